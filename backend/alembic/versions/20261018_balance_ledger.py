@@ -0,0 +1,81 @@
+"""incrementally maintained balance ledger
+
+Revision ID: 20261018_balance_ledger
+Revises: 20261018_number_sequences
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_balance_ledger'
+down_revision: Union[str, None] = '20261018_number_sequences'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_credit_notes_account_status',
+        'credit_notes',
+        ['billing_account_id', 'status'],
+        unique=False,
+    )
+
+    # Seed stored balances from the ledger; from here on they are maintained
+    # incrementally. Enum columns are compared case-insensitively because
+    # older tables store member names and newer ones store values.
+    op.execute(
+        """
+        WITH entries AS (
+            SELECT billing_account_id, -total_amount AS amount
+            FROM invoices
+            WHERE upper(status::text) NOT IN ('DRAFT', 'CANCELLED')
+            UNION ALL
+            SELECT billing_account_id, amount
+            FROM payments
+            WHERE upper(status::text) = 'COMPLETED'
+            UNION ALL
+            SELECT billing_account_id, amount
+            FROM credit_notes
+            WHERE status IN ('active', 'applied')
+            UNION ALL
+            SELECT billing_account_id,
+                   CASE WHEN upper(transaction_type::text) IN ('CREDIT', 'PAYMENT')
+                        THEN amount ELSE -amount END
+            FROM billing_transactions
+            WHERE upper(transaction_type::text) IN ('CREDIT', 'PAYMENT', 'DEBIT', 'CHARGE')
+              AND invoice_id IS NULL
+              AND payment_id IS NULL
+              AND is_reversed IS NOT TRUE
+        ),
+        ledger AS (
+            SELECT billing_account_id, SUM(amount) AS balance
+            FROM entries
+            GROUP BY billing_account_id
+        )
+        UPDATE customer_billing_accounts a
+        SET current_balance = COALESCE(l.balance, 0),
+            available_balance = COALESCE(l.balance, 0) - a.reserved_balance
+        FROM customer_billing_accounts src
+        LEFT JOIN ledger l ON l.billing_account_id = src.id
+        WHERE a.id = src.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE customers c
+        SET balance = a.current_balance
+        FROM customer_billing_accounts a
+        WHERE a.customer_id = c.id
+          AND c.balance IS DISTINCT FROM a.current_balance
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_credit_notes_account_status', table_name='credit_notes')
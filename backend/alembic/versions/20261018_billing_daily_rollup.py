@@ -0,0 +1,65 @@
+"""daily billing rollup
+
+Revision ID: 20261018_billing_daily_rollup
+Revises: 20261018_reseller_rollups
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_billing_daily_rollup'
+down_revision: Union[str, None] = '20261018_reseller_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'billing_daily_rollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('document', sa.String(length=10), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('document_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_amount', sa.DECIMAL(precision=14, scale=2), nullable=False, server_default='0'),
+        sa.Column('paid_amount', sa.DECIMAL(precision=14, scale=2), nullable=False, server_default='0'),
+        sa.Column('balance_due', sa.DECIMAL(precision=14, scale=2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'document', 'status', name='uq_billing_daily_rollup'),
+    )
+    op.create_index(op.f('ix_billing_daily_rollup_id'), 'billing_daily_rollup', ['id'], unique=False)
+
+    # Backfill from the existing documents, so statistics for a range that
+    # starts before the deploy are not read from partial rollups. Statuses
+    # are stored as their enum values, which are the lowercased labels.
+    op.execute(
+        """
+        INSERT INTO billing_daily_rollup
+            (day, document, status, document_count, total_amount, paid_amount, balance_due)
+        SELECT (invoice_date AT TIME ZONE 'UTC')::date, 'invoice', lower(status::text),
+               count(*), coalesce(sum(total_amount), 0), coalesce(sum(paid_amount), 0),
+               coalesce(sum(balance_due), 0)
+        FROM invoices
+        GROUP BY 1, 3
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO billing_daily_rollup (day, document, status, document_count, total_amount)
+        SELECT (payment_date AT TIME ZONE 'UTC')::date, 'payment', lower(status::text),
+               count(*), coalesce(sum(amount), 0)
+        FROM payments
+        GROUP BY 1, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_billing_daily_rollup_id'), table_name='billing_daily_rollup')
+    op.drop_table('billing_daily_rollup')
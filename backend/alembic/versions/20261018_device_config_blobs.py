@@ -0,0 +1,59 @@
+"""content-addressed device configuration backups
+
+Revision ID: 20261018_device_config_blobs
+Revises: 20261018_router_placement
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_device_config_blobs'
+down_revision: Union[str, None] = '20261018_router_placement'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'device_config_blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('encoding', sa.String(length=20), nullable=False, server_default='full'),
+        sa.Column('base_blob_id', sa.Integer(), nullable=True),
+        sa.Column('compression', sa.String(length=20), nullable=False, server_default='zlib'),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('original_size', sa.Integer(), nullable=False),
+        sa.Column('stored_size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['base_blob_id'], ['device_config_blobs.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('sha256'),
+    )
+    op.create_index(op.f('ix_device_config_blobs_id'), 'device_config_blobs', ['id'], unique=False)
+
+    op.add_column('device_config_backups', sa.Column('blob_id', sa.Integer(), nullable=True))
+    op.add_column(
+        'device_config_backups', sa.Column('verified_at', sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_foreign_key(
+        'fk_device_config_backups_blob', 'device_config_backups', 'device_config_blobs',
+        ['blob_id'], ['id'],
+    )
+    op.create_index(
+        'idx_device_config_backups_latest', 'device_config_backups',
+        ['device_id', sa.text('completed_at DESC')], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_device_config_backups_latest', table_name='device_config_backups')
+    op.drop_constraint('fk_device_config_backups_blob', 'device_config_backups', type_='foreignkey')
+    op.drop_column('device_config_backups', 'verified_at')
+    op.drop_column('device_config_backups', 'blob_id')
+    op.drop_index(op.f('ix_device_config_blobs_id'), table_name='device_config_blobs')
+    op.drop_table('device_config_blobs')
@@ -0,0 +1,46 @@
+"""64-bit traffic counters for FUP metering
+
+Revision ID: 20261018_fup_counters
+Revises: 20261018_usage_partitions
+Create Date: 2026-10-18 23:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_fup_counters'
+down_revision: Union[str, None] = '20261018_usage_partitions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Byte counters; a month of traffic overflows a 32-bit integer
+COLUMNS = ('day_up', 'day_down', 'week_up', 'week_down', 'month_up', 'month_down')
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table('customer_traffic_counters'):
+        return
+    for column in COLUMNS:
+        op.alter_column(
+            'customer_traffic_counters',
+            column,
+            type_=sa.BigInteger(),
+            existing_type=sa.Integer(),
+        )
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table('customer_traffic_counters'):
+        return
+    for column in COLUMNS:
+        op.alter_column(
+            'customer_traffic_counters',
+            column,
+            type_=sa.Integer(),
+            existing_type=sa.BigInteger(),
+            postgresql_using=f'least({column}, 2147483647)::integer',
+        )
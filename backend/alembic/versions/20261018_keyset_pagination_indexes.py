@@ -0,0 +1,28 @@
+"""keyset pagination indexes
+
+Revision ID: 20261018_keyset_pagination
+Revises: 7f62bdcd66fe
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_keyset_pagination'
+down_revision: Union[str, None] = '7f62bdcd66fe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Ticket search pages newest-first on (created_at, id)
+    op.create_index(
+        'idx_tickets_created_at_id', 'tickets', ['created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_tickets_created_at_id', table_name='tickets')
@@ -0,0 +1,73 @@
+"""number sequences for document numbering
+
+Revision ID: 20261018_number_sequences
+Revises: 20261018_keyset_pagination
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_number_sequences'
+down_revision: Union[str, None] = '20261018_keyset_pagination'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (counter name, table, number column, prefix) for documents numbered
+# PREFIX-YYYYMM-NNNN before the allocator existed
+SEEDED_COUNTERS = [
+    ('invoice', 'invoices', 'invoice_number', 'INV'),
+    ('payment', 'payments', 'payment_number', 'PAY'),
+    ('credit_note', 'credit_notes', 'credit_note_number', 'CN'),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'number_sequences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('period', sa.String(length=20), nullable=False, server_default=''),
+        sa.Column('last_value', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name', 'period', name='uq_number_sequence_name_period'),
+    )
+    op.create_index(op.f('ix_number_sequences_id'), 'number_sequences', ['id'], unique=False)
+
+    # Continue each month's numbering from the highest number already issued
+    for name, table, column, prefix in SEEDED_COUNTERS:
+        op.execute(
+            f"""
+            INSERT INTO number_sequences (name, period, last_value)
+            SELECT '{name}',
+                   substring({column} from {len(prefix) + 2} for 6),
+                   MAX(CAST(substring({column} from {len(prefix) + 9}) AS BIGINT))
+            FROM {table}
+            WHERE {column} ~ '^{prefix}-[0-9]{{6}}-[0-9]+$'
+            GROUP BY 2
+            """
+        )
+
+    # Customer IDs now come straight from the sequence; make sure it is ahead
+    # of any rows inserted with explicit ids
+    op.execute(
+        """
+        SELECT setval(
+            pg_get_serial_sequence('customers', 'id'),
+            COALESCE((SELECT MAX(id) FROM customers), 0) + 1,
+            false
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_number_sequences_id'), table_name='number_sequences')
+    op.drop_table('number_sequences')
@@ -0,0 +1,55 @@
+"""per-reseller monthly rollups
+
+Revision ID: 20261018_reseller_rollups
+Revises: 20261018_device_config_blobs
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_reseller_rollups'
+down_revision: Union[str, None] = '20261018_device_config_blobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reseller_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('reseller_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=6), nullable=False, server_default=''),
+        sa.Column('customers_added', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('customers_removed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('active_customers', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('payment_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('paying_customers', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_revenue', sa.DECIMAL(precision=14, scale=2), nullable=False, server_default='0'),
+        sa.Column('commission_amount', sa.DECIMAL(precision=14, scale=2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['reseller_id'], ['resellers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('reseller_id', 'period', name='uq_reseller_rollup_period'),
+    )
+    op.create_index(op.f('ix_reseller_rollups_id'), 'reseller_rollups', ['id'], unique=False)
+
+    # Per-page customer summaries look up services and payments per customer
+    op.create_index(
+        'idx_customers_reseller', 'customers', ['reseller_id', 'id'], unique=False
+    )
+    op.create_index(
+        'idx_payments_customer_status_date', 'payments',
+        ['customer_id', 'status', 'payment_date'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_payments_customer_status_date', table_name='payments')
+    op.drop_index('idx_customers_reseller', table_name='customers')
+    op.drop_index(op.f('ix_reseller_rollups_id'), table_name='reseller_rollups')
+    op.drop_table('reseller_rollups')
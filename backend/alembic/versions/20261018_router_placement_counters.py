@@ -0,0 +1,70 @@
+"""router and sector placement occupancy counters
+
+Revision ID: 20261018_router_placement
+Revises: 20261018_ticket_incidents
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_router_placement'
+down_revision: Union[str, None] = '20261018_ticket_incidents'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OCCUPYING_STATUSES = (
+    "'ACTIVE', 'SUSPENDED', 'PENDING_UPGRADE', 'PENDING_DOWNGRADE', 'PENDING_RELOCATION'"
+)
+
+
+def upgrade() -> None:
+    for table in ('routers', 'router_sectors'):
+        op.add_column(
+            table,
+            sa.Column('active_services', sa.Integer(), nullable=False, server_default='0'),
+        )
+        op.add_column(table, sa.Column('max_services', sa.Integer(), nullable=True))
+
+    op.create_index(
+        'idx_customer_services_sector', 'customer_services', ['sector_id'], unique=False
+    )
+
+    # Backfill occupancy from the services that currently hold a slot
+    op.execute(
+        f"""
+        UPDATE routers SET active_services = counts.total
+        FROM (
+            SELECT primary_router_id AS id, count(*) AS total
+            FROM customer_services
+            WHERE primary_router_id IS NOT NULL
+              AND status::text IN ({OCCUPYING_STATUSES})
+            GROUP BY primary_router_id
+        ) AS counts
+        WHERE routers.id = counts.id
+        """
+    )
+    op.execute(
+        f"""
+        UPDATE router_sectors SET active_services = counts.total
+        FROM (
+            SELECT sector_id AS id, count(*) AS total
+            FROM customer_services
+            WHERE sector_id IS NOT NULL
+              AND status::text IN ({OCCUPYING_STATUSES})
+            GROUP BY sector_id
+        ) AS counts
+        WHERE router_sectors.id = counts.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_customer_services_sector', table_name='customer_services')
+    for table in ('router_sectors', 'routers'):
+        op.drop_column(table, 'max_services')
+        op.drop_column(table, 'active_services')
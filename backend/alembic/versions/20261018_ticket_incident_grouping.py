@@ -0,0 +1,31 @@
+"""ticket incident grouping indexes
+
+Revision ID: 20261018_ticket_incidents
+Revises: 20261018_ticket_search_stats
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_ticket_incidents'
+down_revision: Union[str, None] = '20261018_ticket_search_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_tickets_related_incident', 'tickets', ['related_incident_id'], unique=False
+    )
+    op.create_index(
+        'idx_tickets_parent_customer', 'tickets', ['parent_ticket_id', 'customer_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_tickets_parent_customer', table_name='tickets')
+    op.drop_index('idx_tickets_related_incident', table_name='tickets')
@@ -0,0 +1,86 @@
+"""ticket full-text search and daily statistics rollup
+
+Revision ID: 20261018_ticket_search_stats
+Revises: 20261018_balance_ledger
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_ticket_search_stats'
+down_revision: Union[str, None] = '20261018_balance_ledger'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        'tickets',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+    )
+    op.create_index(
+        'idx_tickets_search_vector', 'tickets', ['search_vector'],
+        unique=False, postgresql_using='gin',
+    )
+    op.create_index(
+        'idx_tickets_title_trgm', 'tickets', ['title'],
+        unique=False, postgresql_using='gin',
+        postgresql_ops={'title': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'idx_tickets_number_trgm', 'tickets', ['ticket_number'],
+        unique=False, postgresql_using='gin',
+        postgresql_ops={'ticket_number': 'gin_trgm_ops'},
+    )
+
+    op.create_table(
+        'ticket_daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('stat_date', sa.Date(), nullable=False),
+        sa.Column('team', sa.String(length=100), nullable=False, server_default=''),
+        sa.Column('tickets_created', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tickets_open', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tickets_overdue', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tickets_resolved', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sla_tracked', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sla_met', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('response_seconds_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('response_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('resolution_seconds_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('resolution_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('satisfaction_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('satisfaction_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stat_date', 'team', name='uq_ticket_daily_stats_date_team'),
+    )
+    op.create_index(op.f('ix_ticket_daily_stats_id'), 'ticket_daily_stats', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_ticket_daily_stats_stat_date'), 'ticket_daily_stats', ['stat_date'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ticket_daily_stats_stat_date'), table_name='ticket_daily_stats')
+    op.drop_index(op.f('ix_ticket_daily_stats_id'), table_name='ticket_daily_stats')
+    op.drop_table('ticket_daily_stats')
+    op.drop_index('idx_tickets_number_trgm', table_name='tickets')
+    op.drop_index('idx_tickets_title_trgm', table_name='tickets')
+    op.drop_index('idx_tickets_search_vector', table_name='tickets')
+    op.drop_column('tickets', 'search_vector')
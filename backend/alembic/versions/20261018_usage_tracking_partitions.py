@@ -0,0 +1,167 @@
+"""monthly partitions for service usage tracking
+
+Revision ID: 20261018_usage_partitions
+Revises: 20261018_billing_daily_rollup
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_usage_partitions'
+down_revision: Union[str, None] = '20261018_billing_daily_rollup'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    'id, customer_service_id, tracking_date, period_type, bytes_downloaded, '
+    'bytes_uploaded, session_count, session_duration_minutes, '
+    'peak_download_speed_kbps, peak_upload_speed_kbps, average_latency_ms, '
+    'incoming_calls, outgoing_calls, total_call_minutes, missed_calls, '
+    'voicemail_messages, uptime_minutes, downtime_minutes, packet_loss_percent, '
+    'jitter_ms, usage_charges, overage_charges, created_at, updated_at'
+)
+
+# Creates service_usage_tracking_pYYYY_MM for every month in [first, last]
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month date := date_trunc('month', {first})::date;
+BEGIN
+    WHILE month <= date_trunc('month', {last})::date LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF service_usage_tracking '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'service_usage_tracking_p' || to_char(month, 'YYYY_MM'),
+            month::timestamp AT TIME ZONE 'UTC',
+            (month + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade() -> None:
+    legacy = sa.inspect(op.get_bind()).has_table('service_usage_tracking')
+    if legacy:
+        op.rename_table('service_usage_tracking', 'service_usage_tracking_legacy')
+        op.execute(
+            'ALTER TABLE service_usage_tracking_legacy '
+            'RENAME CONSTRAINT service_usage_tracking_pkey '
+            'TO service_usage_tracking_legacy_pkey'
+        )
+        for index in (
+            'ix_service_usage_tracking_id',
+            'ix_service_usage_tracking_tracking_date',
+            'idx_usage_tracking_service_date',
+            'idx_usage_tracking_period',
+        ):
+            op.execute(f'DROP INDEX IF EXISTS {index}')
+
+    # The id sequence is reused so existing ids keep counting up
+    op.execute('CREATE SEQUENCE IF NOT EXISTS service_usage_tracking_id_seq')
+    op.execute(
+        """
+        CREATE TABLE service_usage_tracking (
+            id integer NOT NULL DEFAULT nextval('service_usage_tracking_id_seq'),
+            customer_service_id integer NOT NULL
+                REFERENCES customer_services (id) ON DELETE CASCADE,
+            tracking_date timestamptz NOT NULL,
+            period_type varchar(20) NOT NULL,
+            bytes_downloaded numeric(15, 0),
+            bytes_uploaded numeric(15, 0),
+            session_count integer,
+            session_duration_minutes integer,
+            peak_download_speed_kbps integer,
+            peak_upload_speed_kbps integer,
+            average_latency_ms numeric(6, 2),
+            incoming_calls integer,
+            outgoing_calls integer,
+            total_call_minutes integer,
+            missed_calls integer,
+            voicemail_messages integer,
+            uptime_minutes integer,
+            downtime_minutes integer,
+            packet_loss_percent numeric(5, 2),
+            jitter_ms numeric(6, 2),
+            usage_charges numeric(10, 2),
+            overage_charges numeric(10, 2),
+            created_at timestamptz DEFAULT now(),
+            updated_at timestamptz,
+            PRIMARY KEY (id, tracking_date)
+        ) PARTITION BY RANGE (tracking_date)
+        """
+    )
+    op.execute(
+        'ALTER SEQUENCE service_usage_tracking_id_seq '
+        'OWNED BY service_usage_tracking.id'
+    )
+    op.create_index(
+        'idx_usage_tracking_service_date',
+        'service_usage_tracking',
+        ['customer_service_id', 'tracking_date'],
+    )
+    op.create_index(
+        'idx_usage_tracking_period',
+        'service_usage_tracking',
+        ['period_type', 'tracking_date'],
+    )
+    op.create_index(
+        'idx_usage_tracking_date_brin',
+        'service_usage_tracking',
+        ['tracking_date'],
+        postgresql_using='brin',
+    )
+
+    # Current month and the next two; the maintenance task keeps ahead
+    op.execute(CREATE_PARTITIONS.format(first='now()', last="now() + interval '2 months'"))
+
+    if legacy:
+        op.execute(
+            CREATE_PARTITIONS.format(
+                first='(SELECT coalesce(min(tracking_date), now()) FROM service_usage_tracking_legacy)',
+                last='(SELECT coalesce(max(tracking_date), now()) FROM service_usage_tracking_legacy)',
+            )
+        )
+        op.execute(
+            f'INSERT INTO service_usage_tracking ({COLUMNS}) '
+            f'SELECT {COLUMNS} FROM service_usage_tracking_legacy'
+        )
+        op.drop_table('service_usage_tracking_legacy')
+
+
+def downgrade() -> None:
+    op.execute(
+        'CREATE TABLE service_usage_tracking_flat '
+        '(LIKE service_usage_tracking INCLUDING DEFAULTS)'
+    )
+    op.execute(
+        f'INSERT INTO service_usage_tracking_flat ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM service_usage_tracking'
+    )
+    op.execute(
+        'ALTER SEQUENCE service_usage_tracking_id_seq '
+        'OWNED BY service_usage_tracking_flat.id'
+    )
+    op.drop_table('service_usage_tracking')
+    op.rename_table('service_usage_tracking_flat', 'service_usage_tracking')
+    op.execute('ALTER TABLE service_usage_tracking ADD PRIMARY KEY (id)')
+    op.execute(
+        'ALTER TABLE service_usage_tracking ADD FOREIGN KEY (customer_service_id) '
+        'REFERENCES customer_services (id) ON DELETE CASCADE'
+    )
+    op.create_index(
+        'idx_usage_tracking_service_date',
+        'service_usage_tracking',
+        ['customer_service_id', 'tracking_date'],
+    )
+    op.create_index(
+        'idx_usage_tracking_period',
+        'service_usage_tracking',
+        ['period_type', 'tracking_date'],
+    )
@@ -1,191 +1,216 @@
-from fastapi import APIRouter
-
-from app.api.v1.endpoints import (  # Core business endpoints; Service & network management; Platform & monitoring; Platform services; Additional endpoints (maintained for compatibility); Lookup tables; RBAC system; Device management; Ansible automation
-    alerts,
-    api_management,
-    audit_management,
-    auth,
-    automation,
-    bank_accounts,
-    billing,
-    # billing_enhanced,  # Temporarily disabled due to Pydantic schema issues
-    billing_types,
-    communications,
-    contact_types,
-    customer_portal,
-    customer_services,
-    customer_statuses,
-    customers,
-    dashboard,
-    dead_letter_queue,
-    device_management,
-    devices,
-    files,
-    navigation,
-    oauth,
-    operational_dashboard,
-    payment_dashboard,
-    portal_auth,
-    radius,
-    rbac,
-    reseller,
-    reseller_auth,
-    search,
-    service_instances,
-    service_provisioning,
-    service_templates,
-    service_types,
-    services,
-    ticket_statuses,
-    ticketing,
-    two_factor,
-    webhooks,
-)
-from app.api.v1 import config_management
-
-# Redirects removed - using direct RESTful URLs
-
-api_router = APIRouter()
-
-# ============================================================================
-# Core Business API
-# ============================================================================
-
-# Authentication & Authorization
-api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
-api_router.include_router(
-    portal_auth.router, prefix="/auth/portal", tags=["authentication"]
-)
-api_router.include_router(
-    two_factor.router, prefix="/auth/two-factor", tags=["authentication"]
-)
-api_router.include_router(oauth.router, prefix="/auth/oauth", tags=["authentication"])
-api_router.include_router(
-    reseller_auth.router, prefix="/auth/resellers", tags=["authentication"]
-)
-
-# Customer Management
-api_router.include_router(customers.router, prefix="/customers", tags=["customers"])
-api_router.include_router(
-    customer_portal.router, prefix="/customers", tags=["customers"]
-)
-api_router.include_router(
-    contact_types.router, prefix="/contact-types", tags=["lookups"]
-)
-api_router.include_router(
-    customer_statuses.router, prefix="/customer-statuses", tags=["lookups"]
-)
-api_router.include_router(
-    service_types.router, prefix="/service-types", tags=["lookups"]
-)
-api_router.include_router(
-    ticket_statuses.router, prefix="/ticket-statuses", tags=["lookups"]
-)
-api_router.include_router(
-    billing_types.router, prefix="/billing-types", tags=["lookups"]
-)
-
-# RBAC System
-api_router.include_router(rbac.router, prefix="/rbac", tags=["rbac"])
-
-# Configuration Management
-api_router.include_router(config_management.router, prefix="/config", tags=["configuration"])
-
-# Dashboard & Reporting
-api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
-api_router.include_router(payment_dashboard.router, prefix="/payment-dashboard", tags=["payment-analytics"])
-
-# Payment System
-api_router.include_router(bank_accounts.router, prefix="/bank-accounts", tags=["payments"])
-
-# Device Management
-api_router.include_router(devices.router, prefix="/devices", tags=["devices"])
-
-# Ansible Automation
-api_router.include_router(automation.router, prefix="/automation", tags=["automation"])
-
-# Service Management (Consolidated)
-api_router.include_router(services.router, prefix="/services", tags=["services"])
-api_router.include_router(
-    customer_services.router, prefix="/customer-services", tags=["services"]
-)
-api_router.include_router(
-    service_templates.router, prefix="/services/templates", tags=["services"]
-)  # Replaces service_plans
-api_router.include_router(
-    service_instances.router, prefix="/services/subscriptions", tags=["services"]
-)  # Renamed for clarity
-api_router.include_router(
-    service_provisioning.router, prefix="/services/provisioning", tags=["services"]
-)
-# Note: service_plans deprecated - use service_templates instead
-
-# Customer Services (Proper RESTful nesting - handled in customers router)
-# Note: Customer services are nested under /customers/{id}/services
+"""
+API v1 router table.
+
+Every endpoint module is listed once in ``ROUTERS``. By default the whole
+table is imported and mounted at startup; with ``settings.lazy_routers`` a
+``LazyRouterLoader`` mounts each module on the first request under its
+prefix, so a cold process can answer health checks before importing every
+endpoint, service and client library.
+"""
+
+import logging
+import threading
+from importlib import import_module
+from typing import Iterable, NamedTuple, Set, Tuple
+
+from fastapi import APIRouter, FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+class RouterSpec(NamedTuple):
+    """An endpoint module's router and where it is mounted"""
+
+    module: str  # Relative to app.api.v1
+    prefix: str
+    tags: Tuple[str, ...]
+
+
+ROUTERS: Tuple[RouterSpec, ...] = (
+    # ============================================================================
+    # Core Business API
+    # ============================================================================
+    # Authentication & Authorization
+    RouterSpec("endpoints.auth", "/auth", ("authentication",)),
+    RouterSpec("endpoints.portal_auth", "/auth/portal", ("authentication",)),
+    RouterSpec("endpoints.two_factor", "/auth/two-factor", ("authentication",)),
+    RouterSpec("endpoints.oauth", "/auth/oauth", ("authentication",)),
+    RouterSpec("endpoints.reseller_auth", "/auth/resellers", ("authentication",)),
+    # Customer Management
+    RouterSpec("endpoints.customers", "/customers", ("customers",)),
+    RouterSpec("endpoints.customer_portal", "/customers", ("customers",)),
+    RouterSpec("endpoints.contact_types", "/contact-types", ("lookups",)),
+    RouterSpec("endpoints.customer_statuses", "/customer-statuses", ("lookups",)),
+    RouterSpec("endpoints.service_types", "/service-types", ("lookups",)),
+    RouterSpec("endpoints.ticket_statuses", "/ticket-statuses", ("lookups",)),
+    RouterSpec("endpoints.billing_types", "/billing-types", ("lookups",)),
+    # RBAC System
+    RouterSpec("endpoints.rbac", "/rbac", ("rbac",)),
+    # Configuration Management
+    RouterSpec("config_management", "/config", ("configuration",)),
+    # Dashboard & Reporting
+    RouterSpec("endpoints.dashboard", "/dashboard", ("dashboard",)),
+    RouterSpec(
+        "endpoints.payment_dashboard", "/payment-dashboard", ("payment-analytics",)
+    ),
+    # Payment System
+    RouterSpec("endpoints.bank_accounts", "/bank-accounts", ("payments",)),
+    # Device Management
+    RouterSpec("endpoints.devices", "/devices", ("devices",)),
+    # Ansible Automation
+    RouterSpec("endpoints.automation", "/automation", ("automation",)),
+    # Service Management (Consolidated)
+    RouterSpec("endpoints.services", "/services", ("services",)),
+    RouterSpec("endpoints.customer_services", "/customer-services", ("services",)),
+    # Replaces service_plans
+    RouterSpec("endpoints.service_templates", "/services/templates", ("services",)),
+    # Renamed for clarity
+    RouterSpec("endpoints.service_instances", "/services/subscriptions", ("services",)),
+    RouterSpec(
+        "endpoints.service_provisioning", "/services/provisioning", ("services",)
+    ),
+    # Note: service_plans deprecated - use service_templates instead
+    # Customer Services (Proper RESTful nesting - handled in customers router)
+    # Note: Customer services are nested under /customers/{id}/services
+    # Billing & Payments
+    RouterSpec("endpoints.billing", "/billing", ("billing",)),
+    # Temporarily disabled
+    # RouterSpec("endpoints.billing_enhanced", "/billing", ("billing",)),
+    # Support & Ticketing (Clean RESTful naming)
+    RouterSpec("endpoints.ticketing", "/support", ("support",)),
+    # Reseller Management (Business Alignment)
+    RouterSpec("endpoints.reseller", "/resellers", ("resellers",)),
+    # ============================================================================
+    # Network & Infrastructure
+    # ============================================================================
+    # Network Management
+    RouterSpec("endpoints.device_management", "/network/devices", ("network",)),
+    RouterSpec("endpoints.radius", "/network/radius", ("network",)),
+    # Note: radius_integration merged into radius endpoints
+    # ============================================================================
+    # Platform & Operations
+    # ============================================================================
+    # Monitoring & Alerting (Consolidated)
+    RouterSpec("endpoints.alerts", "/monitoring/alerts", ("monitoring",)),
+    RouterSpec(
+        "endpoints.operational_dashboard", "/monitoring/dashboard", ("monitoring",)
+    ),
+    # Audit & Compliance
+    RouterSpec("endpoints.audit_management", "/audit", ("compliance",)),
+    # ============================================================================
+    # Platform Services
+    # ============================================================================
+    # API Management (Avoid confusion with /api/v1 base)
+    RouterSpec("endpoints.api_management", "/management", ("platform",)),
+    # File Management
+    RouterSpec("endpoints.files", "/files", ("platform",)),
+    # Global Search
+    RouterSpec("endpoints.search", "/search", ("search",)),
+    # Communications
+    RouterSpec("endpoints.communications", "/communications", ("platform",)),
+    # Webhooks (Clean RESTful naming)
+    RouterSpec("endpoints.webhooks", "/webhooks", ("integrations",)),
+    # Background Processing (Clean RESTful naming)
+    RouterSpec("endpoints.dead_letter_queue", "/background", ("background",)),
+)
+
+
+def load_router(spec: RouterSpec) -> APIRouter:
+    """Import an endpoint module and return its router"""
+    return import_module(f"app.api.v1.{spec.module}").router
+
+
+def build_api_router(specs: Iterable[RouterSpec] = ROUTERS) -> APIRouter:
+    """Import every endpoint module and mount it on one router"""
+    router = APIRouter()
+    for spec in specs:
+        router.include_router(
+            load_router(spec), prefix=spec.prefix, tags=list(spec.tags)
+        )
+    return router
+
+
+class LazyRouterLoader:
+    """Mount endpoint routers on the application on first use.
+
+    ``ensure_loaded`` is called for every request path; routers whose prefix
+    matches are imported and included before the request is routed. Routers
+    are mounted in table order, so prefixes shared by several modules keep
+    their eager precedence (the table lists parent prefixes before nested
+    ones, e.g. ``/services`` before ``/services/templates``).
+    """
+
+    def __init__(
+        self, app: FastAPI, prefix: str, specs: Iterable[RouterSpec] = ROUTERS
+    ):
+        self.app = app
+        self.mounts = {spec: prefix + spec.prefix for spec in specs}
+        self.loaded: Set[RouterSpec] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def complete(self) -> bool:
+        return len(self.loaded) == len(self.mounts)
+
+    def ensure_loaded(self, path: str) -> None:
+        if self.complete:
+            return
+        pending = [
+            spec
+            for spec, mount in self.mounts.items()
+            if spec not in self.loaded
+            and (path == mount or path.startswith(mount + "/"))
+        ]
+        if pending:
+            self._load(pending)
+
+    def load_all(self) -> None:
+        """Mount every remaining router (e.g. before rendering the OpenAPI schema)"""
+        if not self.complete:
+            self._load([spec for spec in self.mounts if spec not in self.loaded])
+
+    def _load(self, specs) -> None:
+        with self._lock:
+            for spec in specs:
+                if spec in self.loaded:
+                    continue
+                mount = self.mounts[spec]
+                self.app.include_router(
+                    load_router(spec), prefix=mount, tags=list(spec.tags)
+                )
+                self.loaded.add(spec)
+                logger.info(f"Mounted API router {spec.module} at {mount}")
+            # Routes changed; regenerate the schema on the next request
+            self.app.openapi_schema = None
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware that mounts the routers a request needs before routing"""
+
+    def __init__(self, app, loader: LazyRouterLoader, schema_paths: Iterable[str] = ()):
+        self.app = app
+        self.loader = loader
+        self.schema_paths = frozenset(path for path in schema_paths if path)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and not self.loader.complete:
+            path = scope["path"]
+            if path in self.schema_paths:
+                self.loader.load_all()
+            else:
+                self.loader.ensure_loaded(path)
+        await self.app(scope, receive, send)
+
+
+def __getattr__(name: str):
+    # ``api_router`` is built on first access so importing this module (for
+    # the lazy loader) does not import every endpoint
+    if name == "api_router":
+        router = build_api_router()
+        globals()["api_router"] = router
+        return router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Billing & Payments
-api_router.include_router(billing.router, prefix="/billing", tags=["billing"])
-# api_router.include_router(billing_enhanced.router, prefix="/billing", tags=["billing"])  # Temporarily disabled
-
-# Support & Ticketing (Clean RESTful naming)
-api_router.include_router(ticketing.router, prefix="/support", tags=["support"])
-
-# Reseller Management (Business Alignment)
-api_router.include_router(reseller.router, prefix="/resellers", tags=["resellers"])
-
-# ============================================================================
-# Network & Infrastructure
-# ============================================================================
-
-# Network Management
-api_router.include_router(
-    device_management.router, prefix="/network/devices", tags=["network"]
-)
-api_router.include_router(radius.router, prefix="/network/radius", tags=["network"])
-# Note: radius_integration merged into radius endpoints
-
-# ============================================================================
-# Platform & Operations
-# ============================================================================
-
-# Monitoring & Alerting (Consolidated)
-api_router.include_router(
-    alerts.router, prefix="/monitoring/alerts", tags=["monitoring"]
-)
-api_router.include_router(
-    operational_dashboard.router, prefix="/monitoring/dashboard", tags=["monitoring"]
-)
-
-# Audit & Compliance
-api_router.include_router(audit_management.router, prefix="/audit", tags=["compliance"])
-
-# ============================================================================
-# Platform Services
-# ============================================================================
-
-# API Management (Avoid confusion with /api/v1 base)
-api_router.include_router(
-    api_management.router, prefix="/management", tags=["platform"]
-)
-
-# File Management
-api_router.include_router(files.router, prefix="/files", tags=["platform"])
-
-# Global Search
-api_router.include_router(search.router, prefix="/search", tags=["search"])
-
-# Communications
-api_router.include_router(
-    communications.router, prefix="/communications", tags=["platform"]
-)
-
-# Webhooks (Clean RESTful naming)
-api_router.include_router(webhooks.router, prefix="/webhooks", tags=["integrations"])
-
-# Background Processing (Clean RESTful naming)
-api_router.include_router(
-    dead_letter_queue.router, prefix="/background", tags=["background"]
-)
 
 # ============================================================================
 # RESTful API Structure Complete
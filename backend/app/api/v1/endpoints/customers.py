@@ -37,6 +37,9 @@ def list_customers(
     status_filter: Optional[str] = Query(None, alias="status", description="Filter by status"),
     category: Optional[str] = Query(None, description="Filter by category"),
     location_id: Optional[int] = Query(None, description="Filter by location"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from a previous page's next_cursor"
+    ),
     current_admin: Administrator = Depends(get_current_active_admin),
     db: Session = Depends(get_db),
 ):
@@ -51,8 +54,13 @@ def list_customers(
             status=status_filter,
             category=category,
             location_id=location_id,
+            cursor=cursor,
         )
         return result
+    except CustomValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
     except Exception as e:
         logger.error(f"Error listing customers: {e}")
         raise HTTPException(
@@ -30,11 +30,17 @@ from app.models.devices.device_management import (
     MonitoringProtocol,
 )
 from app.services.device_management_service import DeviceManagementFactory
-from app.services.snmp_monitoring_service import SNMPMonitoringFactory
 
 router = APIRouter(tags=["device-management"])
 
 
+def _snmp_factory():
+    """SNMP monitoring factory, imported on first use (pysnmp is slow to load)"""
+    from app.services.snmp_monitoring_service import SNMPMonitoringFactory
+
+    return SNMPMonitoringFactory
+
+
 # Device Management Endpoints
 
 
@@ -256,12 +262,46 @@ async def list_device_backups(
             "completed_at": (
                 backup.completed_at.isoformat() if backup.completed_at else None
             ),
+            "verified_at": (
+                backup.verified_at.isoformat() if backup.verified_at else None
+            ),
+            "checksum": backup.checksum,
             "error_message": backup.error_message,
         }
         for backup in backups
     ]
 
 
+@router.get("/{device_id}/backups/{backup_id}/config")
+async def get_device_backup_config(
+    device_id: int,
+    backup_id: int,
+    db: Session = Depends(get_db),
+    current_admin=Depends(get_current_admin),
+):
+    """Get the configuration text captured by a backup"""
+    backup = (
+        db.query(DeviceConfigBackup)
+        .filter(
+            and_(
+                DeviceConfigBackup.id == backup_id,
+                DeviceConfigBackup.device_id == device_id,
+            )
+        )
+        .first()
+    )
+    if not backup:
+        raise HTTPException(status_code=404, detail="Backup not found")
+
+    config_service = DeviceManagementFactory.get_config_service(db)
+    return {
+        "id": backup.id,
+        "device_id": device_id,
+        "checksum": backup.checksum,
+        "config": config_service.get_backup_config(backup),
+    }
+
+
 # Monitoring and Analytics Endpoints
 
 
@@ -409,8 +449,8 @@ async def discover_devices_in_subnet(
     current_admin=Depends(get_current_admin),
 ):
     """Discover devices in a subnet using SNMP"""
-    snmp_service = SNMPMonitoringFactory.create_monitoring_service(db)
-    credentials = SNMPMonitoringFactory.get_standard_credentials(snmp_community)
+    snmp_service = _snmp_factory().create_monitoring_service(db)
+    credentials = _snmp_factory().get_standard_credentials(snmp_community)
 
     # Add background task for SNMP-based device discovery
     background_tasks.add_task(
@@ -439,7 +479,7 @@ async def collect_snmp_system_metrics(
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    snmp_service = SNMPMonitoringFactory.create_monitoring_service(db)
+    snmp_service = _snmp_factory().create_monitoring_service(db)
 
     # Add background task for SNMP metrics collection
     background_tasks.add_task(snmp_service.collect_system_metrics, device)
@@ -463,7 +503,7 @@ async def collect_snmp_interface_metrics(
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    snmp_service = SNMPMonitoringFactory.create_monitoring_service(db)
+    snmp_service = _snmp_factory().create_monitoring_service(db)
 
     # Add background task for SNMP interface metrics collection
     background_tasks.add_task(snmp_service.collect_interface_metrics, device)
@@ -486,7 +526,7 @@ async def perform_snmp_health_check(
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    snmp_service = SNMPMonitoringFactory.create_monitoring_service(db)
+    snmp_service = _snmp_factory().create_monitoring_service(db)
 
     try:
         health_status = await snmp_service.perform_health_check(device)
@@ -508,8 +548,8 @@ async def discover_device_snmp_info(
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    snmp_service = SNMPMonitoringFactory.create_monitoring_service(db)
-    credentials = SNMPMonitoringFactory.get_standard_credentials(
+    snmp_service = _snmp_factory().create_monitoring_service(db)
+    credentials = _snmp_factory().get_standard_credentials(
         device.snmp_community or "public"
     )
 
@@ -122,11 +122,13 @@ async def start_radius_session(
         return RadiusSessionResponse(
             session_id=session.id,
             customer_id=session.customer_id,
-            portal_id=session.portal_id,
-            service_plan_id=session.service_plan_id,
-            framed_ip_address=session.framed_ip_address,
+            portal_id=auth_result["portal_id"],
+            service_plan_id=auth_result["service_plan_id"],
+            framed_ip_address=(
+                str(session.framed_ip_address) if session.framed_ip_address else None
+            ),
             start_time=session.start_time,
-            status=session.status,
+            status=session.status.value,
             radius_attributes=auth_result["radius_attributes"],
         )
 
@@ -234,7 +234,7 @@ async def get_my_dashboard(
     """Get dashboard data for authenticated reseller"""
     try:
         service = ResellerService(db)
-        dashboard_data = await service.get_reseller_dashboard(current_reseller.id)
+        dashboard_data = service.get_reseller_dashboard(current_reseller.id)
         return dashboard_data
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -250,7 +250,7 @@ async def get_my_customers(
     """Get customers for authenticated reseller"""
     try:
         service = ResellerService(db)
-        customers = await service.get_reseller_customers(
+        customers = service.get_reseller_customers(
             reseller_id=current_reseller.id, limit=limit, offset=offset
         )
         return customers
@@ -268,7 +268,7 @@ async def get_my_commission_report(
     """Get commission report for authenticated reseller"""
     try:
         service = ResellerService(db)
-        commission_report = await service.get_commission_report(
+        commission_report = service.get_reseller_commission_report(
             reseller_id=current_reseller.id, start_date=start_date, end_date=end_date
         )
         return commission_report
@@ -3,7 +3,7 @@ Comprehensive Ticketing System API Endpoints
 Support, Technical, Incident, Field Work, SLA, Escalation, Knowledge Base
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -14,6 +14,7 @@ from app.core.permissions import require_permission
 from app.core.security import get_current_admin_user
 from app.models.auth.base import Administrator
 from app.models.ticketing import FieldWorkOrder, KnowledgeBaseArticle, Ticket
+from app.repositories.pagination import cursor_for
 from app.schemas.ticketing import (
     FieldWorkOrderCreate,
     FieldWorkOrderResponse,
@@ -24,6 +25,8 @@ from app.schemas.ticketing import (
     PaginatedTicketResponse,
     TicketAssignment,
     TicketCreate,
+    TicketDailyStatsResponse,
+    TicketIngestResponse,
     TicketMessageCreate,
     TicketMessageResponse,
     TicketPriorityEnum,
@@ -35,7 +38,9 @@ from app.schemas.ticketing import (
     TicketUpdate,
 )
 from app.services.ticketing_service import (
+    TICKET_CURSOR_KEYS,
     FieldWorkService,
+    IncidentTicketService,
     KnowledgeBaseService,
     TicketMessageService,
     TicketService,
@@ -102,6 +107,22 @@ async def create_ticket(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/tickets/ingest", response_model=TicketIngestResponse)
+async def ingest_tickets(
+    tickets_data: List[TicketCreate],
+    db: Session = Depends(get_db),
+    current_admin: Administrator = Depends(get_current_admin_user),
+):
+    """Create tickets in bulk, grouping outage reports under active incidents"""
+    try:
+        incident_service = IncidentTicketService(db)
+        return incident_service.ingest_tickets(
+            [ticket.dict() for ticket in tickets_data], created_by=current_admin.id
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
 @router.get("/tickets", response_model=PaginatedTicketResponse)
 async def search_tickets(
     customer_id: Optional[int] = Query(None),
@@ -116,10 +137,16 @@ async def search_tickets(
     search_text: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from a previous page's next_cursor"
+    ),
     db: Session = Depends(get_db),
     current_admin: Administrator = Depends(get_current_admin_user),
 ):
-    """Search tickets with filters and pagination"""
+    """Search tickets with filters and pagination
+
+    Pass ``cursor`` (from ``next_cursor``) for constant-time deep paging.
+    """
     try:
         filters = {
             "customer_id": customer_id,
@@ -136,7 +163,15 @@ async def search_tickets(
         filters = {k: v for k, v in filters.items() if v is not None}
 
         ticket_service = TicketService(db)
-        tickets, total = ticket_service.search_tickets(filters, page, per_page)
+        if cursor:
+            result = ticket_service.search_tickets_page(filters, cursor, per_page)
+            tickets, total = result.items, result.total
+            next_cursor = result.next_cursor
+        else:
+            tickets, total = ticket_service.search_tickets(filters, page, per_page)
+            next_cursor = None
+            if tickets and page * per_page < total:
+                next_cursor = cursor_for(tickets[-1], TICKET_CURSOR_KEYS)
 
         return {
             "tickets": tickets,
@@ -144,11 +179,52 @@ async def search_tickets(
             "page": page,
             "per_page": per_page,
             "total_pages": (total + per_page - 1) // per_page,
+            "next_cursor": next_cursor,
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/tickets/statistics", response_model=TicketStatisticsResponse)
+async def get_ticket_statistics(
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    db: Session = Depends(get_db),
+    current_admin: Administrator = Depends(get_current_admin_user),
+):
+    """Get ticket statistics and metrics"""
+    try:
+        filters = {}
+        if created_after:
+            filters["created_after"] = created_after
+        if created_before:
+            filters["created_before"] = created_before
+
+        ticket_service = TicketService(db)
+        stats = ticket_service.get_ticket_statistics(filters)
+        return stats
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.get("/tickets/statistics/daily", response_model=List[TicketDailyStatsResponse])
+async def get_daily_ticket_statistics(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    team: Optional[str] = Query(
+        None, description="Assigned team; empty for unassigned"
+    ),
+    db: Session = Depends(get_db),
+    current_admin: Administrator = Depends(get_current_admin_user),
+):
+    """Get per-team, per-day ticket statistics from the periodically refreshed rollup"""
+    try:
+        ticket_service = TicketService(db)
+        return ticket_service.get_daily_statistics(date_from, date_to, team)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
 @router.get("/tickets/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(
     ticket_id: int,
@@ -229,28 +305,6 @@ async def assign_ticket(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/tickets/statistics", response_model=TicketStatisticsResponse)
-async def get_ticket_statistics(
-    created_after: Optional[datetime] = Query(None),
-    created_before: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db),
-    current_admin: Administrator = Depends(get_current_admin_user),
-):
-    """Get ticket statistics and metrics"""
-    try:
-        filters = {}
-        if created_after:
-            filters["created_after"] = created_after
-        if created_before:
-            filters["created_before"] = created_before
-
-        ticket_service = TicketService(db)
-        stats = ticket_service.get_ticket_statistics(filters)
-        return stats
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-
 # ============================================================================
 # TICKET MESSAGE ENDPOINTS
 # ============================================================================
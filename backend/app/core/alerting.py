@@ -2,11 +2,17 @@
 Alerting Integration System for ISP Framework.
 
 Provides Grafana-based alerting with communications module integration.
+
+Error metrics keep a bounded set of label values (see ``LabelGuard``), and
+alerts are aggregated per rule window: the first matching error is sent
+straight away, later ones are counted and sent as one summary per cooldown.
 """
 
+import asyncio
+from collections import Counter as TallyCounter
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 import structlog
 from prometheus_client import Counter, Gauge, Histogram
@@ -20,6 +26,24 @@ from app.core.error_handling import (
     ErrorSeverity,
 )
 
+# Label values beyond a guard's limit are reported under this bucket
+OVERFLOW_LABEL = "other"
+CUSTOMER_LABEL_LIMIT = 50
+DEVICE_LABEL_LIMIT = 100
+ERROR_TYPE_LABEL_LIMIT = 50
+CONTEXT_LABEL_LIMIT = 20
+
+# Error types and ids listed in a summarized alert
+ALERT_SUMMARY_MAX_TYPES = 10
+ALERT_SUMMARY_MAX_IDS = 5
+
+SEVERITY_ORDER = (
+    ErrorSeverity.LOW,
+    ErrorSeverity.MEDIUM,
+    ErrorSeverity.HIGH,
+    ErrorSeverity.CRITICAL,
+)
+
 # Prometheus metrics for error tracking and Grafana alerting
 error_counter = Counter(
     "isp_errors_total",
@@ -59,6 +83,51 @@ service_provisioning_errors = Counter(
     ["service_type", "provisioning_step", "customer_id"],
 )
 
+label_overflow = Counter(
+    "isp_metric_label_overflow_total",
+    "Observations reported under the overflow label value",
+    ["label"],
+)
+
+
+class LabelGuard:
+    """Bounds the distinct values a metric label can take.
+
+    Values on the allow-list always pass. Otherwise the first ``max_values``
+    distinct values are admitted and keep their own series; anything else is
+    reported as ``OVERFLOW_LABEL``. Admitted values are never evicted, since
+    dropping one would mean deleting a live Prometheus series.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_values: int = 0,
+        allowed: Optional[Iterable[str]] = None,
+    ):
+        self.name = name
+        self.max_values = max_values
+        self.allowed: FrozenSet[str] = frozenset(allowed or ())
+        self.admitted: set = set()
+
+    def __call__(self, value: Any) -> str:
+        value = "unknown" if value is None or value == "" else str(value)
+        if value in self.allowed or value in self.admitted:
+            return value
+        if len(self.admitted) < self.max_values:
+            self.admitted.add(value)
+            return value
+        label_overflow.labels(label=self.name).inc()
+        return OVERFLOW_LABEL
+
+
+customer_label = LabelGuard("customer_id", CUSTOMER_LABEL_LIMIT)
+device_label = LabelGuard("device_id", DEVICE_LABEL_LIMIT)
+device_type_label = LabelGuard("device_type", CONTEXT_LABEL_LIMIT)
+error_type_label = LabelGuard("error_type", ERROR_TYPE_LABEL_LIMIT)
+service_type_label = LabelGuard("service_type", CONTEXT_LABEL_LIMIT)
+provisioning_step_label = LabelGuard("provisioning_step", CONTEXT_LABEL_LIMIT)
+
 
 class AlertChannel(str, Enum):
     """Available alerting channels via communications module."""
@@ -100,7 +169,10 @@ class GrafanaAlertManager:
 
     def __init__(self):
         self.logger = structlog.get_logger("isp.alerting")
-        self.alert_cache = {}  # For cooldown management
+        self.alert_cache = {}  # Open alert windows by rule, category and impact
+        self._rule_index: Dict[
+            Tuple[ErrorCategory, ErrorImpact, ErrorSeverity], Tuple[AlertRule, ...]
+        ] = {}
         self.setup_default_rules()
 
     def setup_default_rules(self):
@@ -155,20 +227,58 @@ class GrafanaAlertManager:
                 escalation_minutes=60,
             ),
         ]
+        self.rebuild_rule_index()
+
+    def rebuild_rule_index(self):
+        """Precompute the enabled rules for every category, impact and severity.
+
+        Call after changing ``self.rules`` or a rule's filters.
+        """
+        self._rule_index = {
+            (category, impact, severity): tuple(
+                rule
+                for rule in self.rules
+                if self._rule_matches(rule, category, impact, severity)
+            )
+            for category in ErrorCategory
+            for impact in ErrorImpact
+            for severity in ErrorSeverity
+        }
+
+    @staticmethod
+    def _rule_matches(
+        rule: AlertRule,
+        category: ErrorCategory,
+        impact: ErrorImpact,
+        severity: ErrorSeverity,
+    ) -> bool:
+        if not rule.enabled:
+            return False
+        if SEVERITY_ORDER.index(severity) < SEVERITY_ORDER.index(
+            rule.severity_threshold
+        ):
+            return False
+        if rule.categories and category not in rule.categories:
+            return False
+        if rule.impacts and impact not in rule.impacts:
+            return False
+        return True
 
     async def process_error(self, error_detail: ErrorDetail):
         """Process error, update metrics, and trigger appropriate alerts."""
         # Update Prometheus metrics for Grafana monitoring
         self._update_metrics(error_detail)
 
-        # Find matching alert rules
-        matching_rules = self._find_matching_rules(error_detail)
+        # Send summaries for windows whose cooldown has passed
+        await self.flush_due_alerts()
 
-        # Send alerts via communications module
-        for rule in matching_rules:
+        # Send the first error of each rule window; count the rest
+        for rule in self._find_matching_rules(error_detail):
             if self._should_alert(rule, error_detail):
-                await self._send_communication_alerts(rule, error_detail)
                 self._update_alert_cache(rule, error_detail)
+                await self._send_communication_alerts(rule, error_detail)
+            else:
+                self._record_suppressed(rule, error_detail)
 
     def _update_metrics(self, error_detail: ErrorDetail):
         """Update Prometheus metrics for Grafana dashboards and alerting."""
@@ -183,123 +293,170 @@ class GrafanaAlertManager:
         if error_detail.customer_id:
             customer_impact_errors.labels(
                 category=error_detail.category.value,
-                customer_id=str(error_detail.customer_id),
+                customer_id=customer_label(error_detail.customer_id),
             ).inc()
 
-        # Update active alerts gauge
-        if error_detail.severity in [ErrorSeverity.CRITICAL, ErrorSeverity.HIGH]:
-            active_alerts.labels(severity=error_detail.severity.value).inc()
-
         # Update category-specific metrics
         if error_detail.category == ErrorCategory.NETWORK:
-            device_id = error_detail.context.get("device_id", "unknown")
-            device_type = error_detail.context.get("device_type", "unknown")
             network_device_errors.labels(
-                device_type=device_type,
-                device_id=str(device_id),
-                error_type=error_detail.title,
+                device_type=device_type_label(error_detail.context.get("device_type")),
+                device_id=device_label(error_detail.context.get("device_id")),
+                error_type=error_type_label(error_detail.title),
             ).inc()
 
         elif error_detail.category == ErrorCategory.BILLING:
             billing_errors.labels(
-                error_type=error_detail.title,
-                customer_id=(
-                    str(error_detail.customer_id)
-                    if error_detail.customer_id
-                    else "unknown"
-                ),
+                error_type=error_type_label(error_detail.title),
+                customer_id=customer_label(error_detail.customer_id),
             ).inc()
 
         elif error_detail.category == ErrorCategory.SERVICE:
-            service_type = error_detail.context.get("service_type", "unknown")
-            provisioning_step = error_detail.context.get("provisioning_step", "unknown")
             service_provisioning_errors.labels(
-                service_type=service_type,
-                provisioning_step=provisioning_step,
-                customer_id=(
-                    str(error_detail.customer_id)
-                    if error_detail.customer_id
-                    else "unknown"
+                service_type=service_type_label(
+                    error_detail.context.get("service_type")
+                ),
+                provisioning_step=provisioning_step_label(
+                    error_detail.context.get("provisioning_step")
                 ),
+                customer_id=customer_label(error_detail.customer_id),
             ).inc()
 
-    def _find_matching_rules(self, error_detail: ErrorDetail) -> List[AlertRule]:
+    def _find_matching_rules(self, error_detail: ErrorDetail) -> Tuple[AlertRule, ...]:
         """Find alert rules that match the error criteria."""
-        matching_rules = []
-
-        for rule in self.rules:
-            if not rule.enabled:
-                continue
-
-            # Check severity threshold
-            severity_levels = [
-                ErrorSeverity.LOW,
-                ErrorSeverity.MEDIUM,
-                ErrorSeverity.HIGH,
-                ErrorSeverity.CRITICAL,
-            ]
-            if severity_levels.index(error_detail.severity) < severity_levels.index(
-                rule.severity_threshold
-            ):
-                continue
-
-            # Check category filter
-            if rule.categories and error_detail.category not in rule.categories:
-                continue
-
-            # Check impact filter
-            if rule.impacts and error_detail.impact not in rule.impacts:
-                continue
-
-            matching_rules.append(rule)
-
-        return matching_rules
-
-    def _should_alert(self, rule: AlertRule, error_detail: ErrorDetail) -> bool:
-        """Check if alert should be sent based on cooldown and other criteria."""
-        cache_key = (
-            f"{rule.name}:{error_detail.category.value}:{error_detail.impact.value}"
+        return self._rule_index.get(
+            (error_detail.category, error_detail.impact, error_detail.severity), ()
         )
 
-        if cache_key in self.alert_cache:
-            last_alert_time = self.alert_cache[cache_key]["last_sent"]
-            cooldown_seconds = rule.cooldown_minutes * 60
+    @staticmethod
+    def _alert_key(rule: AlertRule, error_detail: ErrorDetail) -> str:
+        return f"{rule.name}:{error_detail.category.value}:{error_detail.impact.value}"
 
-            if (
-                datetime.now(timezone.utc) - last_alert_time
-            ).total_seconds() < cooldown_seconds:
-                self.logger.debug(
-                    "Alert suppressed due to cooldown",
-                    rule=rule.name,
-                    error_id=error_detail.error_id,
-                    cooldown_minutes=rule.cooldown_minutes,
-                )
-                return False
-
-        return True
+    def _should_alert(self, rule: AlertRule, error_detail: ErrorDetail) -> bool:
+        """Check if the error opens a new alert window (no window is open)."""
+        return self._alert_key(rule, error_detail) not in self.alert_cache
 
     def _update_alert_cache(self, rule: AlertRule, error_detail: ErrorDetail):
-        """Update alert cache to track cooldowns."""
-        cache_key = (
-            f"{rule.name}:{error_detail.category.value}:{error_detail.impact.value}"
-        )
-        self.alert_cache[cache_key] = {
+        """Open an alert window for the rule; it lasts one cooldown."""
+        self.alert_cache[self._alert_key(rule, error_detail)] = {
+            "rule": rule,
+            "severity": error_detail.severity,
             "last_sent": datetime.now(timezone.utc),
             "error_id": error_detail.error_id,
-            "count": self.alert_cache.get(cache_key, {}).get("count", 0) + 1,
+            "count": 0,  # Errors suppressed since last_sent
+            "first_seen": None,
+            "last_seen": None,
+            "last_error": None,
+            "error_types": TallyCounter(),
+            "error_ids": [],
         }
+        active_alerts.labels(severity=error_detail.severity.value).inc()
+
+    def _record_suppressed(self, rule: AlertRule, error_detail: ErrorDetail):
+        """Count an error into its open window for the next summary."""
+        window = self.alert_cache[self._alert_key(rule, error_detail)]
+        now = datetime.now(timezone.utc)
+        if not window["count"]:
+            window["first_seen"] = now
+            self._schedule_flush(window)
+        window["count"] += 1
+        window["last_seen"] = now
+        window["last_error"] = error_detail
+
+        error_types = window["error_types"]
+        if (
+            error_detail.title in error_types
+            or len(error_types) < ALERT_SUMMARY_MAX_TYPES
+        ):
+            error_types[error_detail.title] += 1
+        else:
+            error_types[OVERFLOW_LABEL] += 1
+        if len(window["error_ids"]) < ALERT_SUMMARY_MAX_IDS:
+            window["error_ids"].append(error_detail.error_id)
+
+    def _schedule_flush(self, window: Dict[str, Any]):
+        """Flush the window when its cooldown ends, if an event loop is running.
+
+        Without a loop (e.g. ``asyncio.run`` from a Celery worker) the window
+        is flushed by the next ``process_error`` call instead.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        elapsed = (datetime.now(timezone.utc) - window["last_sent"]).total_seconds()
+        delay = max(window["rule"].cooldown_minutes * 60 - elapsed, 0)
+        loop.call_later(delay, lambda: loop.create_task(self.flush_due_alerts()))
+
+    async def flush_due_alerts(self):
+        """Send summaries for windows whose cooldown has passed.
+
+        A window with suppressed errors sends one summarized alert and stays
+        open for another cooldown; a window that stayed quiet is closed.
+        """
+        now = datetime.now(timezone.utc)
+        due = [
+            (key, window)
+            for key, window in self.alert_cache.items()
+            if (now - window["last_sent"]).total_seconds()
+            >= window["rule"].cooldown_minutes * 60
+        ]
+        for key, window in due:
+            if not window["count"]:
+                # Another flush may have closed it while a summary was sent
+                if self.alert_cache.pop(key, None) is not None:
+                    active_alerts.labels(severity=window["severity"].value).dec()
+                continue
+
+            summary = self._summarize_window(window)
+            window.update(
+                last_sent=now,
+                error_id=summary.error_id,
+                count=0,
+                first_seen=None,
+                last_seen=None,
+                last_error=None,
+                error_types=TallyCounter(),
+                error_ids=[],
+            )
+            await self._send_communication_alerts(window["rule"], summary)
+
+    def _summarize_window(self, window: Dict[str, Any]) -> ErrorDetail:
+        """Build one alert standing for every error suppressed in a window."""
+        count = window["count"]
+        last_error = window["last_error"]
+        if len(window["error_types"]) == 1:
+            title = f"{last_error.title} (x{count})"
+        else:
+            title = f"{count} {window['rule'].name} errors"
+        return last_error.model_copy(
+            update={
+                "title": title,
+                "detail": (
+                    f"{count} errors matched rule '{window['rule'].name}' between "
+                    f"{window['first_seen'].strftime('%H:%M:%S')} and "
+                    f"{window['last_seen'].strftime('%H:%M:%S')} UTC after the "
+                    f"alert for error {window['error_id']}. "
+                    f"Latest: {last_error.detail}"
+                ),
+                "context": {
+                    "occurrences": count,
+                    "error_types": dict(window["error_types"].most_common()),
+                    "sample_error_ids": ", ".join(window["error_ids"]),
+                },
+            }
+        )
 
     async def _send_communication_alerts(
         self, rule: AlertRule, error_detail: ErrorDetail
     ):
         """Send alerts via communications module."""
+        db = None
         try:
             # Import communications service
-            from app.core.database import get_db
+            from app.core.database import SessionLocal
             from app.services.communications_service import CommunicationsService
 
-            # Get database session
-            db = next(get_db())
+            db = SessionLocal()
             comm_service = CommunicationsService(db)
 
             # Create alert message
@@ -345,6 +502,9 @@ class GrafanaAlertManager:
                 error_id=error_detail.error_id,
                 error=str(e),
             )
+        finally:
+            if db is not None:
+                db.close()
 
     def _create_alert_message(self, error_detail: ErrorDetail) -> str:
         """Create formatted alert message."""
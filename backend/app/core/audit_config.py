@@ -13,6 +13,7 @@ from app.models import (  # Customer Management Models; Network Models; Foundati
     ApiKey,
     Customer,
     CustomerExtended,
+    CustomerService,
     IPAllocation,
     IPPool,
     Location,
@@ -48,7 +49,22 @@ CRITICAL_MODELS = {
 
 # Models that should have audit tracking but are lower priority
 STANDARD_MODELS = {
-    # Add additional models here as needed
+    # Service lifecycle - write heavy, audited per flush
+    "CustomerService": CustomerService,
+}
+
+# Per-model column selection: "include" limits auditing to the listed
+# attributes, "exclude" adds to audit_mixins.DEFAULT_AUDIT_EXCLUDE
+AUDIT_COLUMN_RULES = {
+    "Customer": {"exclude": ["last_online"]},
+    # Monitoring counters change constantly and carry no business meaning
+    "CustomerService": {
+        "exclude": [
+            "average_uptime_percent",
+            "last_outage_date",
+            "total_outage_minutes",
+        ]
+    },
 }
 
 # Models that should NOT have audit tracking (performance sensitive)
@@ -77,7 +93,9 @@ def enable_critical_model_auditing():
 
     for model_name, model_class in CRITICAL_MODELS.items():
         try:
-            enable_audit_for_model(model_class)
+            enable_audit_for_model(
+                model_class, **AUDIT_COLUMN_RULES.get(model_name, {})
+            )
             enabled_count += 1
             logger.info(f"Audit tracking enabled for {model_name}")
         except Exception as e:
@@ -101,7 +119,9 @@ def enable_standard_model_auditing():
 
     for model_name, model_class in STANDARD_MODELS.items():
         try:
-            enable_audit_for_model(model_class)
+            enable_audit_for_model(
+                model_class, **AUDIT_COLUMN_RULES.get(model_name, {})
+            )
             enabled_count += 1
             logger.info(f"Audit tracking enabled for {model_name}")
         except Exception as e:
@@ -195,6 +215,7 @@ def get_audit_configuration_status():
         "total_critical": len(CRITICAL_MODELS),
         "total_standard": len(STANDARD_MODELS),
         "total_excluded": len(EXCLUDED_MODELS),
+        "column_rules": AUDIT_COLUMN_RULES,
     }
 
     return status
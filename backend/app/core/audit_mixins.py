@@ -10,12 +10,17 @@ This module provides comprehensive audit infrastructure including:
 """
 
 import logging
-from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from datetime import date, datetime, time, timezone
+from enum import Enum as PyEnum
+from typing import Any, Dict, Iterable, Optional
 
-from sqlalchemy import Column, DateTime, Integer, event, inspect
+from sqlalchemy import Column, DateTime, Integer, event, insert, inspect
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import instance_state
+from sqlalchemy.orm.base import NEVER_SET, NO_VALUE
+
+from app.core.session_changes import ChangeCollector
 
 logger = logging.getLogger(__name__)
 
@@ -280,101 +285,196 @@ class ChangeDataCapture:
             logger.error(f"Failed to log CDC event: {e}")
 
 
-def setup_audit_listeners():
+# Columns never copied into audit payloads unless explicitly included
+DEFAULT_AUDIT_EXCLUDE = frozenset(
+    {
+        "updated_at",
+        "password_hash",
+        "hashed_password",
+        "key_hash",
+        "secret_key",
+        "client_secret",
+        "access_token",
+        "refresh_token",
+        "session_token",
+        "payment_method_token",
+    }
+)
+
+# session.info keys
+AUDIT_PENDING_KEY = "audit_pending_changes"
+AUDIT_CONTEXT_KEY = "audit_context"
+
+
+class AuditOptions:
+    """Per-model audit settings resolved once when auditing is enabled"""
+
+    __slots__ = ("table_name", "columns", "primary_key")
+
+    def __init__(self, mapper, include=None, exclude=None):
+        self.table_name = mapper.local_table.name
+        excluded = DEFAULT_AUDIT_EXCLUDE.union(exclude or ()) - set(include or ())
+        # (attribute key, column name) of every audited column
+        self.columns = tuple(
+            (prop.key, prop.columns[0].name)
+            for prop in mapper.column_attrs
+            if (include is None or prop.key in include) and prop.key not in excluded
+        )
+        self.primary_key = tuple(
+            mapper.get_property_by_column(column).key for column in mapper.primary_key
+        )
+
+    def record_id(self, values: Dict[str, Any]) -> str:
+        return "/".join(str(values.get(key)) for key in self.primary_key)
+
+
+_NATIVE_TYPES = (str, int, float, bool)
+
+
+def _json_value(value: Any) -> Any:
+    """JSON-safe form of a column value"""
+    if value is None or isinstance(value, _NATIVE_TYPES):
+        return value
+    if isinstance(value, datetime | date | time):
+        return value.isoformat()
+    if isinstance(value, PyEnum):
+        return value.value
+    if isinstance(value, dict | list):
+        return value
+    return str(value)
+
+
+def _capture_instance(state, options: AuditOptions, operation: str):
+    """Build one audit row from an instance's pre-flush state"""
+    values = state.dict
+    old_values = new_values = None
+
+    if operation == "INSERT":
+        new_values = {
+            column: _json_value(values[key])
+            for key, column in options.columns
+            if values.get(key) is not None
+        }
+    elif operation == "DELETE":
+        old_values = {
+            column: _json_value(values[key])
+            for key, column in options.columns
+            if values.get(key) is not None
+        }
+    else:
+        # committed_state holds the original value of every modified attribute
+        committed = state.committed_state
+        old_values, new_values = {}, {}
+        for key, column in options.columns:
+            if key not in committed:
+                continue
+            old = committed[key]
+            if old is NO_VALUE or old is NEVER_SET:
+                old = None
+            new = values.get(key)
+            if old == new:
+                continue
+            old_values[column] = _json_value(old)
+            new_values[column] = _json_value(new)
+        if not new_values:
+            return None
+
+    return {
+        "table_name": options.table_name,
+        "record_id": options.record_id(values),
+        "operation": operation,
+        "old_values": old_values,
+        "new_values": new_values,
+    }
+
+
+def _capture_change(session: Session, instance: Any, operation: str) -> None:
+    """Record an audited instance's change while its pre-flush state is intact"""
+    options = getattr(type(instance), "__audit_options__", None)
+    if options is None or not type(instance).__audit_enabled__:
+        return
+    row = _capture_instance(instance_state(instance), options, operation)
+    if row is not None:
+        audit_changes.pending(session).append(row)
+
+
+def _write_changes(session: Session, pending: list) -> None:
+    """Bulk insert the transaction's changes into the audit queue
+
+    The rows commit atomically with the audited data, so ``AuditQueue``
+    doubles as the outbox the async processor drains.
     """
-    Set up SQLAlchemy event listeners for automatic audit capture.
-    Note: These are lightweight listeners that queue events for async processing.
+    from app.models.audit import AuditQueue
+
+    context = session.info.get(AUDIT_CONTEXT_KEY) or get_audit_context()
+    created_at = datetime.now(timezone.utc)
+    shared = {
+        "user_id": context.get("user_id"),
+        "session_id": context.get("session_id"),
+        "ip_address": context.get("ip_address"),
+        "user_agent": context.get("user_agent"),
+        "created_at": created_at,
+        "status": "pending",
+        "retry_count": 0,
+    }
+    session.execute(
+        insert(AuditQueue.__table__), [{**row, **shared} for row in pending]
+    )
+    logger.debug(f"Queued {len(pending)} audit events")
+
+
+audit_changes = ChangeCollector(AUDIT_PENDING_KEY, _capture_change, _write_changes)
+
+
+def _bump_version(mapper, connection, target):
+    if target.__audit_enabled__:
+        target.increment_version()
+
+
+def setup_audit_listeners():
     """
+    Install the session-level change data capture listeners (idempotent).
 
-    def before_insert(mapper, connection, target):
-        """Capture INSERT events."""
-        if hasattr(target, "__audit_enabled__") and target.__audit_enabled__:
-            # Get new values
-            new_values = {}
-            for column in mapper.columns:
-                value = getattr(target, column.name, None)
-                if value is not None:
-                    new_values[column.name] = (
-                        str(value)
-                        if not isinstance(value, (str, int, float, bool))
-                        else value
-                    )
-
-            # Queue for async processing
-            # Note: We'll implement the actual queuing in the async processor
-            logger.debug(f"INSERT event queued for {target.__tablename__}")
-
-    def before_update(mapper, connection, target):
-        """Capture UPDATE events."""
-        if hasattr(target, "__audit_enabled__") and target.__audit_enabled__:
-            # Get old and new values
-            state = inspect(target)
-            old_values = {}
-            new_values = {}
-
-            for attr in state.attrs:
-                if attr.history.has_changes():
-                    old_value = (
-                        attr.history.deleted[0] if attr.history.deleted else None
-                    )
-                    new_value = attr.history.added[0] if attr.history.added else None
-
-                    if old_value is not None:
-                        old_values[attr.key] = (
-                            str(old_value)
-                            if not isinstance(old_value, (str, int, float, bool))
-                            else old_value
-                        )
-                    if new_value is not None:
-                        new_values[attr.key] = (
-                            str(new_value)
-                            if not isinstance(new_value, (str, int, float, bool))
-                            else new_value
-                        )
-
-            # Increment version if using enhanced audit mixin
-            if hasattr(target, "increment_version"):
-                target.increment_version()
-
-            logger.debug(f"UPDATE event queued for {target.__tablename__}")
-
-    def before_delete(mapper, connection, target):
-        """Capture DELETE events."""
-        if hasattr(target, "__audit_enabled__") and target.__audit_enabled__:
-            # Get current values before deletion
-            old_values = {}
-            for column in mapper.columns:
-                value = getattr(target, column.name, None)
-                if value is not None:
-                    old_values[column.name] = (
-                        str(value)
-                        if not isinstance(value, (str, int, float, bool))
-                        else value
-                    )
-
-            logger.debug(f"DELETE event queued for {target.__tablename__}")
-
-    # Register event listeners
-    # Note: We'll register these selectively for models that need auditing
-    logger.info("Audit event listeners configured (registration pending)")
+    Changes to audited models are collected per session in ``after_flush`` and
+    written to ``AuditQueue`` in one bulk insert when the session commits, so
+    a flush costs one pass over the session rather than listeners per row.
+    """
+    if audit_changes.install():
+        logger.info("Audit change data capture listeners installed")
 
 
 # Utility functions for audit management
 
 
-def enable_audit_for_model(model_class):
+def enable_audit_for_model(
+    model_class,
+    include: Optional[Iterable[str]] = None,
+    exclude: Optional[Iterable[str]] = None,
+):
     """
     Enable audit tracking for a specific model class.
 
+    Args:
+        include: Only audit these attributes (default: every column)
+        exclude: Attributes to leave out in addition to DEFAULT_AUDIT_EXCLUDE
+
     Usage:
-        enable_audit_for_model(Customer)
+        enable_audit_for_model(Customer, exclude=["last_login"])
     """
+    setup_audit_listeners()
+
+    model_class.__audit_options__ = AuditOptions(
+        inspect(model_class),
+        include=set(include) if include is not None else None,
+        exclude=set(exclude or ()),
+    )
     model_class.__audit_enabled__ = True
 
-    # Register event listeners for this model
-    event.listen(model_class, "before_insert", setup_audit_listeners().before_insert)
-    event.listen(model_class, "before_update", setup_audit_listeners().before_update)
-    event.listen(model_class, "before_delete", setup_audit_listeners().before_delete)
+    # Optimistic locking for models using the enhanced audit mixin
+    if hasattr(model_class, "increment_version") and not event.contains(
+        model_class, "before_update", _bump_version
+    ):
+        event.listen(model_class, "before_update", _bump_version)
 
     logger.info(f"Audit tracking enabled for {model_class.__name__}")
 
@@ -390,7 +490,8 @@ def disable_audit_for_model(model_class):
 def get_audit_context():
     """
     Get current audit context (user_id, session_id, etc.) from request context.
-    This would typically be populated by middleware.
+    This would typically be populated by middleware; a session can override it
+    via ``session.info[AUDIT_CONTEXT_KEY]``.
     """
     # Placeholder - would integrate with FastAPI request context
     return {"user_id": None, "session_id": None, "ip_address": None, "user_agent": None}
@@ -4,14 +4,27 @@ Celery Configuration and Dead-Letter Queue for ISP Framework.
 Provides background task processing with comprehensive error handling and retry logic.
 """
 
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 
 import structlog
 from celery import Celery, Task
-from celery.signals import task_failure, task_retry, task_success
+from celery.signals import (
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    task_success,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from sqlalchemy.orm import Session
 
+from app.core import database
 from app.core.config import settings
+from app.core.sql_instrumentation import finish_profile, start_profile
 
 # Configure Celery app
 celery_app = Celery(
@@ -25,6 +38,7 @@ celery_app = Celery(
         "app.tasks.customer_notifications",
         "app.tasks.monitoring_tasks",
         "app.tasks.maintenance_tasks",
+        "app.tasks.fanout",
     ],
 )
 
@@ -71,18 +85,59 @@ celery_app.conf.update(
             "task": "app.tasks.maintenance_tasks.process_dead_letter_queue",
             "schedule": 600.0,  # Every 10 minutes
         },
+        "maintain-usage-partitions": {
+            "task": "app.tasks.maintenance_tasks.maintain_usage_partitions",
+            "schedule": 86400.0,  # Daily; creates upcoming months, drops expired ones
+        },
         "billing-cycle-processing": {
             "task": "app.tasks.billing_tasks.process_billing_cycle",
             "schedule": 3600.0,  # Every hour
         },
+        "billing-balance-reconciliation": {
+            "task": "billing.reconcile_accounts",
+            "schedule": 21600.0,  # Every 6 hours
+        },
         "network-monitoring": {
             "task": "app.tasks.monitoring_tasks.monitor_network_devices",
             "schedule": 180.0,  # Every 3 minutes
         },
+        "network-placement-recount": {
+            "task": "network.recount_placement_counters",
+            "schedule": 3600.0,  # Every hour
+        },
+        "fup-evaluation": {
+            "task": "network.evaluate_fup",
+            "schedule": 60.0,  # Every minute; period resets run first
+        },
+        "device-config-backups": {
+            "task": "network.schedule_config_backups",
+            "schedule": 3600.0,  # Hourly; each device follows its own schedule
+        },
         "customer-usage-tracking": {
             "task": "app.tasks.monitoring_tasks.update_customer_usage",
             "schedule": 900.0,  # Every 15 minutes
         },
+        "dunning-nightly": {
+            "task": "billing.run_dunning",
+            "schedule": 86400.0,  # Daily; only state changes are written
+        },
+        "billing-rollup-rebuild": {
+            "task": "billing.rebuild_daily_rollups",
+            "schedule": 86400.0,  # Daily drift correction of the last 35 days
+        },
+        "reseller-rollup-rebuild": {
+            "task": "billing.rebuild_reseller_rollups",
+            "schedule": 86400.0,  # Daily drift correction; updates are incremental
+        },
+        "ticket-statistics-rollup": {
+            "task": "monitoring.refresh_ticket_statistics",
+            "schedule": 900.0,  # Every 15 minutes, last 7 days
+        },
+        "ticket-statistics-rollup-full": {
+            "task": "monitoring.refresh_ticket_statistics",
+            "schedule": 86400.0,  # Daily full rebuild
+            "kwargs": {"days": None},
+        },
     },
 )
 
@@ -96,6 +151,46 @@ class ISPFrameworkTask(Task):
     def __init__(self):
         self.logger = structlog.get_logger(f"isp.celery.{self.name}")
 
+    def session(self) -> Session:
+        """Database session scoped to the current task execution.
+
+        Opened on first use and closed in ``after_return`` whatever the
+        outcome; closing rolls back anything the task did not commit.
+        """
+        db = getattr(self.request, "db_session", None)
+        if db is None:
+            db = database.SessionLocal()
+            self.request.db_session = db
+        return db
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator[Session]:
+        """Separate session committed on success and rolled back on error."""
+        with database.session_scope() as db:
+            yield db
+
+    def process_in_batches(
+        self,
+        items: Iterable[Any],
+        handler: Callable[[Session, List[Any]], Any],
+        batch_size: int = 500,
+        stop_on_error: bool = False,
+    ) -> Dict[str, Any]:
+        """Apply ``handler(db, batch)`` to large inputs with a commit per batch."""
+        return database.process_in_batches(items, handler, batch_size, stop_on_error)
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        """Release the task-scoped session."""
+        db = getattr(self.request, "db_session", None)
+        if db is not None:
+            self.request.db_session = None
+            try:
+                db.close()
+            except Exception as e:
+                self.logger.error(
+                    "Failed to close task session", task_id=task_id, error=str(e)
+                )
+
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         """Handle task failure with comprehensive logging and alerting."""
         self.logger.error(
@@ -263,6 +358,79 @@ def task_success_handler(sender=None, task_id=None, result=None, **kwargs):
     )
 
 
+@worker_init.connect
+def install_worker_listeners(**kwargs):
+    """Register the ORM listeners that maintain rollups before any task runs.
+
+    Runs in the parent worker process, so forked children inherit them.
+    """
+    from app.services.billing_rollups import install_billing_rollups
+    from app.services.reseller_rollups import install_reseller_rollups
+
+    install_billing_rollups()
+    install_reseller_rollups()
+
+
+@worker_process_init.connect
+def init_worker_database(**kwargs):
+    """Give each forked worker process its own, smaller connection pool.
+
+    Pool metrics are labeled with the queues the worker consumes, so the
+    Postgres connection budget can be sized per queue.
+    """
+    queues = getattr(celery_app.amqp.queues, "consume_from", None) or {}
+    pool_label = ",".join(sorted(queues)) or celery_app.conf.task_default_queue
+    database.configure_engine(
+        pool_size=settings.celery_db_pool_size,
+        max_overflow=settings.celery_db_max_overflow,
+        pool_label=pool_label,
+    )
+
+    if settings.celery_metrics_port:
+        from billiard.process import current_process
+        from prometheus_client import start_http_server
+
+        port = settings.celery_metrics_port + (current_process().index or 0)
+        start_http_server(port)
+        logger.info("Worker metrics exposed", port=port, pool=pool_label)
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_database(**kwargs):
+    """Close this worker's pooled connections before the process exits."""
+    database.engine.dispose()
+
+
+# SQL profiles of running tasks, keyed by task id
+_task_query_profiles: Dict[str, tuple] = {}
+
+
+@task_prerun.connect
+def task_prerun_handler(sender=None, task_id=None, task=None, **kwargs):
+    """Start profiling the SQL issued by a task."""
+    if settings.sql_instrumentation_enabled and task_id:
+        _task_query_profiles[task_id] = start_profile(
+            "celery", getattr(task, "name", None) or "unknown"
+        )
+
+
+@task_postrun.connect
+def task_postrun_handler(sender=None, task_id=None, task=None, state=None, **kwargs):
+    """Publish query count, DB time and N+1 suspects for a finished task."""
+    queries = _task_query_profiles.pop(task_id, None)
+    if queries is None:
+        return
+    profile = finish_profile(queries)
+    logger.debug(
+        "Task SQL profile",
+        task_id=task_id,
+        task_name=profile.label,
+        state=state,
+        db_queries=profile.query_count,
+        db_time_ms=round(profile.total_seconds * 1000, 2),
+    )
+
+
 # Utility functions for task management
 def get_task_status(task_id: str) -> Dict[str, Any]:
     """Get comprehensive task status information."""
@@ -51,6 +51,10 @@ class Settings(BaseSettings):
     docs_url: Optional[str] = "/docs"
     redoc_url: Optional[str] = "/redoc"
 
+    # Startup
+    create_tables_on_startup: bool = False  # Schema is managed by Alembic
+    lazy_routers: bool = False  # Import endpoint modules on first request
+
     # Pagination
     default_page_size: int = 25
     max_page_size: int = 100
@@ -61,6 +65,46 @@ class Settings(BaseSettings):
 
     # Logging
     log_level: str = "INFO"
+
+    # Request pipeline
+    access_log_sample_rate: float = 0.1  # Share of fast 2xx/3xx requests logged
+    access_log_slow_ms: float = 1000.0  # Slower requests are always logged
+    fast_path_routes: List[str] = ["/healthz", "/health", "/readyz", "/metrics"]
+
+    # SQL instrumentation
+    sql_instrumentation_enabled: bool = True
+    slow_query_ms: float = 200.0  # Statements slower than this are sampled
+    n_plus_one_threshold: int = 10  # Same statement this often per request/task
+
+    # Presence tracking (last_seen / last_online), flushed in bulk
+    presence_flush_seconds: float = 5.0  # Upper bound on timestamp staleness
+    presence_max_pending: int = 5000  # Flush early once this many rows wait
+
+    # Live RADIUS session table, persisted to customers_online in the background
+    live_sessions_flush_seconds: float = 2.0
+
+    # Built-in RADIUS server (python -m app.services.radius_server)
+    radius_server_host: str = "0.0.0.0"
+    radius_auth_port: int = 1812
+    radius_acct_port: int = 1813
+    radius_default_secret: Optional[str] = None  # For NAS clients not in the database
+    radius_dictionary_path: Optional[str] = None  # Extra FreeRADIUS-format definitions
+    radius_batch_window_ms: float = 5.0  # Packets arriving within this share a batch
+    radius_batch_max: int = 200
+
+    # Fair usage policy: metered usage is flushed to customer_traffic_counters
+    fup_meter_flush_seconds: float = 10.0
+    fup_coa_concurrency: int = 100  # CoA requests in flight when (un)throttling
+
+    # Service usage tracking, stored in monthly partitions
+    usage_partition_months_ahead: int = 2  # Partitions created ahead of time
+    usage_partition_lock_timeout_ms: int = 2000  # On-demand partition DDL
+    usage_retention_days: int = 365  # Older months are dropped whole
+
+    # Celery worker database pool (per worker process)
+    celery_db_pool_size: int = 2
+    celery_db_max_overflow: int = 2
+    celery_metrics_port: Optional[int] = None  # Worker N serves metrics on port + N
     
     # SSL/HTTPS Configuration
     enable_https: bool = False
@@ -97,7 +141,10 @@ def initialize_settings_integration():
     try:
         # Import here to avoid circular imports
         from app.core.secrets_manager import initialize_secrets_from_env
-        from app.services.settings_service import get_settings_service
+        from app.services.settings_service import (
+            get_settings_service,
+            settings_store,
+        )
 
         # Initialize secrets from environment
         initialize_secrets_from_env()
@@ -106,6 +153,9 @@ def initialize_settings_integration():
         with get_settings_service() as service:
             service.initialize_default_settings()
 
+        # Load every setting and feature flag before serving requests
+        settings_store.refresh()
+
         _settings_initialized = True
 
     except Exception as e:
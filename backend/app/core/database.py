@@ -1,28 +1,74 @@
 import logging
-from typing import Generator
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, Optional
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.core.sql_instrumentation import (
+    TimedQueuePool,
+    install_sql_instrumentation,
+    set_pool_label,
+)
 from app.models.base import Base
 
 logger = logging.getLogger(__name__)
 
+
+def create_db_engine(
+    pool_size: Optional[int] = None, max_overflow: Optional[int] = None
+) -> Engine:
+    """Create an engine with configuration from settings."""
+    options: Dict[str, Any] = {
+        "echo": settings.database_echo,
+        "pool_pre_ping": True,
+        "pool_recycle": 300,
+    }
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        options["poolclass"] = TimedQueuePool
+        if pool_size is not None:
+            options["pool_size"] = pool_size
+        if max_overflow is not None:
+            options["max_overflow"] = max_overflow
+
+    new_engine = create_engine(settings.DATABASE_URL, **options)
+    if settings.sql_instrumentation_enabled:
+        install_sql_instrumentation(new_engine)
+    return new_engine
+
+
 # Create database engine with configuration from settings
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.database_echo,
-    pool_pre_ping=True,
-    pool_recycle=300,
-)
+engine = create_db_engine()
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create Base class for models
 
+def configure_engine(
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_label: str = "web",
+) -> Engine:
+    """Replace this process's engine, e.g. in a freshly forked worker.
+
+    The inherited pool is discarded without closing its connections, which
+    still belong to the parent process, and ``SessionLocal`` is rebound.
+    """
+    global engine
+    previous = engine
+    set_pool_label(pool_label)
+    engine = create_db_engine(pool_size, max_overflow)
+    SessionLocal.configure(bind=engine)
+    previous.dispose(close=False)
+    logger.info(
+        f"Database engine configured for {pool_label}: "
+        f"pool_size={pool_size}, max_overflow={max_overflow}"
+    )
+    return engine
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -38,6 +84,60 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Unit of work: commit on success, roll back on error, always close."""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def process_in_batches(
+    items: Iterable[Any],
+    handler: Callable[[Session, List[Any]], Any],
+    batch_size: int = 500,
+    stop_on_error: bool = False,
+) -> Dict[str, Any]:
+    """Run ``handler(db, batch)`` over ``items`` with one commit per batch.
+
+    One session and connection serve every batch; the identity map is
+    cleared after each commit so memory stays flat over thousands of rows.
+    A failed batch is rolled back and skipped unless ``stop_on_error``.
+    """
+    summary: Dict[str, Any] = {"processed": 0, "batches": 0, "failed": 0, "errors": []}
+    iterator = iter(items)
+    db = SessionLocal()
+    try:
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                break
+            summary["batches"] += 1
+            try:
+                handler(db, batch)
+                db.commit()
+                summary["processed"] += len(batch)
+            except Exception as e:
+                db.rollback()
+                summary["failed"] += len(batch)
+                if len(summary["errors"]) < 10:
+                    summary["errors"].append(str(e))
+                logger.error(f"Batch {summary['batches']} failed: {e}")
+                if stop_on_error:
+                    raise
+            finally:
+                db.expunge_all()
+    finally:
+        db.close()
+    return summary
+
+
 def create_tables():
     """Create all database tables."""
     try:
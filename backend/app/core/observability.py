@@ -4,13 +4,11 @@ Observability infrastructure for ISP Framework.
 Provides structured logging, metrics, tracing, and health checks.
 """
 
-import time
-import uuid
+import re
 from datetime import datetime, timezone
-from typing import Callable
 
 import structlog
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 from fastapi.responses import JSONResponse
 from prometheus_client import (
     CONTENT_TYPE_LATEST,
@@ -20,7 +18,6 @@ from prometheus_client import (
     generate_latest,
 )
 from sqlalchemy import text
-from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.config import settings
 
@@ -71,136 +68,19 @@ database_connections = Gauge(
 )
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for structured request/response logging with metrics."""
+_NUMERIC_SEGMENT = re.compile(r"/\d+")
+_UUID_SEGMENT = re.compile(r"/[a-f0-9-]{36}")
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Generate request ID if not present
-        request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
 
-        # Extract user context
-        user_id = None
-        client_id = None
-        if hasattr(request.state, "user"):
-            user_id = getattr(request.state.user, "id", None)
-        if hasattr(request.state, "client"):
-            client_id = getattr(request.state.client, "client_id", None)
+def endpoint_pattern(scope: dict) -> str:
+    """Extract endpoint pattern for metrics (removes path parameters)."""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
 
-        # Get request size
-        request_size = int(request.headers.get("content-length", 0))
-
-        # Start timing
-        start_time = time.time()
-        active_connections.inc()
-
-        # Process request
-        try:
-            response = await call_next(request)
-
-            # Calculate metrics
-            duration = time.time() - start_time
-            response_size = int(response.headers.get("content-length", 0))
-
-            # Extract endpoint pattern for metrics (remove path params)
-            endpoint = self._get_endpoint_pattern(request)
-
-            # Update Prometheus metrics
-            http_requests_total.labels(
-                method=request.method,
-                endpoint=endpoint,
-                status_code=response.status_code,
-            ).inc()
-
-            http_request_duration_seconds.labels(
-                method=request.method, endpoint=endpoint
-            ).observe(duration)
-
-            if request_size > 0:
-                http_request_size_bytes.labels(
-                    method=request.method, endpoint=endpoint
-                ).observe(request_size)
-
-            if response_size > 0:
-                http_response_size_bytes.labels(
-                    method=request.method, endpoint=endpoint
-                ).observe(response_size)
-
-            # Structured logging
-            log_data = {
-                "request_id": request_id,
-                "method": request.method,
-                "path": str(request.url.path),
-                "query_params": dict(request.query_params),
-                "status_code": response.status_code,
-                "duration_ms": round(duration * 1000, 2),
-                "request_size_bytes": request_size,
-                "response_size_bytes": response_size,
-                "user_agent": request.headers.get("user-agent"),
-                "remote_addr": request.client.host if request.client else None,
-                "user_id": user_id,
-                "client_id": client_id,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
-
-            # Log level based on status code
-            if response.status_code >= 500:
-                logger.error("HTTP request completed", **log_data)
-            elif response.status_code >= 400:
-                logger.warning("HTTP request completed", **log_data)
-            else:
-                logger.info("HTTP request completed", **log_data)
-
-            # Add request ID to response headers
-            response.headers["X-Request-ID"] = request_id
-
-            return response
-
-        except Exception as e:
-            duration = time.time() - start_time
-            endpoint = self._get_endpoint_pattern(request)
-
-            # Update error metrics
-            http_requests_total.labels(
-                method=request.method, endpoint=endpoint, status_code=500
-            ).inc()
-
-            http_request_duration_seconds.labels(
-                method=request.method, endpoint=endpoint
-            ).observe(duration)
-
-            # Log error
-            logger.error(
-                "HTTP request failed",
-                request_id=request_id,
-                method=request.method,
-                path=str(request.url.path),
-                duration_ms=round(duration * 1000, 2),
-                error=str(e),
-                user_id=user_id,
-                client_id=client_id,
-                timestamp=datetime.now(timezone.utc).isoformat(),
-                exc_info=True,
-            )
-
-            raise
-        finally:
-            active_connections.dec()
-
-    def _get_endpoint_pattern(self, request: Request) -> str:
-        """Extract endpoint pattern for metrics (removes path parameters)."""
-        if hasattr(request, "scope") and "route" in request.scope:
-            route = request.scope["route"]
-            if hasattr(route, "path"):
-                return route.path
-
-        # Fallback: use path with basic parameter normalization
-        path = request.url.path
-        # Replace common ID patterns
-        import re
-
-        path = re.sub(r"/\d+", "/{id}", path)
-        path = re.sub(r"/[a-f0-9-]{36}", "/{uuid}", path)
-        return path
+    # Fallback: use path with basic parameter normalization
+    path = _NUMERIC_SEGMENT.sub("/{id}", scope["path"])
+    return _UUID_SEGMENT.sub("/{uuid}", path)
 
 
 async def health_check() -> dict:
@@ -270,10 +150,8 @@ async def readiness_check() -> dict:
 def setup_observability(app: FastAPI) -> None:
     """Setup observability middleware and endpoints."""
 
-    # Add request logging middleware
-    if getattr(settings, "OBSERVABILITY_ENABLED", True):
-        app.add_middleware(RequestLoggingMiddleware)
-        logger.info("Request logging middleware enabled")
+    # Request logging and metrics are recorded by the fused request pipeline
+    # (app.middleware.request_pipeline), installed from main.py
 
     # Health endpoints
     @app.get("/healthz", include_in_schema=False)
@@ -9,12 +9,13 @@ import re
 import time
 from collections import defaultdict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Optional
 
 import structlog
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import FastAPI, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
 from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
@@ -73,11 +74,34 @@ class RateLimitStore:
 rate_limit_store = RateLimitStore()
 
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Comprehensive security middleware."""
+# Headers added to every response by the request pipeline
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Content-Security-Policy": (
+        "default-src 'self' cdn.jsdelivr.net fastapi.tiangolo.com; "
+        "script-src 'self' 'unsafe-inline' cdn.jsdelivr.net; "
+        "style-src 'self' 'unsafe-inline' cdn.jsdelivr.net; "
+        "img-src 'self' fastapi.tiangolo.com data:;"
+    ),
+    "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+}
 
-    def __init__(self, app, config: dict = None):
-        super().__init__(app)
+# Methods whose bodies are inspected for injection patterns
+INSPECTED_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+
+class SecurityPolicy:
+    """Request screening rules (IP blocks, user agents, rate limits, content).
+
+    Applied by ``RequestPipelineMiddleware``; each ``screen_*`` method returns
+    a rejection response, or None when the request may proceed.
+    """
+
+    def __init__(self, config: dict = None):
         self.config = config or {}
 
         # Rate limiting config
@@ -95,12 +119,17 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             r"eval\s*\(",  # Code injection
             r"exec\s*\(",  # Code execution
         ]
+        self._compiled_patterns = [
+            (pattern, re.compile(pattern, re.IGNORECASE))
+            for pattern in self.suspicious_patterns
+        ]
 
         # Blocked user agents
         self.blocked_user_agents = ["sqlmap", "nikto", "nmap", "masscan", "zap"]
 
         # Trusted IP ranges (can be configured)
         self.trusted_ips = self._parse_trusted_ips()
+        self.is_trusted_ip = lru_cache(maxsize=4096)(self._is_trusted_ip)
 
     def _parse_trusted_ips(self) -> List[ipaddress.IPv4Network]:
         """Parse trusted IP ranges from config."""
@@ -132,26 +161,24 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         except ValueError:
             return False
 
-    def _get_client_ip(self, request: Request) -> str:
+    def get_client_ip(self, headers: Headers, client: Optional[tuple]) -> str:
         """Extract real client IP considering proxies."""
         # Check X-Forwarded-For header (from load balancer/proxy)
-        forwarded_for = request.headers.get("X-Forwarded-For")
+        forwarded_for = headers.get("x-forwarded-for")
         if forwarded_for:
             # Take the first IP (original client)
             return forwarded_for.split(",")[0].strip()
 
         # Check X-Real-IP header
-        real_ip = request.headers.get("X-Real-IP")
+        real_ip = headers.get("x-real-ip")
         if real_ip:
             return real_ip
 
         # Fallback to direct connection
-        return request.client.host if request.client else "127.0.0.1"
+        return client[0] if client else "127.0.0.1"
 
-    def _get_rate_limit_key(self, request: Request, ip: str) -> tuple:
+    def _get_rate_limit_key(self, path: str, ip: str, user_id=None) -> tuple:
         """Generate rate limit key and determine limit type."""
-        path = request.url.path
-
         # Authentication endpoints
         if "/auth/" in path or "/login" in path or "/token" in path:
             return f"auth:{ip}", "auth"
@@ -159,7 +186,6 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         # API endpoints
         if path.startswith("/api/"):
             # Per-user rate limiting if authenticated
-            user_id = getattr(request.state, "user_id", None)
             if user_id:
                 return f"api:user:{user_id}", "api"
             else:
@@ -170,14 +196,11 @@ class SecurityMiddleware(BaseHTTPMiddleware):
 
     def _check_suspicious_content(self, content: str) -> List[str]:
         """Check for suspicious patterns in request content."""
-        threats = []
-        content_lower = content.lower()
-
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, content_lower, re.IGNORECASE):
-                threats.append(pattern)
-
-        return threats
+        return [
+            pattern
+            for pattern, compiled in self._compiled_patterns
+            if compiled.search(content)
+        ]
 
     def _check_user_agent(self, user_agent: str) -> bool:
         """Check if user agent is suspicious."""
@@ -187,16 +210,10 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         user_agent_lower = user_agent.lower()
         return any(blocked in user_agent_lower for blocked in self.blocked_user_agents)
 
-    async def dispatch(self, request: Request, call_next):
-        """Main security middleware logic."""
-        time.time()
-        client_ip = self._get_client_ip(request)
-        user_agent = request.headers.get("User-Agent", "")
-
-        # Skip security checks for trusted IPs (internal services)
-        if self._is_trusted_ip(client_ip):
-            return await call_next(request)
-
+    def screen_client(
+        self, client_ip: str, user_agent: str, path: str
+    ) -> Optional[JSONResponse]:
+        """Reject blocked IPs and scanner user agents."""
         # Check if IP is blocked
         if rate_limit_store.is_ip_blocked(client_ip):
             log_audit_event(
@@ -204,7 +221,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 event="blocked_ip_access_attempt",
                 ip_address=client_ip,
                 user_agent=user_agent,
-                path=request.url.path,
+                path=path,
             )
             return JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -218,7 +235,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 event="suspicious_user_agent",
                 ip_address=client_ip,
                 user_agent=user_agent,
-                path=request.url.path,
+                path=path,
             )
             rate_limit_store.block_ip(client_ip, 3600)  # Block for 1 hour
             return JSONResponse(
@@ -226,99 +243,74 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 content={"detail": "Access denied"},
             )
 
-        # Rate limiting
-        rate_key, limit_type = self._get_rate_limit_key(request, client_ip)
+        return None
+
+    def screen_rate_limit(
+        self, client_ip: str, user_agent: str, path: str, user_id=None
+    ) -> Optional[JSONResponse]:
+        """Apply the sliding-window rate limit for the request's category."""
+        rate_key, limit_type = self._get_rate_limit_key(path, client_ip, user_id)
         limit_config = self.rate_limits[limit_type]
 
-        if rate_limit_store.is_rate_limited(
+        if not rate_limit_store.is_rate_limited(
             rate_key, limit_config["requests"], limit_config["window"]
         ):
-            log_audit_event(
-                domain="security",
-                event="rate_limit_exceeded",
-                ip_address=client_ip,
-                user_agent=user_agent,
-                path=request.url.path,
-                limit_type=limit_type,
-            )
-
-            # Block IP after repeated rate limit violations
-            violations_key = f"violations:{client_ip}"
-            if rate_limit_store.is_rate_limited(
-                violations_key, 3, 300
-            ):  # 3 violations in 5 min
-                rate_limit_store.block_ip(client_ip, 1800)  # Block for 30 minutes
+            return None
+
+        log_audit_event(
+            domain="security",
+            event="rate_limit_exceeded",
+            ip_address=client_ip,
+            user_agent=user_agent,
+            path=path,
+            limit_type=limit_type,
+        )
 
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "detail": "Rate limit exceeded",
-                    "retry_after": limit_config["window"],
-                },
-                headers={"Retry-After": str(limit_config["window"])},
-            )
+        # Block IP after repeated rate limit violations
+        violations_key = f"violations:{client_ip}"
+        if rate_limit_store.is_rate_limited(
+            violations_key, 3, 300
+        ):  # 3 violations in 5 min
+            rate_limit_store.block_ip(client_ip, 1800)  # Block for 30 minutes
+
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={
+                "detail": "Rate limit exceeded",
+                "retry_after": limit_config["window"],
+            },
+            headers={"Retry-After": str(limit_config["window"])},
+        )
 
-        # Content inspection for POST/PUT requests
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                if body:
-                    content = body.decode("utf-8", errors="ignore")
-                    threats = self._check_suspicious_content(content)
-
-                    if threats:
-                        log_audit_event(
-                            domain="security",
-                            event="suspicious_content_detected",
-                            ip_address=client_ip,
-                            user_agent=user_agent,
-                            path=request.url.path,
-                            threats=threats,
-                            content_sample=content[:200],
-                        )
-
-                        # Block IP for repeated suspicious content
-                        rate_limit_store.block_ip(client_ip, 7200)  # Block for 2 hours
-
-                        return JSONResponse(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            content={"detail": "Suspicious content detected"},
-                        )
-            except Exception as e:
-                logger.warning(f"Content inspection failed: {e}")
-
-        # Process request
-        try:
-            response = await call_next(request)
-
-            # Add security headers
-            response.headers.update(
-                {
-                    "X-Content-Type-Options": "nosniff",
-                    "X-Frame-Options": "DENY",
-                    "X-XSS-Protection": "1; mode=block",
-                    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
-                    "Referrer-Policy": "strict-origin-when-cross-origin",
-                    "Content-Security-Policy": "default-src 'self' cdn.jsdelivr.net fastapi.tiangolo.com; script-src 'self' 'unsafe-inline' cdn.jsdelivr.net; style-src 'self' 'unsafe-inline' cdn.jsdelivr.net; img-src 'self' fastapi.tiangolo.com data:;",
-                    "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
-                }
-            )
+    def screen_body(
+        self, client_ip: str, user_agent: str, path: str, body: bytes
+    ) -> Optional[JSONResponse]:
+        """Reject request bodies matching injection patterns."""
+        if not body:
+            return None
+
+        content = body.decode("utf-8", errors="ignore")
+        threats = self._check_suspicious_content(content)
+        if not threats:
+            return None
+
+        log_audit_event(
+            domain="security",
+            event="suspicious_content_detected",
+            ip_address=client_ip,
+            user_agent=user_agent,
+            path=path,
+            threats=threats,
+            content_sample=content[:200],
+        )
 
-            return response
+        # Block IP for repeated suspicious content
+        rate_limit_store.block_ip(client_ip, 7200)  # Block for 2 hours
 
-        except Exception as e:
-            # Log security-relevant errors
-            if isinstance(e, HTTPException) and e.status_code >= 400:
-                log_audit_event(
-                    domain="security",
-                    event="http_error",
-                    ip_address=client_ip,
-                    user_agent=user_agent,
-                    path=request.url.path,
-                    status_code=e.status_code,
-                    error=str(e),
-                )
-            raise
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": "Suspicious content detected"},
+        )
 
 
 def setup_security_middleware(app: FastAPI):
@@ -338,9 +330,8 @@ def setup_security_middleware(app: FastAPI):
     if allowed_hosts and allowed_hosts != ["*"]:
         app.add_middleware(TrustedHostMiddleware, allowed_hosts=allowed_hosts)
 
-    # Custom security middleware
-    security_config = getattr(settings, "SECURITY_CONFIG", {})
-    app.add_middleware(SecurityMiddleware, config=security_config)
+    # Request screening and security headers are applied by the fused request
+    # pipeline (app.middleware.request_pipeline), installed from main.py
 
     # CORS configuration is handled in main.py - removed duplicate to prevent conflicts
 
@@ -354,15 +345,7 @@ def setup_security_middleware(app: FastAPI):
 
 def get_security_headers() -> Dict[str, str]:
     """Get recommended security headers."""
-    return {
-        "X-Content-Type-Options": "nosniff",
-        "X-Frame-Options": "DENY",
-        "X-XSS-Protection": "1; mode=block",
-        "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
-        "Referrer-Policy": "strict-origin-when-cross-origin",
-        "Content-Security-Policy": "default-src 'self' cdn.jsdelivr.net fastapi.tiangolo.com; script-src 'self' 'unsafe-inline' cdn.jsdelivr.net; style-src 'self' 'unsafe-inline' cdn.jsdelivr.net; img-src 'self' fastapi.tiangolo.com data:;",
-        "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
-    }
+    return dict(SECURITY_HEADERS)
 
 
 def cleanup_security_store():
@@ -0,0 +1,96 @@
+"""
+Session Change Collection
+
+Shared plumbing for the ORM listeners that turn a transaction's changes into
+rows committed atomically with them: the audit queue and the reseller and
+billing rollups.
+
+A :class:`ChangeCollector` passes every new, dirty and deleted instance of a
+flush to its ``capture`` callback in ``after_flush``, while attribute history
+still describes that flush. ``capture`` records what it needs in
+:meth:`ChangeCollector.pending`, which lives in ``session.info`` until
+``before_commit`` hands it to ``apply``. A transaction that rolls back or is
+closed drops it.
+
+The previous value of an attribute that was expired before it changed is
+only known if the attribute is mapped with ``active_history=True``, so
+models map the columns whose old value a collector reverses that way.
+"""
+
+from typing import Any, Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+
+
+def attribute_value(obj: Any, key: str, previous: bool) -> Any:
+    """An attribute's value before (``previous``) or after the flush"""
+    history = attributes.get_history(obj, key)
+    if history.unchanged:
+        return history.unchanged[0]
+    source = history.deleted if previous else history.added
+    return source[0] if source else None
+
+
+class ChangeCollector:
+    """Collects a transaction's changes per session and applies them at commit
+
+    Args:
+        info_key: ``session.info`` key holding the pending changes
+        capture: ``capture(session, obj, operation)`` for every flushed
+            instance, where ``operation`` is INSERT, UPDATE or DELETE
+        apply: ``apply(session, pending)`` once before the session commits
+        empty: factory for the initial pending container
+    """
+
+    def __init__(
+        self,
+        info_key: str,
+        capture: Callable[[Session, Any, str], None],
+        apply: Callable[[Session, Any], None],
+        empty: Callable[[], Any] = list,
+    ):
+        self.info_key = info_key
+        self._capture = capture
+        self._apply = apply
+        self._empty = empty
+        self._installed = False
+
+    def pending(self, session: Session) -> Any:
+        """This transaction's pending changes, created on first use"""
+        return session.info.setdefault(self.info_key, self._empty())
+
+    def install(self) -> bool:
+        """Register the session listeners; False if they already were"""
+        if self._installed:
+            return False
+
+        event.listen(Session, "after_flush", self.collect)
+        event.listen(Session, "before_commit", self.apply)
+        event.listen(Session, "after_transaction_end", self.discard)
+        self._installed = True
+        return True
+
+    def collect(self, session: Session, flush_context) -> None:
+        """after_flush: capture the flushed instances"""
+        for operation, instances in (
+            ("INSERT", session.new),
+            ("UPDATE", session.dirty),
+            ("DELETE", session.deleted),
+        ):
+            for obj in instances:
+                self._capture(session, obj, operation)
+
+    def apply(self, session: Session) -> None:
+        """before_commit: apply everything the transaction collected"""
+        if session.new or session.dirty or session.deleted:
+            session.flush()
+
+        pending = session.info.pop(self.info_key, None)
+        if pending:
+            self._apply(session, pending)
+
+    def discard(self, session: Session, transaction) -> None:
+        """Drop changes collected by a transaction that rolled back or was closed"""
+        if transaction.parent is None:
+            session.info.pop(self.info_key, None)
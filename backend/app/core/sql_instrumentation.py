@@ -0,0 +1,310 @@
+"""
+SQL instrumentation for ISP Framework.
+
+Hooks SQLAlchemy engine events to profile the queries issued by each unit of
+work (an HTTP request or a Celery task):
+
+- query count and total database time, exported as Prometheus histograms
+  labeled by route pattern or task name
+- statement fingerprints (literals and bind names stripped); a fingerprint
+  repeated ``n_plus_one_threshold`` times in one unit flags a likely N+1 loop
+- slow-query samples with the *shape* of their bound parameters (types and
+  list lengths, never values)
+
+Tests can cap the queries an endpoint may issue with ``assert_max_queries``.
+``TimedQueuePool`` adds connection-pool gauges and checkout latency, labeled
+by pool (``web`` or the queues a Celery worker consumes).
+"""
+
+import re
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from time import perf_counter
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import structlog
+from prometheus_client import Counter as PrometheusCounter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+
+logger = structlog.get_logger("isp.sql")
+
+# Prometheus metrics
+db_queries_per_unit = Histogram(
+    "db_queries_per_unit",
+    "SQL statements issued per request or task",
+    ["kind", "endpoint"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+
+db_time_per_unit_seconds = Histogram(
+    "db_time_per_unit_seconds",
+    "Total database time per request or task in seconds",
+    ["kind", "endpoint"],
+)
+
+db_n_plus_one_suspected_total = PrometheusCounter(
+    "db_n_plus_one_suspected_total",
+    "Requests or tasks that repeated one statement past the N+1 threshold",
+    ["kind", "endpoint"],
+)
+
+db_slow_queries_total = PrometheusCounter(
+    "db_slow_queries_total", "SQL statements slower than the slow-query threshold"
+)
+
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Database connections held by this process's pool",
+    ["pool", "state"],
+)
+
+db_pool_checkout_seconds = Histogram(
+    "db_pool_checkout_seconds",
+    "Time waiting to check a connection out of the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+# Most recent slow statements, newest last (for /debug views and tests)
+recent_slow_queries: Deque[Dict[str, Any]] = deque(maxlen=100)
+
+_current_profile: ContextVar[Optional["QueryProfile"]] = ContextVar(
+    "sql_query_profile", default=None
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"%\(\w+\)s|:\w+|\$\d+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)|\(__\[POSTCOMPILE_\w+\]\)", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so executions differing only in values match."""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _BIND_PARAM.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Describe bound parameters by type (and length for lists), not value."""
+    if isinstance(parameters, dict):
+        return {key: parameter_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, list | tuple):
+        if parameters and all(
+            not isinstance(p, list | tuple | dict) for p in parameters
+        ):
+            kinds = sorted({type(p).__name__ for p in parameters})
+            return f"{type(parameters).__name__}[{'|'.join(kinds)}] x{len(parameters)}"
+        return [parameter_shape(value) for value in parameters[:5]]
+    return type(parameters).__name__
+
+
+class QueryProfile:
+    """Queries issued by one request or task"""
+
+    __slots__ = (
+        "kind",
+        "label",
+        "query_count",
+        "total_seconds",
+        "fingerprints",
+        "slow",
+    )
+
+    def __init__(self, kind: str, label: str):
+        self.kind = kind
+        self.label = label
+        self.query_count = 0
+        self.total_seconds = 0.0
+        self.fingerprints: Counter = Counter()
+        self.slow: List[Dict[str, Any]] = []
+
+    def record(self, statement: str, elapsed: float) -> str:
+        key = fingerprint(statement)
+        self.query_count += 1
+        self.total_seconds += elapsed
+        self.fingerprints[key] += 1
+        return key
+
+    def repeated(self, threshold: Optional[int] = None) -> List[tuple]:
+        """Fingerprints executed at least ``threshold`` times, most first"""
+        threshold = threshold or settings.n_plus_one_threshold
+        return [
+            (key, count)
+            for key, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+    def export(self, label: Optional[str] = None) -> None:
+        """Publish metrics and log suspected N+1 loops for this unit"""
+        endpoint = label or self.label
+        db_queries_per_unit.labels(kind=self.kind, endpoint=endpoint).observe(
+            self.query_count
+        )
+        db_time_per_unit_seconds.labels(kind=self.kind, endpoint=endpoint).observe(
+            self.total_seconds
+        )
+
+        repeated = self.repeated()
+        if repeated:
+            db_n_plus_one_suspected_total.labels(
+                kind=self.kind, endpoint=endpoint
+            ).inc()
+            logger.warning(
+                "Possible N+1 query pattern",
+                kind=self.kind,
+                endpoint=endpoint,
+                query_count=self.query_count,
+                db_time_ms=round(self.total_seconds * 1000, 2),
+                repeated=[
+                    {"count": count, "statement": key[:300]}
+                    for key, count in repeated[:3]
+                ],
+            )
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_queries(
+    kind: str, label: str, export: bool = True
+) -> Iterator[QueryProfile]:
+    """Profile every statement issued inside the block (including threads
+    started with a copied context, e.g. FastAPI's threadpool)."""
+    profile = QueryProfile(kind, label)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        if export:
+            profile.export()
+
+
+def start_profile(kind: str, label: str) -> tuple:
+    """Begin profiling outside a ``with`` block; pass the result to finish."""
+    profile = QueryProfile(kind, label)
+    return profile, _current_profile.set(profile)
+
+
+def finish_profile(handle: tuple, label: Optional[str] = None) -> QueryProfile:
+    profile, token = handle
+    try:
+        _current_profile.reset(token)
+    except ValueError:
+        # Reset from another context (e.g. a different Celery signal thread)
+        _current_profile.set(None)
+    profile.export(label)
+    return profile
+
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = "test") -> Iterator[QueryProfile]:
+    """Fail if the block issues more than ``limit`` statements.
+
+    Intended for tests and development::
+
+        with assert_max_queries(5):
+            client.get("/api/v1/customers/")
+    """
+    with profile_queries("test", label, export=False) as profile:
+        yield profile
+    if profile.query_count > limit:
+        worst = "\n".join(
+            f"  {count}x {key[:200]}"
+            for key, count in profile.fingerprints.most_common(5)
+        )
+        raise AssertionError(
+            f"{label} issued {profile.query_count} queries (limit {limit}):\n{worst}"
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = perf_counter() - starts.pop()
+
+    profile = _current_profile.get()
+    key = profile.record(statement, elapsed) if profile is not None else None
+
+    if elapsed * 1000 >= settings.slow_query_ms:
+        sample = {
+            "statement": key or fingerprint(statement),
+            "duration_ms": round(elapsed * 1000, 2),
+            "parameters": parameter_shape(parameters),
+            "executemany": executemany,
+            "endpoint": profile.label if profile is not None else None,
+        }
+        recent_slow_queries.append(sample)
+        db_slow_queries_total.inc()
+        if profile is not None:
+            profile.slow.append(sample)
+        logger.warning("Slow query", **sample)
+
+
+_installed = set()
+_install_lock = threading.Lock()
+
+
+def install_sql_instrumentation(engine: Engine) -> None:
+    """Attach the cursor timing listeners to an engine (idempotent)."""
+    with _install_lock:
+        if id(engine) in _installed:
+            return
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        _installed.add(id(engine))
+
+
+_pool_label = "web"
+
+
+def set_pool_label(label: str) -> None:
+    """Name this process's pool in metrics (one engine per process)."""
+    global _pool_label
+    _pool_label = label
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports checkout latency and connection counts"""
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_seconds.labels(pool=_pool_label).observe(
+                perf_counter() - start
+            )
+            self._report()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._report()
+
+    def _report(self) -> None:
+        db_pool_connections.labels(pool=_pool_label, state="checked_out").set(
+            self.checkedout()
+        )
+        db_pool_connections.labels(pool=_pool_label, state="idle").set(self.checkedin())
+        db_pool_connections.labels(pool=_pool_label, state="capacity").set(
+            self.size() + max(self._max_overflow, 0)
+        )
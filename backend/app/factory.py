@@ -211,8 +211,10 @@ def create_test_app() -> FastAPI:
     # Add observability endpoints for testing
     try:
         from app.core.observability import setup_observability
+        from app.middleware.request_pipeline import setup_request_pipeline
 
         setup_observability(app)
+        setup_request_pipeline(app, security=False, exceptions=False)
     except ImportError:
         # Add minimal health endpoint if observability module fails
         @app.get("/healthz")
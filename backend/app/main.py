@@ -9,13 +9,16 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.api.v1.api import api_router
+from app.api.v1.api import LazyRouterLoader, LazyRouterMiddleware, build_api_router
 from app.core.config import settings
 from app.core.database import create_tables
 from app.core.exceptions import ISPFrameworkException
 from app.core.observability import setup_observability
 from app.core.security_middleware import setup_security_middleware
 from app.middleware.exception_handler import setup_exception_handlers
+from app.middleware.request_pipeline import setup_request_pipeline
+from app.services.billing_rollups import install_billing_rollups
+from app.services.reseller_rollups import install_reseller_rollups
 
 # Configure logging
 logging.basicConfig(
@@ -30,8 +33,10 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting ISP Framework API...")
     try:
-        create_tables()
-        logger.info("Database tables created/verified")
+        # Schema is owned by Alembic; create_all is a dev/test convenience
+        if settings.create_tables_on_startup:
+            create_tables()
+            logger.info("Database tables created/verified")
 
         # Initialize settings integration
         from app.core.config import initialize_settings_integration
@@ -137,5 +142,22 @@ setup_observability(app)
 # Setup comprehensive error handling and alerting
 setup_exception_handlers(app)
 
+# Fused pure-ASGI pipeline: exception capture, metrics/access logs, request
+# screening and security headers (outermost middleware)
+setup_request_pipeline(app)
+
+# Rollup listeners must see every commit, not only those made after the
+# module that maintains the rollup happens to be imported by a router
+install_billing_rollups()
+install_reseller_rollups()
+
 # Include API routers
-app.include_router(api_router, prefix=settings.api_v1_prefix)
+if settings.lazy_routers:
+    # Endpoint modules are imported on the first request under their prefix
+    app.add_middleware(
+        LazyRouterMiddleware,
+        loader=LazyRouterLoader(app, settings.api_v1_prefix),
+        schema_paths=[app.openapi_url, settings.docs_url, settings.redoc_url],
+    )
+else:
+    app.include_router(build_api_router(), prefix=settings.api_v1_prefix)
@@ -1,5 +1,5 @@
 """
-Global Exception Handler Middleware for ISP Framework.
+Global Exception Handlers for ISP Framework.
 
 Catches all unhandled exceptions and provides structured error responses.
 """
@@ -7,24 +7,10 @@ Catches all unhandled exceptions and provides structured error responses.
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.error_handling import ValidationError, error_handler
 
 
-class GlobalExceptionMiddleware(BaseHTTPMiddleware):
-    """Middleware to catch and handle all unhandled exceptions."""
-
-    async def dispatch(self, request: Request, call_next):
-        """Process request and handle any exceptions."""
-        try:
-            response = await call_next(request)
-            return response
-        except Exception as exc:
-            # Handle the exception using our error handler
-            return await error_handler.handle_error(request, exc)
-
-
 def setup_exception_handlers(app: FastAPI):
     """Setup global exception handlers for FastAPI application."""
 
@@ -59,5 +45,5 @@ def setup_exception_handlers(app: FastAPI):
         """Handle all other unhandled exceptions."""
         return await error_handler.handle_error(request, exc)
 
-    # Add the global exception middleware
-    app.add_middleware(GlobalExceptionMiddleware)
+    # Exceptions escaping the app are converted by the fused request pipeline
+    # (app.middleware.request_pipeline), installed from main.py
@@ -0,0 +1,298 @@
+"""
+Fused request pipeline middleware for ISP Framework.
+
+A single pure-ASGI middleware replacing the former chain of
+``BaseHTTPMiddleware`` layers. In one pass over each request it:
+
+- converts unhandled exceptions into structured error responses
+- records Prometheus metrics and writes sampled access logs
+- profiles the SQL issued by the request (query count, DB time, N+1 loops)
+- screens requests (IP blocks, user agents, rate limits, body content)
+- adds security headers and ``X-Request-ID`` to every response
+
+Responses stream straight through; only the bodies of inspected methods are
+buffered. Fast-path routes (health and metrics probes) skip metrics, access
+logging, rate limiting and body inspection.
+"""
+
+import random
+import uuid
+from time import perf_counter
+from typing import Iterable, Optional
+
+import structlog
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.error_handling import error_handler
+from app.core.observability import (
+    active_connections,
+    endpoint_pattern,
+    http_request_duration_seconds,
+    http_request_size_bytes,
+    http_requests_total,
+    http_response_size_bytes,
+)
+from app.core.security_middleware import (
+    INSPECTED_METHODS,
+    SECURITY_HEADERS,
+    SecurityPolicy,
+)
+from app.core.sql_instrumentation import finish_profile, start_profile
+
+logger = structlog.get_logger("isp.observability")
+
+
+async def _buffer_body(receive: Receive):
+    """Read the whole request body and return it with a replaying receive."""
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            # Client went away; let the app see the disconnect
+            pending = [message]
+
+            async def replay_disconnect(pending=pending) -> Message:
+                return pending.pop() if pending else await receive()
+
+            return b"".join(chunks), replay_disconnect
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+class RequestPipelineMiddleware:
+    """Exception handling, observability and security in one ASGI layer."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        security: bool = True,
+        observability: bool = True,
+        exceptions: bool = True,
+        fast_paths: Optional[Iterable[str]] = None,
+        sample_rate: Optional[float] = None,
+        slow_ms: Optional[float] = None,
+    ):
+        self.app = app
+        self.policy = (
+            SecurityPolicy(getattr(settings, "SECURITY_CONFIG", {}))
+            if security
+            else None
+        )
+        self.observability = observability
+        self.exceptions = exceptions
+        self.fast_paths = frozenset(
+            fast_paths if fast_paths is not None else settings.fast_path_routes
+        )
+        self.sample_rate = (
+            sample_rate if sample_rate is not None else settings.access_log_sample_rate
+        )
+        self.slow_ms = slow_ms if slow_ms is not None else settings.access_log_slow_ms
+
+        # Encoded once; appended to every response start message
+        self.response_headers = (
+            [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in SECURITY_HEADERS.items()
+            ]
+            if security
+            else []
+        )
+        self.managed_headers = {name for name, _ in self.response_headers}
+        self.managed_headers.add(b"x-request-id")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id") or str(uuid.uuid4())
+        extra_headers = self.response_headers + [
+            (b"x-request-id", request_id.encode("latin-1"))
+        ]
+        fast = scope["path"] in self.fast_paths
+        observe = self.observability and not fast
+
+        response_status = 500
+        response_size = 0
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_status, response_size, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                response_status = message["status"]
+                message["headers"] = [
+                    header
+                    for header in message.get("headers", [])
+                    if header[0].lower() not in self.managed_headers
+                ] + extra_headers
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        start = perf_counter()
+        queries = None
+        if observe:
+            active_connections.inc()
+            if settings.sql_instrumentation_enabled:
+                queries = start_profile("http", scope["path"])
+        try:
+            await self._dispatch(scope, receive, send_wrapper, headers, fast)
+        except Exception as exc:
+            logger.error(
+                "HTTP request failed",
+                request_id=request_id,
+                method=scope["method"],
+                path=scope["path"],
+                duration_ms=round((perf_counter() - start) * 1000, 2),
+                error=str(exc),
+                exc_info=True,
+            )
+            if not self.exceptions or response_started:
+                raise
+            response_status = 500
+            response = await error_handler.handle_error(Request(scope, receive), exc)
+            await response(scope, receive, send_wrapper)
+        finally:
+            if observe:
+                active_connections.dec()
+                self._record(
+                    scope,
+                    headers,
+                    request_id,
+                    response_status,
+                    response_size,
+                    perf_counter() - start,
+                    queries,
+                )
+
+    async def _dispatch(
+        self, scope: Scope, receive: Receive, send: Send, headers: Headers, fast: bool
+    ) -> None:
+        policy = self.policy
+        if policy is not None:
+            client_ip = policy.get_client_ip(headers, scope.get("client"))
+
+            # Skip security checks for trusted IPs (internal services)
+            if not policy.is_trusted_ip(client_ip):
+                path = scope["path"]
+                user_agent = headers.get("user-agent", "")
+
+                rejection = policy.screen_client(client_ip, user_agent, path)
+                if rejection is None and not fast:
+                    user_id = scope.get("state", {}).get("user_id")
+                    rejection = policy.screen_rate_limit(
+                        client_ip, user_agent, path, user_id
+                    )
+                if (
+                    rejection is None
+                    and not fast
+                    and scope["method"] in INSPECTED_METHODS
+                ):
+                    body, receive = await _buffer_body(receive)
+                    rejection = policy.screen_body(client_ip, user_agent, path, body)
+
+                if rejection is not None:
+                    await rejection(scope, receive, send)
+                    return
+
+        await self.app(scope, receive, send)
+
+    def _record(
+        self,
+        scope: Scope,
+        headers: Headers,
+        request_id: str,
+        status_code: int,
+        response_size: int,
+        duration: float,
+        queries: Optional[tuple] = None,
+    ) -> None:
+        """Update Prometheus metrics and write the (sampled) access log."""
+        method = scope["method"]
+        endpoint = endpoint_pattern(scope)
+        profile = finish_profile(queries, endpoint) if queries is not None else None
+        request_size = int(headers.get("content-length") or 0)
+
+        http_requests_total.labels(
+            method=method, endpoint=endpoint, status_code=status_code
+        ).inc()
+        http_request_duration_seconds.labels(method=method, endpoint=endpoint).observe(
+            duration
+        )
+        if request_size > 0:
+            http_request_size_bytes.labels(method=method, endpoint=endpoint).observe(
+                request_size
+            )
+        if response_size > 0:
+            http_response_size_bytes.labels(method=method, endpoint=endpoint).observe(
+                response_size
+            )
+
+        # Errors and slow requests are always logged; the rest are sampled
+        duration_ms = duration * 1000
+        sample_rate = 1.0
+        if status_code >= 500:
+            log = logger.error
+        elif status_code >= 400:
+            log = logger.warning
+        elif duration_ms >= self.slow_ms:
+            log = logger.info
+        elif random.random() < self.sample_rate:
+            log, sample_rate = logger.info, self.sample_rate
+        else:
+            return
+
+        state = scope.get("state", {})
+        user = state.get("user")
+        client = state.get("client")
+        log(
+            "HTTP request completed",
+            request_id=request_id,
+            method=method,
+            path=scope["path"],
+            query_string=scope.get("query_string", b"").decode("latin-1"),
+            status_code=status_code,
+            duration_ms=round(duration_ms, 2),
+            request_size_bytes=request_size,
+            response_size_bytes=response_size,
+            user_agent=headers.get("user-agent"),
+            remote_addr=scope["client"][0] if scope.get("client") else None,
+            user_id=getattr(user, "id", None),
+            client_id=getattr(client, "client_id", None),
+            db_queries=profile.query_count if profile else None,
+            db_time_ms=round(profile.total_seconds * 1000, 2) if profile else None,
+            sample_rate=sample_rate,
+        )
+
+
+def setup_request_pipeline(app, **options) -> None:
+    """Install the fused request pipeline as the outermost user middleware."""
+    options.setdefault(
+        "observability", getattr(settings, "OBSERVABILITY_ENABLED", True)
+    )
+    app.add_middleware(RequestPipelineMiddleware, **options)
+    logger.info(
+        "Request pipeline configured",
+        fast_paths=sorted(options.get("fast_paths") or settings.fast_path_routes),
+        access_log_sample_rate=options.get(
+            "sample_rate", settings.access_log_sample_rate
+        ),
+    )
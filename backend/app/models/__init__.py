@@ -32,6 +32,7 @@ from .base import Base
 # Billing System Models
 from .billing import (
     BalanceHistory,
+    BillingDailyRollup,
     BillingTransaction,
     BillingType,
     CreditNote,
@@ -96,6 +97,7 @@ from .devices import (
     CiscoVLAN,
     DeviceAlert,
     DeviceConfigBackup,
+    DeviceConfigBlob,
     DeviceInterface,
     DeviceMonitoring,
     DeviceTemplate,
@@ -124,7 +126,9 @@ from .foundation import (
     FileStorage,
     InternetTariffConfig,
     Location,
+    NumberSequence,
     Reseller,
+    ResellerRollup,
     Tariff,
     TariffBillingOption,
     TariffPromotion,
@@ -220,6 +224,7 @@ from .ticketing import (
     SLAPolicy,
     Ticket,
     TicketAttachment,
+    TicketDailyStats,
     TicketEscalation,
     TicketMessage,
     TicketPriority,
@@ -313,10 +318,13 @@ __all__ = [
     "NetworkIncident",
     "KnowledgeBaseArticle",
     "TicketTemplate",
+    "TicketDailyStats",
     # Foundation Models
     "Location",
     "FileStorage",
     "Reseller",
+    "ResellerRollup",
+    "NumberSequence",
     # Enhanced Audit Models
     "AuditQueue",
     "ConfigurationSnapshot",
@@ -363,6 +371,7 @@ __all__ = [
     "DeviceMonitoring",
     "DeviceAlert",
     "DeviceConfigBackup",
+    "DeviceConfigBlob",
     "DeviceTemplate",
     "MikroTikDevice",
     "MikroTikInterface",
@@ -405,6 +414,7 @@ __all__ = [
     "CreditNote",
     "PaymentPlan",
     "DunningCase",
+    "BillingDailyRollup",
     # Webhook System Models
     "WebhookEndpoint",
     "WebhookEvent",
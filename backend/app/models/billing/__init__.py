@@ -21,7 +21,7 @@ from .accounts import CustomerBillingAccount
 from .billing_cycles import BillingCycle
 from .billing_type import BillingType
 from .credit_notes import CreditNote
-from .dunning import DunningAction, DunningCase
+from .dunning import DunningAction, DunningCase, DunningRule, DunningTemplate
 from .enums import (
     AccountStatus,
     BillingCycleType,
@@ -36,6 +36,7 @@ from .enums import (
 from .invoices import Invoice, InvoiceItem
 from .payment_plans import PaymentPlan, PaymentPlanInstallment
 from .payments import Payment, PaymentMethod, PaymentRefund
+from .rollups import BillingDailyRollup
 from .tax_rates import TaxRate
 from .transactions import BalanceHistory, BillingTransaction
 
@@ -47,6 +48,8 @@ __all__ = [
     "CreditNote",
     "DunningCase",
     "DunningAction",
+    "DunningRule",
+    "DunningTemplate",
     "AccountStatus",
     "BillingCycleType",
     "CreditNoteReason",
@@ -63,6 +66,7 @@ __all__ = [
     "PaymentPlanInstallment",
     "Payment",
     "PaymentRefund",
+    "BillingDailyRollup",
     "TaxRate",
     "BillingTransaction",
     "BalanceHistory",
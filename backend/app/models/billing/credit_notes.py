@@ -13,6 +13,7 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -75,6 +76,11 @@ class CreditNote(Base):
     creator = relationship("Administrator", foreign_keys=[created_by])
     accounting_entries = relationship("AccountingEntry", back_populates="credit_note")
 
+    # Indexes for performance
+    __table_args__ = (
+        Index("idx_credit_notes_account_status", "billing_account_id", "status"),
+    )
+
     def __repr__(self):
         return f"<CreditNote(id={self.id}, number='{self.credit_note_number}', amount={self.amount})>"
 
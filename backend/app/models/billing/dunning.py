@@ -27,6 +27,18 @@ from ..base import Base
 from .enums import DeliveryStatus, DunningActionType, DunningStatus, EscalationLevel
 
 
+def escalation_level_for(overdue_amount, days_overdue):
+    """Escalation level for an overdue amount and age"""
+    if overdue_amount >= 1000 or days_overdue >= 60:
+        return EscalationLevel.CRITICAL
+    elif overdue_amount >= 500 or days_overdue >= 30:
+        return EscalationLevel.HIGH
+    elif overdue_amount >= 100 or days_overdue >= 14:
+        return EscalationLevel.MEDIUM
+    else:
+        return EscalationLevel.LOW
+
+
 class DunningCase(Base):
     """Dunning cases for overdue account management"""
 
@@ -126,14 +138,7 @@ class DunningCase(Base):
 
     def calculate_escalation_level(self):
         """Calculate escalation level based on amount and days overdue"""
-        if self.total_overdue_amount >= 1000 or self.days_overdue >= 60:
-            return EscalationLevel.CRITICAL
-        elif self.total_overdue_amount >= 500 or self.days_overdue >= 30:
-            return EscalationLevel.HIGH
-        elif self.total_overdue_amount >= 100 or self.days_overdue >= 14:
-            return EscalationLevel.MEDIUM
-        else:
-            return EscalationLevel.LOW
+        return escalation_level_for(self.total_overdue_amount, self.days_overdue)
 
     def escalate_to_next_stage(self):
         """Escalate case to next stage"""
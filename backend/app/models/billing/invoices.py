@@ -20,7 +20,7 @@ from sqlalchemy import (
 )
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 
 from ..base import Base
@@ -38,8 +38,14 @@ class Invoice(Base):
         Integer, ForeignKey("customer_billing_accounts.id"), nullable=False
     )
 
+    # Columns mapped with active_history are reversed by the billing rollup
+    # when they change, so their previous value is always loaded
+
     # Invoice dates
-    invoice_date = Column(DateTime(timezone=True), nullable=False, index=True)
+    invoice_date = column_property(
+        Column(DateTime(timezone=True), nullable=False, index=True),
+        active_history=True,
+    )
     due_date = Column(DateTime(timezone=True), nullable=False, index=True)
     billing_period_start = Column(DateTime(timezone=True), nullable=False)
     billing_period_end = Column(DateTime(timezone=True), nullable=False)
@@ -49,13 +55,25 @@ class Invoice(Base):
     tax_amount = Column(DECIMAL(12, 2), nullable=False, default=0)
     discount_amount = Column(DECIMAL(12, 2), nullable=False, default=0)
     adjustment_amount = Column(DECIMAL(12, 2), nullable=False, default=0)
-    total_amount = Column(DECIMAL(12, 2), nullable=False, default=0)
-    paid_amount = Column(DECIMAL(12, 2), nullable=False, default=0)
-    balance_due = Column(DECIMAL(12, 2), nullable=False, default=0)
+    total_amount = column_property(
+        Column(DECIMAL(12, 2), nullable=False, default=0), active_history=True
+    )
+    paid_amount = column_property(
+        Column(DECIMAL(12, 2), nullable=False, default=0), active_history=True
+    )
+    balance_due = column_property(
+        Column(DECIMAL(12, 2), nullable=False, default=0), active_history=True
+    )
 
     # Invoice configuration
-    status = Column(
-        SQLEnum(InvoiceStatus), nullable=False, default=InvoiceStatus.DRAFT, index=True
+    status = column_property(
+        Column(
+            SQLEnum(InvoiceStatus),
+            nullable=False,
+            default=InvoiceStatus.DRAFT,
+            index=True,
+        ),
+        active_history=True,
     )
     currency = Column(String(3), nullable=False, default="USD")
     tax_rate = Column(DECIMAL(5, 2), default=0)
@@ -20,7 +20,7 @@ from sqlalchemy import (
 )
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 
 from ..base import Base
@@ -126,25 +126,38 @@ class Payment(Base):
 
     __tablename__ = "payments"
 
+    # Columns mapped with active_history are reversed by the billing and
+    # reseller rollups when they change, so their previous value is always
+    # loaded
+
     id = Column(Integer, primary_key=True, index=True)
     payment_number = Column(String(50), unique=True, nullable=False, index=True)
-    billing_account_id = Column(
-        Integer, ForeignKey("customer_billing_accounts.id"), nullable=False
+    billing_account_id = column_property(
+        Column(Integer, ForeignKey("customer_billing_accounts.id"), nullable=False),
+        active_history=True,
     )
     invoice_id = Column(Integer, ForeignKey("invoices.id"))
     payment_method_id = Column(Integer, ForeignKey("payment_methods.id"))
 
     # Payment details
-    payment_date = Column(DateTime(timezone=True), nullable=False, index=True)
-    amount = Column(DECIMAL(12, 2), nullable=False)
+    payment_date = column_property(
+        Column(DateTime(timezone=True), nullable=False, index=True),
+        active_history=True,
+    )
+    amount = column_property(
+        Column(DECIMAL(12, 2), nullable=False), active_history=True
+    )
     currency = Column(String(3), nullable=False, default="USD")
 
     # Status and processing
-    status = Column(
-        SQLEnum(PaymentStatus),
-        nullable=False,
-        default=PaymentStatus.PENDING,
-        index=True,
+    status = column_property(
+        Column(
+            SQLEnum(PaymentStatus),
+            nullable=False,
+            default=PaymentStatus.PENDING,
+            index=True,
+        ),
+        active_history=True,
     )
     processed_date = Column(DateTime(timezone=True))
 
@@ -168,7 +181,9 @@ class Payment(Base):
     method = Column(String(20), nullable=True, index=True)  # gateway, bank_transfer, cash
     
     # Additional references for new payment system
-    customer_id = Column(Integer, nullable=True, index=True)  # Direct customer reference
+    customer_id = column_property(
+        Column(Integer, nullable=True, index=True), active_history=True
+    )  # Direct customer reference
     gateway_id = Column(Integer, nullable=True, index=True)  # Gateway configuration reference
     bank_account_id = Column(Integer, nullable=True, index=True)  # Bank account reference
     
@@ -0,0 +1,49 @@
+"""
+Billing Rollup Models
+
+Per-day invoice and payment totals maintained incrementally (see
+app.services.billing_rollups) so month and year billing views read a few
+hundred pre-aggregated rows instead of scanning invoices and payments.
+"""
+
+from sqlalchemy import Column, Date, DateTime, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.types import DECIMAL
+
+from app.models.base import Base
+
+
+class BillingDailyRollup(Base):
+    """Totals of one document kind and status for one UTC day
+
+    Invoices are counted on their invoice date and payments on their payment
+    date, each under its current status, so a status change moves the
+    document's amounts from one row of the day to another.
+    """
+
+    __tablename__ = "billing_daily_rollup"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    document = Column(String(10), nullable=False)  # invoice, payment
+    status = Column(String(20), nullable=False)
+
+    document_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(DECIMAL(14, 2), nullable=False, default=0)
+    # Invoices only
+    paid_amount = Column(DECIMAL(14, 2), nullable=False, default=0)
+    balance_due = Column(DECIMAL(14, 2), nullable=False, default=0)
+
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint("day", "document", "status", name="uq_billing_daily_rollup"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<BillingDailyRollup {self.day} {self.document}/{self.status}: "
+            f"{self.document_count}>"
+        )
@@ -5,6 +5,7 @@ Customer-related models following ISP Framework modular architecture
 from sqlalchemy import (
     DECIMAL,
     JSON,
+    BigInteger,
     Boolean,
     Column,
     Date,
@@ -14,7 +15,7 @@ from sqlalchemy import (
     String,
     Text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 
 from app.models.base import Base
@@ -30,9 +31,14 @@ class Customer(Base):
         String(100), unique=True, nullable=False, index=True
     )  # Portal ID for RADIUS/portal/PPPoE auth
     password_hash = Column(String(255))
-    status_id = Column(Integer, ForeignKey("customer_statuses.id"), nullable=False)
-    reseller_id = Column(
-        Integer, ForeignKey("resellers.id"), nullable=True
+    # active_history: the reseller rollups reverse the previous assignment
+    status_id = column_property(
+        Column(Integer, ForeignKey("customer_statuses.id"), nullable=False),
+        active_history=True,
+    )
+    reseller_id = column_property(
+        Column(Integer, ForeignKey("resellers.id"), nullable=True),
+        active_history=True,
     )  # Optional - customers can be direct or via reseller
     location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
     parent_id = Column(Integer, ForeignKey("customers.id"))  # for sub-accounts
@@ -407,12 +413,12 @@ class CustomerTrafficCounter(Base):
     )
 
     # Traffic counters (in bytes)
-    day_up = Column(Integer, default=0)
-    day_down = Column(Integer, default=0)
-    week_up = Column(Integer, default=0)
-    week_down = Column(Integer, default=0)
-    month_up = Column(Integer, default=0)
-    month_down = Column(Integer, default=0)
+    day_up = Column(BigInteger, default=0)
+    day_down = Column(BigInteger, default=0)
+    week_up = Column(BigInteger, default=0)
+    week_down = Column(BigInteger, default=0)
+    month_up = Column(BigInteger, default=0)
+    month_down = Column(BigInteger, default=0)
 
     # Time counters (in seconds)
     day_time = Column(Integer, default=0)
@@ -14,6 +14,7 @@ from .device_management import (
     BackupStatus,
     DeviceAlert,
     DeviceConfigBackup,
+    DeviceConfigBlob,
     DeviceInterface,
     DeviceMonitoring,
     DeviceStatus,
@@ -41,6 +42,7 @@ __all__ = [
     "DeviceMonitoring",
     "DeviceAlert",
     "DeviceConfigBackup",
+    "DeviceConfigBlob",
     "DeviceTemplate",
     "DeviceType",
     "DeviceStatus",
@@ -27,6 +27,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
 )
@@ -368,8 +369,9 @@ class DeviceConfigBackup(Base):
     compression = Column(String(20))  # gzip, bzip2, none
 
     # Configuration Content
-    config_content = Column(Text)  # For small configs, store directly
+    config_content = Column(Text)  # Legacy inline copy; new backups use blob_id
     config_diff = Column(Text)  # Diff from previous backup
+    blob_id = Column(Integer, ForeignKey("device_config_blobs.id"))
 
     # Backup Metadata
     config_version = Column(String(100))
@@ -385,14 +387,48 @@ class DeviceConfigBackup(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
     scheduled_at = Column(DateTime(timezone=True))
+    verified_at = Column(DateTime(timezone=True))  # Last run that found no change
 
     # Relationships
     device = relationship("ManagedDevice", back_populates="config_backups")
+    blob = relationship("DeviceConfigBlob")
 
     def __repr__(self):
         return f"<DeviceConfigBackup(id={self.id}, device_id={self.device_id}, status='{self.backup_status}')>"
 
 
+class DeviceConfigBlob(Base):
+    """Content-addressed, compressed device configuration
+
+    Identical configurations (unchanged devices, CPEs built from one template)
+    share a single row keyed by their SHA-256. A blob is either a full zlib
+    snapshot or a zlib-compressed line delta against a full snapshot.
+    """
+
+    __tablename__ = "device_config_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, unique=True)
+
+    # Storage
+    encoding = Column(String(20), nullable=False, default="full")  # full, delta
+    base_blob_id = Column(Integer, ForeignKey("device_config_blobs.id"))
+    compression = Column(String(20), nullable=False, default="zlib")
+    data = Column(LargeBinary, nullable=False)
+
+    # Sizes (bytes)
+    original_size = Column(Integer, nullable=False)
+    stored_size = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return (
+            f"<DeviceConfigBlob(id={self.id}, sha256='{self.sha256[:12]}', "
+            f"encoding='{self.encoding}')>"
+        )
+
+
 class DeviceTemplate(Base):
     """Device configuration and monitoring templates"""
 
@@ -453,3 +489,8 @@ Index(
     DeviceConfigBackup.device_id,
     DeviceConfigBackup.backup_status,
 )
+Index(
+    "idx_device_config_backups_latest",
+    DeviceConfigBackup.device_id,
+    DeviceConfigBackup.completed_at.desc(),
+)
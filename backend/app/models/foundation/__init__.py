@@ -9,6 +9,8 @@ This module contains foundational models that support the entire ISP Framework:
 """
 
 from .base import DeadLetterQueue, FileStorage, Location, Reseller, TaskExecutionLog
+from .reseller_rollups import ResellerRollup
+from .sequences import NumberSequence
 from .tariff import (
     InternetTariffConfig,
     Tariff,
@@ -24,6 +26,8 @@ __all__ = [
     "DeadLetterQueue",
     "TaskExecutionLog",
     "Reseller",
+    "ResellerRollup",
+    "NumberSequence",
     # Tariff Management
     "Tariff",
     "InternetTariffConfig",
@@ -0,0 +1,60 @@
+"""
+Reseller Rollup Models
+
+Per-reseller, per-month customer and revenue counters maintained incrementally
+(see app.services.reseller_rollups) so reseller dashboards never scan the
+reseller's customers or payments.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.types import DECIMAL
+
+from app.models.base import Base
+
+
+class ResellerRollup(Base):
+    """Customer and payment counters for one reseller and month
+
+    Every column is an additive delta: the monthly rows (``period`` YYYYMM)
+    record what happened in that month, and the lifetime row (``period`` "")
+    is the running total across all months. Customer counters are bucketed by
+    the month the customer was created, payment counters by payment date.
+    """
+
+    __tablename__ = "reseller_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reseller_id = Column(
+        Integer, ForeignKey("resellers.id", ondelete="CASCADE"), nullable=False
+    )
+    period = Column(String(6), nullable=False, default="")  # YYYYMM, "" = lifetime
+
+    # Customer assignments
+    customers_added = Column(Integer, nullable=False, default=0)
+    customers_removed = Column(Integer, nullable=False, default=0)
+    active_customers = Column(Integer, nullable=False, default=0)  # Net change
+
+    # Completed payments from the reseller's customers
+    payment_count = Column(Integer, nullable=False, default=0)
+    paying_customers = Column(Integer, nullable=False, default=0)  # Monthly rows only
+    total_revenue = Column(DECIMAL(14, 2), nullable=False, default=0)
+    commission_amount = Column(DECIMAL(14, 2), nullable=False, default=0)
+
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint("reseller_id", "period", name="uq_reseller_rollup_period"),
+    )
+
+    @property
+    def customer_count(self) -> int:
+        return (self.customers_added or 0) - (self.customers_removed or 0)
+
+    def __repr__(self):
+        return (
+            f"<ResellerRollup {self.reseller_id}/{self.period or 'lifetime'}: "
+            f"{self.customer_count}>"
+        )
@@ -0,0 +1,35 @@
+"""
+Number Sequence Models
+
+Counter rows backing the central identifier/number allocator
+(see app.services.number_allocator).
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class NumberSequence(Base):
+    """Per-kind, per-period counter for human-readable document numbers"""
+
+    __tablename__ = "number_sequences"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False)  # invoice, payment, credit_note
+    period = Column(String(20), nullable=False, default="")  # e.g. 202501, "" = none
+    last_value = Column(BigInteger, nullable=False, default=0)  # Last number handed out
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        UniqueConstraint("name", "period", name="uq_number_sequence_name_period"),
+    )
+
+    def __repr__(self):
+        return f"<NumberSequence({self.name}/{self.period}={self.last_value})>"
@@ -65,6 +65,10 @@ class Router(Base):
     connection_error = Column(Integer, default=0)
     last_api_error = Column(Boolean, default=False)
 
+    # Placement occupancy (maintained by RouterPlacementEngine)
+    active_services = Column(Integer, nullable=False, default=0)
+    max_services = Column(Integer)  # None = no customer limit
+
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -93,6 +97,10 @@ class RouterSector(Base):
     speed_up = Column(Integer, nullable=False)  # kbps
     limit_at = Column(Integer, default=95)  # percentage
 
+    # Placement occupancy (maintained by RouterPlacementEngine)
+    active_services = Column(Integer, nullable=False, default=0)
+    max_services = Column(Integer)  # None = no customer limit
+
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -452,6 +452,7 @@ Index(
 )
 Index("idx_customer_services_template", CustomerService.service_template_id)
 Index("idx_customer_services_router", CustomerService.primary_router_id)
+Index("idx_customer_services_sector", CustomerService.sector_id)
 Index("idx_customer_services_activation", CustomerService.activation_date)
 Index("idx_customer_services_contract", CustomerService.contract_end_date)
 
@@ -287,17 +287,23 @@ class ServiceSuspension(Base):
 
 
 class ServiceUsageTracking(Base):
-    """Track service usage patterns and statistics"""
+    """Track service usage patterns and statistics
+
+    The table is range-partitioned by month on ``tracking_date``; partitions
+    are managed by ``app.repositories.usage_tracking``.
+    """
 
     __tablename__ = "service_usage_tracking"
+    __table_args__ = {"postgresql_partition_by": "RANGE (tracking_date)"}
 
-    id = Column(Integer, primary_key=True, index=True)
+    # The partition key has to be part of the table's primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
     customer_service_id = Column(
         Integer, ForeignKey("customer_services.id", ondelete="CASCADE"), nullable=False
     )
 
     # Time Period
-    tracking_date = Column(DateTime(timezone=True), nullable=False, index=True)
+    tracking_date = Column(DateTime(timezone=True), primary_key=True, nullable=False)
     period_type = Column(String(20), nullable=False)  # hourly, daily, weekly, monthly
 
     # Internet Usage (if applicable)
@@ -333,6 +339,9 @@ class ServiceUsageTracking(Base):
     # Relationships
     customer_service = relationship("CustomerService")
 
+    # Rows are still identified by id alone
+    __mapper_args__ = {"primary_key": [id]}
+
     def __repr__(self):
         return (
             f"<ServiceUsageTracking {self.customer_service_id}: {self.tracking_date}>"
@@ -474,6 +483,11 @@ Index(
     ServiceUsageTracking.period_type,
     ServiceUsageTracking.tracking_date,
 )
+Index(
+    "idx_usage_tracking_date_brin",
+    ServiceUsageTracking.tracking_date,
+    postgresql_using="brin",
+)
 
 # Alert indexes
 Index("idx_alerts_active", ServiceAlert.is_active, ServiceAlert.severity)
@@ -8,6 +8,7 @@ from .field_work import FieldWorkOrder, FieldWorkStatus
 from .incidents import NetworkIncident
 from .knowledge_base import KnowledgeBaseArticle
 from .sla import SLAPolicy
+from .stats import TicketDailyStats
 from .status_history import TicketStatusHistory
 from .templates import TicketTemplate
 from .tickets import (
@@ -45,4 +46,6 @@ __all__ = [
     "NetworkIncident",
     "KnowledgeBaseArticle",
     "TicketTemplate",
+    # Reporting
+    "TicketDailyStats",
 ]
@@ -0,0 +1,57 @@
+"""
+Ticket Statistics Rollup Models
+Per-team, per-day ticket aggregates refreshed in the background for reporting
+"""
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class TicketDailyStats(Base):
+    """Ticket aggregates for the tickets a team received on one day
+
+    Averages are stored as totals and counts so any date range or set of teams
+    can be combined without re-reading the tickets table.
+    """
+
+    __tablename__ = "ticket_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    stat_date = Column(Date, nullable=False, index=True)
+    team = Column(String(100), nullable=False, default="")  # "" = unassigned
+
+    # Counts
+    tickets_created = Column(Integer, nullable=False, default=0)
+    tickets_open = Column(Integer, nullable=False, default=0)
+    tickets_overdue = Column(Integer, nullable=False, default=0)
+    tickets_resolved = Column(Integer, nullable=False, default=0)
+    sla_tracked = Column(Integer, nullable=False, default=0)
+    sla_met = Column(Integer, nullable=False, default=0)
+
+    # Totals for averages
+    response_seconds_total = Column(BigInteger, nullable=False, default=0)
+    response_count = Column(Integer, nullable=False, default=0)
+    resolution_seconds_total = Column(BigInteger, nullable=False, default=0)
+    resolution_count = Column(Integer, nullable=False, default=0)
+    satisfaction_total = Column(Integer, nullable=False, default=0)
+    satisfaction_count = Column(Integer, nullable=False, default=0)
+
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("stat_date", "team", name="uq_ticket_daily_stats_date_team"),
+    )
+
+    def __repr__(self):
+        team = self.team or "unassigned"
+        return f"<TicketDailyStats {self.stat_date} {team}: {self.tickets_created}>"
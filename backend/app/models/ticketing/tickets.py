@@ -11,14 +11,16 @@ from sqlalchemy import (
     DECIMAL,
     Boolean,
     Column,
+    Computed,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
 )
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -156,6 +158,14 @@ class Ticket(Base):
     # Tags & Keywords
     tags = Column(ARRAY(String), default=[])
     keywords = Column(ARRAY(String), default=[])  # For search optimization
+    search_vector = Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+    )
 
     # Framework Integration
     custom_fields = Column(JSONB, default={})  # Dynamic custom fields
@@ -204,6 +214,30 @@ class Ticket(Base):
     parent_ticket = relationship("Ticket", remote_side=[id])
     child_tickets = relationship("Ticket", back_populates="parent_ticket")
 
+    # Indexes for performance
+    __table_args__ = (
+        # Keyset pagination seeks on (created_at, id) newest-first
+        Index("idx_tickets_created_at_id", "created_at", "id"),
+        # Full-text search over title and description
+        Index("idx_tickets_search_vector", "search_vector", postgresql_using="gin"),
+        # Trigram indexes make ILIKE '%term%' on these columns index-backed
+        Index(
+            "idx_tickets_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_tickets_number_trgm",
+            "ticket_number",
+            postgresql_using="gin",
+            postgresql_ops={"ticket_number": "gin_trgm_ops"},
+        ),
+        # Incident grouping: parent lookup and per-customer duplicate checks
+        Index("idx_tickets_related_incident", "related_incident_id"),
+        Index("idx_tickets_parent_customer", "parent_ticket_id", "customer_id"),
+    )
+
     def __repr__(self):
         return f"<Ticket {self.ticket_number}: {self.title} [{self.status.value}]>"
 
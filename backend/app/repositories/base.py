@@ -1,12 +1,19 @@
 import logging
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Sequence, Type, TypeVar
 
 from sqlalchemy import asc, desc
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
 
-from app.core.exceptions import NotFoundError
+from app.core.exceptions import NotFoundError, ValidationError
 from app.models.base import Base
+from app.repositories.pagination import (
+    KeysetPage,
+    apply_keyset,
+    build_page,
+    estimate_query_count,
+    estimate_table_count,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +21,45 @@ ModelType = TypeVar("ModelType", bound=Base)
 
 
 class BaseRepository(Generic[ModelType]):
-    """Base repository class with common CRUD operations."""
+    """Base repository class with common CRUD operations.
+
+    Subclasses may declare ``eager_load`` with relationship names that list
+    endpoints always need, so they are fetched in one extra query (or join)
+    instead of lazily per row.
+    """
+
+    # Relationship names eager-loaded by get_all/get_page
+    eager_load: Sequence[str] = ()
+    # "selectin" issues one IN query per relationship, "joined" uses a LEFT JOIN
+    eager_strategy: str = "selectin"
 
     def __init__(self, model: Type[ModelType], db: Session):
         self.model = model
         self.db = db
 
+    def _apply_eager_loading(
+        self, query: Query, eager_load: Optional[Sequence[str]] = None
+    ) -> Query:
+        """Attach loader options for the requested relationships."""
+        relationships = self.eager_load if eager_load is None else eager_load
+        loader = joinedload if self.eager_strategy == "joined" else selectinload
+        for name in relationships:
+            query = query.options(loader(getattr(self.model, name)))
+        return query
+
+    def _apply_filters(
+        self, query: Query, filters: Optional[Dict[str, Any]] = None
+    ) -> Query:
+        """Apply equality / IN filters for known model attributes."""
+        if filters:
+            for field, value in filters.items():
+                if hasattr(self.model, field):
+                    if isinstance(value, list):
+                        query = query.filter(getattr(self.model, field).in_(value))
+                    else:
+                        query = query.filter(getattr(self.model, field) == value)
+        return query
+
     def get(self, id: int) -> Optional[ModelType]:
         """Get a single record by ID."""
         try:
@@ -58,19 +98,12 @@ class BaseRepository(Generic[ModelType]):
         filters: Optional[Dict[str, Any]] = None,
         order_by: Optional[str] = None,
         order_desc: bool = False,
+        eager_load: Optional[Sequence[str]] = None,
     ) -> List[ModelType]:
         """Get multiple records with optional filtering and pagination."""
         try:
-            query = self.db.query(self.model)
-
-            # Apply filters
-            if filters:
-                for field, value in filters.items():
-                    if hasattr(self.model, field):
-                        if isinstance(value, list):
-                            query = query.filter(getattr(self.model, field).in_(value))
-                        else:
-                            query = query.filter(getattr(self.model, field) == value)
+            query = self._apply_filters(self.db.query(self.model), filters)
+            query = self._apply_eager_loading(query, eager_load)
 
             # Apply ordering
             if order_by and hasattr(self.model, order_by):
@@ -84,18 +117,73 @@ class BaseRepository(Generic[ModelType]):
             logger.error(f"Error getting {self.model.__name__} records: {e}")
             raise
 
-    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
-        """Count records with optional filtering."""
+    def get_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+        order_by: str = "id",
+        order_desc: bool = False,
+        eager_load: Optional[Sequence[str]] = None,
+        with_total: Optional[str] = None,
+    ) -> KeysetPage[ModelType]:
+        """Get one page of records using keyset (cursor) pagination.
+
+        Rows are ordered by ``order_by`` with the primary key as tie-breaker and
+        the query seeks past ``cursor`` instead of using OFFSET, so the cost of a
+        page does not depend on how deep it is. ``with_total`` may be
+        ``"exact"`` for a COUNT or ``"estimate"`` for a planner estimate.
+        """
+        if not hasattr(self.model, order_by):
+            raise ValidationError(
+                f"{self.model.__name__} cannot be ordered by {order_by}"
+            )
+
+        columns = [getattr(self.model, order_by)]
+        key_attrs = [order_by]
+        if order_by != "id":
+            columns.append(self.model.id)
+            key_attrs.append("id")
+
+        try:
+            query = self._apply_filters(self.db.query(self.model), filters)
+            paged = apply_keyset(
+                self._apply_eager_loading(query, eager_load),
+                columns,
+                cursor,
+                limit,
+                descending=order_desc,
+            )
+            page = build_page(paged.all(), limit, key_attrs)
+
+            if with_total:
+                page.total_is_estimate = with_total == "estimate"
+                page.total = self.count(filters, estimate=page.total_is_estimate)
+            return page
+        except SQLAlchemyError as e:
+            logger.error(f"Error paging {self.model.__name__} records: {e}")
+            raise
+
+    def count(
+        self, filters: Optional[Dict[str, Any]] = None, estimate: bool = False
+    ) -> int:
+        """Count records with optional filtering.
+
+        With ``estimate=True`` the planner's row estimate is returned, which
+        avoids a full scan on large tables at the cost of exactness.
+        """
         try:
-            query = self.db.query(self.model)
-
-            if filters:
-                for field, value in filters.items():
-                    if hasattr(self.model, field):
-                        if isinstance(value, list):
-                            query = query.filter(getattr(self.model, field).in_(value))
-                        else:
-                            query = query.filter(getattr(self.model, field) == value)
+            query = self._apply_filters(self.db.query(self.model), filters)
+
+            if estimate:
+                try:
+                    if filters:
+                        return estimate_query_count(self.db, query)
+                    return estimate_table_count(self.db, self.model.__tablename__)
+                except Exception as e:
+                    logger.warning(
+                        f"Falling back to exact count for {self.model.__name__}: {e}"
+                    )
 
             return query.count()
         except SQLAlchemyError as e:
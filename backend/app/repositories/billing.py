@@ -5,11 +5,11 @@ Repository classes for billing module following the established repository patte
 for ISP Framework.
 """
 
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, case, desc, func
 from sqlalchemy.orm import Session
 
 from ..models.billing import (
@@ -25,6 +25,9 @@ from ..models.billing import (
 )
 from .base import BaseRepository
 
+# Unpaid invoice states that count as overdue once past their due date
+PAST_DUE_INVOICE_STATUSES = (InvoiceStatus.PENDING, InvoiceStatus.SENT)
+
 
 class InvoiceRepository(BaseRepository[Invoice]):
     """Repository for invoice management"""
@@ -56,20 +59,7 @@ class InvoiceRepository(BaseRepository[Invoice]):
         self, as_of_date: Optional[datetime] = None
     ) -> List[Invoice]:
         """Get all overdue invoices"""
-        if not as_of_date:
-            as_of_date = datetime.utcnow()
-
-        return (
-            self.db.query(self.model)
-            .filter(
-                and_(
-                    self.model.due_date < as_of_date,
-                    self.model.status.in_([InvoiceStatus.PENDING, InvoiceStatus.SENT]),
-                    self.model.balance_due > 0,
-                )
-            )
-            .all()
-        )
+        return self.db.query(self.model).filter(self._past_due(as_of_date)).all()
 
     def get_invoices_by_status(
         self, status: InvoiceStatus, limit: int = 100, offset: int = 0
@@ -150,50 +140,83 @@ class InvoiceRepository(BaseRepository[Invoice]):
     def get_billing_statistics(
         self, start_date: Optional[date] = None, end_date: Optional[date] = None
     ) -> Dict[str, Any]:
-        """Get billing statistics"""
-        query = self.db.query(self.model)
+        """Get billing statistics with one grouped scan of the invoices"""
+        past_due = self._past_due()
+        query = self.db.query(
+            self.model.status.label("status"),
+            func.count(self.model.id).label("invoice_count"),
+            func.sum(self.model.total_amount).label("total_amount"),
+            func.sum(self.model.paid_amount).label("paid_amount"),
+            func.sum(self.model.balance_due).label("balance_due"),
+            func.sum(case((past_due, self.model.balance_due), else_=0)).label(
+                "overdue_amount"
+            ),
+            func.sum(case((past_due, 1), else_=0)).label("past_due_count"),
+        ).group_by(self.model.status)
 
         if start_date:
             query = query.filter(self.model.invoice_date >= start_date)
         if end_date:
-            query = query.filter(self.model.invoice_date <= end_date)
-
-        # Basic counts and sums
-        total_invoices = query.count()
-        total_amount = query.with_entities(
-            func.sum(self.model.total_amount)
-        ).scalar() or Decimal("0")
-        paid_amount = query.with_entities(
-            func.sum(self.model.paid_amount)
-        ).scalar() or Decimal("0")
-        outstanding_amount = query.with_entities(
-            func.sum(self.model.balance_due)
-        ).scalar() or Decimal("0")
-
-        # Status counts
-        status_counts = {}
-        for status in InvoiceStatus:
-            count = query.filter(self.model.status == status).count()
-            status_counts[f"{status.value}_invoices"] = count
-
-        # Overdue amount
-        overdue_amount = self.db.query(self.model).filter(
-            and_(
-                self.model.due_date < datetime.utcnow(),
-                self.model.status.in_([InvoiceStatus.PENDING, InvoiceStatus.SENT]),
-                self.model.balance_due > 0,
-            )
-        ).with_entities(func.sum(self.model.balance_due)).scalar() or Decimal("0")
+            # The whole end day, like the daily rollup
+            query = query.filter(self.model.invoice_date < end_date + timedelta(days=1))
 
+        return summarize_invoice_statistics(query.all())
+
+    def get_past_due_totals(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Overdue amount and count of past-due invoices"""
+        query = self.db.query(
+            func.coalesce(func.sum(self.model.balance_due), 0),
+            func.count(self.model.id),
+        ).filter(self._past_due())
+        if start_date:
+            query = query.filter(self.model.invoice_date >= start_date)
+        if end_date:
+            query = query.filter(self.model.invoice_date < end_date + timedelta(days=1))
+
+        overdue_amount, past_due_invoices = query.one()
         return {
-            "total_invoices": total_invoices,
-            "total_amount": total_amount,
-            "paid_amount": paid_amount,
-            "outstanding_amount": outstanding_amount,
-            "overdue_amount": overdue_amount,
-            **status_counts,
+            "overdue_amount": Decimal(str(overdue_amount)),
+            "past_due_invoices": past_due_invoices,
         }
 
+    def _past_due(self, as_of_date: Optional[datetime] = None):
+        """Filter for unpaid invoices past their due date"""
+        return and_(
+            self.model.due_date < (as_of_date or datetime.utcnow()),
+            self.model.status.in_(PAST_DUE_INVOICE_STATUSES),
+            self.model.balance_due > 0,
+        )
+
+
+def summarize_invoice_statistics(rows: List[Any]) -> Dict[str, Any]:
+    """Fold per-status invoice aggregates into the billing statistics dict
+
+    Each row carries ``status``, ``invoice_count``, ``total_amount``,
+    ``paid_amount`` and ``balance_due``, and optionally ``overdue_amount``
+    and ``past_due_count``.
+    """
+    stats: Dict[str, Any] = {
+        "total_invoices": 0,
+        "total_amount": Decimal("0"),
+        "paid_amount": Decimal("0"),
+        "outstanding_amount": Decimal("0"),
+        "overdue_amount": Decimal("0"),
+        "past_due_invoices": 0,
+    }
+    status_counts = {f"{status.value}_invoices": 0 for status in InvoiceStatus}
+    for row in rows:
+        status = getattr(row.status, "value", row.status)
+        status_counts[f"{status}_invoices"] = row.invoice_count or 0
+        stats["total_invoices"] += row.invoice_count or 0
+        stats["total_amount"] += Decimal(str(row.total_amount or 0))
+        stats["paid_amount"] += Decimal(str(row.paid_amount or 0))
+        stats["outstanding_amount"] += Decimal(str(row.balance_due or 0))
+        stats["overdue_amount"] += Decimal(str(getattr(row, "overdue_amount", 0) or 0))
+        stats["past_due_invoices"] += getattr(row, "past_due_count", 0) or 0
+    return {**stats, **status_counts}
+
 
 class InvoiceItemRepository(BaseRepository[InvoiceItem]):
     """Repository for invoice item management"""
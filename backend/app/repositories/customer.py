@@ -6,6 +6,12 @@ from sqlalchemy.orm import Session
 
 from app.models.customer import Customer
 from app.repositories.base import BaseRepository
+from app.repositories.pagination import (
+    KeysetPage,
+    apply_keyset,
+    build_page,
+    estimate_query_count,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +19,9 @@ logger = logging.getLogger(__name__)
 class CustomerRepository(BaseRepository[Customer]):
     """Repository for customer-specific database operations."""
 
+    # CustomerSummary renders the status for every row
+    eager_load = ("status_ref",)
+
     def __init__(self, db: Session):
         super().__init__(Customer, db)
 
@@ -24,6 +33,37 @@ class CustomerRepository(BaseRepository[Customer]):
         """Get customer by login."""
         return self.get_by_field("login", login)
 
+    def _search_query(
+        self,
+        query: str,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        location_id: Optional[int] = None,
+    ):
+        """Build the filtered query shared by search, search_page and count_search."""
+        db_query = self.db.query(self.model)
+
+        # Text search across multiple fields
+        if query:
+            search_filter = or_(
+                Customer.name.ilike(f"%{query}%"),
+                Customer.email.ilike(f"%{query}%"),
+                Customer.phone.ilike(f"%{query}%"),
+            )
+            db_query = db_query.filter(search_filter)
+
+        # Additional filters
+        if status:
+            db_query = db_query.filter(Customer.status == status)
+
+        if category:
+            db_query = db_query.filter(Customer.category == category)
+
+        if location_id:
+            db_query = db_query.filter(Customer.location_id == location_id)
+
+        return db_query
+
     def search(
         self,
         query: str,
@@ -35,28 +75,30 @@ class CustomerRepository(BaseRepository[Customer]):
     ) -> List[Customer]:
         """Search customers by name, email, or phone with additional filters."""
         try:
-            db_query = self.db.query(self.model)
-
-            # Text search across multiple fields
-            if query:
-                search_filter = or_(
-                    Customer.name.ilike(f"%{query}%"),
-                    Customer.email.ilike(f"%{query}%"),
-                    Customer.phone.ilike(f"%{query}%"),
-                )
-                db_query = db_query.filter(search_filter)
-
-            # Additional filters
-            if status:
-                db_query = db_query.filter(Customer.status == status)
-
-            if category:
-                db_query = db_query.filter(Customer.category == category)
+            db_query = self._search_query(query, status, category, location_id)
+            db_query = self._apply_eager_loading(db_query)
+            return db_query.order_by(Customer.id).offset(skip).limit(limit).all()
 
-            if location_id:
-                db_query = db_query.filter(Customer.location_id == location_id)
+        except Exception as e:
+            logger.error(f"Error searching customers: {e}")
+            raise
 
-            return db_query.offset(skip).limit(limit).all()
+    def search_page(
+        self,
+        query: str,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        location_id: Optional[int] = None,
+    ) -> KeysetPage[Customer]:
+        """Search customers using keyset pagination ordered by id."""
+        try:
+            db_query = self._search_query(query, status, category, location_id)
+            db_query = apply_keyset(
+                self._apply_eager_loading(db_query), [Customer.id], cursor, limit
+            )
+            return build_page(db_query.all(), limit, ["id"])
 
         except Exception as e:
             logger.error(f"Error searching customers: {e}")
@@ -68,30 +110,16 @@ class CustomerRepository(BaseRepository[Customer]):
         status: Optional[str] = None,
         category: Optional[str] = None,
         location_id: Optional[int] = None,
+        estimate: bool = False,
     ) -> int:
         """Count customers matching search criteria."""
         try:
-            db_query = self.db.query(self.model)
-
-            # Text search across multiple fields
-            if query:
-                search_filter = or_(
-                    Customer.name.ilike(f"%{query}%"),
-                    Customer.email.ilike(f"%{query}%"),
-                    Customer.phone.ilike(f"%{query}%"),
-                )
-                db_query = db_query.filter(search_filter)
-
-            # Additional filters
-            if status:
-                db_query = db_query.filter(Customer.status == status)
-
-            if category:
-                db_query = db_query.filter(Customer.category == category)
-
-            if location_id:
-                db_query = db_query.filter(Customer.location_id == location_id)
-
+            db_query = self._search_query(query, status, category, location_id)
+            if estimate:
+                try:
+                    return estimate_query_count(self.db, db_query)
+                except Exception as e:
+                    logger.warning(f"Falling back to exact search count: {e}")
             return db_query.count()
 
         except Exception as e:
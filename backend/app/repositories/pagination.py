@@ -0,0 +1,163 @@
+"""Keyset (cursor) pagination helpers shared by repositories.
+
+OFFSET pagination makes PostgreSQL walk and discard every skipped row, so deep
+pages get linearly slower as a table grows. Keyset pagination instead seeks
+directly to the last row of the previous page using an index on the sort
+columns, which keeps every page constant-time.
+
+Cursors are opaque, URL-safe strings that encode the sort-key values of the
+last row returned.
+"""
+
+import base64
+import enum
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Generic, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, Session
+
+from app.core.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class KeysetPage(Generic[T]):
+    """A single page of keyset-paginated results."""
+
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of a row into an opaque cursor."""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor produced by :func:`encode_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list):
+            raise ValueError("cursor payload is not a list")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError) as e:
+        raise ValidationError(f"Invalid pagination cursor: {e}") from e
+
+
+def apply_keyset(
+    query: Query,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False,
+) -> Query:
+    """Order ``query`` by ``columns`` and seek past ``cursor``.
+
+    ``columns`` must end with a unique column (normally the primary key) so the
+    ordering is total. One extra row is fetched so callers can tell whether
+    another page exists; see :func:`build_page`.
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise ValidationError("Pagination cursor does not match sort order")
+        key = tuple_(*columns)
+        bound = tuple(values)
+        query = query.filter(key < bound if descending else key > bound)
+
+    ordering = [c.desc() if descending else c.asc() for c in columns]
+    return query.order_by(*ordering).limit(limit + 1)
+
+
+def build_page(rows: List[T], limit: int, key_attrs: Sequence[str]) -> KeysetPage[T]:
+    """Trim the look-ahead row and compute the cursor for the next page."""
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = None
+    if has_more and items:
+        next_cursor = cursor_for(items[-1], key_attrs)
+    return KeysetPage(items=items, next_cursor=next_cursor, has_more=has_more)
+
+
+def cursor_for(obj: Any, key_attrs: Sequence[str]) -> str:
+    """Build a cursor pointing just after ``obj``."""
+    return encode_cursor([getattr(obj, attr) for attr in key_attrs])
+
+
+def estimate_table_count(db: Session, table_name: str) -> int:
+    """Return the planner's row estimate for a whole table.
+
+    Reads ``pg_class.reltuples`` which is maintained by VACUUM/ANALYZE, so it
+    costs a single catalog lookup instead of a sequential scan. Runs in a
+    savepoint so a failure leaves the caller's transaction usable for an
+    exact count.
+    """
+    with db.begin_nested():
+        result = db.execute(
+            text(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = to_regclass(:table_name)"
+            ),
+            {"table_name": table_name},
+        ).scalar()
+    # reltuples is -1 for tables that were never analyzed
+    return max(int(result or 0), 0)
+
+
+def estimate_query_count(db: Session, query: Query) -> int:
+    """Return the planner's row estimate for a filtered query via EXPLAIN.
+
+    Like :func:`estimate_table_count` this runs in a savepoint, so callers can
+    fall back to ``query.count()`` when it fails.
+    """
+    statement = query.order_by(None).limit(None).offset(None).statement
+    compiled = statement.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    # Executed as raw driver SQL: literal values may contain ':' or '%'
+    with db.begin_nested():
+        plan = (
+            db.connection()
+            .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+            .scalar()
+        )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -7,12 +7,13 @@ Database operations for reseller management in single-tenant ISP Framework.
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
 
-from app.models.billing import Payment
-from app.models.customer import Customer
-from app.models.foundation import Reseller
+from app.models.billing import CustomerBillingAccount, Payment, PaymentStatus
+from app.models.customer import Customer, CustomerStatus
+from app.models.foundation import Reseller, Tariff
+from app.models.services import CustomerService, ServiceStatus
 from app.repositories.base import BaseRepository
 
 
@@ -71,6 +72,72 @@ class ResellerRepository(BaseRepository[Reseller]):
             .all()
         )
 
+    def get_reseller_customer_summaries(
+        self, reseller_id: int, limit: int = 50, offset: int = 0
+    ) -> List[Any]:
+        """Get a page of a reseller's customers with service and payment summaries
+
+        Active service counts, monthly revenue and the last completed payment
+        are aggregated for the whole page in one statement.
+        """
+        page = (
+            select(Customer.id)
+            .where(Customer.reseller_id == reseller_id)
+            .order_by(Customer.id)
+            .offset(offset)
+            .limit(limit)
+            .subquery()
+        )
+        page_ids = select(page.c.id)
+
+        price = func.coalesce(CustomerService.custom_price, Tariff.base_price)
+        discount = func.coalesce(CustomerService.discount_percentage, 0)
+        services = (
+            select(
+                CustomerService.customer_id,
+                func.count(CustomerService.id).label("services_count"),
+                func.sum(price * (100 - discount) / 100).label("monthly_revenue"),
+            )
+            .join(Tariff, Tariff.id == CustomerService.tariff_id)
+            .where(
+                CustomerService.customer_id.in_(page_ids),
+                CustomerService.status == ServiceStatus.ACTIVE,
+            )
+            .group_by(CustomerService.customer_id)
+            .subquery()
+        )
+
+        payer = func.coalesce(Payment.customer_id, CustomerBillingAccount.customer_id)
+        payments = (
+            select(
+                payer.label("customer_id"),
+                func.max(Payment.payment_date).label("last_payment"),
+            )
+            .outerjoin(
+                CustomerBillingAccount,
+                CustomerBillingAccount.id == Payment.billing_account_id,
+            )
+            .where(payer.in_(page_ids), Payment.status == PaymentStatus.COMPLETED)
+            .group_by(payer)
+            .subquery()
+        )
+
+        return (
+            self.db.query(
+                Customer,
+                CustomerStatus.code.label("status"),
+                func.coalesce(services.c.services_count, 0).label("services_count"),
+                func.coalesce(services.c.monthly_revenue, 0).label("monthly_revenue"),
+                payments.c.last_payment,
+            )
+            .outerjoin(CustomerStatus, CustomerStatus.id == Customer.status_id)
+            .outerjoin(services, services.c.customer_id == Customer.id)
+            .outerjoin(payments, payments.c.customer_id == Customer.id)
+            .filter(Customer.id.in_(page_ids))
+            .order_by(Customer.id)
+            .all()
+        )
+
     def get_reseller_customer_count(self, reseller_id: int) -> int:
         """Get count of customers assigned to a reseller"""
         return (
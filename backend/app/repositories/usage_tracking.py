@@ -6,17 +6,62 @@ Repository layer for service usage tracking including:
 - Usage analytics and reporting
 - Performance metrics tracking
 - Cost calculation and billing integration
+
+``service_usage_tracking`` is range-partitioned by calendar month (UTC) on
+``tracking_date``, one ``service_usage_tracking_pYYYY_MM`` table per month.
+Partitions are created ahead of time by the maintenance task, and a month
+outside that window gets its partition on demand, in the transaction that
+inserts into it. Retention drops whole months instead of deleting rows.
 """
 
-from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Any
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
-from sqlalchemy import and_, or_, desc, asc, func, text
-from sqlalchemy.orm import Session, joinedload
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+from sqlalchemy import and_, asc, desc, func, insert, text
+from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.services.management import ServiceUsageTracking
 from app.repositories.base import BaseRepository
 
+logger = logging.getLogger(__name__)
+
+USAGE_TABLE = ServiceUsageTracking.__tablename__
+USAGE_PARTITION_PREFIX = f"{USAGE_TABLE}_p"
+_PARTITION_NAME = re.compile(rf"^{USAGE_PARTITION_PREFIX}(\d{{4}})_(\d{{2}})$")
+
+# Rows per multi-row INSERT statement
+USAGE_WRITE_CHUNK = 1000
+
+# Bucket for each tracking period in usage trends
+TREND_BUCKETS = {
+    "hourly": ("hour", "%Y-%m-%d %H:00"),
+    "daily": ("day", "%Y-%m-%d"),
+    "weekly": ("week", "%Y-%m-%d"),
+    "monthly": ("month", "%Y-%m-%d"),
+}
+
+# Months known to have a committed partition in this process
+_known_partitions: Set[date] = set()
+
+
+def month_start(value: datetime) -> date:
+    """First day of the UTC month containing ``value``."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def usage_partition_name(month: date) -> str:
+    return f"{USAGE_PARTITION_PREFIX}{month:%Y_%m}"
+
 
 class UsageRepository(BaseRepository[ServiceUsageTracking]):
     """Repository for service usage tracking."""
@@ -72,11 +117,117 @@ class UsageRepository(BaseRepository[ServiceUsageTracking]):
             usage_charges=usage_charges,
             overage_charges=overage_charges
         )
+        self.ensure_partitions([month_start(tracking_date)])
         self.db.add(usage_record)
         self.db.commit()
         self.db.refresh(usage_record)
         return usage_record
 
+    def record_usage_many(self, records: Iterable[Mapping[str, Any]]) -> int:
+        """Record many usage rows with multi-row INSERTs; return the row count.
+
+        Each record holds ``ServiceUsageTracking`` column values; counters
+        that are left out default to zero as in :meth:`record_usage`.
+        """
+        rows = [
+            {
+                "bytes_downloaded": 0,
+                "bytes_uploaded": 0,
+                "session_count": 0,
+                "session_duration_minutes": 0,
+                "incoming_calls": 0,
+                "outgoing_calls": 0,
+                "total_call_minutes": 0,
+                "missed_calls": 0,
+                "voicemail_messages": 0,
+                "uptime_minutes": 0,
+                "downtime_minutes": 0,
+                "usage_charges": Decimal('0'),
+                "overage_charges": Decimal('0'),
+                **record,
+            }
+            for record in records
+        ]
+        if not rows:
+            return 0
+
+        self.ensure_partitions({month_start(row["tracking_date"]) for row in rows})
+        for start in range(0, len(rows), USAGE_WRITE_CHUNK):
+            self.db.execute(
+                insert(ServiceUsageTracking), rows[start:start + USAGE_WRITE_CHUNK]
+            )
+        self.db.commit()
+        return len(rows)
+
+    def ensure_partitions(self, months: Iterable[date]) -> None:
+        """Create the monthly partitions for ``months`` that do not exist yet.
+
+        The DDL runs in the caller's transaction, so it commits or rolls back
+        with the rows that need the partition and never waits on locks that
+        transaction holds. ``CREATE TABLE ... PARTITION OF`` locks the parent
+        table, so it runs with ``usage_partition_lock_timeout_ms`` and fails
+        instead of queueing every other writer behind it.
+        """
+        missing = set(months) - _known_partitions
+        if not missing:
+            return
+        existing = set(self.list_partitions())
+        _known_partitions.update(existing & missing)
+        missing -= existing
+        if not missing:
+            return
+
+        set_lock_timeout = text("SELECT set_config('lock_timeout', :value, true)")
+        previous = self.db.execute(
+            text("SELECT current_setting('lock_timeout')")
+        ).scalar()
+        with self.db.begin_nested():
+            self.db.execute(
+                set_lock_timeout,
+                {"value": f"{settings.usage_partition_lock_timeout_ms}ms"},
+            )
+            for month in sorted(missing):
+                self.db.execute(
+                    text(
+                        f'CREATE TABLE IF NOT EXISTS "{usage_partition_name(month)}" '
+                        f'PARTITION OF {USAGE_TABLE} '
+                        f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') "
+                        f"TO ('{next_month(month).isoformat()} 00:00+00')"
+                    )
+                )
+            self.db.execute(set_lock_timeout, {"value": previous})
+        # Known once committed; until then the catalog is checked again
+        logger.info(
+            f"Created usage tracking partitions: {[str(m) for m in sorted(missing)]}"
+        )
+
+    def ensure_future_partitions(self, months_ahead: int = 2) -> List[date]:
+        """Create and commit the current month and ``months_ahead`` after it."""
+        months = [month_start(datetime.now(timezone.utc))]
+        for _ in range(months_ahead):
+            months.append(next_month(months[-1]))
+        self.ensure_partitions(months)
+        self.db.commit()
+        return months
+
+    def list_partitions(self) -> Dict[date, str]:
+        """Existing monthly partitions by first day of the month."""
+        names = self.db.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table"
+            ),
+            {"table": USAGE_TABLE},
+        ).scalars()
+        partitions = {}
+        for name in names:
+            match = _PARTITION_NAME.match(name)
+            if match:
+                partitions[date(int(match[1]), int(match[2]), 1)] = name
+        return partitions
+
     def get_usage_by_service(
         self,
         customer_service_id: int,
@@ -185,37 +336,66 @@ class UsageRepository(BaseRepository[ServiceUsageTracking]):
         period_type: str = "daily",
         days: int = 30
     ) -> List[Dict[str, Any]]:
-        """Get usage trends over time."""
+        """Get usage trends over time, one bucket per tracking period."""
         end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=days)
+        unit, date_format = TREND_BUCKETS.get(period_type, TREND_BUCKETS["daily"])
+        bucket = func.date_trunc(unit, ServiceUsageTracking.tracking_date)
 
-        query = self.db.query(ServiceUsageTracking).filter(
+        results = self.db.query(
+            bucket.label("bucket"),
+            func.sum(
+                func.coalesce(ServiceUsageTracking.bytes_downloaded, 0)
+                + func.coalesce(ServiceUsageTracking.bytes_uploaded, 0)
+            ).label("total_bytes"),
+            func.coalesce(
+                func.sum(ServiceUsageTracking.session_count), 0
+            ).label("sessions"),
+            func.coalesce(
+                func.sum(ServiceUsageTracking.session_duration_minutes), 0
+            ).label("session_minutes"),
+            func.coalesce(
+                func.sum(ServiceUsageTracking.incoming_calls), 0
+            ).label("incoming_calls"),
+            func.coalesce(
+                func.sum(ServiceUsageTracking.outgoing_calls), 0
+            ).label("outgoing_calls"),
+            func.coalesce(
+                func.sum(ServiceUsageTracking.total_call_minutes), 0
+            ).label("call_minutes"),
+            func.coalesce(
+                func.sum(ServiceUsageTracking.uptime_minutes), 0
+            ).label("uptime_minutes"),
+            func.coalesce(
+                func.sum(ServiceUsageTracking.downtime_minutes), 0
+            ).label("downtime_minutes"),
+            func.sum(
+                func.coalesce(ServiceUsageTracking.usage_charges, 0)
+                + func.coalesce(ServiceUsageTracking.overage_charges, 0)
+            ).label("charges"),
+        ).filter(
             and_(
                 ServiceUsageTracking.customer_service_id == customer_service_id,
                 ServiceUsageTracking.period_type == period_type,
                 ServiceUsageTracking.tracking_date >= start_date,
                 ServiceUsageTracking.tracking_date <= end_date
             )
-        ).order_by(asc(ServiceUsageTracking.tracking_date))
-
-        records = query.all()
-        trends = []
-
-        for record in records:
-            total_data_gb = (int(record.bytes_downloaded or 0) + int(record.bytes_uploaded or 0)) / (1024 ** 3)
-            trends.append({
-                "date": record.tracking_date.strftime("%Y-%m-%d"),
-                "data_usage_gb": round(total_data_gb, 2),
-                "sessions": record.session_count or 0,
-                "session_minutes": record.session_duration_minutes or 0,
-                "calls": (record.incoming_calls or 0) + (record.outgoing_calls or 0),
-                "call_minutes": record.total_call_minutes or 0,
-                "uptime_minutes": record.uptime_minutes or 0,
-                "downtime_minutes": record.downtime_minutes or 0,
-                "charges": float((record.usage_charges or 0) + (record.overage_charges or 0))
-            })
-
-        return trends
+        ).group_by(bucket).order_by(asc(bucket)).all()
+
+        return [
+            {
+                "date": result.bucket.strftime(date_format),
+                "data_usage_gb": round(int(result.total_bytes or 0) / (1024 ** 3), 2),
+                "sessions": int(result.sessions),
+                "session_minutes": int(result.session_minutes),
+                "calls": int(result.incoming_calls + result.outgoing_calls),
+                "call_minutes": int(result.call_minutes),
+                "uptime_minutes": int(result.uptime_minutes),
+                "downtime_minutes": int(result.downtime_minutes),
+                "charges": float(result.charges or 0)
+            }
+            for result in results
+        ]
 
     def get_top_usage_services(
         self,
@@ -225,23 +405,31 @@ class UsageRepository(BaseRepository[ServiceUsageTracking]):
         metric: str = "data"  # data, sessions, calls, charges
     ) -> List[Dict[str, Any]]:
         """Get top services by usage metric."""
-        if metric == "data":
-            order_field = func.sum(ServiceUsageTracking.bytes_downloaded + ServiceUsageTracking.bytes_uploaded)
-        elif metric == "sessions":
-            order_field = func.sum(ServiceUsageTracking.session_count)
-        elif metric == "calls":
-            order_field = func.sum(ServiceUsageTracking.incoming_calls + ServiceUsageTracking.outgoing_calls)
-        elif metric == "charges":
-            order_field = func.sum(ServiceUsageTracking.usage_charges + ServiceUsageTracking.overage_charges)
-        else:
+        totals = {
+            "data": func.sum(
+                func.coalesce(ServiceUsageTracking.bytes_downloaded, 0)
+                + func.coalesce(ServiceUsageTracking.bytes_uploaded, 0)
+            ),
+            "sessions": func.sum(func.coalesce(ServiceUsageTracking.session_count, 0)),
+            "calls": func.sum(
+                func.coalesce(ServiceUsageTracking.incoming_calls, 0)
+                + func.coalesce(ServiceUsageTracking.outgoing_calls, 0)
+            ),
+            "charges": func.sum(
+                func.coalesce(ServiceUsageTracking.usage_charges, 0)
+                + func.coalesce(ServiceUsageTracking.overage_charges, 0)
+            ),
+        }
+        if metric not in totals:
             raise ValueError("Metric must be one of: data, sessions, calls, charges")
 
+        # Ranked and limited in SQL; the date range prunes partitions
         query = self.db.query(
             ServiceUsageTracking.customer_service_id,
-            func.sum(ServiceUsageTracking.bytes_downloaded + ServiceUsageTracking.bytes_uploaded).label('total_bytes'),
-            func.sum(ServiceUsageTracking.session_count).label('total_sessions'),
-            func.sum(ServiceUsageTracking.incoming_calls + ServiceUsageTracking.outgoing_calls).label('total_calls'),
-            func.sum(ServiceUsageTracking.usage_charges + ServiceUsageTracking.overage_charges).label('total_charges')
+            totals["data"].label('total_bytes'),
+            totals["sessions"].label('total_sessions'),
+            totals["calls"].label('total_calls'),
+            totals["charges"].label('total_charges')
         ).filter(
             and_(
                 ServiceUsageTracking.tracking_date >= start_date,
@@ -250,7 +438,7 @@ class UsageRepository(BaseRepository[ServiceUsageTracking]):
         ).group_by(
             ServiceUsageTracking.customer_service_id
         ).order_by(
-            desc(order_field)
+            desc(totals[metric])
         ).limit(limit)
 
         results = query.all()
@@ -369,14 +557,45 @@ class UsageRepository(BaseRepository[ServiceUsageTracking]):
         return aggregated
 
     def cleanup_old_usage_data(self, days_to_keep: int = 365) -> int:
-        """Clean up old usage tracking data."""
+        """Clean up old usage tracking data.
+
+        Months entirely before the cutoff are dropped as whole partitions;
+        only rows in the month containing the cutoff are deleted one by one.
+        Rows in dropped partitions are counted from planner statistics.
+        """
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
-        
-        deleted_count = self.db.query(ServiceUsageTracking).filter(
+        cutoff_month = month_start(cutoff_date)
+
+        expired = {
+            month: name
+            for month, name in self.list_partitions().items()
+            if month < cutoff_month
+        }
+        deleted_count = 0
+        for month, name in sorted(expired.items()):
+            deleted_count += max(
+                int(
+                    self.db.execute(
+                        text("SELECT reltuples FROM pg_class WHERE relname = :name"),
+                        {"name": name},
+                    ).scalar()
+                    or 0
+                ),
+                0,
+            )
+            self.db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+            _known_partitions.discard(month)
+
+        deleted_count += self.db.query(ServiceUsageTracking).filter(
             ServiceUsageTracking.tracking_date < cutoff_date
-        ).delete()
-        
+        ).delete(synchronize_session=False)
+
         self.db.commit()
+        if expired:
+            logger.info(
+                f"Dropped {len(expired)} usage tracking partitions "
+                f"before {cutoff_month}"
+            )
         return deleted_count
 
     def get_usage_statistics(self) -> Dict[str, Any]:
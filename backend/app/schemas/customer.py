@@ -124,6 +124,9 @@ class CustomerList(BaseModel):
     page: int = Field(..., description="Current page number")
     per_page: int = Field(..., description="Items per page")
     pages: int = Field(..., description="Total number of pages")
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor for the next page (keyset pagination)"
+    )
 
 
 class CustomerStatusUpdate(BaseModel):
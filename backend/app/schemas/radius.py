@@ -169,7 +169,7 @@ class CustomerOnlineUpdate(BaseModel):
 
 
 class CustomerOnline(CustomerOnlineBase):
-    id: int
+    id: Optional[int] = None  # Not assigned until the live session is persisted
     last_change: datetime
     created_at: datetime
     total_bytes: int
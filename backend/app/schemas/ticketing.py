@@ -3,7 +3,7 @@ Ticketing System Pydantic Schemas
 Request/response models for ticketing API endpoints
 """
 
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
 from typing import Any, Dict, List, Optional, Union
@@ -98,6 +98,9 @@ class TicketCreate(TicketBase):
     contact_id: Optional[int] = Field(None, example=789)
     source: TicketSourceEnum = TicketSourceEnum.CUSTOMER_PORTAL
     source_reference: Optional[str] = Field(None, example="EMAIL-2024-001")
+    incident_id: Optional[int] = Field(
+        None, description="Link to this network incident instead of auto-matching"
+    )
 
     class Config:
         schema_extra = {
@@ -445,12 +448,36 @@ class TicketStatisticsResponse(BaseModel):
     customer_satisfaction: float
 
 
+class TicketDailyStatsResponse(BaseModel):
+    stat_date: date
+    team: Optional[str] = None
+    total_tickets: int
+    open_tickets: int
+    overdue_tickets: int
+    resolved_tickets: int
+    sla_tracked: int
+    sla_met: int
+    average_response_time_hours: float
+    average_resolution_time_hours: float
+    customer_satisfaction: float
+    refreshed_at: Optional[datetime] = None
+
+
 class PaginatedTicketResponse(BaseModel):
     tickets: List[TicketResponse]
     total: int
     page: int
     per_page: int
     total_pages: int
+    next_cursor: Optional[str] = None
+
+
+class TicketIngestResponse(BaseModel):
+    tickets: List[TicketResponse]
+    linked: int
+    duplicates: int
+    standalone: int
+    incident_ids: List[int]
 
 
 class PaginatedMessageResponse(BaseModel):
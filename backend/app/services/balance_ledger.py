@@ -0,0 +1,466 @@
+"""
+Balance Ledger Service
+
+Single authoritative, incrementally maintained balance per billing account for
+ISP Framework.
+
+``customer_billing_accounts.current_balance`` is the balance of record and
+``customers.balance`` mirrors it. Both are moved by deltas in the same
+transaction as the invoice, payment or credit-note write that causes them (a
+session ``after_flush`` listener), so reading a balance is a single row lookup
+instead of summing a customer's entire billing history.
+
+Sign convention: positive is credit, negative is money owed.
+
+* invoices count ``-total_amount`` once they leave draft (cancelled ones never
+  count)
+* completed payments count ``+amount``
+* active or applied credit notes count ``+amount``
+* manual billing transactions (no invoice or payment attached) count by type
+
+Writes that bypass the ORM unit of work (``query.update()``, raw SQL) are not
+seen by the listener; :meth:`BalanceLedger.reconcile` recomputes the ledger in
+bulk and corrects any drift.
+"""
+
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, func, literal, select, union_all, update
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy.orm.util import identity_key
+
+from app.models.billing import (
+    BillingTransaction,
+    CreditNote,
+    CustomerBillingAccount,
+    Invoice,
+    InvoiceStatus,
+    Payment,
+    PaymentStatus,
+    TransactionType,
+)
+from app.models.customer import Customer
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal("0.00")
+
+# Invoices in these states are not owed (yet)
+UNPOSTED_INVOICE_STATUSES = (InvoiceStatus.DRAFT, InvoiceStatus.CANCELLED)
+POSTED_CREDIT_NOTE_STATUSES = ("active", "applied")
+
+# Direction a manual transaction moves the balance; other types are recorded
+# for audit only
+TRANSACTION_SIGNS = {
+    TransactionType.CREDIT: 1,
+    TransactionType.PAYMENT: 1,
+    TransactionType.DEBIT: -1,
+    TransactionType.CHARGE: -1,
+}
+
+_accounts = CustomerBillingAccount.__table__
+_customers = Customer.__table__
+
+_PENDING_KEY = "balance_ledger_touched"
+
+
+def _as_decimal(value: Any) -> Decimal:
+    if value is None:
+        return ZERO
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def invoice_contribution(status: Any, total_amount: Any) -> Decimal:
+    """Balance effect of an invoice in the given state."""
+    # A status of None is an unflushed column default, i.e. draft
+    if status is None or status in UNPOSTED_INVOICE_STATUSES:
+        return ZERO
+    return -_as_decimal(total_amount)
+
+
+def payment_contribution(status: Any, amount: Any) -> Decimal:
+    """Balance effect of a payment in the given state."""
+    if status != PaymentStatus.COMPLETED:
+        return ZERO
+    return _as_decimal(amount)
+
+
+def credit_note_contribution(status: Any, amount: Any) -> Decimal:
+    """Balance effect of a credit note in the given state."""
+    # A status of None is an unflushed column default, i.e. active
+    if status is not None and status not in POSTED_CREDIT_NOTE_STATUSES:
+        return ZERO
+    return _as_decimal(amount)
+
+
+def signed_transaction_amount(transaction_type: Any, amount: Any) -> Decimal:
+    """Balance effect of a manual transaction of the given type."""
+    return TRANSACTION_SIGNS.get(transaction_type, 0) * _as_decimal(amount)
+
+
+# Documents that move the balance: model -> (amount attribute, contribution)
+TRACKED_DOCUMENTS = {
+    Invoice: ("total_amount", invoice_contribution),
+    Payment: ("amount", payment_contribution),
+    CreditNote: ("amount", credit_note_contribution),
+}
+
+
+class BalanceLedger:
+    """Reads, moves and reconciles stored account balances"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # Reads
+
+    def get_account_balance(self, account_id: int) -> Decimal:
+        """Return the stored balance of a billing account."""
+        value = (
+            self.db.query(CustomerBillingAccount.current_balance)
+            .filter(CustomerBillingAccount.id == account_id)
+            .scalar()
+        )
+        return _as_decimal(value)
+
+    def get_customer_balance(self, customer_id: int) -> Decimal:
+        """Return the stored balance of a customer's billing account.
+
+        Customers without a billing account fall back to ``customers.balance``.
+        """
+        row = (
+            self.db.query(CustomerBillingAccount.current_balance)
+            .filter(CustomerBillingAccount.customer_id == customer_id)
+            .first()
+        )
+        if row is not None:
+            return _as_decimal(row[0])
+
+        value = (
+            self.db.query(Customer.balance).filter(Customer.id == customer_id).scalar()
+        )
+        return _as_decimal(value)
+
+    # Writes
+
+    def apply_delta(self, account_id: int, delta: Decimal) -> None:
+        """Move one account's balance by ``delta`` in the current transaction."""
+        self.apply_deltas({account_id: delta})
+
+    def apply_deltas(self, deltas: Dict[int, Decimal]) -> List[Tuple[int, int]]:
+        """Move several account balances in the current transaction.
+
+        Returns the ``(account_id, customer_id)`` pairs that were updated.
+        """
+        return apply_balance_deltas(self.db.connection(), deltas)
+
+    # Reconciliation
+
+    def ledger_balances_query(self, account_ids: Optional[Iterable[int]] = None):
+        """Build a query of ``(account_id, ledger_balance)`` from the documents."""
+        ids = list(account_ids) if account_ids is not None else None
+
+        def scoped(stmt, column):
+            return stmt.where(column.in_(ids)) if ids is not None else stmt
+
+        invoices = scoped(
+            select(
+                Invoice.billing_account_id.label("account_id"),
+                (-Invoice.total_amount).label("amount"),
+            ).where(Invoice.status.notin_(UNPOSTED_INVOICE_STATUSES)),
+            Invoice.billing_account_id,
+        )
+        payments = scoped(
+            select(Payment.billing_account_id, Payment.amount).where(
+                Payment.status == PaymentStatus.COMPLETED
+            ),
+            Payment.billing_account_id,
+        )
+        credit_notes = scoped(
+            select(CreditNote.billing_account_id, CreditNote.amount).where(
+                CreditNote.status.in_(POSTED_CREDIT_NOTE_STATUSES)
+            ),
+            CreditNote.billing_account_id,
+        )
+        manual = [
+            scoped(
+                select(
+                    BillingTransaction.billing_account_id,
+                    (literal(sign) * BillingTransaction.amount),
+                ).where(
+                    BillingTransaction.transaction_type == transaction_type,
+                    BillingTransaction.invoice_id.is_(None),
+                    BillingTransaction.payment_id.is_(None),
+                    BillingTransaction.is_reversed.isnot(True),
+                ),
+                BillingTransaction.billing_account_id,
+            )
+            for transaction_type, sign in TRANSACTION_SIGNS.items()
+        ]
+
+        entries = union_all(invoices, payments, credit_notes, *manual).subquery()
+        return select(
+            entries.c.account_id, func.sum(entries.c.amount).label("balance")
+        ).group_by(entries.c.account_id)
+
+    def compute_ledger_balances(
+        self, account_ids: Optional[Iterable[int]] = None
+    ) -> Dict[int, Decimal]:
+        """Recompute balances from the underlying documents."""
+        rows = self.db.execute(self.ledger_balances_query(account_ids))
+        return {row.account_id: _as_decimal(row.balance) for row in rows}
+
+    def reconcile(
+        self,
+        account_ids: Optional[Iterable[int]] = None,
+        batch_size: int = 500,
+        fix: bool = True,
+    ) -> Dict[str, Any]:
+        """Compare stored balances with the ledger and correct drift.
+
+        Accounts are checked in primary-key batches, each in its own
+        transaction. Stored and ledger balances are read by one statement so
+        they share a snapshot, and corrections are applied as deltas so
+        documents committed in the meantime are not lost.
+        """
+        checked = 0
+        drift: Dict[int, Decimal] = {}
+
+        for batch in self._account_batches(account_ids, batch_size):
+            ledger = self.ledger_balances_query(batch).subquery()
+            rows = self.db.execute(
+                select(
+                    CustomerBillingAccount.id,
+                    CustomerBillingAccount.current_balance,
+                    func.coalesce(ledger.c.balance, 0).label("ledger_balance"),
+                )
+                .outerjoin(ledger, ledger.c.account_id == CustomerBillingAccount.id)
+                .where(CustomerBillingAccount.id.in_(batch))
+            ).all()
+
+            batch_drift = {
+                row.id: _as_decimal(row.ledger_balance)
+                - _as_decimal(row.current_balance)
+                for row in rows
+                if _as_decimal(row.ledger_balance) != _as_decimal(row.current_balance)
+            }
+            checked += len(rows)
+            drift.update(batch_drift)
+
+            if fix:
+                if batch_drift:
+                    self.apply_deltas(batch_drift)
+                self._sync_customer_balances(batch)
+                self.db.commit()
+
+        if drift:
+            logger.warning(
+                f"Balance drift on {len(drift)} of {checked} accounts"
+                f"{' (corrected)' if fix else ''}"
+            )
+        return {
+            "accounts_checked": checked,
+            "accounts_drifted": len(drift),
+            "total_drift": sum(drift.values(), ZERO),
+            "drift": drift,
+            "fixed": fix,
+        }
+
+    def reconcile_customer(self, customer_id: int) -> Decimal:
+        """Reconcile one customer's account and return the corrected balance."""
+        account_id = (
+            self.db.query(CustomerBillingAccount.id)
+            .filter(CustomerBillingAccount.customer_id == customer_id)
+            .scalar()
+        )
+        if account_id is None:
+            return self.get_customer_balance(customer_id)
+
+        self.reconcile(account_ids=[account_id])
+        return self.get_account_balance(account_id)
+
+    def account_ids(self) -> List[int]:
+        """All billing account ids, in primary-key order."""
+        return [
+            row[0]
+            for row in self.db.query(CustomerBillingAccount.id).order_by(
+                CustomerBillingAccount.id
+            )
+        ]
+
+    def _account_batches(
+        self, account_ids: Optional[Iterable[int]], batch_size: int
+    ) -> Iterable[List[int]]:
+        if account_ids is not None:
+            ids = sorted(set(account_ids))
+            for start in range(0, len(ids), batch_size):
+                yield ids[start : start + batch_size]
+            return
+
+        last_id = 0
+        while True:
+            batch = [
+                row[0]
+                for row in self.db.query(CustomerBillingAccount.id)
+                .filter(CustomerBillingAccount.id > last_id)
+                .order_by(CustomerBillingAccount.id)
+                .limit(batch_size)
+            ]
+            if not batch:
+                return
+            last_id = batch[-1]
+            yield batch
+
+    def _sync_customer_balances(self, account_ids: List[int]) -> None:
+        """Bring ``customers.balance`` in line with the accounts."""
+        self.db.execute(
+            update(_customers)
+            .where(
+                _customers.c.id == _accounts.c.customer_id,
+                _accounts.c.id.in_(account_ids),
+                _customers.c.balance.is_distinct_from(_accounts.c.current_balance),
+            )
+            .values(balance=_accounts.c.current_balance)
+        )
+
+
+def apply_balance_deltas(
+    connection, deltas: Dict[int, Decimal]
+) -> List[Tuple[int, int]]:
+    """Atomically add deltas to account balances and mirror them to customers.
+
+    Each account is a single ``UPDATE .. SET current_balance = current_balance
+    + :delta`` so concurrent writers never lose each other's changes. Accounts
+    are updated in id order to keep lock ordering consistent.
+    """
+    touched: List[Tuple[int, int]] = []
+    for account_id in sorted(deltas):
+        delta = _as_decimal(deltas[account_id])
+        if not delta:
+            continue
+        row = connection.execute(
+            update(_accounts)
+            .where(_accounts.c.id == account_id)
+            .values(
+                current_balance=_accounts.c.current_balance + delta,
+                available_balance=_accounts.c.current_balance
+                + delta
+                - _accounts.c.reserved_balance,
+                updated_at=func.now(),
+            )
+            .returning(_accounts.c.id, _accounts.c.customer_id)
+        ).first()
+        if row is None:
+            logger.warning(f"Balance delta {delta} for unknown account {account_id}")
+            continue
+        touched.append((row.id, row.customer_id))
+
+    if touched:
+        connection.execute(
+            update(_customers)
+            .where(
+                _customers.c.id == _accounts.c.customer_id,
+                _accounts.c.id.in_([account_id for account_id, _ in touched]),
+            )
+            .values(balance=_accounts.c.current_balance)
+        )
+    return touched
+
+
+# Unit-of-work integration
+
+
+def _attribute_value(obj: Any, key: str, previous: bool) -> Any:
+    """Return an attribute's value before (``previous``) or after the flush."""
+    history = attributes.get_history(obj, key)
+    if history.unchanged:
+        return history.unchanged[0]
+    source = history.deleted if previous else history.added
+    return source[0] if source else None
+
+
+def _document_effect(obj: Any, previous: bool) -> Tuple[Optional[int], Decimal]:
+    amount_key, contribution = TRACKED_DOCUMENTS[type(obj)]
+    account_id = _attribute_value(obj, "billing_account_id", previous)
+    status = _attribute_value(obj, "status", previous)
+    amount = _attribute_value(obj, amount_key, previous)
+    return account_id, contribution(status, amount)
+
+
+def collect_balance_deltas(session: Session) -> Dict[int, Decimal]:
+    """Net balance change per account implied by the pending flush."""
+    deltas: Dict[int, Decimal] = defaultdict(lambda: ZERO)
+
+    for obj in session.new:
+        if type(obj) in TRACKED_DOCUMENTS:
+            account_id, effect = _document_effect(obj, previous=False)
+            if account_id is not None:
+                deltas[account_id] += effect
+
+    for obj in session.dirty:
+        if type(obj) in TRACKED_DOCUMENTS:
+            old_account, old_effect = _document_effect(obj, previous=True)
+            new_account, new_effect = _document_effect(obj, previous=False)
+            if old_account is not None:
+                deltas[old_account] -= old_effect
+            if new_account is not None:
+                deltas[new_account] += new_effect
+
+    for obj in session.deleted:
+        if type(obj) in TRACKED_DOCUMENTS:
+            account_id, effect = _document_effect(obj, previous=True)
+            if account_id is not None:
+                deltas[account_id] -= effect
+
+    return {account_id: delta for account_id, delta in deltas.items() if delta}
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    deltas = collect_balance_deltas(session)
+    if not deltas:
+        return
+    touched = apply_balance_deltas(session.connection(), deltas)
+    session.info.setdefault(_PENDING_KEY, []).extend(touched)
+
+
+def _after_flush_postexec(session: Session, flush_context) -> None:
+    """Expire cached balances so the session re-reads the updated rows."""
+    for account_id, customer_id in session.info.pop(_PENDING_KEY, []):
+        account = session.identity_map.get(
+            identity_key(CustomerBillingAccount, account_id)
+        )
+        if account is not None:
+            session.expire(account, ["current_balance", "available_balance"])
+        customer = session.identity_map.get(identity_key(Customer, customer_id))
+        if customer is not None:
+            session.expire(customer, ["balance"])
+
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+def install_balance_ledger() -> None:
+    """Register the ledger's session and attribute listeners (idempotent)."""
+    if event.contains(Session, "after_flush", _after_flush):
+        return
+
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_flush_postexec", _after_flush_postexec)
+
+    # Load the old value when these change so the previous contribution can be
+    # reversed even if the attribute was expired
+    for model, (amount_key, _) in TRACKED_DOCUMENTS.items():
+        for key in ("billing_account_id", "status", amount_key):
+            event.listen(
+                getattr(model, key),
+                "set",
+                _track_previous_value,
+                active_history=True,
+            )
+
+
+install_balance_ledger()
@@ -8,8 +8,9 @@ payments, credit notes, and accounting for ISP Framework.
 import logging
 from datetime import date, datetime, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from ..models.billing import (
@@ -20,6 +21,7 @@ from ..models.billing import (
     Payment,
     PaymentStatus,
 )
+from ..models.services import CustomerService, ServiceUsageTracking
 from ..repositories.billing import (
     BillingManagementRepository,
     CreditNoteRepository,
@@ -38,6 +40,9 @@ from ..schemas.billing import (
     PaymentCreate,
     PaymentSearch,
 )
+from .billing_rollups import BillingRollupService
+from .invoice_composer import InvoiceComposer
+from .number_allocator import NumberAllocator
 
 logger = logging.getLogger(__name__)
 
@@ -50,13 +55,12 @@ class InvoiceService:
         self.invoice_repo = InvoiceRepository(db)
         self.invoice_item_repo = InvoiceItemRepository(db)
         self.tax_rate_repo = TaxRateRepository(db)
+        self.composer = InvoiceComposer(db)
+        self.rollups = BillingRollupService(db)
 
     def create_invoice(self, invoice_data: InvoiceCreate) -> Invoice:
         """Create a new invoice with items"""
         try:
-            # Generate invoice number
-            invoice_number = self._generate_invoice_number()
-
             # Prepare invoice data
             invoice_dict = invoice_data.dict(exclude={"items"})
             
@@ -66,26 +70,20 @@ class InvoiceService:
                 # Auto-create billing account if it doesn't exist
                 billing_account_id = self._ensure_billing_account_exists(customer_id)
                 invoice_dict["billing_account_id"] = billing_account_id
-            
-            invoice_dict["invoice_number"] = invoice_number
+
             invoice_dict["status"] = InvoiceStatus.DRAFT
 
-            # Create invoice
-            invoice = self.invoice_repo.create(invoice_dict)
+            # Price all items and totals in memory, then write in one batch
+            composed = self.composer.compose(
+                invoice_dict, (item.dict() for item in invoice_data.items)
+            )
+            [invoice_id] = self.composer.persist([composed])
+            self.db.commit()
+
+            invoice = self.invoice_repo.get(invoice_id)
             logger.info(
                 f"Created invoice {invoice.invoice_number} for billing account {invoice.billing_account_id}"
             )
-
-            # Create invoice items
-            if invoice_data.items:
-                for item_data in invoice_data.items:
-                    self._create_invoice_item(invoice.id, item_data)
-
-            # Calculate and update totals
-            self._calculate_and_update_totals(invoice.id)
-
-            # Refresh invoice with items
-            self.db.refresh(invoice)
             return invoice
 
         except Exception as e:
@@ -108,11 +106,9 @@ class InvoiceService:
 
             # Update invoice
             update_dict = invoice_data.dict(exclude_unset=True)
+            # Header fields do not affect totals, which are kept with the items
             updated_invoice = self.invoice_repo.update(invoice_id, update_dict)
 
-            # Recalculate totals if needed
-            self._calculate_and_update_totals(invoice_id)
-
             logger.info(f"Updated invoice {updated_invoice.invoice_number}")
             return updated_invoice
 
@@ -153,7 +149,7 @@ class InvoiceService:
     ) -> Dict[str, Any]:
         """Get billing statistics for a date range"""
         try:
-            return self.invoice_repo.get_billing_statistics(start_date, end_date)
+            return self.rollups.get_statistics(start_date, end_date)
         except Exception as e:
             logger.error(f"Error getting billing statistics: {str(e)}")
             raise
@@ -166,59 +162,22 @@ class InvoiceService:
         self, invoice_id: int, item_data: InvoiceItemCreate
     ) -> InvoiceItem:
         """Add an item to an existing invoice"""
-        item = self._create_invoice_item(invoice_id, item_data)
-        self._calculate_and_update_totals(invoice_id)
-        return item
+        return self.add_invoice_items(invoice_id, [item_data])[0]
 
-    def _create_invoice_item(
-        self, invoice_id: int, item_data: InvoiceItemCreate
-    ) -> InvoiceItem:
-        """Create an invoice item with calculations"""
-        item_dict = item_data.dict()
-        item_dict["invoice_id"] = invoice_id
-
-        # Calculate line total
-        quantity = item_dict["quantity"]
-        unit_price = item_dict["unit_price"]
-        discount_amount = item_dict.get("discount_amount", Decimal("0"))
-        discount_percentage = item_dict.get("discount_percentage", Decimal("0"))
-
-        # Apply percentage discount if specified
-        if discount_percentage > 0:
-            discount_amount = unit_price * quantity * discount_percentage / 100
-            item_dict["discount_amount"] = discount_amount
-
-        # Calculate line total before tax
-        line_total_before_tax = (unit_price * quantity) - discount_amount
-
-        # Calculate tax
-        tax_rate = item_dict.get("tax_rate", Decimal("0"))
-        tax_amount = Decimal("0")
-        if item_dict.get("taxable", True) and tax_rate > 0:
-            tax_amount = line_total_before_tax * tax_rate / 100
-
-        item_dict["tax_amount"] = tax_amount
-        item_dict["line_total"] = line_total_before_tax + tax_amount
-
-        return self.invoice_item_repo.create(item_dict)
-
-    def _calculate_and_update_totals(self, invoice_id: int):
-        """Calculate and update invoice totals"""
-        totals = self.invoice_item_repo.calculate_invoice_totals(invoice_id)
-
-        # Update invoice with calculated totals
-        self.invoice_repo.update(
-            invoice_id,
-            {
-                "subtotal": totals["subtotal"],
-                "tax_amount": totals["tax_amount"],
-                "discount_amount": totals["discount_amount"],
-                "total_amount": totals["total_amount"],
-                "balance_due": totals[
-                    "total_amount"
-                ],  # Initially, balance due equals total
-            },
-        )
+    def add_invoice_items(
+        self, invoice_id: int, items: List[InvoiceItemCreate]
+    ) -> List[InvoiceItem]:
+        """Add several items to an existing invoice in one transaction"""
+        try:
+            added = self.composer.append_lines(
+                invoice_id, (item.dict() for item in items)
+            )
+            self.db.commit()
+            return added
+        except Exception as e:
+            logger.error(f"Error adding items to invoice {invoice_id}: {str(e)}")
+            self.db.rollback()
+            raise
 
     def _ensure_billing_account_exists(self, customer_id: int) -> int:
         """Ensure billing account exists for customer, create if not found"""
@@ -275,32 +234,6 @@ class InvoiceService:
             # Fallback: return customer_id as billing_account_id
             return customer_id
 
-    def _generate_invoice_number(self) -> str:
-        """Generate unique invoice number"""
-        # Simple implementation - can be enhanced with custom formats
-        now = datetime.now(timezone.utc)
-        year = now.year
-        month = now.month
-
-        # Count invoices this month
-        start_of_month = datetime(year, month, 1, tzinfo=timezone.utc)
-        end_of_month = (
-            datetime(year, month + 1, 1, tzinfo=timezone.utc)
-            if month < 12
-            else datetime(year + 1, 1, 1, tzinfo=timezone.utc)
-        )
-
-        monthly_count = (
-            self.db.query(Invoice)
-            .filter(
-                Invoice.invoice_date >= start_of_month,
-                Invoice.invoice_date < end_of_month,
-            )
-            .count()
-        )
-
-        return f"INV-{year:04d}{month:02d}-{monthly_count + 1:04d}"
-
 
 class PaymentService:
     """Service for payment management"""
@@ -309,6 +242,7 @@ class PaymentService:
         self.db = db
         self.payment_repo = PaymentRepository(db)
         self.invoice_repo = InvoiceRepository(db)
+        self.number_allocator = NumberAllocator(db)
 
     def create_payment(self, payment_data: PaymentCreate) -> Payment:
         """Create a new payment"""
@@ -395,29 +329,8 @@ class PaymentService:
         return updated_payment
 
     def _generate_payment_number(self) -> str:
-        """Generate unique payment number"""
-        now = datetime.now(timezone.utc)
-        year = now.year
-        month = now.month
-
-        # Count payments this month
-        start_of_month = datetime(year, month, 1, tzinfo=timezone.utc)
-        end_of_month = (
-            datetime(year, month + 1, 1, tzinfo=timezone.utc)
-            if month < 12
-            else datetime(year + 1, 1, 1, tzinfo=timezone.utc)
-        )
-
-        monthly_count = (
-            self.db.query(Payment)
-            .filter(
-                Payment.payment_date >= start_of_month,
-                Payment.payment_date < end_of_month,
-            )
-            .count()
-        )
-
-        return f"PAY-{year:04d}{month:02d}-{monthly_count + 1:04d}"
+        """Generate unique payment number (PAY-YYYYMM-NNNN)"""
+        return self.number_allocator.next_number("payment")
 
 
 class CreditNoteService:
@@ -427,6 +340,7 @@ class CreditNoteService:
         self.db = db
         self.credit_note_repo = CreditNoteRepository(db)
         self.invoice_repo = InvoiceRepository(db)
+        self.number_allocator = NumberAllocator(db)
 
     def create_credit_note(self, credit_note_data: CreditNoteCreate) -> CreditNote:
         """Create a new credit note"""
@@ -500,29 +414,8 @@ class CreditNoteService:
         return updated_credit_note
 
     def _generate_credit_note_number(self) -> str:
-        """Generate unique credit note number"""
-        now = datetime.now(timezone.utc)
-        year = now.year
-        month = now.month
-
-        # Count credit notes this month
-        start_of_month = datetime(year, month, 1, tzinfo=timezone.utc)
-        end_of_month = (
-            datetime(year, month + 1, 1, tzinfo=timezone.utc)
-            if month < 12
-            else datetime(year + 1, 1, 1, tzinfo=timezone.utc)
-        )
-
-        monthly_count = (
-            self.db.query(CreditNote)
-            .filter(
-                CreditNote.credit_date >= start_of_month,
-                CreditNote.credit_date < end_of_month,
-            )
-            .count()
-        )
-
-        return f"CN-{year:04d}{month:02d}-{monthly_count + 1:04d}"
+        """Generate unique credit note number (CN-YYYYMM-NNNN)"""
+        return self.number_allocator.next_number("credit_note")
 
 
 class BillingManagementService:
@@ -543,9 +436,8 @@ class BillingManagementService:
             # Get basic statistics
             stats = self.invoice_service.get_billing_statistics(start_date, end_date)
 
-            # Add additional metrics
-            overdue_invoices = self.invoice_service.get_overdue_invoices()
-            stats["overdue_invoices"] = len(overdue_invoices)
+            # Past-due invoices are counted with the overdue amount
+            stats["overdue_invoices"] = stats["past_due_invoices"]
 
             # Add missing fields required by BillingOverview schema
             stats["total_payments"] = self.db.query(Payment).count()
@@ -573,3 +465,90 @@ class BillingManagementService:
         except Exception as e:
             logger.error(f"Error getting customer billing summary: {str(e)}")
             raise
+
+    def calculate_usage_charges(
+        self,
+        customer_ids: Optional[Iterable[int]] = None,
+        billing_period: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Sum usage and overage charges per customer for a billing period.
+
+        ``billing_period`` is a ``YYYY-MM`` month (default: the current one).
+        All customers in ``customer_ids`` are aggregated by one grouped query.
+        """
+        start, end = self._billing_period_bounds(billing_period)
+        total_charges = func.coalesce(
+            func.sum(
+                func.coalesce(ServiceUsageTracking.usage_charges, 0)
+                + func.coalesce(ServiceUsageTracking.overage_charges, 0)
+            ),
+            0,
+        )
+        query = (
+            self.db.query(CustomerService.customer_id, total_charges.label("amount"))
+            .join(
+                ServiceUsageTracking,
+                ServiceUsageTracking.customer_service_id == CustomerService.id,
+            )
+            .filter(
+                ServiceUsageTracking.tracking_date >= start,
+                ServiceUsageTracking.tracking_date < end,
+            )
+            .group_by(CustomerService.customer_id)
+        )
+        if customer_ids is not None:
+            query = query.filter(CustomerService.customer_id.in_(list(customer_ids)))
+
+        charges = {
+            row.customer_id: Decimal(str(row.amount)) for row in query if row.amount
+        }
+        return {
+            "billing_period": start.strftime("%Y-%m"),
+            "charges_calculated": len(charges),
+            "total_amount": sum(charges.values(), Decimal("0")),
+            "charges": charges,
+        }
+
+    def calculate_customer_usage_charges(
+        self, customer_id: int, billing_period: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Usage charges for a single customer"""
+        return self.calculate_usage_charges([customer_id], billing_period)
+
+    def calculate_all_usage_charges(
+        self, billing_period: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Usage charges for every customer with tracked usage"""
+        return self.calculate_usage_charges(None, billing_period)
+
+    def get_usage_customer_ids(self, billing_period: Optional[str] = None) -> List[int]:
+        """Customers with tracked usage in a billing period"""
+        start, end = self._billing_period_bounds(billing_period)
+        rows = (
+            self.db.query(CustomerService.customer_id)
+            .join(
+                ServiceUsageTracking,
+                ServiceUsageTracking.customer_service_id == CustomerService.id,
+            )
+            .filter(
+                ServiceUsageTracking.tracking_date >= start,
+                ServiceUsageTracking.tracking_date < end,
+            )
+            .distinct()
+        )
+        return [row.customer_id for row in rows]
+
+    @staticmethod
+    def _billing_period_bounds(billing_period: Optional[str]):
+        if billing_period:
+            start = datetime.strptime(billing_period, "%Y-%m").replace(
+                tzinfo=timezone.utc
+            )
+        else:
+            now = datetime.now(timezone.utc)
+            start = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
+        if start.month == 12:
+            end = start.replace(year=start.year + 1, month=1)
+        else:
+            end = start.replace(month=start.month + 1)
+        return start, end
@@ -9,13 +9,16 @@ Service layer for automated billing processes including:
 """
 
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, time, timedelta, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
+from dateutil.relativedelta import relativedelta
 from sqlalchemy.orm import Session
 
 from app.core.exceptions import ValidationError
+from app.models.billing import CustomerBillingAccount, InvoiceStatus
+from app.services.invoice_composer import ComposedInvoice, InvoiceComposer
 from app.services.webhook_integration_service import WebhookTriggers
 
 logger = logging.getLogger(__name__)
@@ -27,40 +30,40 @@ class BillingAutomationService:
     def __init__(self, db: Session):
         self.db = db
         self.webhook_triggers = WebhookTriggers(db)
+        self.invoice_composer = InvoiceComposer(db)
 
     def generate_recurring_invoices(
         self, billing_date: Optional[datetime] = None
     ) -> Dict[str, Any]:
-        """Generate recurring invoices for services due for billing."""
+        """Generate recurring invoices for services due for billing.
+
+        All invoices of the run are composed in memory and written with one
+        batch of inserts in a single transaction.
+        """
         if not billing_date:
             billing_date = datetime.now(timezone.utc).date()
 
         try:
             # Get all services due for billing
             services_due = self._get_services_due_for_billing(billing_date)
+            accounts = self._get_billing_account_ids(
+                {service["customer_id"] for service in services_due}
+            )
 
-            invoices_created = 0
-            total_amount = Decimal("0.00")
+            composed = []
             errors = []
-
             for service in services_due:
                 try:
-                    invoice = self._create_service_invoice(service, billing_date)
-                    invoices_created += 1
-                    total_amount += invoice["amount"]
-
-                    # Trigger webhook for invoice creation
-                    self.webhook_triggers.invoice_created(
-                        {
-                            "invoice_id": invoice["id"],
-                            "customer_id": service["customer_id"],
-                            "service_id": service["id"],
-                            "amount": float(invoice["amount"]),
-                            "due_date": invoice["due_date"].isoformat(),
-                            "billing_period": invoice["billing_period"],
-                        }
+                    composed.append(
+                        (
+                            service,
+                            self._compose_service_invoice(
+                                service,
+                                accounts.get(service["customer_id"]),
+                                billing_date,
+                            ),
+                        )
                     )
-
                 except Exception as e:
                     logger.error(
                         f"Error creating invoice for service {service['id']}: {e}"
@@ -73,18 +76,43 @@ class BillingAutomationService:
                         }
                     )
 
+            invoice_ids = self.invoice_composer.persist(
+                [invoice for _, invoice in composed]
+            )
+            self.db.commit()
+
+            total_amount = Decimal("0.00")
+            for (service, invoice), invoice_id in zip(
+                composed, invoice_ids, strict=True
+            ):
+                total_amount += invoice.total_amount
+
+                # Trigger webhook for invoice creation
+                self.webhook_triggers.invoice_created(
+                    {
+                        "invoice_id": invoice_id,
+                        "customer_id": service["customer_id"],
+                        "service_id": service["id"],
+                        "amount": float(invoice.total_amount),
+                        "due_date": invoice.header["due_date"].isoformat(),
+                        "billing_period": billing_date.strftime("%Y-%m"),
+                    }
+                )
+
             logger.info(
-                f"Generated {invoices_created} recurring invoices totaling ${total_amount}"
+                f"Generated {len(invoice_ids)} recurring invoices "
+                f"totaling ${total_amount}"
             )
 
             return {
-                "invoices_created": invoices_created,
+                "invoices_created": len(invoice_ids),
                 "total_amount": float(total_amount),
                 "billing_date": billing_date.isoformat(),
                 "errors": errors,
             }
 
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error in recurring invoice generation: {e}")
             raise
 
@@ -283,20 +311,55 @@ class BillingAutomationService:
         # This would query active services where next_billing_date <= billing_date
         return []
 
-    def _create_service_invoice(
-        self, service: Dict[str, Any], billing_date: datetime.date
-    ) -> Dict[str, Any]:
-        """Create an invoice for a service."""
-        # Placeholder - implement when invoice repository is available
-        invoice_data = {
-            "id": f"inv_{service['id']}_{billing_date.strftime('%Y%m%d')}",
-            "customer_id": service["customer_id"],
-            "service_id": service["id"],
-            "amount": Decimal(str(service["monthly_fee"])),
-            "due_date": billing_date + timedelta(days=30),
-            "billing_period": f"{billing_date.strftime('%Y-%m')}",
-        }
-        return invoice_data
+    def _get_billing_account_ids(self, customer_ids: Set[int]) -> Dict[int, int]:
+        """Billing account id per customer, in one query."""
+        if not customer_ids:
+            return {}
+        rows = self.db.query(
+            CustomerBillingAccount.customer_id, CustomerBillingAccount.id
+        ).filter(CustomerBillingAccount.customer_id.in_(customer_ids))
+        return dict(rows)
+
+    def _compose_service_invoice(
+        self,
+        service: Dict[str, Any],
+        billing_account_id: Optional[int],
+        billing_date: datetime.date,
+    ) -> ComposedInvoice:
+        """Compose the recurring invoice for a service in memory."""
+        if billing_account_id is None:
+            raise ValidationError(
+                f"Customer {service['customer_id']} has no billing account"
+            )
+
+        period_start = datetime.combine(billing_date, time.min, tzinfo=timezone.utc)
+        # Clamps to the last day of shorter months (Jan 31 -> Feb 28)
+        period_end = period_start + relativedelta(months=1)
+
+        return self.invoice_composer.compose(
+            {
+                "billing_account_id": billing_account_id,
+                "invoice_date": period_start,
+                "due_date": period_start + timedelta(days=30),
+                "billing_period_start": period_start,
+                "billing_period_end": period_end,
+                "currency": service.get("currency", "USD"),
+                "status": InvoiceStatus.DRAFT,
+            },
+            [
+                {
+                    "description": service.get("name")
+                    or f"Service {service['id']} ({billing_date.strftime('%Y-%m')})",
+                    "item_type": "service",
+                    "service_id": service["id"],
+                    "quantity": 1,
+                    "unit_price": service["monthly_fee"],
+                    "tax_rate": service.get("tax_rate", 0),
+                    "period_start": period_start,
+                    "period_end": period_end,
+                }
+            ],
+        )
 
     def _get_service_billing_info(self, service_id: int) -> Dict[str, Any]:
         """Get billing information for a service."""
@@ -434,9 +497,23 @@ class BillingAutomationService:
         return {"success": False, "error_message": "Payment gateway unavailable"}
 
     def _initiate_dunning_process(self, payment: Dict[str, Any]):
-        """Initiate dunning process for repeatedly failed payments."""
-        # Placeholder - implement dunning logic
+        """Initiate dunning process for repeatedly failed payments.
+
+        The run is queued as ``billing.run_dunning`` for the customer's
+        accounts, so the actions it creates are delivered and the services of
+        accounts it suspends are suspended, as in the nightly run.
+        """
+        from app.tasks.billing_tasks import run_dunning_task
+
         logger.info(f"Initiating dunning process for payment {payment['id']}")
+        account_ids = [
+            account_id
+            for (account_id,) in self.db.query(CustomerBillingAccount.id).filter(
+                CustomerBillingAccount.customer_id == payment["customer_id"]
+            )
+        ]
+        if account_ids:
+            run_dunning_task.delay(account_ids=account_ids)
 
     def _get_reseller_commission_structure(self, reseller_id: int) -> Dict[str, float]:
         """Get commission structure for a reseller."""
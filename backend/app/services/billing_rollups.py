@@ -0,0 +1,376 @@
+"""
+Billing Rollup Service
+
+Maintains ``billing_daily_rollup``: per-day invoice and payment totals by
+status. Invoice and payment changes are collected per session by a
+``ChangeCollector`` and folded into the rollup with one upsert when the
+session commits, so the totals commit atomically with the documents they
+count; ``install_billing_rollups`` registers it at API and worker startup.
+Bulk writers (the invoice composer) apply their changes directly, and a
+``rebuild`` over a date range corrects drift from other statements that
+bypass the ORM.
+
+The migration that creates the table fills it from the existing invoices and
+payments. Documents written by processes still running the previous release
+while it is deployed are picked up by the scheduled drift correction, which
+rebuilds the last ``DRIFT_WINDOW_DAYS`` days.
+
+Billing statistics for a month or a year then read a few hundred rollup rows
+grouped by status. Only the overdue totals depend on the current time, so
+they are still read from the invoices, through the status and due date index.
+
+Rebuild a longer range (month by month, one transaction each)::
+
+    python -m app.services.billing_rollups --since 2024-01-01
+"""
+
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.session_changes import ChangeCollector, attribute_value
+from app.models.billing import BillingDailyRollup, Invoice, Payment
+from app.repositories.billing import InvoiceRepository, summarize_invoice_statistics
+
+logger = logging.getLogger(__name__)
+
+INVOICE = "invoice"
+PAYMENT = "payment"
+ROLLUP_PENDING_KEY = "billing_rollup_pending"
+
+COUNTER_COLUMNS = ("document_count", "total_amount", "paid_amount", "balance_due")
+
+# Days recomputed by the scheduled drift correction
+DRIFT_WINDOW_DAYS = 35
+
+
+def rollup_day(at: Any) -> date:
+    """UTC day a document is counted on"""
+    if at is None:
+        return datetime.now(timezone.utc).date()
+    if isinstance(at, datetime):
+        return (at.astimezone(timezone.utc) if at.tzinfo else at).date()
+    if isinstance(at, str):
+        return date.fromisoformat(at[:10])
+    return at
+
+
+def _status(value: Any) -> str:
+    return getattr(value, "value", value)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+class BillingRollupService:
+    """Read, update and rebuild the daily billing rollup"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # Reads
+
+    def get_statistics(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Billing statistics for a date range (inclusive) from the rollup
+
+        A range without rollup rows has no invoices either; it is answered by
+        the grouped invoice scan, which is cheap for an empty range.
+        """
+        query = self._range(
+            self.db.query(
+                BillingDailyRollup.status.label("status"),
+                func.sum(BillingDailyRollup.document_count).label("invoice_count"),
+                func.sum(BillingDailyRollup.total_amount).label("total_amount"),
+                func.sum(BillingDailyRollup.paid_amount).label("paid_amount"),
+                func.sum(BillingDailyRollup.balance_due).label("balance_due"),
+            ).filter(BillingDailyRollup.document == INVOICE),
+            start_date,
+            end_date,
+        ).group_by(BillingDailyRollup.status)
+
+        invoice_repo = InvoiceRepository(self.db)
+        rows = query.all()
+        if not rows:
+            return invoice_repo.get_billing_statistics(start_date, end_date)
+
+        stats = summarize_invoice_statistics(rows)
+        stats.update(invoice_repo.get_past_due_totals(start_date, end_date))
+        return stats
+
+    def get_daily_totals(
+        self,
+        document: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[BillingDailyRollup]:
+        """Rollup rows of one document kind, by day and status"""
+        return (
+            self._range(
+                self.db.query(BillingDailyRollup).filter(
+                    BillingDailyRollup.document == document
+                ),
+                start_date,
+                end_date,
+            )
+            .order_by(BillingDailyRollup.day, BillingDailyRollup.status)
+            .all()
+        )
+
+    @staticmethod
+    def _range(query, start_date: Optional[date], end_date: Optional[date]):
+        if start_date:
+            query = query.filter(BillingDailyRollup.day >= start_date)
+        if end_date:
+            query = query.filter(BillingDailyRollup.day <= end_date)
+        return query
+
+    # Incremental maintenance
+
+    def apply_changes(self, pending: Dict[str, List[tuple]]) -> int:
+        """Fold collected invoice and payment changes into the rollup
+
+        Invoices are ``(invoice_date, status, total_amount, paid_amount,
+        balance_due, sign)`` and payments ``(payment_date, status, amount,
+        sign)``, where ``sign`` is +1 for the new state and -1 for the old.
+        """
+        deltas: Dict[Tuple[date, str, str], Dict[str, Any]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        for invoice_date, status, total, paid, balance, sign in pending.get(
+            "invoices", []
+        ):
+            values = deltas[(rollup_day(invoice_date), INVOICE, _status(status))]
+            values["document_count"] += sign
+            values["total_amount"] += Decimal(str(total or 0)) * sign
+            values["paid_amount"] += Decimal(str(paid or 0)) * sign
+            values["balance_due"] += Decimal(str(balance or 0)) * sign
+        for payment_date, status, amount, sign in pending.get("payments", []):
+            values = deltas[(rollup_day(payment_date), PAYMENT, _status(status))]
+            values["document_count"] += sign
+            values["total_amount"] += Decimal(str(amount or 0)) * sign
+
+        rows = [
+            {
+                "day": day,
+                "document": document,
+                "status": status,
+                **{column: values.get(column, 0) for column in COUNTER_COLUMNS},
+            }
+            for (day, document, status), values in deltas.items()
+            if any(values.values())
+        ]
+        if rows:
+            self.db.execute(self._upsert(), rows)
+        return len(rows)
+
+    def _upsert(self):
+        dialect = (
+            postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        )
+        stmt = dialect.insert(BillingDailyRollup)
+        return stmt.on_conflict_do_update(
+            index_elements=["day", "document", "status"],
+            set_={
+                **{
+                    column: getattr(BillingDailyRollup, column) + stmt.excluded[column]
+                    for column in COUNTER_COLUMNS
+                },
+                "updated_at": func.now(),
+            },
+        )
+
+    # Rebuild and backfill
+
+    def rebuild(self, start_date: date, end_date: date) -> int:
+        """Recompute the rollup for a date range (inclusive) and commit"""
+        try:
+            start, end = _day_start(start_date), _day_start(
+                end_date + timedelta(days=1)
+            )
+            rows: Dict[Tuple[date, str, str], Dict[str, Any]] = {}
+
+            invoice_day = self._day(Invoice.invoice_date)
+            for row in (
+                self.db.query(
+                    invoice_day.label("day"),
+                    Invoice.status,
+                    func.count(Invoice.id).label("documents"),
+                    func.sum(Invoice.total_amount).label("total_amount"),
+                    func.sum(Invoice.paid_amount).label("paid_amount"),
+                    func.sum(Invoice.balance_due).label("balance_due"),
+                )
+                .filter(Invoice.invoice_date >= start, Invoice.invoice_date < end)
+                .group_by(invoice_day, Invoice.status)
+            ):
+                rows[(rollup_day(row.day), INVOICE, _status(row.status))] = {
+                    "document_count": row.documents,
+                    "total_amount": row.total_amount or 0,
+                    "paid_amount": row.paid_amount or 0,
+                    "balance_due": row.balance_due or 0,
+                }
+
+            payment_day = self._day(Payment.payment_date)
+            for row in (
+                self.db.query(
+                    payment_day.label("day"),
+                    Payment.status,
+                    func.count(Payment.id).label("documents"),
+                    func.sum(Payment.amount).label("total_amount"),
+                )
+                .filter(Payment.payment_date >= start, Payment.payment_date < end)
+                .group_by(payment_day, Payment.status)
+            ):
+                rows[(rollup_day(row.day), PAYMENT, _status(row.status))] = {
+                    "document_count": row.documents,
+                    "total_amount": row.total_amount or 0,
+                }
+
+            self.db.query(BillingDailyRollup).filter(
+                BillingDailyRollup.day >= start_date, BillingDailyRollup.day <= end_date
+            ).delete(synchronize_session=False)
+            self.db.bulk_insert_mappings(
+                BillingDailyRollup,
+                [
+                    {"day": day, "document": document, "status": status, **values}
+                    for (day, document, status), values in rows.items()
+                ],
+            )
+            self.db.commit()
+
+            logger.info(
+                f"Rebuilt {len(rows)} billing rollup rows "
+                f"for {start_date} to {end_date}"
+            )
+            return len(rows)
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error rebuilding billing rollup: {str(e)}")
+            raise
+
+    def backfill(
+        self, since: Optional[date] = None, until: Optional[date] = None
+    ) -> int:
+        """Rebuild month by month from ``since`` (default: first document)"""
+        until = until or datetime.now(timezone.utc).date()
+        if since is None:
+            first = min(
+                (
+                    value
+                    for value in (
+                        self.db.query(func.min(Invoice.invoice_date)).scalar(),
+                        self.db.query(func.min(Payment.payment_date)).scalar(),
+                    )
+                    if value is not None
+                ),
+                default=None,
+            )
+            if first is None:
+                return 0
+            since = rollup_day(first)
+
+        total = 0
+        month_start = since
+        while month_start <= until:
+            next_month = (month_start.replace(day=1) + timedelta(days=32)).replace(
+                day=1
+            )
+            total += self.rebuild(
+                month_start, min(next_month - timedelta(days=1), until)
+            )
+            month_start = next_month
+        return total
+
+    def _day(self, column):
+        if self.db.get_bind().dialect.name == "postgresql":
+            return func.date(func.timezone("UTC", column))
+        return func.date(column)
+
+
+# Session listeners
+
+
+INVOICE_FIELDS = (
+    "invoice_date",
+    "status",
+    "total_amount",
+    "paid_amount",
+    "balance_due",
+)
+PAYMENT_FIELDS = ("payment_date", "status", "amount")
+TRACKED_DOCUMENTS = {
+    Invoice: ("invoices", INVOICE_FIELDS),
+    Payment: ("payments", PAYMENT_FIELDS),
+}
+
+
+def _capture(session: Session, obj: Any, operation: str) -> None:
+    """Record invoice and payment changes of a flush"""
+    tracked = TRACKED_DOCUMENTS.get(type(obj))
+    if tracked is None:
+        return
+    kind, keys = tracked
+    before = after = None
+    if operation != "INSERT":
+        before = tuple(attribute_value(obj, key, previous=True) for key in keys)
+    if operation != "DELETE":
+        after = tuple(attribute_value(obj, key, previous=False) for key in keys)
+    if before == after:
+        return
+
+    changes = rollup_changes.pending(session)[kind]
+    if before is not None:
+        changes.append(before + (-1,))
+    if after is not None:
+        changes.append(after + (1,))
+
+
+def _apply(session: Session, pending: Dict[str, List[tuple]]) -> None:
+    BillingRollupService(session).apply_changes(pending)
+
+
+rollup_changes = ChangeCollector(
+    ROLLUP_PENDING_KEY,
+    _capture,
+    _apply,
+    empty=lambda: {"invoices": [], "payments": []},
+)
+
+
+def install_billing_rollups() -> None:
+    """Register the rollup session listeners (idempotent)
+
+    Called at API and worker startup, so changes committed by any code path
+    are counted.
+    """
+    rollup_changes.install()
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Backfill billing_daily_rollup")
+    parser.add_argument(
+        "--since", type=date.fromisoformat, help="First day (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--until", type=date.fromisoformat, help="Last day (YYYY-MM-DD)"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = BillingRollupService(db).backfill(args.since, args.until)
+        print(f"Backfilled {rows} billing rollup rows")
+    finally:
+        db.close()
@@ -35,6 +35,8 @@ from app.models.billing import (
     TransactionCategory,
     TransactionType,
 )
+from app.services.balance_ledger import BalanceLedger, signed_transaction_amount
+from app.services.number_allocator import NumberAllocator
 from app.services.webhook_integration_service import WebhookTriggers
 
 logger = logging.getLogger(__name__)
@@ -98,46 +100,67 @@ class BillingAccountService:
         transaction_type: TransactionType,
         description: str,
         reference_id: Optional[int] = None,
+        document_backed: bool = False,
     ) -> BillingTransaction:
-        """Update account balance with transaction logging"""
+        """Update account balance with transaction logging
+
+        Manual adjustments move the ledger balance directly. Pass
+        ``document_backed`` when the transaction records an invoice or payment
+        (``reference_id``), whose own write already moves the balance.
+        """
         try:
             account = self._get_account(account_id)
+            ledger = BalanceLedger(self.db)
 
-            # Record balance before change
-            balance_before = account.available_balance or Decimal("0.00")
-
-            # Apply balance change
-            if transaction_type in [TransactionType.CREDIT, TransactionType.PAYMENT]:
-                account.available_balance = balance_before + amount
-            elif transaction_type in [TransactionType.DEBIT, TransactionType.CHARGE]:
-                account.available_balance = balance_before - amount
-
-            balance_after = account.available_balance
+            # Post pending documents first so balance_before is exact
+            self.db.flush()
+            change = signed_transaction_amount(transaction_type, amount)
+            balance_before = ledger.get_account_balance(account_id)
+            balance_after = balance_before + change
+
+            if change and not document_backed:
+                ledger.apply_delta(account_id, change)
+
+            # Link the source document so the reconciler does not count it twice
+            invoice_id = payment_id = None
+            if document_backed:
+                if transaction_type in (
+                    TransactionType.PAYMENT,
+                    TransactionType.REFUND,
+                ):
+                    payment_id = reference_id
+                else:
+                    invoice_id = reference_id
 
-            # Create transaction record
             transaction = BillingTransaction(
-                transaction_id=self._generate_transaction_id(),
                 billing_account_id=account_id,
                 transaction_type=transaction_type,
-                transaction_category=self._get_transaction_category(transaction_type),
+                category=self._get_transaction_category(transaction_type),
                 amount=amount,
                 currency=account.currency or "USD",
                 description=description,
-                reference_id=reference_id,
+                reference_number=str(reference_id) if reference_id else None,
+                invoice_id=invoice_id,
+                payment_id=payment_id,
+                balance_before=balance_before,
+                balance_after=balance_after,
                 effective_date=datetime.now(timezone.utc),
             )
+            self.db.add(transaction)
+            self.db.flush()
 
             # Create balance history record
+            reserved = account.reserved_balance or Decimal("0.00")
             balance_history = BalanceHistory(
                 billing_account_id=account_id,
-                balance_before=balance_before,
-                balance_after=balance_after,
-                change_amount=balance_after - balance_before,
-                change_reason=description,
-                snapshot_date=datetime.now(timezone.utc),
+                balance=balance_after,
+                available_balance=balance_after - reserved,
+                reserved_balance=reserved,
+                change_amount=change,
+                change_reason=description[:200],
+                transaction_id=transaction.transaction_id,
             )
 
-            self.db.add(transaction)
             self.db.add(balance_history)
             self.db.commit()
             self.db.refresh(transaction)
@@ -169,10 +192,6 @@ class BillingAccountService:
         """Generate unique account number"""
         return f"BA{customer_id:06d}{datetime.now().strftime('%Y%m')}"
 
-    def _generate_transaction_id(self) -> str:
-        """Generate unique transaction ID"""
-        return f"TXN{datetime.now().strftime('%Y%m%d%H%M%S')}{datetime.now().microsecond:06d}"
-
     def _get_transaction_category(
         self, transaction_type: TransactionType
     ) -> TransactionCategory:
@@ -191,6 +210,7 @@ class InvoiceService:
 
     def __init__(self, db: Session):
         self.db = db
+        self.number_allocator = NumberAllocator(db)
 
     def create_invoice(
         self,
@@ -340,7 +360,7 @@ class InvoiceService:
 
     def _generate_invoice_number(self) -> str:
         """Generate unique invoice number"""
-        return f"INV{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        return self.number_allocator.next_number("invoice")
 
 
 class PaymentService:
@@ -387,6 +407,7 @@ class PaymentService:
                 transaction_type=TransactionType.PAYMENT,
                 description=f"Payment {payment_reference}",
                 reference_id=payment.id,
+                document_backed=True,
             )
 
             # Update payment status
@@ -13,7 +13,6 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
 from jinja2 import BaseLoader, Environment, TemplateError, select_autoescape
 from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
@@ -681,6 +680,8 @@ class CommunicationService:
 
     def _send_sms(self, comm_log: CommunicationLog, provider: CommunicationProvider):
         """Send SMS using HTTP API"""
+        import requests
+
         config = provider.configuration
         credentials = provider.credentials
 
@@ -7,10 +7,15 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.exceptions import DuplicateError, NotFoundError, ValidationError
+from app.models.billing import CustomerBillingAccount
 from app.repositories.customer import CustomerRepository
+from app.repositories.pagination import cursor_for
 from app.schemas.customer import CustomerCreate, CustomerList, CustomerSummary, CustomerUpdate
 from app.schemas.customer_status import CustomerStatus as CustomerStatusSchema
+from app.services.balance_ledger import BalanceLedger
+from app.services.number_allocator import NumberAllocator
 from app.services.portal_id import PortalIDService
+from app.services.presence import presence_tracker
 from app.services.webhook_integration_service import WebhookTriggers
 
 logger = logging.getLogger(__name__)
@@ -25,6 +30,8 @@ class CustomerService:
         self.portal_id_service = PortalIDService(db)
         self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         self.webhook_triggers = WebhookTriggers(db)
+        self.number_allocator = NumberAllocator(db)
+        self.balance_ledger = BalanceLedger(db)
 
     def get_customer(self, customer_id: int):
         """Get a customer by ID."""
@@ -41,8 +48,15 @@ class CustomerService:
         status: Optional[str] = None,
         category: Optional[str] = None,
         location_id: Optional[int] = None,
+        cursor: Optional[str] = None,
     ) -> CustomerList:
-        """List customers with pagination and filtering."""
+        """List customers with pagination and filtering.
+
+        When ``cursor`` is given the list is keyset-paginated by id and the
+        total is a planner estimate, so deep pages cost the same as the first.
+        Every response carries ``next_cursor`` so clients can switch over after
+        the first page.
+        """
         if per_page is None:
             per_page = settings.default_page_size
 
@@ -52,36 +66,69 @@ class CustomerService:
         if per_page > settings.max_page_size:
             per_page = settings.max_page_size
 
-        skip = (page - 1) * per_page
-
-        # Get customers and total count
-        if search:
-            customers = self.customer_repo.search(
-                query=search,
-                skip=skip,
-                limit=per_page,
-                status=status,
-                category=category,
-                location_id=location_id,
-            )
-            total = self.customer_repo.count_search(
-                query=search, status=status, category=category, location_id=location_id
-            )
+        filters = {}
+        if status:
+            filters["status"] = status
+        if category:
+            filters["category"] = category
+        if location_id:
+            filters["location_id"] = location_id
+
+        if cursor:
+            if search:
+                result = self.customer_repo.search_page(
+                    query=search,
+                    cursor=cursor,
+                    limit=per_page,
+                    status=status,
+                    category=category,
+                    location_id=location_id,
+                )
+                total = self.customer_repo.count_search(
+                    query=search,
+                    status=status,
+                    category=category,
+                    location_id=location_id,
+                    estimate=True,
+                )
+            else:
+                result = self.customer_repo.get_page(
+                    cursor=cursor, limit=per_page, filters=filters
+                )
+                total = self.customer_repo.count(filters=filters, estimate=True)
+            customers = result.items
+            next_cursor = result.next_cursor
         else:
-            filters = {}
-            if status:
-                filters["status"] = status
-            if category:
-                filters["category"] = category
-            if location_id:
-                filters["location_id"] = location_id
-
-            customers = self.customer_repo.get_all(
-                skip=skip, limit=per_page, filters=filters
-            )
-            total = self.customer_repo.count(filters=filters)
+            skip = (page - 1) * per_page
+
+            # Get customers and total count
+            if search:
+                customers = self.customer_repo.search(
+                    query=search,
+                    skip=skip,
+                    limit=per_page,
+                    status=status,
+                    category=category,
+                    location_id=location_id,
+                )
+                total = self.customer_repo.count_search(
+                    query=search,
+                    status=status,
+                    category=category,
+                    location_id=location_id,
+                )
+            else:
+                customers = self.customer_repo.get_all(
+                    skip=skip, limit=per_page, filters=filters, order_by="id"
+                )
+                total = self.customer_repo.count(filters=filters)
+
+            next_cursor = None
+            if len(customers) == per_page and skip + per_page < total:
+                next_cursor = cursor_for(customers[-1], ["id"])
 
         # Convert Customer model objects to CustomerSummary schema objects
+        # (status_ref is eager-loaded by the repository)
         customer_summaries = [
             CustomerSummary(
                 id=customer.id,
@@ -102,6 +149,7 @@ class CustomerService:
             page=page,
             per_page=per_page,
             pages=((total - 1) // per_page) + 1 if total > 0 else 0,
+            next_cursor=next_cursor,
         )
 
     def create_customer(self, customer_data: CustomerCreate) -> Any:
@@ -139,10 +187,11 @@ class CustomerService:
 
         try:
             # We need to handle the portal_id NOT NULL constraint
-            # First, let's get the next customer ID to generate the portal_id
+            # First, reserve the customer ID to generate the portal_id
             next_id = self._get_next_customer_id()
+            customer_dict["id"] = next_id
 
-            # Generate portal ID using the predicted next ID
+            # Generate portal ID using the reserved ID
             portal_id = self.portal_id_service.generate_portal_id(
                 next_id, customer_dict["reseller_id"]
             )
@@ -189,25 +238,14 @@ class CustomerService:
             raise
 
     def _get_next_customer_id(self) -> int:
-        """Get the next customer ID by querying the database sequence."""
-        try:
-            from sqlalchemy import text
+        """Reserve the next customer ID from the customers id sequence.
 
-            # Get the current maximum ID and add 1
-            result = self.db.execute(
-                text("SELECT COALESCE(MAX(id), 0) + 1 FROM customers")
-            )
-            next_id = result.scalar()
-            logger.debug(f"Predicted next customer ID: {next_id}")
-            return next_id
-        except Exception as e:
-            logger.error(f"Error getting next customer ID: {e}")
-            # Fallback: get count and add 1
-            try:
-                count = self.customer_repo.count()
-                return count + 1
-            except Exception:
-                return 999999
+        The value is consumed from the sequence, so the customer must be
+        inserted with this explicit id (see create_customer).
+        """
+        next_id = self.number_allocator.next_id("customers")
+        logger.debug(f"Reserved customer ID: {next_id}")
+        return next_id
 
     def update_customer(self, customer_id: int, customer_data: CustomerUpdate) -> Any:
         """Update an existing customer."""
@@ -336,10 +374,8 @@ class CustomerService:
                 )
                 return None
 
-            # Update last login
-            self.customer_repo.update(
-                customer.id, {"last_online": datetime.now(timezone.utc)}
-            )
+            # Update last login, written in bulk by the presence tracker
+            presence_tracker.touch("customer", customer.id)
 
             logger.info(
                 f"Successful authentication for portal ID {portal_id} (customer {customer.id})"
@@ -671,54 +707,36 @@ class CustomerService:
         self.db.commit()
 
     def calculate_customer_balance(self, customer_id: int) -> float:
-        """Calculate customer balance from invoices and payments."""
-        from app.models.billing.invoices import Invoice
-        from app.models.billing.payments import Payment
-        from sqlalchemy import func
-
-        # Get customer to verify it exists
-        customer = self.get_customer(customer_id)
+        """Calculate customer balance from invoices, payments and credit notes."""
+        # Verify the customer exists
+        self.get_customer(customer_id)
 
-        # Calculate total invoiced amount
-        total_invoiced = (
-            self.db.query(func.coalesce(func.sum(Invoice.total_amount), 0))
-            .filter(Invoice.customer_id == customer_id)
+        account_id = (
+            self.db.query(CustomerBillingAccount.id)
+            .filter(CustomerBillingAccount.customer_id == customer_id)
             .scalar()
-        ) or 0
+        )
+        if account_id is None:
+            return 0.0
 
-        # Calculate total payments received
-        total_paid = (
-            self.db.query(func.coalesce(func.sum(Payment.amount), 0))
-            .filter(Payment.customer_id == customer_id, Payment.status == "completed")
-            .scalar()
-        ) or 0
-
-        # Balance = Total Paid - Total Invoiced (positive = credit, negative = debt)
-        calculated_balance = float(total_paid) - float(total_invoiced)
-        
-        return calculated_balance
+        ledger = self.balance_ledger.compute_ledger_balances([account_id])
+        return float(ledger.get(account_id, 0))
 
     def update_customer_balance(self, customer_id: int) -> float:
-        """Update customer balance in database and return new balance."""
-        calculated_balance = self.calculate_customer_balance(customer_id)
-        
-        # Update balance in database
-        customer = self.get_customer(customer_id)
-        customer.balance = calculated_balance
-        self.db.commit()
-        self.db.refresh(customer)
-        
-        logger.info(f"Updated customer {customer_id} balance to {calculated_balance}")
-        return calculated_balance
+        """Reconcile the stored customer balance with the ledger and return it."""
+        self.get_customer(customer_id)
+        balance = float(self.balance_ledger.reconcile_customer(customer_id))
+
+        logger.info(f"Reconciled customer {customer_id} balance to {balance}")
+        return balance
 
     def get_customer_balance(self, customer_id: int) -> float:
-        """Get customer balance (from database or calculate if needed)."""
-        customer = self.get_customer(customer_id)
-        
-        # If balance is None or 0, recalculate it
-        if customer.balance is None or customer.balance == 0:
-            return self.update_customer_balance(customer_id)
-        
-        return float(customer.balance)
+        """Get the stored customer balance.
+
+        Balances are maintained incrementally as billing documents are written,
+        so this is a single row lookup.
+        """
+        self.get_customer(customer_id)
+        return float(self.balance_ledger.get_customer_balance(customer_id))
 
         logger.info(f"Deleted contact {contact_id} for customer {customer_id}")
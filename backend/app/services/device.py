@@ -23,6 +23,7 @@ from app.schemas.device import (
     RadiusDeviceRequest,
     RadiusDeviceResponse,
 )
+from app.services.presence import presence_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -365,15 +366,14 @@ class DeviceService:
             )
 
     def _update_device_session_info(self, device: Device, request: RadiusDeviceRequest):
-        """Update device session information."""
-        device.last_seen = datetime.utcnow()
-        if request.client_ip:
-            device.last_ip_address = request.client_ip
-        if request.nas_identifier:
-            device.last_nas_identifier = request.nas_identifier
-        if request.nas_port:
-            device.last_nas_port = request.nas_port
-        self.db.commit()
+        """Record that the device was seen; written in bulk by the presence tracker."""
+        presence_tracker.touch(
+            "device",
+            device.id,
+            last_ip_address=request.client_ip,
+            last_nas_identifier=request.nas_identifier,
+            last_nas_port=request.nas_port,
+        )
 
     def _check_device_limits(self, customer_id: int, max_devices: int) -> bool:
         """Check if customer is within device limits."""
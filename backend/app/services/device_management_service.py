@@ -9,18 +9,25 @@ This service provides business logic for network device management including:
 - Performance analysis and reporting
 """
 
+import asyncio
+import difflib
+import hashlib
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Any, Dict, List
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, desc
-from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, defer
 
 from app.models.devices.device_management import (
     AlertSeverity,
     BackupStatus,
     DeviceAlert,
     DeviceConfigBackup,
+    DeviceConfigBlob,
     DeviceMonitoring,
     DeviceStatus,
     DeviceType,
@@ -29,6 +36,62 @@ from app.models.devices.device_management import (
 
 logger = logging.getLogger(__name__)
 
+# Config backup fan-out
+CONFIG_BACKUP_CONCURRENCY = 50
+CONFIG_BACKUP_FLUSH_SIZE = 200
+
+# Store a fresh snapshot once a delta is at least half its size
+CONFIG_DELTA_MAX_RATIO = 0.5
+
+BACKUP_SCHEDULE_INTERVALS = {
+    "@hourly": timedelta(hours=1),
+    "@daily": timedelta(days=1),
+    "@midnight": timedelta(days=1),
+    "@weekly": timedelta(weeks=1),
+    "@monthly": timedelta(days=30),
+}
+BACKUP_DUE_SLACK = timedelta(minutes=30)
+
+
+def config_digest(content: str) -> str:
+    """SHA-256 hex digest identifying a configuration"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def encode_config_delta(base: str, content: str) -> bytes:
+    """Compressed line delta turning ``base`` into ``content``
+
+    The delta is a JSON list of ``[start, end]`` ranges copied from the base
+    lines and strings inserted verbatim.
+    """
+    base_lines = base.splitlines(keepends=True)
+    new_lines = content.splitlines(keepends=True)
+    ops: List[Any] = []
+    matcher = difflib.SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(new_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"))
+
+
+def apply_config_delta(base: str, delta: bytes) -> str:
+    """Rebuild a configuration from its base and an encoded delta"""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(zlib.decompress(delta)):
+        parts.append("".join(base_lines[op[0] : op[1]]) if isinstance(op, list) else op)
+    return "".join(parts)
+
+
+def _decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
 
 class DeviceDiscoveryService:
     """Service for discovering and registering network devices"""
@@ -209,58 +272,151 @@ class DeviceMonitoringService:
         self.db.commit()
 
 
+class ConfigBlobStore:
+    """Content-addressed storage for device configurations
+
+    Each distinct configuration is stored once, keyed by its SHA-256. New
+    versions are stored as a compressed line delta against the full snapshot
+    their predecessor is based on, so reading any version touches at most two
+    rows; a fresh snapshot is taken once the delta stops paying for itself.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load(self, blob_id: int) -> Optional[str]:
+        """Reconstruct the configuration text stored in a blob"""
+        blob = self.db.get(DeviceConfigBlob, blob_id)
+        if not blob:
+            return None
+        if blob.encoding != "delta":
+            return _decompress_text(blob.data)
+        base = self.db.get(DeviceConfigBlob, blob.base_blob_id)
+        return apply_config_delta(_decompress_text(base.data), blob.data)
+
+    def store_many(self, configs: List[Tuple[str, Optional[int]]]) -> List[int]:
+        """Store (content, previous_blob_id) pairs and return their blob ids
+
+        Contents that already exist are reused; the rest are inserted in one
+        statement that tolerates concurrent workers storing the same digest.
+        """
+        if not configs:
+            return []
+        digests = [config_digest(content) for content, _ in configs]
+        blob_ids = dict(
+            self.db.query(DeviceConfigBlob.sha256, DeviceConfigBlob.id)
+            .filter(DeviceConfigBlob.sha256.in_(set(digests)))
+            .all()
+        )
+
+        missing = {}
+        for (content, previous_id), digest in zip(configs, digests, strict=True):
+            if digest not in blob_ids and digest not in missing:
+                missing[digest] = (content, previous_id)
+
+        if missing:
+            snapshots = self._snapshots(
+                {previous_id for _, previous_id in missing.values() if previous_id}
+            )
+            rows = [
+                self._encode(digest, content, snapshots.get(previous_id))
+                for digest, (content, previous_id) in missing.items()
+            ]
+            self.db.execute(
+                pg_insert(DeviceConfigBlob)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["sha256"])
+            )
+            blob_ids.update(
+                self.db.query(DeviceConfigBlob.sha256, DeviceConfigBlob.id)
+                .filter(DeviceConfigBlob.sha256.in_(list(missing)))
+                .all()
+            )
+
+        return [blob_ids[digest] for digest in digests]
+
+    def _snapshots(self, blob_ids: set) -> Dict[int, Tuple[int, str]]:
+        """Map blob ids to (snapshot id, snapshot text) with two queries"""
+        if not blob_ids:
+            return {}
+        bases = dict(
+            self.db.query(DeviceConfigBlob.id, DeviceConfigBlob.base_blob_id)
+            .filter(DeviceConfigBlob.id.in_(blob_ids))
+            .all()
+        )
+        snapshot_ids = {base_id or blob_id for blob_id, base_id in bases.items()}
+        texts = {
+            blob_id: _decompress_text(data)
+            for blob_id, data in self.db.query(
+                DeviceConfigBlob.id, DeviceConfigBlob.data
+            )
+            .filter(DeviceConfigBlob.id.in_(snapshot_ids))
+            .all()
+        }
+        return {
+            blob_id: (base_id or blob_id, texts[base_id or blob_id])
+            for blob_id, base_id in bases.items()
+        }
+
+    @staticmethod
+    def _encode(
+        digest: str, content: str, snapshot: Optional[Tuple[int, str]]
+    ) -> Dict[str, Any]:
+        raw = content.encode("utf-8")
+        row = {
+            "sha256": digest,
+            "encoding": "full",
+            "base_blob_id": None,
+            "compression": "zlib",
+            "data": zlib.compress(raw),
+            "original_size": len(raw),
+        }
+        if snapshot:
+            snapshot_id, snapshot_text = snapshot
+            delta = encode_config_delta(snapshot_text, content)
+            if len(delta) < len(row["data"]) * CONFIG_DELTA_MAX_RATIO:
+                row.update(encoding="delta", base_blob_id=snapshot_id, data=delta)
+        row["stored_size"] = len(row["data"])
+        return row
+
+
 class DeviceConfigService:
     """Service for device configuration management"""
 
     def __init__(self, db: Session):
         self.db = db
+        self.blob_store = ConfigBlobStore(db)
 
     async def backup_device_config(
         self, device_id: int, backup_type: str = "full"
     ) -> DeviceConfigBackup:
-        """Backup device configuration"""
+        """Backup device configuration
+
+        Returns the new backup, or the previous one when the configuration
+        has not changed since it was taken.
+        """
         device = (
             self.db.query(ManagedDevice).filter(ManagedDevice.id == device_id).first()
         )
         if not device:
             raise ValueError(f"Device {device_id} not found")
 
-        backup = DeviceConfigBackup(
-            device_id=device_id,
-            backup_type=backup_type,
-            backup_method="ssh",  # Default method
-            backup_status=BackupStatus.IN_PROGRESS,
-            backup_trigger="manual",
-        )
-
-        self.db.add(backup)
-        self.db.commit()
-        self.db.refresh(backup)
-
-        try:
-            # Placeholder for actual config backup logic
-            # This would use SSH, SNMP, or vendor APIs to retrieve config
-            config_content = await self._retrieve_config(device)
-
-            backup.config_content = config_content
-            backup.file_size = len(config_content.encode("utf-8"))
-            backup.backup_status = BackupStatus.SUCCESS
-            backup.completed_at = datetime.utcnow()
-
-            logger.info(f"Successfully backed up config for device {device.hostname}")
-
-        except Exception as e:
-            backup.backup_status = BackupStatus.FAILED
-            backup.error_message = str(e)
-            backup.completed_at = datetime.utcnow()
-
-            logger.error(
-                f"Failed to backup config for device {device.hostname}: {str(e)}"
-            )
+        result = await self._fetch_config(device)
+        latest = self._latest_backups([device_id])
+        stats = self._record_results([result], latest, backup_type, "manual")
 
-        self.db.commit()
+        backup = stats["backups"][device_id]
+        logger.info(
+            f"Config backup for device {device.hostname}: {backup.backup_status.value}"
+        )
         return backup
 
+    def get_backup_config(self, backup: DeviceConfigBackup) -> Optional[str]:
+        """Return the configuration text captured by a backup"""
+        if backup.blob_id:
+            return self.blob_store.load(backup.blob_id)
+        return backup.config_content
+
     async def _retrieve_config(self, device: ManagedDevice) -> str:
         """Retrieve configuration from device"""
         # Placeholder for actual config retrieval
@@ -268,45 +424,183 @@ class DeviceConfigService:
         logger.info(f"Retrieving config from {device.hostname}")
 
         # Return placeholder config
-        return f"! Configuration for {device.hostname}\n! Retrieved at {datetime.utcnow()}\n"
+        return (
+            f"! Configuration for {device.hostname}\n"
+            f"! Retrieved at {datetime.utcnow()}\n"
+        )
+
+    async def schedule_config_backups(
+        self, max_concurrent: int = CONFIG_BACKUP_CONCURRENCY
+    ) -> Dict[str, int]:
+        """Back up every device whose schedule is due
 
-    async def schedule_config_backups(self):
-        """Schedule automatic config backups for devices"""
+        Configurations are fetched concurrently (at most ``max_concurrent``
+        devices at a time) and written in batches as they arrive; devices
+        whose configuration hash is unchanged only have their previous backup
+        marked as verified.
+        """
         devices = (
             self.db.query(ManagedDevice)
-            .filter(ManagedDevice.config_backup_enabled is True)
+            .filter(
+                ManagedDevice.config_backup_enabled.is_(True),
+                ManagedDevice.config_backup_schedule.isnot(None),
+            )
             .all()
         )
+        latest = self._latest_backups([device.id for device in devices])
+        due = [d for d in devices if self._is_backup_due(d, latest.get(d.id))]
+
+        stats = {"devices_due": len(due), "changed": 0, "unchanged": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        async def fetch(device):
+            async with semaphore:
+                return await self._fetch_config(device)
+
+        pending = []
+        for next_result in asyncio.as_completed([fetch(device) for device in due]):
+            pending.append(await next_result)
+            if len(pending) >= CONFIG_BACKUP_FLUSH_SIZE:
+                self._record_results(pending, latest, "scheduled", "scheduled", stats)
+                pending = []
+        if pending:
+            self._record_results(pending, latest, "scheduled", "scheduled", stats)
+
+        stats.pop("backups", None)
+        logger.info(
+            f"Scheduled config backups: {stats['changed']} changed, "
+            f"{stats['unchanged']} unchanged, {stats['failed']} failed "
+            f"of {len(due)} due"
+        )
+        return stats
 
-        for device in devices:
-            # Check if backup is due based on schedule
-            if await self._is_backup_due(device):
-                await self.backup_device_config(device.id, "scheduled")
-
-    async def _is_backup_due(self, device: ManagedDevice) -> bool:
-        """Check if device backup is due"""
-        if not device.config_backup_schedule:
-            return False
+    async def _fetch_config(
+        self, device: ManagedDevice
+    ) -> Tuple[ManagedDevice, Optional[str], Optional[Exception]]:
+        try:
+            return device, await self._retrieve_config(device), None
+        except Exception as e:
+            return device, None, e
 
-        # Get last successful backup
-        last_backup = (
+    def _latest_backups(self, device_ids: List[int]) -> Dict[int, DeviceConfigBackup]:
+        """Most recent successful backup of each device, in one query"""
+        if not device_ids:
+            return {}
+        backups = (
             self.db.query(DeviceConfigBackup)
+            .options(
+                defer(DeviceConfigBackup.config_content),
+                defer(DeviceConfigBackup.config_diff),
+            )
             .filter(
-                and_(
-                    DeviceConfigBackup.device_id == device.id,
-                    DeviceConfigBackup.backup_status == BackupStatus.SUCCESS,
-                )
+                DeviceConfigBackup.device_id.in_(device_ids),
+                DeviceConfigBackup.backup_status == BackupStatus.SUCCESS,
             )
-            .order_by(desc(DeviceConfigBackup.completed_at))
-            .first()
+            .distinct(DeviceConfigBackup.device_id)
+            .order_by(
+                DeviceConfigBackup.device_id,
+                DeviceConfigBackup.completed_at.desc().nullslast(),
+            )
+            .all()
+        )
+        return {backup.device_id: backup for backup in backups}
+
+    def _record_results(
+        self,
+        results: List[Tuple[ManagedDevice, Optional[str], Optional[Exception]]],
+        latest: Dict[int, DeviceConfigBackup],
+        backup_type: str,
+        trigger: str,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Persist one batch of fetched configurations and commit"""
+        if stats is None:
+            stats = {"changed": 0, "unchanged": 0, "failed": 0}
+        backups = stats.setdefault("backups", {})
+        now = datetime.now(timezone.utc)
+        changed = []
+
+        for device, content, error in results:
+            previous = latest.get(device.id)
+            if error is not None:
+                backup = DeviceConfigBackup(
+                    device_id=device.id,
+                    backup_type=backup_type,
+                    backup_method="ssh",  # Default method
+                    backup_status=BackupStatus.FAILED,
+                    backup_trigger=trigger,
+                    error_message=str(error),
+                    completed_at=now,
+                )
+                self.db.add(backup)
+                backups[device.id] = backup
+                stats["failed"] += 1
+                logger.error(
+                    f"Failed to backup config for device {device.hostname}: "
+                    f"{str(error)}"
+                )
+                continue
+
+            digest = config_digest(content)
+            if previous is not None and previous.checksum == digest:
+                previous.verified_at = now
+                backups[device.id] = previous
+                stats["unchanged"] += 1
+                continue
+            changed.append((device, content, digest, previous))
+
+        blob_ids = self.blob_store.store_many(
+            [
+                (content, previous.blob_id if previous else None)
+                for _, content, _, previous in changed
+            ]
         )
+        for (device, content, digest, _), blob_id in zip(
+            changed, blob_ids, strict=True
+        ):
+            backup = DeviceConfigBackup(
+                device_id=device.id,
+                backup_type=backup_type,
+                backup_method="ssh",  # Default method
+                backup_status=BackupStatus.SUCCESS,
+                backup_trigger=trigger,
+                blob_id=blob_id,
+                checksum=digest,
+                compression="zlib",
+                file_size=len(content.encode("utf-8")),
+                completed_at=now,
+            )
+            self.db.add(backup)
+            backups[device.id] = latest[device.id] = backup
+            stats["changed"] += 1
+
+        self.db.commit()
+        return stats
+
+    def _is_backup_due(
+        self, device: ManagedDevice, last_backup: Optional[DeviceConfigBackup]
+    ) -> bool:
+        """Check if device backup is due"""
+        if not device.config_backup_schedule:
+            return False
 
         if not last_backup:
             return True  # No previous backup, so backup is due
 
-        # Placeholder for cron schedule parsing
-        # In real implementation, would parse cron expression and check if backup is due
-        return False
+        runs = [
+            _as_utc(value)
+            for value in (last_backup.completed_at, last_backup.verified_at)
+            if value is not None
+        ]
+        if not runs:
+            return True
+
+        # Cron expressions are approximated by their period until a cron
+        # parser is available; unknown expressions are treated as daily
+        interval = BACKUP_SCHEDULE_INTERVALS.get(
+            device.config_backup_schedule.strip().lower(), timedelta(days=1)
+        )
+        return datetime.now(timezone.utc) - max(runs) >= interval - BACKUP_DUE_SLACK
 
 
 class DeviceHealthService:
@@ -0,0 +1,543 @@
+"""
+Dunning Engine
+
+Set-based dunning driven by ``DunningRule`` and ``DunningTemplate``.
+
+A nightly run reads each billing account's overdue amount and oldest due
+date with one grouped query over unpaid invoices, and the open dunning cases
+as plain columns with another. Rules are matched in memory, and only
+accounts whose dunning state changes are written: a case to open, a rule to
+fire, an overdue amount that moved, or a case to resolve. Writes go out as
+batched inserts and updates. Communications and service suspensions are
+returned as id lists for the task layer to queue in chunks, so the cost of a
+run follows the number of state changes rather than the number of overdue
+invoices.
+
+Each rule fires at most once per case. A case escalates one step at a time:
+on each due run the lowest untriggered ``trigger_days_overdue`` tier of
+matching rules fires, and the next step waits ``escalate_after_days``.
+Termination and service restriction flags are left for staff.
+"""
+
+import logging
+from bisect import bisect_right
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.billing import (
+    AccountStatus,
+    CustomerBillingAccount,
+    DunningAction,
+    DunningCase,
+    DunningRule,
+    DunningStatus,
+    DunningTemplate,
+    Invoice,
+    InvoiceStatus,
+)
+from app.models.billing.dunning import escalation_level_for
+from app.models.billing.enums import DeliveryStatus, DunningActionType
+from app.models.customer.base import Customer
+from app.models.services.enums import ServiceStatus
+from app.models.services.instances import CustomerService
+from app.services.number_allocator import (
+    NumberAllocator,
+    NumberFormat,
+    register_number_format,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows per batched INSERT/UPDATE statement
+DUNNING_WRITE_CHUNK = 1000
+
+UNPAID_INVOICE_STATUSES = (
+    InvoiceStatus.PENDING,
+    InvoiceStatus.SENT,
+    InvoiceStatus.OVERDUE,
+)
+OPEN_CASE_STATUSES = (DunningStatus.ACTIVE, DunningStatus.PAUSED)
+
+DELIVERY_METHODS = {
+    DunningActionType.EMAIL_REMINDER: "email",
+    DunningActionType.SMS_REMINDER: "sms",
+    DunningActionType.LETTER: "postal",
+    DunningActionType.PHONE_CALL: "phone",
+}
+# Delivery methods sent by the task layer; the rest are worked by staff
+QUEUED_DELIVERY_METHODS = ("email", "sms")
+
+register_number_format("dunning_case", NumberFormat(prefix="DUN"))
+
+
+@dataclass
+class DunningRunResult:
+    """Counts and follow-up work from one dunning run"""
+
+    overdue_accounts: int = 0
+    cases_opened: int = 0
+    cases_escalated: int = 0
+    cases_updated: int = 0
+    cases_resolved: int = 0
+    actions_created: int = 0
+    # Pending email/SMS actions that are due for delivery
+    action_ids: List[int] = field(default_factory=list)
+    # Accounts suspended by this run whose services must be suspended
+    suspended_account_ids: List[int] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _chunks(rows: Sequence, size: int = DUNNING_WRITE_CHUNK) -> Iterable[Sequence]:
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+class DunningEngine:
+    """Opens, escalates and resolves dunning cases for overdue accounts"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._rules: List[DunningRule] = []
+        self._rule_days: List[int] = []
+        self._templates: Dict[int, DunningTemplate] = {}
+
+    def run(
+        self,
+        as_of: Optional[datetime] = None,
+        account_ids: Optional[Sequence[int]] = None,
+    ) -> DunningRunResult:
+        """Bring dunning cases in line with what is overdue, then commit."""
+        as_of = as_of or datetime.now(timezone.utc)
+        result = DunningRunResult()
+
+        overdue = self._overdue_accounts(as_of, account_ids)
+        cases = self._open_cases(account_ids)
+        self._load_rules()
+        result.overdue_accounts = len(overdue)
+
+        new_cases: List[Dict[str, Any]] = []
+        case_updates: List[Dict[str, Any]] = []
+        # (account_id, case_id or None, stage, rule)
+        fired: List[Tuple[int, Optional[int], int, DunningRule]] = []
+        suspend: set = set()
+
+        for account_id, (amount, oldest_due, days) in overdue.items():
+            level = escalation_level_for(amount, days)
+            triggered = self._triggered_rules(days, amount, level)
+            case = cases.get(account_id)
+
+            if case is None:
+                step = self._next_step(triggered, applied=(), stage=0)
+                if not step:
+                    continue
+                new_cases.append(
+                    {
+                        "billing_account_id": account_id,
+                        "total_overdue_amount": amount,
+                        "oldest_overdue_date": oldest_due,
+                        "days_overdue": days,
+                        "status": DunningStatus.ACTIVE,
+                        "current_stage": 1,
+                        "escalation_level": level,
+                        "created_date": as_of,
+                        "last_action_date": as_of,
+                        "next_action_date": self._next_action_date(as_of, step),
+                        "additional_data": {"applied_rule_ids": [r.id for r in step]},
+                    }
+                )
+                fired.extend((account_id, None, 1, rule) for rule in step)
+                suspend.update(account_id for rule in step if rule.suspend_account)
+                continue
+
+            applied = (case.additional_data or {}).get("applied_rule_ids", [])
+            step = ()
+            if (
+                case.status == DunningStatus.ACTIVE
+                and case.auto_escalate
+                and (
+                    case.next_action_date is None
+                    or _aware(case.next_action_date) <= as_of
+                )
+            ):
+                step = self._next_step(triggered, applied, case.current_stage or 0)
+
+            if step:
+                stage = (case.current_stage or 0) + 1
+                case_updates.append(
+                    {
+                        "id": case.id,
+                        "total_overdue_amount": amount,
+                        "days_overdue": days,
+                        "current_stage": stage,
+                        "escalation_level": level,
+                        "last_action_date": as_of,
+                        "next_action_date": self._next_action_date(as_of, step),
+                        "additional_data": {
+                            **(case.additional_data or {}),
+                            "applied_rule_ids": list(applied) + [r.id for r in step],
+                        },
+                    }
+                )
+                fired.extend((account_id, case.id, stage, rule) for rule in step)
+                if case.auto_suspend:
+                    suspend.update(account_id for rule in step if rule.suspend_account)
+                result.cases_escalated += 1
+            elif case.total_overdue_amount != amount:
+                case_updates.append(
+                    {
+                        "id": case.id,
+                        "total_overdue_amount": amount,
+                        "days_overdue": days,
+                        "escalation_level": level,
+                    }
+                )
+                result.cases_updated += 1
+
+        resolved = [
+            case.id for account_id, case in cases.items() if account_id not in overdue
+        ]
+
+        case_ids = self._insert_cases(new_cases, as_of)
+        result.cases_opened = len(case_ids)
+        for chunk in _chunks(case_updates):
+            self.db.execute(update(DunningCase), list(chunk))
+        result.cases_resolved = self._resolve_cases(resolved, as_of)
+        result.actions_created = self._insert_actions(fired, case_ids, overdue, as_of)
+        result.suspended_account_ids = self._suspend_accounts(sorted(suspend), as_of)
+        self.db.commit()
+
+        result.action_ids = self.due_action_ids(as_of)
+        logger.info(
+            f"Dunning run: {result.overdue_accounts} overdue accounts, "
+            f"{result.cases_opened} cases opened, {result.cases_escalated} escalated, "
+            f"{result.cases_resolved} resolved, {result.actions_created} actions"
+        )
+        return result
+
+    # Reads
+
+    def _overdue_accounts(
+        self, as_of: datetime, account_ids: Optional[Sequence[int]]
+    ) -> Dict[int, Tuple[Decimal, datetime, int]]:
+        """Overdue amount, oldest due date and days overdue per account.
+
+        Accounts still inside their grace period are left out.
+        """
+        query = (
+            self.db.query(
+                Invoice.billing_account_id,
+                func.sum(Invoice.balance_due),
+                func.min(Invoice.due_date),
+                CustomerBillingAccount.grace_period_days,
+            )
+            .join(
+                CustomerBillingAccount,
+                CustomerBillingAccount.id == Invoice.billing_account_id,
+            )
+            .filter(
+                Invoice.status.in_(UNPAID_INVOICE_STATUSES),
+                Invoice.due_date < as_of,
+                Invoice.balance_due > 0,
+                CustomerBillingAccount.dunning_enabled.is_(True),
+            )
+            .group_by(
+                Invoice.billing_account_id, CustomerBillingAccount.grace_period_days
+            )
+        )
+        if account_ids is not None:
+            query = query.filter(Invoice.billing_account_id.in_(account_ids))
+
+        overdue = {}
+        for account_id, amount, oldest_due, grace_days in query:
+            oldest_due = _aware(oldest_due)
+            days = (as_of - oldest_due).days
+            if days > (grace_days or 0):
+                overdue[account_id] = (Decimal(amount), oldest_due, days)
+        return overdue
+
+    def _open_cases(self, account_ids: Optional[Sequence[int]]) -> Dict[int, Any]:
+        query = self.db.query(
+            DunningCase.id,
+            DunningCase.billing_account_id,
+            DunningCase.status,
+            DunningCase.current_stage,
+            DunningCase.total_overdue_amount,
+            DunningCase.next_action_date,
+            DunningCase.auto_escalate,
+            DunningCase.auto_suspend,
+            DunningCase.additional_data,
+        ).filter(DunningCase.status.in_(OPEN_CASE_STATUSES))
+        if account_ids is not None:
+            query = query.filter(DunningCase.billing_account_id.in_(account_ids))
+        return {row.billing_account_id: row for row in query}
+
+    def _load_rules(self):
+        rules = (
+            self.db.query(DunningRule)
+            .filter(DunningRule.is_active.is_(True), DunningRule.auto_execute.is_(True))
+            .all()
+        )
+        # Sorted by tier, then priority, so a bisect finds the reachable rules
+        self._rules = sorted(
+            rules, key=lambda r: (r.trigger_days_overdue, r.priority or 0, r.id)
+        )
+        self._rule_days = [rule.trigger_days_overdue for rule in self._rules]
+        template_ids = {rule.template_id for rule in rules if rule.template_id}
+        self._templates = (
+            {
+                template.id: template
+                for template in self.db.query(DunningTemplate).filter(
+                    DunningTemplate.id.in_(template_ids),
+                    DunningTemplate.is_active.is_(True),
+                )
+            }
+            if template_ids
+            else {}
+        )
+
+    def _triggered_rules(self, days: int, amount: Decimal, level) -> List[DunningRule]:
+        reachable = self._rules[: bisect_right(self._rule_days, days)]
+        return [rule for rule in reachable if rule.is_triggered(days, amount, level)]
+
+    @staticmethod
+    def _next_step(
+        triggered: List[DunningRule], applied: Iterable[int], stage: int
+    ) -> Tuple[DunningRule, ...]:
+        """The lowest tier of triggered rules that have not fired on the case."""
+        applied = set(applied)
+        pending = [
+            rule
+            for rule in triggered
+            if rule.id not in applied
+            and stage < (rule.max_escalation_stage or stage + 1)
+        ]
+        if not pending:
+            return ()
+        tier = pending[0].trigger_days_overdue
+        return tuple(rule for rule in pending if rule.trigger_days_overdue == tier)
+
+    @staticmethod
+    def _next_action_date(as_of: datetime, step: Sequence[DunningRule]) -> datetime:
+        return as_of + timedelta(
+            days=max(rule.escalate_after_days or 7 for rule in step)
+        )
+
+    def due_action_ids(self, as_of: Optional[datetime] = None) -> List[int]:
+        """Automated email/SMS actions that are pending and due."""
+        as_of = as_of or datetime.now(timezone.utc)
+        return [
+            action_id
+            for (action_id,) in self.db.query(DunningAction.id)
+            .filter(
+                DunningAction.delivery_status == DeliveryStatus.PENDING,
+                DunningAction.is_automated.is_(True),
+                DunningAction.delivery_method.in_(QUEUED_DELIVERY_METHODS),
+                DunningAction.action_date <= as_of,
+            )
+            .order_by(DunningAction.id)
+        ]
+
+    def suspendable_service_ids(self, account_ids: Sequence[int]) -> List[int]:
+        """Active services belonging to the given billing accounts."""
+        if not account_ids:
+            return []
+        return [
+            service_id
+            for (service_id,) in self.db.query(CustomerService.id)
+            .join(
+                CustomerBillingAccount,
+                CustomerBillingAccount.customer_id == CustomerService.customer_id,
+            )
+            .filter(
+                CustomerBillingAccount.id.in_(account_ids),
+                CustomerService.status == ServiceStatus.ACTIVE,
+            )
+            .order_by(CustomerService.id)
+        ]
+
+    def pending_deliveries(
+        self, action_ids: Sequence[int]
+    ) -> List[Tuple[DunningAction, Customer]]:
+        """Load still-pending actions with their customers in one query."""
+        return (
+            self.db.query(DunningAction, Customer)
+            .join(DunningCase, DunningCase.id == DunningAction.dunning_case_id)
+            .join(
+                CustomerBillingAccount,
+                CustomerBillingAccount.id == DunningCase.billing_account_id,
+            )
+            .join(Customer, Customer.id == CustomerBillingAccount.customer_id)
+            .filter(
+                DunningAction.id.in_(action_ids),
+                DunningAction.delivery_status == DeliveryStatus.PENDING,
+            )
+            .all()
+        )
+
+    # Writes
+
+    def _insert_cases(
+        self, rows: List[Dict[str, Any]], as_of: datetime
+    ) -> Dict[int, int]:
+        """Insert new cases; return case id by billing account."""
+        if not rows:
+            return {}
+        numbers = NumberAllocator(self.db).allocate_numbers(
+            "dunning_case", len(rows), as_of
+        )
+        for row, number in zip(rows, numbers, strict=True):
+            row["case_number"] = number
+
+        case_ids = {}
+        stmt = insert(DunningCase).returning(
+            DunningCase.id, DunningCase.billing_account_id
+        )
+        for chunk in _chunks(rows):
+            for case_id, account_id in self.db.execute(stmt, list(chunk)):
+                case_ids[account_id] = case_id
+        return case_ids
+
+    def _resolve_cases(self, case_ids: List[int], as_of: datetime) -> int:
+        for chunk in _chunks(case_ids):
+            self.db.execute(
+                update(DunningCase)
+                .where(DunningCase.id.in_(chunk))
+                .values(status=DunningStatus.COMPLETED, resolved_date=as_of)
+                .execution_options(synchronize_session=False)
+            )
+        return len(case_ids)
+
+    def _insert_actions(
+        self,
+        fired: List[Tuple[int, Optional[int], int, DunningRule]],
+        case_ids: Dict[int, int],
+        overdue: Dict[int, Tuple[Decimal, datetime, int]],
+        as_of: datetime,
+    ) -> int:
+        if not fired:
+            return 0
+        recipients = self._recipients({account_id for account_id, *_ in fired})
+
+        rows = []
+        for account_id, case_id, stage, rule in fired:
+            amount, _, days = overdue[account_id]
+            template = self._templates.get(rule.template_id)
+            if template and not template.is_applicable(amount, days):
+                template = None
+            recipient = recipients.get(account_id)
+            method = (
+                template.delivery_method
+                if template
+                else DELIVERY_METHODS.get(rule.action_type)
+            )
+            subject, message = self._render(template, rule, recipient, amount, days)
+            rows.append(
+                {
+                    "dunning_case_id": case_id or case_ids[account_id],
+                    "action_type": rule.action_type,
+                    "action_date": as_of
+                    + timedelta(hours=rule.execution_delay_hours or 0),
+                    "stage": stage,
+                    "subject": subject,
+                    "message": message,
+                    "template_used": template.template_name if template else None,
+                    "delivery_method": method,
+                    "delivery_address": self._address(method, recipient),
+                    "delivery_status": DeliveryStatus.PENDING,
+                    "is_automated": True,
+                    "additional_data": {"rule_id": rule.id},
+                }
+            )
+        for chunk in _chunks(rows):
+            self.db.execute(insert(DunningAction), list(chunk))
+        return len(rows)
+
+    def _suspend_accounts(self, account_ids: List[int], as_of: datetime) -> List[int]:
+        """Suspend active accounts; return the ones this run suspended."""
+        suspended = []
+        for chunk in _chunks(account_ids):
+            rows = self.db.execute(
+                update(CustomerBillingAccount)
+                .where(
+                    CustomerBillingAccount.id.in_(chunk),
+                    CustomerBillingAccount.status == AccountStatus.ACTIVE,
+                )
+                .values(status=AccountStatus.SUSPENDED, suspended_date=as_of)
+                .returning(CustomerBillingAccount.id)
+                .execution_options(synchronize_session=False)
+            )
+            suspended.extend(account_id for (account_id,) in rows)
+        return sorted(suspended)
+
+    def mark_sent(self, action_ids: Sequence[int]):
+        """Mark delivered-to-gateway actions as sent in batched updates."""
+        now = datetime.now(timezone.utc)
+        for chunk in _chunks(list(action_ids)):
+            self.db.execute(
+                update(DunningAction)
+                .where(DunningAction.id.in_(chunk))
+                .values(delivery_status=DeliveryStatus.SENT, delivery_date=now)
+                .execution_options(synchronize_session=False)
+            )
+
+    # Content
+
+    def _recipients(self, account_ids: Iterable[int]) -> Dict[int, Any]:
+        rows = (
+            self.db.query(
+                CustomerBillingAccount.id,
+                CustomerBillingAccount.account_number,
+                Customer.name,
+                Customer.email,
+                Customer.billing_email,
+                Customer.phone,
+            )
+            .join(Customer, Customer.id == CustomerBillingAccount.customer_id)
+            .filter(CustomerBillingAccount.id.in_(list(account_ids)))
+        )
+        return {row.id: row for row in rows}
+
+    @staticmethod
+    def _render(
+        template, rule, recipient, amount: Decimal, days: int
+    ) -> Tuple[str, str]:
+        values = {
+            "customer_name": recipient.name if recipient else "",
+            "account_number": recipient.account_number if recipient else "",
+            "amount": f"{amount:.2f}",
+            "days_overdue": days,
+        }
+        if template:
+            try:
+                return template.generate_content(**values)
+            except ValueError as e:
+                logger.warning(
+                    f"Dunning template {template.template_name} not rendered: {e}"
+                )
+        subject = f"Overdue balance on account {values['account_number']}"
+        message = (
+            f"Your account has an overdue balance of {values['amount']}, "
+            f"{days} days past due. ({rule.rule_name})"
+        )
+        return subject, message
+
+    @staticmethod
+    def _address(method: Optional[str], recipient) -> Optional[str]:
+        if recipient is None:
+            return None
+        if method == "email":
+            return recipient.billing_email or recipient.email
+        if method in ("sms", "phone"):
+            return recipient.phone
+        return None
@@ -12,8 +12,6 @@ import uuid
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from minio import Minio
-from minio.error import S3Error
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -27,11 +25,24 @@ from app.repositories.file_storage import (
 
 logger = logging.getLogger(__name__)
 
+# The MinIO client is imported on first use (see _load_minio): it is slow to
+# import and most API and worker processes never touch object storage
+Minio = None
+S3Error = None
+
+
+def _load_minio() -> None:
+    global Minio, S3Error
+    if Minio is None:
+        from minio import Minio
+        from minio.error import S3Error
+
 
 class MinIOService:
     """Service for MinIO S3 operations"""
 
     def __init__(self):
+        _load_minio()
         self.client = Minio(
             settings.minio_endpoint,
             access_key=settings.minio_access_key,
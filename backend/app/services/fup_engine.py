@@ -0,0 +1,465 @@
+"""
+FUP Engine
+
+Fair usage policy enforcement for all internet services at once.
+
+Usage is metered per service in ``customer_traffic_counters``. Accounting
+updates hand their byte deltas to :data:`fup_meter`, which adds them to the
+day, week and month counters with one bulk upsert every
+``FUP_METER_FLUSH_SECONDS``. :class:`FupEngine` then works on whole sets of
+services per statement instead of one service at a time:
+
+- :meth:`FupEngine.evaluate` throttles every active service whose usage in
+  its tariff's reset period reached the tariff's ``data_limit_bytes``, with a
+  single ``UPDATE ... FROM``;
+- :meth:`FupEngine.reset` zeroes a period's counters once its boundary has
+  passed and, in the same statement, lifts the throttle from services whose
+  tariff resets with that period.
+
+Both return :class:`FupAction` lists, which :meth:`FupEngine.dispatch` sends
+to the NAS of each online session as CoA requests, concurrently. Tariffs with
+``FUPResetPeriod.NEVER`` are measured on the month counters and are never
+restored automatically; ``reset_fup_status`` remains the manual path.
+
+A session's ``customers_online.fup_exceeded`` records the FUP state its NAS
+acknowledged. :meth:`FupEngine.pending` selects the online sessions where it
+differs from their service, so a CoA that timed out or was refused is sent
+again on the next run; new logins get the throttled speed from the
+Access-Accept.
+"""
+
+import asyncio
+import atexit
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.customer.base import CustomerTrafficCounter
+from ..models.foundation.tariff import FUPResetPeriod, InternetTariffConfig
+from ..models.networking.nas_radius import NASDevice
+from ..models.networking.radius import CustomerOnline
+from ..models.services.enums import ServiceStatus
+from ..models.services.instances import CustomerInternetService, CustomerService
+from .write_behind import WriteBehind
+
+logger = logging.getLogger(__name__)
+
+counters = CustomerTrafficCounter.__table__
+internet_services = CustomerInternetService.__table__
+services = CustomerService.__table__
+tariff_configs = InternetTariffConfig.__table__
+online_sessions = CustomerOnline.__table__
+nas_devices = NASDevice.__table__
+
+# Counter column prefix measured for each tariff reset period
+PERIOD_COLUMNS = {
+    FUPResetPeriod.DAILY: "day",
+    FUPResetPeriod.WEEKLY: "week",
+    FUPResetPeriod.MONTHLY: "month",
+    FUPResetPeriod.NEVER: "month",
+}
+RESET_PERIODS = (FUPResetPeriod.DAILY, FUPResetPeriod.WEEKLY, FUPResetPeriod.MONTHLY)
+
+FUP_LIMIT_REASON = "fup"
+# Speed of a service that is not throttled
+PLAN_SPEED_DOWN = func.coalesce(
+    internet_services.c.download_speed_kbps, tariff_configs.c.speed_download
+)
+PLAN_SPEED_UP = func.coalesce(
+    internet_services.c.upload_speed_kbps, tariff_configs.c.speed_upload
+)
+# Speed of a throttled service; tariffs without FUP speeds keep the plan's
+FUP_SPEED_DOWN = func.coalesce(tariff_configs.c.fup_speed_download, PLAN_SPEED_DOWN)
+FUP_SPEED_UP = func.coalesce(tariff_configs.c.fup_speed_upload, PLAN_SPEED_UP)
+# Rows per bulk statement
+FUP_WRITE_CHUNK = 1000
+
+
+def period_start(period: FUPResetPeriod, now: datetime) -> datetime:
+    """Start (UTC) of the day, ISO week or month containing ``now``."""
+    day = now.astimezone(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    if period == FUPResetPeriod.WEEKLY:
+        return day - timedelta(days=day.weekday())
+    if period == FUPResetPeriod.MONTHLY:
+        return day.replace(day=1)
+    return day
+
+
+@dataclass
+class FupAction:
+    """A speed change to push to a service's online session"""
+
+    service_id: int
+    username: Optional[str]
+    throttle: bool
+    speed_down_kbps: Optional[int]
+    speed_up_kbps: Optional[int]
+
+
+def _counter_upsert():
+    stmt = pg_insert(counters)
+    return stmt.on_conflict_do_update(
+        index_elements=[counters.c.service_id],
+        set_={
+            **{
+                f"{prefix}_{direction}": counters.c[f"{prefix}_{direction}"]
+                + stmt.excluded[f"{prefix}_{direction}"]
+                for prefix in ("day", "week", "month")
+                for direction in ("up", "down")
+            },
+            "updated_at": func.now(),
+        },
+    )
+
+
+class FupUsageMeter(WriteBehind):
+    """Per-service byte deltas, added to the traffic counters in bulk"""
+
+    thread_name = "fup-meter-flush"
+
+    def __init__(
+        self,
+        session_factory=None,
+        flush_interval: float = settings.fup_meter_flush_seconds,
+    ):
+        super().__init__(session_factory, flush_interval)
+        # service_id -> [bytes up, bytes down]
+        self._pending: Dict[int, List[int]] = {}
+
+    def record(self, service_id: Optional[int], bytes_up: int, bytes_down: int) -> None:
+        """Add traffic to a service; negative deltas (counter resets) count as 0."""
+        bytes_up, bytes_down = max(bytes_up or 0, 0), max(bytes_down or 0, 0)
+        if not service_id or not (bytes_up or bytes_down):
+            return
+        with self._lock:
+            totals = self._pending.setdefault(service_id, [0, 0])
+            totals[0] += bytes_up
+            totals[1] += bytes_down
+        self._ensure_worker()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Add every buffered delta to the counters; return the rows written."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        # New rows start their periods now, so the next reset leaves them be
+        now = datetime.now(timezone.utc)
+        starts = {
+            f"{PERIOD_COLUMNS[period]}_reset": period_start(period, now)
+            for period in RESET_PERIODS
+        }
+        rows = [
+            {
+                "service_id": service_id,
+                **{f"{prefix}_up": up for prefix in ("day", "week", "month")},
+                **{f"{prefix}_down": down for prefix in ("day", "week", "month")},
+                **starts,
+            }
+            for service_id, (up, down) in batch.items()
+        ]
+
+        db = self._session()
+        try:
+            # Sessions of other service kinds have no counters to add to
+            known = self._internet_services(db, list(batch))
+            if len(known) < len(rows):
+                logger.warning(
+                    f"FUP usage of {len(rows) - len(known)} services without an "
+                    f"internet service dropped"
+                )
+                rows = [row for row in rows if row["service_id"] in known]
+            statement = _counter_upsert()
+            for start in range(0, len(rows), FUP_WRITE_CHUNK):
+                self._execute_rows(db, statement, rows[start : start + FUP_WRITE_CHUNK])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(
+                f"FUP meter flush of {len(rows)} services failed, will retry: {e}"
+            )
+            with self._lock:
+                for service_id, (up, down) in batch.items():
+                    totals = self._pending.setdefault(service_id, [0, 0])
+                    totals[0] += up
+                    totals[1] += down
+            return 0
+        finally:
+            db.close()
+
+        logger.debug(f"Flushed FUP usage for {len(rows)} services")
+        return len(rows)
+
+    @staticmethod
+    def _internet_services(db: Session, service_ids: List[int]) -> Set[int]:
+        known: Set[int] = set()
+        column = internet_services.c.customer_service_id
+        for start in range(0, len(service_ids), FUP_WRITE_CHUNK):
+            chunk = service_ids[start : start + FUP_WRITE_CHUNK]
+            known.update(db.execute(select(column).where(column.in_(chunk))).scalars())
+        return known
+
+
+class FupEngine:
+    """Set-based FUP evaluation, period resets and throttle dispatch"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def evaluate(self) -> List[FupAction]:
+        """Throttle every active service that reached its FUP threshold."""
+        usage = case(
+            *(
+                (
+                    tariff_configs.c.fup_reset_period == period,
+                    counters.c[f"{prefix}_up"] + counters.c[f"{prefix}_down"],
+                )
+                for period, prefix in PERIOD_COLUMNS.items()
+                if prefix != "month"
+            ),
+            else_=counters.c.month_up + counters.c.month_down,
+        )
+        statement = (
+            update(internet_services)
+            .where(
+                internet_services.c.customer_service_id == services.c.id,
+                services.c.tariff_id == tariff_configs.c.tariff_id,
+                counters.c.service_id == internet_services.c.customer_service_id,
+                services.c.status == ServiceStatus.ACTIVE,
+                tariff_configs.c.fup_enabled.is_(True),
+                tariff_configs.c.data_limit_bytes.isnot(None),
+                or_(
+                    internet_services.c.fup_exceeded.is_(False),
+                    internet_services.c.fup_exceeded.is_(None),
+                ),
+                usage >= tariff_configs.c.data_limit_bytes,
+            )
+            .values(
+                fup_exceeded=True,
+                speed_limited=True,
+                speed_limit_reason=FUP_LIMIT_REASON,
+                current_speed_down_kbps=FUP_SPEED_DOWN,
+                current_speed_up_kbps=FUP_SPEED_UP,
+                updated_at=func.now(),
+            )
+            .returning(
+                internet_services.c.customer_service_id,
+                internet_services.c.pppoe_username,
+                FUP_SPEED_DOWN,
+                FUP_SPEED_UP,
+            )
+        )
+        rows = self.db.execute(statement).all()
+        self.db.commit()
+
+        if rows:
+            logger.info(f"FUP threshold reached by {len(rows)} services")
+        return [FupAction(row[0], row[1], True, row[2], row[3]) for row in rows]
+
+    def reset(
+        self, period: FUPResetPeriod, now: Optional[datetime] = None
+    ) -> List[FupAction]:
+        """Start a new ``period`` for counters last reset before its boundary.
+
+        Services on tariffs that reset with ``period`` and were throttled get
+        their speed back; the counters and the services are updated by one
+        statement, so running it again within the period changes nothing.
+        """
+        now = now or datetime.now(timezone.utc)
+        prefix = PERIOD_COLUMNS[period]
+        reset_at = counters.c[f"{prefix}_reset"]
+        reset_counters = (
+            update(counters)
+            .where(or_(reset_at.is_(None), reset_at < period_start(period, now)))
+            .values(
+                {
+                    f"{prefix}_up": 0,
+                    f"{prefix}_down": 0,
+                    f"{prefix}_time": 0,
+                    f"{prefix}_reset": now,
+                }
+            )
+            .returning(counters.c.service_id)
+            .cte("reset_counters")
+        )
+        statement = (
+            update(internet_services)
+            .where(
+                internet_services.c.customer_service_id == reset_counters.c.service_id,
+                internet_services.c.customer_service_id == services.c.id,
+                services.c.tariff_id == tariff_configs.c.tariff_id,
+                tariff_configs.c.fup_reset_period == period,
+                internet_services.c.fup_exceeded.is_(True),
+            )
+            .values(
+                fup_exceeded=False,
+                fup_reset_date=now,
+                speed_limited=False,
+                speed_limit_reason=None,
+                current_speed_down_kbps=None,
+                current_speed_up_kbps=None,
+                updated_at=func.now(),
+            )
+            .returning(
+                internet_services.c.customer_service_id,
+                internet_services.c.pppoe_username,
+                PLAN_SPEED_DOWN,
+                PLAN_SPEED_UP,
+            )
+        )
+        rows = self.db.execute(statement).all()
+        self.db.commit()
+
+        if rows:
+            logger.info(f"FUP {period.value} reset restored {len(rows)} services")
+        return [FupAction(row[0], row[1], False, row[2], row[3]) for row in rows]
+
+    def pending(self) -> List[FupAction]:
+        """Speed changes that online sessions have not acknowledged yet.
+
+        Covers services throttled or restored since the last run as well as
+        changes whose CoA failed, in one query over the online sessions.
+        """
+        throttled = func.coalesce(internet_services.c.fup_exceeded, False)
+        rows = self.db.execute(
+            select(
+                internet_services.c.customer_service_id,
+                internet_services.c.pppoe_username,
+                throttled,
+                case(
+                    (throttled, internet_services.c.current_speed_down_kbps),
+                    else_=PLAN_SPEED_DOWN,
+                ),
+                case(
+                    (throttled, internet_services.c.current_speed_up_kbps),
+                    else_=PLAN_SPEED_UP,
+                ),
+            )
+            .distinct()
+            .select_from(online_sessions)
+            .join(
+                internet_services,
+                internet_services.c.customer_service_id == online_sessions.c.service_id,
+            )
+            .join(services, services.c.id == internet_services.c.customer_service_id)
+            .outerjoin(
+                tariff_configs, tariff_configs.c.tariff_id == services.c.tariff_id
+            )
+            .where(func.coalesce(online_sessions.c.fup_exceeded, False) != throttled)
+        ).all()
+        return [FupAction(*row) for row in rows]
+
+    async def dispatch(
+        self, actions: List[FupAction], concurrency: int = settings.fup_coa_concurrency
+    ) -> Dict[str, int]:
+        """Send the speed changes to online sessions as CoA requests.
+
+        Sessions and NAS secrets for all actions are loaded with one query;
+        services that are offline pick up their speed on the next login.
+        Acknowledged changes are recorded on the sessions, so
+        :meth:`pending` returns only the ones still to send.
+        """
+        # The RADIUS server package imports the integration, which feeds the meter
+        from .radius_server.client import send_request
+        from .radius_server.dictionary import RadiusDictionary
+        from .radius_server.packet import COA_ACK, COA_REQUEST, RadiusError
+
+        result = {"sent": 0, "acknowledged": 0, "failed": 0, "offline": 0}
+        if not actions:
+            return result
+
+        by_service = {action.service_id: action for action in actions}
+        online = self.db.execute(
+            select(
+                online_sessions.c.service_id,
+                online_sessions.c.session_id,
+                online_sessions.c.login,
+                nas_devices.c.nas_ip,
+                nas_devices.c.radius_secret,
+            )
+            .join(
+                nas_devices,
+                nas_devices.c.id
+                == func.coalesce(
+                    online_sessions.c.nas_device_id, online_sessions.c.nas_id
+                ),
+            )
+            .where(online_sessions.c.service_id.in_(list(by_service)))
+        ).all()
+        result["offline"] = len(by_service) - len({row.service_id for row in online})
+
+        dictionary = RadiusDictionary.load(settings.radius_dictionary_path)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(row) -> bool:
+            action = by_service[row.service_id]
+            attributes = {
+                "User-Name": action.username or row.login,
+                "Acct-Session-Id": row.session_id,
+            }
+            if action.speed_down_kbps and action.speed_up_kbps:
+                attributes[
+                    "Mikrotik-Rate-Limit"
+                ] = f"{action.speed_up_kbps}k/{action.speed_down_kbps}k"
+                attributes["WISPr-Bandwidth-Max-Down"] = action.speed_down_kbps * 1000
+                attributes["WISPr-Bandwidth-Max-Up"] = action.speed_up_kbps * 1000
+            async with semaphore:
+                try:
+                    reply = await send_request(
+                        str(row.nas_ip).split("/")[0],
+                        COA_REQUEST,
+                        attributes,
+                        row.radius_secret.encode(),
+                        dictionary,
+                    )
+                # Counted per session; one bad NAS must not fail the gather
+                except (OSError, TimeoutError, RadiusError) as e:
+                    logger.warning(f"FUP CoA for service {row.service_id} failed: {e}")
+                    return False
+            return reply.code == COA_ACK
+
+        acknowledged = await asyncio.gather(*(send(row) for row in online))
+        result["sent"] = len(acknowledged)
+        result["acknowledged"] = sum(acknowledged)
+        result["failed"] = result["sent"] - result["acknowledged"]
+
+        applied = [
+            {
+                "p_session_id": row.session_id,
+                "p_throttled": by_service[row.service_id].throttle,
+                "p_speed_down": by_service[row.service_id].speed_down_kbps,
+                "p_speed_up": by_service[row.service_id].speed_up_kbps,
+            }
+            for row, ok in zip(online, acknowledged, strict=True)
+            if ok
+        ]
+        if applied:
+            self.db.execute(
+                update(online_sessions)
+                .where(online_sessions.c.session_id == bindparam("p_session_id"))
+                .values(
+                    fup_exceeded=bindparam("p_throttled"),
+                    speed_limited=bindparam("p_throttled"),
+                    current_speed_down=bindparam("p_speed_down"),
+                    current_speed_up=bindparam("p_speed_up"),
+                ),
+                applied,
+            )
+            self.db.commit()
+        return result
+
+
+fup_meter = FupUsageMeter()
+atexit.register(fup_meter.close)
@@ -0,0 +1,304 @@
+"""
+Invoice Composer
+
+Builds invoices and their lines in memory and persists them in one go.
+
+Line discounts, taxes and totals are computed in a single pass with Decimal
+arithmetic, each amount rounded half-up to the cent exactly once. Invoice
+totals are the sums of the rounded line amounts, so a header always agrees
+with its lines:
+
+* ``subtotal`` is the sum of ``quantity * unit_price`` before discounts
+* ``discount_amount`` and ``tax_amount`` are the sums of the line amounts
+* ``total_amount`` is ``subtotal - discount_amount + tax_amount``, which is
+  also the sum of the line totals
+
+Persisting a batch costs one number allocation, one ``INSERT .. RETURNING``
+for the invoices and one multi-row ``INSERT`` for all of their lines, inside
+the caller's transaction. Appending lines to an existing invoice is one
+insert plus one ``UPDATE`` that adds the new lines' totals to the header,
+instead of re-aggregating every line in SQL.
+
+Bulk statements bypass the session's flush listeners, so balance effects of
+invoices written in a posted state are applied through :class:`BalanceLedger`,
+and the daily billing rollup is updated directly, in the same transaction.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core.exceptions import NotFoundError
+from app.models.billing import Invoice, InvoiceItem, InvoiceStatus
+from app.services.balance_ledger import BalanceLedger, invoice_contribution
+from app.services.billing_rollups import BillingRollupService
+from app.services.number_allocator import NumberAllocator
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+HUNDRED = Decimal("100")
+ZERO = Decimal("0.00")
+
+# Rows per multi-row INSERT statement
+INVOICE_WRITE_CHUNK = 1000
+
+
+def _as_decimal(value: Any) -> Decimal:
+    if value is None:
+        return Decimal("0")
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def to_money(value: Any) -> Decimal:
+    """Round an amount half-up to the cent."""
+    return _as_decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def price_line(item: Mapping[str, Any]) -> Dict[str, Any]:
+    """Return an invoice item row with discount, tax and line total filled in.
+
+    A discount percentage takes precedence over a fixed discount amount, and
+    tax is charged on the discounted amount of taxable lines.
+    """
+    row = dict(item)
+    quantity = _as_decimal(row.get("quantity", 1))
+    unit_price = _as_decimal(row["unit_price"])
+    gross = to_money(quantity * unit_price)
+
+    discount_percentage = _as_decimal(row.get("discount_percentage"))
+    if discount_percentage > 0:
+        discount_amount = to_money(
+            quantity * unit_price * discount_percentage / HUNDRED
+        )
+    else:
+        discount_amount = to_money(row.get("discount_amount"))
+    net = gross - discount_amount
+
+    tax_rate = _as_decimal(row.get("tax_rate"))
+    tax_amount = ZERO
+    if row.get("taxable", True) and tax_rate > 0:
+        tax_amount = to_money(net * tax_rate / HUNDRED)
+
+    row.update(
+        quantity=quantity,
+        unit_price=unit_price,
+        discount_percentage=discount_percentage,
+        discount_amount=discount_amount,
+        tax_rate=tax_rate,
+        tax_amount=tax_amount,
+        line_total=net + tax_amount,
+    )
+    return row
+
+
+@dataclass
+class InvoiceTotals:
+    """Running header totals of an invoice"""
+
+    subtotal: Decimal = ZERO
+    discount_amount: Decimal = ZERO
+    tax_amount: Decimal = ZERO
+
+    @property
+    def total_amount(self) -> Decimal:
+        return self.subtotal - self.discount_amount + self.tax_amount
+
+    def add(self, line: Mapping[str, Any]) -> None:
+        """Add a priced line to the totals."""
+        self.subtotal += (
+            line["line_total"] - line["tax_amount"] + line["discount_amount"]
+        )
+        self.discount_amount += line["discount_amount"]
+        self.tax_amount += line["tax_amount"]
+
+    def as_values(self) -> Dict[str, Decimal]:
+        return {
+            "subtotal": self.subtotal,
+            "discount_amount": self.discount_amount,
+            "tax_amount": self.tax_amount,
+            "total_amount": self.total_amount,
+        }
+
+
+@dataclass
+class ComposedInvoice:
+    """An invoice header and its priced lines, not yet written"""
+
+    header: Dict[str, Any]
+    lines: List[Dict[str, Any]] = field(default_factory=list)
+    totals: InvoiceTotals = field(default_factory=InvoiceTotals)
+
+    def add_line(self, item: Mapping[str, Any]) -> Dict[str, Any]:
+        """Price a line and add it to the invoice."""
+        line = price_line(item)
+        self.lines.append(line)
+        self.totals.add(line)
+        return line
+
+    @property
+    def total_amount(self) -> Decimal:
+        return self.totals.total_amount
+
+    def values(self) -> Dict[str, Any]:
+        """Invoice row with the computed totals."""
+        row = dict(self.header)
+        row.setdefault("status", InvoiceStatus.DRAFT)
+        row.update(self.totals.as_values())
+        row["balance_due"] = self.totals.total_amount - _as_decimal(
+            row.get("paid_amount")
+        )
+        return row
+
+
+class InvoiceComposer:
+    """Composes invoices in memory and writes them with bulk statements"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.number_allocator = NumberAllocator(db)
+        self.rollups = BillingRollupService(db)
+
+    @staticmethod
+    def compose(
+        header: Mapping[str, Any], items: Iterable[Mapping[str, Any]] = ()
+    ) -> ComposedInvoice:
+        """Build an invoice and price all of its lines in one pass."""
+        invoice = ComposedInvoice(header=dict(header))
+        for item in items:
+            invoice.add_line(item)
+        return invoice
+
+    def persist(
+        self, invoices: Sequence[ComposedInvoice], at: Optional[datetime] = None
+    ) -> List[int]:
+        """Insert composed invoices and their lines; return the invoice ids.
+
+        Invoices without an ``invoice_number`` are numbered in one
+        allocation. Nothing is committed; the caller owns the transaction.
+        """
+        if not invoices:
+            return []
+        rows = [invoice.values() for invoice in invoices]
+        unnumbered = [row for row in rows if not row.get("invoice_number")]
+        if unnumbered:
+            numbers = self.number_allocator.allocate_numbers(
+                "invoice", len(unnumbered), at
+            )
+            for row, number in zip(unnumbered, numbers, strict=True):
+                row["invoice_number"] = number
+
+        invoice_ids: List[int] = []
+        stmt = insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True)
+        for chunk in _chunks(rows):
+            invoice_ids.extend(self.db.scalars(stmt, chunk))
+
+        lines = [
+            {**line, "invoice_id": invoice_id}
+            for invoice, invoice_id in zip(invoices, invoice_ids, strict=True)
+            for line in invoice.lines
+        ]
+        for chunk in _chunks(lines):
+            self.db.execute(insert(InvoiceItem), chunk)
+
+        deltas: Dict[int, Decimal] = defaultdict(Decimal)
+        for row in rows:
+            deltas[row["billing_account_id"]] += invoice_contribution(
+                row["status"], row["total_amount"]
+            )
+        self._apply_balance_deltas(deltas)
+        self.rollups.apply_changes(
+            {"invoices": [_rollup_entry(row, 1) for row in rows]}
+        )
+
+        logger.info(f"Persisted {len(invoice_ids)} invoices with {len(lines)} items")
+        return invoice_ids
+
+    def append_lines(
+        self, invoice_id: int, items: Iterable[Mapping[str, Any]]
+    ) -> List[InvoiceItem]:
+        """Insert lines into an existing invoice and add them to its totals.
+
+        Nothing is committed; the caller owns the transaction.
+        """
+        added = self.compose({}, items)
+        if not added.lines:
+            return []
+        lines = [{**line, "invoice_id": invoice_id} for line in added.lines]
+
+        totals = added.totals
+        header = self.db.execute(
+            update(Invoice)
+            .where(Invoice.id == invoice_id)
+            .values(
+                subtotal=Invoice.subtotal + totals.subtotal,
+                discount_amount=Invoice.discount_amount + totals.discount_amount,
+                tax_amount=Invoice.tax_amount + totals.tax_amount,
+                total_amount=Invoice.total_amount + totals.total_amount,
+                balance_due=Invoice.balance_due + totals.total_amount,
+            )
+            .returning(
+                Invoice.billing_account_id,
+                Invoice.invoice_date,
+                Invoice.status,
+                Invoice.total_amount,
+                Invoice.paid_amount,
+                Invoice.balance_due,
+            )
+            .execution_options(synchronize_session=False)
+        ).first()
+        if header is None:
+            raise NotFoundError(f"Invoice {invoice_id} not found")
+
+        items_added = list(
+            self.db.scalars(
+                insert(InvoiceItem).returning(
+                    InvoiceItem, sort_by_parameter_order=True
+                ),
+                lines,
+            )
+        )
+        self._apply_balance_deltas(
+            {
+                header.billing_account_id: invoice_contribution(
+                    header.status, totals.total_amount
+                )
+            }
+        )
+        after = header._asdict()
+        before = {
+            **after,
+            "total_amount": header.total_amount - totals.total_amount,
+            "balance_due": header.balance_due - totals.total_amount,
+        }
+        self.rollups.apply_changes(
+            {"invoices": [_rollup_entry(before, -1), _rollup_entry(after, 1)]}
+        )
+        return items_added
+
+    def _apply_balance_deltas(self, deltas: Mapping[int, Decimal]) -> None:
+        deltas = {account_id: delta for account_id, delta in deltas.items() if delta}
+        if deltas:
+            BalanceLedger(self.db).apply_deltas(deltas)
+
+
+def _rollup_entry(row: Mapping[str, Any], sign: int) -> tuple:
+    return (
+        row["invoice_date"],
+        row["status"],
+        row["total_amount"],
+        row.get("paid_amount"),
+        row["balance_due"],
+        sign,
+    )
+
+
+def _chunks(rows: List[Dict[str, Any]]) -> Iterable[List[Dict[str, Any]]]:
+    for start in range(0, len(rows), INVOICE_WRITE_CHUNK):
+        yield rows[start : start + INVOICE_WRITE_CHUNK]
@@ -0,0 +1,405 @@
+"""
+Live Session Table
+
+In-memory registry of the RADIUS sessions that are currently online.
+
+Session start, stop and interim accounting events update a compact record
+per session together with secondary indexes by IP address, login, NAS and
+customer, and running totals of traffic and session time. Lookups, counts
+and the online summary are dictionary reads instead of queries against
+``customers_online``.
+
+``customers_online`` stays the durable copy: changes are coalesced per
+session and written in the background every ``live_sessions_flush_seconds``
+with one bulk upsert and one bulk delete, and the registry is loaded from
+the table the first time a process uses it. Each process keeps its own
+table, so session events and lookups must be served by the same process.
+
+Like ``customers_online`` before it, the table holds at most one session per
+customer; starting a session replaces the customer's previous one. Because
+that session may have been started by another process, a start also deletes
+the customer's other rows from ``customers_online``, and a stop for a session
+this process does not hold still deletes its row.
+"""
+
+import atexit
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.networking.radius import CustomerOnline
+from app.services.write_behind import WriteBehind
+
+logger = logging.getLogger(__name__)
+
+# Session attributes copied from start events and persisted
+SESSION_FIELDS = (
+    "session_id",
+    "customer_id",
+    "service_id",
+    "tariff_id",
+    "partner_id",
+    "nas_id",
+    "login",
+    "username_real",
+    "ipv4",
+    "ipv6",
+    "mac",
+    "call_to",
+    "port",
+    "price",
+    "type",
+    "login_is",
+    "start_session",
+    "in_bytes",
+    "out_bytes",
+    "time_on",
+)
+
+# Rows per bulk statement
+LIVE_SESSION_WRITE_CHUNK = 1000
+
+
+class LiveSession:
+    """One online session; attribute names match ``CustomerOnline``"""
+
+    __slots__ = SESSION_FIELDS + ("id", "last_change", "created_at")
+
+    def __init__(self, **values: Any):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+        self.in_bytes = self.in_bytes or 0
+        self.out_bytes = self.out_bytes or 0
+        self.time_on = self.time_on or 0
+        self.price = self.price if self.price is not None else Decimal("0")
+        self.type = self.type or "mikrotik_api"
+        self.login_is = self.login_is or "user"
+        for name in ("ipv4", "ipv6"):
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, str(value))
+
+    @property
+    def total_bytes(self) -> int:
+        return self.in_bytes + self.out_bytes
+
+    @property
+    def total_gb(self) -> float:
+        return round(self.total_bytes / (1024**3), 2)
+
+    @property
+    def session_duration_minutes(self) -> int:
+        return self.time_on // 60
+
+    def row(self) -> Dict[str, Any]:
+        """Column values for ``customers_online``."""
+        row = {name: getattr(self, name) for name in SESSION_FIELDS}
+        row.update(
+            last_change=self.last_change,
+            last_update=self.last_change,
+            created_at=self.created_at,
+        )
+        return row
+
+    def __repr__(self):
+        return f"<LiveSession {self.login}: {self.ipv4}>"
+
+
+class LiveSessionRegistry(WriteBehind):
+    """Online sessions indexed in memory and persisted in the background"""
+
+    thread_name = "live-sessions-flush"
+
+    def __init__(
+        self,
+        session_factory=None,
+        flush_interval: float = settings.live_sessions_flush_seconds,
+    ):
+        super().__init__(session_factory, flush_interval)
+        self._sessions: Dict[str, LiveSession] = {}
+        self._by_ip: Dict[str, str] = {}
+        self._by_login: Dict[str, str] = {}
+        self._by_customer: Dict[int, str] = {}
+        self._by_nas: Dict[Any, Set[str]] = defaultdict(set)
+        self._in_bytes = 0
+        self._out_bytes = 0
+        self._time_on = 0
+        # session_id -> record to upsert, or None to delete
+        self._dirty: Dict[str, Optional[LiveSession]] = {}
+        # customer_id -> the session to keep, or None; other rows are deleted
+        self._replaced: Dict[int, Optional[str]] = {}
+        self._loaded = False
+
+    def load(self, db: Session) -> None:
+        """Fill the registry from ``customers_online`` once per process."""
+        if self._loaded:
+            return
+        columns = [
+            CustomerOnline.__table__.c[name]
+            for name in SESSION_FIELDS + ("id", "last_change", "created_at")
+        ]
+        with self._lock:
+            if self._loaded:
+                return
+            rows = db.execute(
+                select(*columns).where(CustomerOnline.session_id.isnot(None))
+            ).mappings()
+            loaded = 0
+            for row in rows:
+                # Events received before loading are newer than the table
+                session_id, customer_id = row["session_id"], row["customer_id"]
+                if session_id in self._sessions or session_id in self._dirty:
+                    continue
+                if self._replaced.get(customer_id, session_id) != session_id:
+                    continue
+                self._add(LiveSession(**row))
+                loaded += 1
+            self._loaded = True
+        logger.info(f"Loaded {loaded} live sessions from customers_online")
+
+    # Events
+
+    def start(self, data: Mapping[str, Any]) -> LiveSession:
+        """Register a new session, replacing the customer's previous one."""
+        now = datetime.now(timezone.utc)
+        session = LiveSession(
+            **{name: data.get(name) for name in SESSION_FIELDS},
+            last_change=now,
+            created_at=now,
+        )
+        with self._lock:
+            for previous_id in (
+                session.session_id,
+                self._by_customer.get(session.customer_id),
+            ):
+                previous = self._sessions.get(previous_id)
+                if previous is not None:
+                    self._remove(previous)
+                    self._dirty[previous.session_id] = None
+            self._add(session)
+            self._dirty[session.session_id] = session
+            if session.customer_id is not None:
+                self._replaced[session.customer_id] = session.session_id
+        self._ensure_worker()
+        return session
+
+    def update(
+        self, session_id: str, in_bytes: int, out_bytes: int, time_on: int
+    ) -> Optional[LiveSession]:
+        """Apply interim accounting totals to an online session."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            in_bytes, out_bytes, time_on = in_bytes or 0, out_bytes or 0, time_on or 0
+            self._in_bytes += in_bytes - session.in_bytes
+            self._out_bytes += out_bytes - session.out_bytes
+            self._time_on += time_on - session.time_on
+            session.in_bytes, session.out_bytes, session.time_on = (
+                in_bytes,
+                out_bytes,
+                time_on,
+            )
+            session.last_change = datetime.now(timezone.utc)
+            self._dirty[session_id] = session
+        self._ensure_worker()
+        return session
+
+    def stop(self, session_id: str) -> bool:
+        """Remove a session; return False if it was not online here.
+
+        The row is deleted either way, in case another process started it.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._remove(session)
+            self._dirty[session_id] = None
+        self._ensure_worker()
+        return session is not None
+
+    def remove_customer(self, customer_id: int) -> bool:
+        """Remove the customer's session; return False if none was online here.
+
+        The customer's rows are deleted either way.
+        """
+        with self._lock:
+            session_id = self._by_customer.get(customer_id)
+            if session_id is not None:
+                return self.stop(session_id)
+            self._replaced[customer_id] = None
+        self._ensure_worker()
+        return False
+
+    # Lookups
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        return self._sessions.get(session_id)
+
+    def get_by_ip(self, ip_address: str) -> Optional[LiveSession]:
+        return self._sessions.get(self._by_ip.get(ip_address))
+
+    def get_by_login(self, login: str) -> Optional[LiveSession]:
+        return self._sessions.get(self._by_login.get(login))
+
+    def get_by_customer(self, customer_id: int) -> Optional[LiveSession]:
+        return self._sessions.get(self._by_customer.get(customer_id))
+
+    def get_by_nas(self, nas_id: Any) -> List[LiveSession]:
+        with self._lock:
+            return [self._sessions[sid] for sid in self._by_nas.get(nas_id, ())]
+
+    def count_by_nas(self, nas_id: Any) -> int:
+        return len(self._by_nas.get(nas_id, ()))
+
+    def all(self) -> List[LiveSession]:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def summary(self) -> Dict[str, Any]:
+        """Online totals, kept up to date by every event."""
+        with self._lock:
+            online = len(self._sessions)
+            total_data = self._in_bytes + self._out_bytes
+            total_time = self._time_on
+        return {
+            "total_online": online,
+            "total_data_gb": round(total_data / (1024**3), 2) if total_data else 0,
+            "total_session_time_hours": (
+                round(total_time / 3600, 2) if total_time else 0
+            ),
+            "average_session_duration_minutes": (
+                round(total_time / online / 60, 2) if online and total_time else 0
+            ),
+        }
+
+    def pending(self) -> int:
+        return len(self._dirty) + len(self._replaced)
+
+    # Persistence
+
+    def flush(self) -> int:
+        """Write changed sessions to ``customers_online``; return changes sent."""
+        with self._lock:
+            batch, self._dirty = self._dirty, {}
+            replaced, self._replaced = self._replaced, {}
+            upserts = [
+                session.row() for session in batch.values() if session is not None
+            ]
+        if not batch and not replaced:
+            return 0
+        deletes = [
+            session_id for session_id, session in batch.items() if session is None
+        ]
+
+        table = CustomerOnline.__table__
+        db = self._session()
+        try:
+            if replaced:
+                db.execute(
+                    delete(table).where(
+                        table.c.customer_id == bindparam("p_customer_id"),
+                        table.c.session_id.is_distinct_from(
+                            bindparam("p_session_id", type_=table.c.session_id.type)
+                        ),
+                    ),
+                    [
+                        {"p_customer_id": customer_id, "p_session_id": session_id}
+                        for customer_id, session_id in replaced.items()
+                    ],
+                )
+            for start in range(0, len(deletes), LIVE_SESSION_WRITE_CHUNK):
+                chunk = deletes[start : start + LIVE_SESSION_WRITE_CHUNK]
+                db.execute(delete(table).where(table.c.session_id.in_(chunk)))
+
+            stmt = pg_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.session_id],
+                set_={
+                    name: stmt.excluded[name]
+                    for name in SESSION_FIELDS + ("last_change", "last_update")
+                    if name != "session_id"
+                },
+            ).returning(table.c.session_id, table.c.id)
+            persisted = []
+            for start in range(0, len(upserts), LIVE_SESSION_WRITE_CHUNK):
+                persisted.extend(
+                    self._execute_rows(
+                        db, stmt, upserts[start : start + LIVE_SESSION_WRITE_CHUNK]
+                    )
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(
+                f"Live session flush of {len(batch)} rows failed, will retry: {e}"
+            )
+            # Changes made since are newer; keep them
+            with self._lock:
+                for session_id, session in batch.items():
+                    self._dirty.setdefault(session_id, session)
+                for customer_id, session_id in replaced.items():
+                    self._replaced.setdefault(customer_id, session_id)
+            return 0
+        finally:
+            db.close()
+
+        for session_id, row_id in persisted:
+            session = self._sessions.get(session_id)
+            if session is not None and session.id is None:
+                session.id = row_id
+        logger.debug(
+            f"Flushed {len(upserts)} live sessions, removed {len(deletes)} "
+            f"and replaced the sessions of {len(replaced)} customers"
+        )
+        return len(batch) + len(replaced)
+
+    def _add(self, session: LiveSession) -> None:
+        session_id = session.session_id
+        self._sessions[session_id] = session
+        for index, key in self._index_keys(session):
+            index[key] = session_id
+        if session.nas_id is not None:
+            self._by_nas[session.nas_id].add(session_id)
+        self._in_bytes += session.in_bytes
+        self._out_bytes += session.out_bytes
+        self._time_on += session.time_on
+
+    def _remove(self, session: LiveSession) -> None:
+        session_id = session.session_id
+        del self._sessions[session_id]
+        for index, key in self._index_keys(session):
+            # Another session may have taken over the key since
+            if index.get(key) == session_id:
+                del index[key]
+        members = self._by_nas.get(session.nas_id)
+        if members is not None:
+            members.discard(session_id)
+            if not members:
+                del self._by_nas[session.nas_id]
+        self._in_bytes -= session.in_bytes
+        self._out_bytes -= session.out_bytes
+        self._time_on -= session.time_on
+
+    def _index_keys(self, session: LiveSession):
+        keys = [
+            (self._by_ip, session.ipv4),
+            (self._by_ip, session.ipv6),
+            (self._by_login, session.login),
+            (self._by_customer, session.customer_id),
+        ]
+        return [(index, key) for index, key in keys if key is not None]
+
+
+live_sessions = LiveSessionRegistry()
+atexit.register(live_sessions.close)
@@ -21,9 +21,11 @@ from ..models.networking.nas_radius import NASDevice
 # Using new modular network architecture
 from ..models.networking.networks import NetworkDevice, NetworkSite
 from ..models.networking.routers import Router, RouterSector
+from ..models.services.enums import ServiceStatus
 from ..models.services.instances import CustomerService, InternetService
 from ..models.services.legacy import ServicePlan
 from ..repositories.base import BaseRepository
+from .router_placement import RouterPlacementEngine
 
 # Create aliases for backward compatibility
 IPv4IP = IPAllocation
@@ -53,6 +55,8 @@ class NetworkProvisioningService:
         self.ip_pool_repo = BaseRepository(IPPool, db)
         self.ip_allocation_repo = BaseRepository(IPAllocation, db)
         self.customer_service_repo = BaseRepository(CustomerService, db)
+        self.router_repo = BaseRepository(Router, db)
+        self.placement = RouterPlacementEngine(db)
 
     def provision_customer_service(
         self,
@@ -73,6 +77,7 @@ class NetworkProvisioningService:
         Returns:
             Provisioning result with assigned resources
         """
+        assigned_router = assigned_sector = customer_service = None
         try:
             logger.info(
                 f"Starting network provisioning for customer {customer_id}, service plan {service_plan_id}"
@@ -132,11 +137,11 @@ class NetworkProvisioningService:
                 "provisioning_status": "completed",
                 "assigned_router": {
                     "id": assigned_router.id,
-                    "name": assigned_router.name,
-                    "ip_address": assigned_router.management_ip,
+                    "name": assigned_router.title,
+                    "ip_address": assigned_router.ip,
                 },
                 "assigned_sector": (
-                    {"id": assigned_sector.id, "name": assigned_sector.name}
+                    {"id": assigned_sector.id, "name": assigned_sector.title}
                     if assigned_sector
                     else None
                 ),
@@ -151,6 +156,13 @@ class NetworkProvisioningService:
             logger.error(
                 f"Error provisioning network service for customer {customer_id}: {str(e)}"
             )
+            if assigned_router and customer_service is None:
+                # Hand back the slot claimed for a service that was never created
+                self.db.rollback()
+                self.placement.release(
+                    assigned_router.id, assigned_sector.id if assigned_sector else None
+                )
+                self.db.commit()
             raise
 
     def deprovision_customer_service(
@@ -171,7 +183,7 @@ class NetworkProvisioningService:
                     and_(
                         CustomerService.customer_id == customer_id,
                         CustomerService.service_plan_id == service_plan_id,
-                        CustomerService.status == "active",
+                        CustomerService.status == ServiceStatus.ACTIVE,
                     )
                 )
                 .first()
@@ -189,10 +201,13 @@ class NetworkProvisioningService:
             # Remove network configuration
             self._remove_network_configuration(customer_service)
 
-            # Update customer service status
-            customer_service.status = "inactive"
-            customer_service.end_date = datetime.now(timezone.utc)
+            # Update customer service status and free its router/sector slot
+            customer_service.status = ServiceStatus.TERMINATED
+            customer_service.termination_date = datetime.now(timezone.utc)
             self.db.merge(customer_service)
+            self.placement.release(
+                customer_service.primary_router_id, customer_service.sector_id
+            )
             self.db.commit()
 
             logger.info(f"Network deprovisioning completed for customer {customer_id}")
@@ -293,17 +308,8 @@ class NetworkProvisioningService:
             if not router:
                 raise NotFoundError(f"Router {router_id} not found")
 
-            # Count active customer services on this router
-            active_customers = (
-                self.db.query(CustomerService)
-                .filter(
-                    and_(
-                        CustomerService.router_id == router_id,
-                        CustomerService.status == "active",
-                    )
-                )
-                .count()
-            )
+            # Occupancy is kept on the router by the placement engine
+            active_customers = router.active_services
 
             # Count assigned IP addresses
             assigned_ipv4 = (
@@ -321,18 +327,18 @@ class NetworkProvisioningService:
 
             # Calculate utilization percentages
             customer_utilization = (
-                (active_customers / router.max_customers * 100)
-                if router.max_customers
+                (active_customers / router.max_services * 100)
+                if router.max_services
                 else 0
             )
             ip_utilization = (assigned_ipv4 / total_ipv4 * 100) if total_ipv4 else 0
 
             return {
                 "router_id": router_id,
-                "router_name": router.name,
+                "router_name": router.title,
                 "status": router.status,
                 "active_customers": active_customers,
-                "max_customers": router.max_customers,
+                "max_customers": router.max_services,
                 "customer_utilization_percent": round(customer_utilization, 2),
                 "assigned_ipv4": assigned_ipv4,
                 "total_ipv4": total_ipv4,
@@ -357,79 +363,21 @@ class NetworkProvisioningService:
     ) -> Tuple[Optional[Router], Optional[RouterSector]]:
         """
         Assign optimal router and sector for a customer
+
+        Claims a slot on the least loaded router/sector (or on the requested
+        one) and commits it straight away, so the router row is only locked
+        for the claim and a later failure can hand the slot back.
         """
         try:
-            assigned_router = None
-            assigned_sector = None
-
-            # If specific router requested, use it
-            if router_id:
-                assigned_router = self.router_repo.get(router_id)
-                if not assigned_router or assigned_router.status != "active":
-                    raise ValidationError(
-                        f"Requested router {router_id} is not available"
-                    )
-            else:
-                # Find optimal router based on load and service type
-                available_routers = (
-                    self.db.query(Router)
-                    .filter(
-                        and_(
-                            Router.status == "active",
-                            Router.service_types.contains(service_plan.service_type),
-                        )
-                    )
-                    .all()
-                )
-
-                if not available_routers:
-                    raise ValidationError(
-                        f"No routers available for service type {service_plan.service_type}"
-                    )
-
-                # Select router with lowest utilization
-                best_router = None
-                lowest_utilization = float("inf")
-
-                for router in available_routers:
-                    utilization = self._calculate_router_utilization(router.id)
-                    if utilization < lowest_utilization:
-                        lowest_utilization = utilization
-                        best_router = router
-
-                assigned_router = best_router
-
-            # Assign sector if specified or find optimal one
-            if assigned_router:
-                if sector_id:
-                    assigned_sector = (
-                        self.db.query(RouterSector)
-                        .filter(
-                            and_(
-                                RouterSector.id == sector_id,
-                                RouterSector.router_id == assigned_router.id,
-                                RouterSector.status == "active",
-                            )
-                        )
-                        .first()
-                    )
-                else:
-                    # Find sector with lowest utilization
-                    available_sectors = (
-                        self.db.query(RouterSector)
-                        .filter(
-                            and_(
-                                RouterSector.router_id == assigned_router.id,
-                                RouterSector.status == "active",
-                            )
-                        )
-                        .all()
-                    )
-
-                    if available_sectors:
-                        # Simple selection - could be enhanced with load balancing
-                        assigned_sector = available_sectors[0]
+            assigned_router, assigned_sector = self.placement.place(
+                router_id, sector_id
+            )
+            self.db.commit()
 
+            logger.info(
+                f"Placed customer {customer_id} on router {assigned_router.id}"
+                f" sector {assigned_sector.id if assigned_sector else None}"
+            )
             return assigned_router, assigned_sector
 
         except Exception as e:
@@ -522,15 +470,20 @@ class NetworkProvisioningService:
                     and_(
                         CustomerService.customer_id == customer_id,
                         CustomerService.service_plan_id == service_plan_id,
-                        CustomerService.status == "active",
+                        CustomerService.status == ServiceStatus.ACTIVE,
                     )
                 )
                 .first()
             )
 
             if existing_assignment:
+                # Moving the service frees the slot it held before
+                self.placement.release(
+                    existing_assignment.primary_router_id, existing_assignment.sector_id
+                )
+
                 # Update existing assignment
-                existing_assignment.router_id = router_id
+                existing_assignment.primary_router_id = router_id
                 existing_assignment.sector_id = sector_id
                 existing_assignment.updated_at = datetime.now(timezone.utc)
 
@@ -543,9 +496,9 @@ class NetworkProvisioningService:
                 new_assignment = CustomerService(
                     customer_id=customer_id,
                     service_plan_id=service_plan_id,
-                    status="active",
-                    start_date=datetime.now(timezone.utc),
-                    router_id=router_id,
+                    status=ServiceStatus.ACTIVE,
+                    activation_date=datetime.now(timezone.utc),
+                    primary_router_id=router_id,
                     sector_id=sector_id,
                 )
 
@@ -575,7 +528,8 @@ class NetworkProvisioningService:
         """
         try:
             logger.info(
-                f"Applying network configuration for customer {customer_id} on router {router.name}"
+                f"Applying network configuration for customer {customer_id} "
+                f"on router {router.title}"
             )
 
             # Placeholder for router configuration
@@ -589,8 +543,8 @@ class NetworkProvisioningService:
             # For now, just log the configuration that would be applied
             config_details = {
                 "customer_id": customer_id,
-                "router": router.name,
-                "sector": sector.name if sector else None,
+                "router": router.title,
+                "sector": sector.title if sector else None,
                 "service_plan": service_plan.name,
                 "ipv4": ipv4,
                 "ipv6": ipv6,
@@ -684,35 +638,6 @@ class NetworkProvisioningService:
             )
             return {"ipv4": [], "ipv6": []}
 
-    def _calculate_router_utilization(self, router_id: int) -> float:
-        """
-        Calculate router utilization percentage
-        """
-        try:
-            router = self.router_repo.get(router_id)
-            if not router:
-                return 100.0  # Consider unavailable routers as fully utilized
-
-            active_customers = (
-                self.db.query(CustomerService)
-                .filter(
-                    and_(
-                        CustomerService.router_id == router_id,
-                        CustomerService.status == "active",
-                    )
-                )
-                .count()
-            )
-
-            if router.max_customers:
-                return (active_customers / router.max_customers) * 100
-            else:
-                return 0.0
-
-        except Exception as e:
-            logger.error(f"Error calculating router utilization: {str(e)}")
-            return 100.0  # Consider error as fully utilized
-
     def _get_bandwidth_limits(self, service_plan: ServicePlan) -> Dict[str, Any]:
         """
         Get bandwidth limits from service plan
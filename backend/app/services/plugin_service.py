@@ -5,17 +5,36 @@ Handles dynamic plugin loading, registration, lifecycle management,
 hook execution, and integration with the ISP Framework core systems.
 """
 
+import asyncio
+import atexit
+import functools
 import importlib
 import importlib.util
+import inspect
 import logging
+import math
 import threading
 import time
 import traceback
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple, Type
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+)
 
-from sqlalchemy import and_, func, or_
+from sqlalchemy import Integer, and_, bindparam, cast, func, or_, update
 from sqlalchemy.orm import Session
 
 from app.models.plugins import (
@@ -32,9 +51,228 @@ from app.schemas.plugins import (
     PluginInstallRequest,
     PluginUpdate,
 )
+from app.services.write_behind import WriteBehind
 
 logger = logging.getLogger(__name__)
 
+# How a hook binding runs: in the caller's thread, on the hook pool with a
+# timeout, or on the hook pool without waiting for the result
+HOOK_EXECUTION_MODES = ("inline", "thread", "background")
+HOOK_DEFAULT_TIMEOUT_MS = 5000
+HOOK_WORKERS = 8
+
+# Hook statistics are written after this many executions or seconds
+HOOK_STATS_FLUSH_SIZE = 500
+HOOK_STATS_FLUSH_INTERVAL_SECONDS = 30
+HOOK_STATS_SAMPLE_SIZE = 512
+
+_hook_executor = ThreadPoolExecutor(
+    max_workers=HOOK_WORKERS, thread_name_prefix="plugin-hook"
+)
+
+
+class HookBinding(NamedTuple):
+    """A registered hook resolved to the bound plugin method"""
+
+    hook_id: int
+    hook_name: str
+    plugin_id: int
+    method_name: str
+    priority: int
+    callback: Callable[..., Any]
+    mode: str
+    timeout: Optional[float]  # Seconds; None waits indefinitely
+
+
+def _elapsed_ms(start_time: float) -> float:
+    return (time.perf_counter() - start_time) * 1000
+
+
+class _HookStats:
+    """Running totals for one hook plus the deltas not yet written"""
+
+    __slots__ = (
+        "plugin_id",
+        "count",
+        "total_ms",
+        "errors",
+        "samples",
+        "last_executed",
+        "pending_count",
+        "pending_ms",
+        "pending_errors",
+    )
+
+    def __init__(self, plugin_id: int):
+        self.plugin_id = plugin_id
+        self.count = 0
+        self.total_ms = 0.0
+        self.errors = 0
+        self.samples: Deque[float] = deque(maxlen=HOOK_STATS_SAMPLE_SIZE)
+        self.last_executed: Optional[datetime] = None
+        self.pending_count = 0
+        self.pending_ms = 0.0
+        self.pending_errors = 0
+
+
+class HookStatsRecorder(WriteBehind):
+    """Aggregates hook execution statistics in memory
+
+    Successful executions update the count, mean and a bounded sample used
+    for p95; failures only count towards the plugin's error total. Pending
+    deltas are written in one batched UPDATE per table on the write-behind
+    thread, every ``HOOK_STATS_FLUSH_INTERVAL_SECONDS`` or sooner once
+    ``HOOK_STATS_FLUSH_SIZE`` executions are pending, so executing a hook
+    never commits the caller's session.
+    """
+
+    thread_name = "plugin-hook-stats"
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None):
+        super().__init__(session_factory, HOOK_STATS_FLUSH_INTERVAL_SECONDS)
+        self._stats: Dict[int, _HookStats] = {}
+        self._pending = 0
+
+    def record(self, binding: HookBinding, elapsed_ms: float, failed: bool = False):
+        with self._lock:
+            stats = self._stats.get(binding.hook_id)
+            if stats is None:
+                stats = self._stats[binding.hook_id] = _HookStats(binding.plugin_id)
+            if failed:
+                stats.errors += 1
+                stats.pending_errors += 1
+            else:
+                stats.count += 1
+                stats.total_ms += elapsed_ms
+                stats.samples.append(elapsed_ms)
+                stats.last_executed = datetime.now(timezone.utc)
+                stats.pending_count += 1
+                stats.pending_ms += elapsed_ms
+            self._pending += 1
+            due = self._pending >= HOOK_STATS_FLUSH_SIZE
+
+        self._ensure_worker()
+        if due:
+            self.wake()
+
+    def snapshot(self, hook_id: int) -> Dict[str, Any]:
+        """Statistics gathered by this process for one hook"""
+        with self._lock:
+            stats = self._stats.get(hook_id)
+            if stats is None:
+                return {
+                    "execution_count": 0,
+                    "error_count": 0,
+                    "mean_ms": 0.0,
+                    "p95_ms": 0.0,
+                    "last_executed": None,
+                }
+            samples = sorted(stats.samples)
+            return {
+                "execution_count": stats.count,
+                "error_count": stats.errors,
+                "mean_ms": (
+                    round(stats.total_ms / stats.count, 2) if stats.count else 0.0
+                ),
+                "p95_ms": round(samples[math.ceil(len(samples) * 0.95) - 1], 2)
+                if samples
+                else 0.0,
+                "last_executed": stats.last_executed,
+            }
+
+    def flush(self) -> int:
+        """Write pending deltas; returns the number of hooks updated"""
+        with self._lock:
+            taken = {
+                hook_id: (
+                    stats.plugin_id,
+                    stats.pending_count,
+                    stats.pending_ms,
+                    stats.pending_errors,
+                    stats.last_executed,
+                )
+                for hook_id, stats in self._stats.items()
+                if stats.pending_count or stats.pending_errors
+            }
+            for hook_id in taken:
+                stats = self._stats[hook_id]
+                stats.pending_count = stats.pending_ms = stats.pending_errors = 0
+            self._pending = 0
+
+        try:
+            if taken:
+                self._write(taken)
+        except Exception as e:
+            logger.error(f"Failed to flush plugin hook statistics: {str(e)}")
+            with self._lock:
+                for hook_id, (_, count, total_ms, errors, _) in taken.items():
+                    stats = self._stats[hook_id]
+                    stats.pending_count += count
+                    stats.pending_ms += total_ms
+                    stats.pending_errors += errors
+                    self._pending += count + errors
+            return 0
+
+        return len(taken)
+
+    def _write(self, taken: Dict[int, tuple]) -> None:
+        hooks = PluginHook.__table__
+        count = func.coalesce(hooks.c.execution_count, 0)
+        average = func.coalesce(hooks.c.average_execution_time, 0)
+        # Merge the batch into the stored mean: (mean * n + sum) / (n + k)
+        hook_update = (
+            update(hooks)
+            .where(hooks.c.id == bindparam("b_id"))
+            .values(
+                execution_count=count + bindparam("b_count"),
+                average_execution_time=cast(
+                    (average * count + bindparam("b_total_ms"))
+                    / (count + bindparam("b_count")),
+                    Integer,
+                ),
+                last_executed=bindparam("b_last"),
+            )
+        )
+        plugins = Plugin.__table__
+        plugin_update = (
+            update(plugins)
+            .where(plugins.c.id == bindparam("b_id"))
+            .values(
+                error_count=func.coalesce(plugins.c.error_count, 0)
+                + bindparam("b_errors")
+            )
+        )
+
+        hook_rows = [
+            {"b_id": hook_id, "b_count": count, "b_total_ms": total_ms, "b_last": last}
+            for hook_id, (_, count, total_ms, _, last) in taken.items()
+            if count
+        ]
+        plugin_errors: Dict[int, int] = {}
+        for plugin_id, _, _, errors, _ in taken.values():
+            if errors:
+                plugin_errors[plugin_id] = plugin_errors.get(plugin_id, 0) + errors
+
+        db = self._session()
+        try:
+            if hook_rows:
+                db.execute(hook_update, hook_rows)
+            if plugin_errors:
+                db.execute(
+                    plugin_update,
+                    [{"b_id": pid, "b_errors": n} for pid, n in plugin_errors.items()],
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+hook_stats = HookStatsRecorder()
+atexit.register(hook_stats.close)
+
 
 class PluginInterface(ABC):
     """Base interface that all plugins must implement"""
@@ -76,9 +314,8 @@ class PluginManager:
         self.db = db
         self.loaded_plugins: Dict[int, Any] = {}
         self.plugin_classes: Dict[int, Type] = {}
-        self.hooks: Dict[str, List[Tuple[int, str, int]]] = (
-            {}
-        )  # hook_name -> [(plugin_id, method, priority)]
+        self.bindings: Dict[int, List[HookBinding]] = {}  # plugin_id -> bindings
+        self.dispatch: Mapping[str, Tuple[HookBinding, ...]] = MappingProxyType({})
         self.lock = threading.RLock()
 
     def load_plugin(self, plugin_id: int) -> bool:
@@ -211,82 +448,122 @@ class PluginManager:
         return False
 
     def execute_hook(self, hook_name: str, *args, **kwargs) -> List[Any]:
-        """Execute all registered hooks for a given hook name"""
+        """Execute all registered hooks for a given hook name
+
+        Bindings run in priority order. ``thread`` hooks are bounded by their
+        timeout and ``background`` hooks are dispatched without waiting, so
+        neither contributes to the returned results when it does not finish.
+        """
         results = []
+        for binding in self.dispatch.get(hook_name, ()):
+            if binding.mode == "background":
+                self._run_in_background(hook_name, binding, args, kwargs)
+                continue
+
+            start_time = time.perf_counter()
+            try:
+                if binding.mode == "thread":
+                    future = _hook_executor.submit(binding.callback, *args, **kwargs)
+                    result = future.result(timeout=binding.timeout)
+                else:
+                    result = binding.callback(*args, **kwargs)
+            except Exception as e:
+                self._hook_failed(hook_name, binding, e, start_time)
+                continue
+
+            hook_stats.record(binding, _elapsed_ms(start_time))
+            results.append(result)
 
-        if hook_name not in self.hooks:
-            return results
+        return results
 
-        # Sort hooks by priority (lower number = higher priority)
-        sorted_hooks = sorted(self.hooks[hook_name], key=lambda x: x[2])
+    async def execute_hook_async(self, hook_name: str, *args, **kwargs) -> List[Any]:
+        """Execute hooks without blocking the event loop
+
+        Coroutine callbacks are awaited; plain callbacks run on the hook
+        thread pool. Every binding is bounded by its timeout.
+        """
+        results = []
+        loop = asyncio.get_running_loop()
+        for binding in self.dispatch.get(hook_name, ()):
+            if binding.mode == "background":
+                self._run_in_background(hook_name, binding, args, kwargs)
+                continue
 
-        for plugin_id, method_name, priority in sorted_hooks:
+            start_time = time.perf_counter()
             try:
-                if plugin_id not in self.loaded_plugins:
-                    continue
-
-                plugin_instance = self.loaded_plugins[plugin_id]
-                if not hasattr(plugin_instance, method_name):
-                    continue
-
-                start_time = time.time()
-                method = getattr(plugin_instance, method_name)
-                result = method(*args, **kwargs)
-                execution_time = int((time.time() - start_time) * 1000)
-
-                results.append(result)
-
-                # Update hook statistics
-                hook = (
-                    self.db.query(PluginHook)
-                    .filter(
-                        and_(
-                            PluginHook.plugin_id == plugin_id,
-                            PluginHook.hook_name == hook_name,
-                            PluginHook.callback_method == method_name,
-                        )
+                if inspect.iscoroutinefunction(binding.callback):
+                    pending = binding.callback(*args, **kwargs)
+                else:
+                    pending = loop.run_in_executor(
+                        _hook_executor,
+                        functools.partial(binding.callback, *args, **kwargs),
                     )
-                    .first()
-                )
+                result = await asyncio.wait_for(pending, timeout=binding.timeout)
+            except Exception as e:
+                self._hook_failed(hook_name, binding, e, start_time)
+                continue
 
-                if hook:
-                    hook.execution_count += 1
-                    hook.last_executed = datetime.now(timezone.utc)
-                    # Update average execution time
-                    if hook.average_execution_time == 0:
-                        hook.average_execution_time = execution_time
-                    else:
-                        hook.average_execution_time = int(
-                            (hook.average_execution_time + execution_time) / 2
-                        )
-                    self.db.commit()
+            hook_stats.record(binding, _elapsed_ms(start_time))
+            results.append(result)
 
-                self._log_plugin_event(
-                    plugin_id,
-                    "DEBUG",
-                    f"Hook {hook_name} executed successfully",
-                    context={"execution_time": execution_time, "hook_name": hook_name},
-                )
+        return results
 
-            except Exception as e:
-                logger.error(
-                    f"Hook execution failed for plugin {plugin_id}, hook {hook_name}: {str(e)}"
-                )
-                self._log_plugin_event(
-                    plugin_id,
-                    "ERROR",
-                    f"Hook {hook_name} execution failed: {str(e)}",
-                    traceback.format_exc(),
-                    hook_name=hook_name,
+    def get_hook_stats(self, hook_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Execution count, mean and p95 (ms) of the registered hook bindings"""
+        return [
+            {
+                "hook_id": binding.hook_id,
+                "hook_name": name,
+                "plugin_id": binding.plugin_id,
+                "callback_method": binding.method_name,
+                "execution_mode": binding.mode,
+                **hook_stats.snapshot(binding.hook_id),
+            }
+            for name, bindings in self.dispatch.items()
+            if hook_name is None or name == hook_name
+            for binding in bindings
+        ]
+
+    def _run_in_background(
+        self, hook_name: str, binding: HookBinding, args: tuple, kwargs: dict
+    ) -> None:
+        start_time = time.perf_counter()
+
+        def done(future: Future) -> None:
+            error = future.exception()
+            if error is not None:
+                self._hook_failed(
+                    hook_name, binding, error, start_time, log_event=False
                 )
+            else:
+                hook_stats.record(binding, _elapsed_ms(start_time))
 
-                # Update error count
-                plugin = self.db.query(Plugin).filter(Plugin.id == plugin_id).first()
-                if plugin:
-                    plugin.error_count += 1
-                    self.db.commit()
+        _hook_executor.submit(binding.callback, *args, **kwargs).add_done_callback(done)
 
-        return results
+    def _hook_failed(
+        self,
+        hook_name: str,
+        binding: HookBinding,
+        error: BaseException,
+        start_time: float,
+        log_event: bool = True,
+    ) -> None:
+        if isinstance(error, TimeoutError):
+            message = f"Hook {hook_name} timed out after {binding.timeout}s"
+        else:
+            message = f"Hook {hook_name} execution failed: {str(error)}"
+        logger.error(f"{message} (plugin {binding.plugin_id})")
+        hook_stats.record(binding, _elapsed_ms(start_time), failed=True)
+
+        # Background hooks finish on a pool thread that must not touch the session
+        if log_event:
+            self._log_plugin_event(
+                binding.plugin_id,
+                "ERROR",
+                message,
+                "".join(traceback.format_exception(error)),
+                hook_name=hook_name,
+            )
 
     def get_plugin_instance(self, plugin_id: int) -> Optional[Any]:
         """Get loaded plugin instance by ID"""
@@ -360,31 +637,69 @@ class PluginManager:
         hooks = (
             self.db.query(PluginHook)
             .filter(
-                and_(PluginHook.plugin_id == plugin_id, PluginHook.is_active is True)
+                and_(PluginHook.plugin_id == plugin_id, PluginHook.is_active.is_(True))
             )
             .all()
         )
 
+        plugin_instance = self.loaded_plugins[plugin_id]
+        bindings = []
         for hook in hooks:
-            if hook.hook_name not in self.hooks:
-                self.hooks[hook.hook_name] = []
-
-            self.hooks[hook.hook_name].append(
-                (plugin_id, hook.callback_method, hook.priority)
+            callback = getattr(plugin_instance, hook.callback_method, None)
+            if not callable(callback):
+                logger.warning(
+                    f"Plugin {plugin_id} has no method {hook.callback_method} "
+                    f"for hook {hook.hook_name}"
+                )
+                continue
+
+            options = hook.conditions or {}
+            mode = options.get("execution_mode", "inline")
+            if mode not in HOOK_EXECUTION_MODES:
+                logger.warning(f"Unknown execution mode {mode} for hook {hook.id}")
+                mode = "inline"
+            timeout_ms = options.get("timeout_ms", HOOK_DEFAULT_TIMEOUT_MS)
+
+            bindings.append(
+                HookBinding(
+                    hook_id=hook.id,
+                    hook_name=hook.hook_name,
+                    plugin_id=plugin_id,
+                    method_name=hook.callback_method,
+                    priority=hook.priority if hook.priority is not None else 100,
+                    callback=callback,
+                    mode=mode,
+                    timeout=timeout_ms / 1000 if timeout_ms else None,
+                )
             )
 
+        self.bindings[plugin_id] = bindings
+        self._rebuild_dispatch()
+
     def _unregister_plugin_hooks(self, plugin_id: int):
         """Unregister all hooks for a plugin"""
-        for hook_name in list(self.hooks.keys()):
-            self.hooks[hook_name] = [
-                (pid, method, priority)
-                for pid, method, priority in self.hooks[hook_name]
-                if pid != plugin_id
-            ]
-
-            # Remove empty hook lists
-            if not self.hooks[hook_name]:
-                del self.hooks[hook_name]
+        if self.bindings.pop(plugin_id, None) is not None:
+            self._rebuild_dispatch()
+
+    def _rebuild_dispatch(self):
+        """Publish a new priority-sorted dispatch table
+
+        The table is replaced, never mutated, so ``execute_hook`` reads it
+        without taking the lock.
+        """
+        table: Dict[str, List[HookBinding]] = {}
+        for bindings in self.bindings.values():
+            for binding in bindings:
+                table.setdefault(binding.hook_name, []).append(binding)
+
+        self.dispatch = MappingProxyType(
+            {
+                hook_name: tuple(
+                    sorted(entries, key=lambda b: (b.priority, b.plugin_id, b.hook_id))
+                )
+                for hook_name, entries in table.items()
+            }
+        )
 
     def _log_plugin_event(
         self,
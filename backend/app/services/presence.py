@@ -0,0 +1,170 @@
+"""
+Presence Tracker
+
+Write-coalescing store for "last seen" timestamps.
+
+Authentication paths record presence (a device seen on a MAC-auth request,
+a customer logging in, a RADIUS session starting or stopping) in a
+process-local buffer instead of committing a row per request. Repeated
+touches of the same row collapse to the latest value, and a background
+thread writes the buffer every ``presence_flush_seconds`` with one
+executemany ``UPDATE`` per table, so stored timestamps are at most about one
+interval stale. A flush starts early once ``presence_max_pending`` rows are
+waiting, and whatever is left is flushed when the process exits.
+
+Updates never move a timestamp backwards, so processes flushing the same row
+in any order converge on the latest value. A flush that fails is retried with
+the next one, except for rows the database rejects on their own, which are
+logged and dropped.
+"""
+
+import atexit
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Table, bindparam, func, or_, update
+
+from app.core.config import settings
+from app.models.customer.base import Customer
+from app.models.networking.device import Device
+from app.models.networking.radius import CustomerOnline
+from app.services.write_behind import WriteBehind
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PresenceTarget:
+    """Table and columns written for one kind of presence"""
+
+    table: Table
+    key: str  # Column the row is matched on
+    timestamp: str  # Column holding the last-seen time
+    fields: Tuple[str, ...] = ()  # Columns updated alongside when given
+
+    def statement(self):
+        table = self.table
+        seen = table.c[self.timestamp]
+        return (
+            update(table)
+            .where(
+                table.c[self.key] == bindparam("p_key"),
+                or_(seen.is_(None), seen < bindparam("p_at", type_=seen.type)),
+            )
+            .values(
+                {
+                    self.timestamp: bindparam("p_at", type_=seen.type),
+                    **{
+                        name: func.coalesce(
+                            bindparam(f"p_{name}", type_=table.c[name].type),
+                            table.c[name],
+                        )
+                        for name in self.fields
+                    },
+                }
+            )
+        )
+
+
+PRESENCE_TARGETS: Dict[str, PresenceTarget] = {
+    "device": PresenceTarget(
+        Device.__table__,
+        "id",
+        "last_seen",
+        ("last_ip_address", "last_nas_identifier", "last_nas_port"),
+    ),
+    "customer": PresenceTarget(Customer.__table__, "id", "last_online"),
+    "customer_online": PresenceTarget(
+        CustomerOnline.__table__, "customer_id", "last_update"
+    ),
+}
+
+
+class PresenceTracker(WriteBehind):
+    """Buffers presence timestamps and writes them in periodic bulk updates"""
+
+    thread_name = "presence-flush"
+
+    def __init__(
+        self,
+        session_factory=None,
+        flush_interval: float = settings.presence_flush_seconds,
+        max_pending: int = settings.presence_max_pending,
+    ):
+        super().__init__(session_factory, flush_interval)
+        self.max_pending = max_pending
+        # (kind, key) -> (seen at, extra column values)
+        self._pending: Dict[Tuple[str, Any], Tuple[datetime, Dict[str, Any]]] = {}
+
+    def touch(
+        self, kind: str, key: Any, at: Optional[datetime] = None, **fields
+    ) -> None:
+        """Record that a row was seen; ``fields`` that are None are left as is."""
+        if kind not in PRESENCE_TARGETS:
+            raise ValueError(f"Unknown presence kind: {kind}")
+        at = at or datetime.now(timezone.utc)
+        values = {name: value for name, value in fields.items() if value is not None}
+
+        with self._lock:
+            previous = self._pending.get((kind, key))
+            if previous is not None:
+                previous_at, previous_values = previous
+                if at >= previous_at:
+                    values = {**previous_values, **values}
+                else:
+                    at, values = previous_at, {**values, **previous_values}
+            self._pending[(kind, key)] = (at, values)
+            waiting = len(self._pending)
+
+        self._ensure_worker()
+        if waiting >= self.max_pending:
+            self.wake()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Write every buffered timestamp; return the number of rows sent."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        rows = defaultdict(list)
+        for (kind, key), (at, values) in batch.items():
+            target = PRESENCE_TARGETS[kind]
+            rows[kind].append(
+                {
+                    "p_key": key,
+                    "p_at": at,
+                    **{f"p_{name}": values.get(name) for name in target.fields},
+                }
+            )
+
+        db = self._session()
+        try:
+            for kind, params in rows.items():
+                self._execute_rows(db, PRESENCE_TARGETS[kind].statement(), params)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(
+                f"Presence flush of {len(batch)} rows failed, will retry: {e}"
+            )
+            # Keep anything touched again since; it is at least as recent
+            with self._lock:
+                for pending_key, entry in batch.items():
+                    self._pending.setdefault(pending_key, entry)
+            return 0
+        finally:
+            db.close()
+
+        logger.debug(f"Flushed {len(batch)} presence updates")
+        return len(batch)
+
+
+presence_tracker = PresenceTracker()
+atexit.register(presence_tracker.close)
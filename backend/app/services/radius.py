@@ -13,12 +13,13 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..core.exceptions import DuplicateError, NotFoundError, ValidationError
-from ..models.networking.radius import CustomerOnline, CustomerStatistics, RadiusSession
+from ..models.networking.radius import CustomerStatistics, RadiusSession
 from ..repositories.radius import (
-    CustomerOnlineRepository,
     CustomerStatisticsRepository,
     RadiusSessionRepository,
 )
+from .fup_engine import fup_meter
+from .live_sessions import LiveSession, live_sessions
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,8 @@ class RadiusSessionService:
     def __init__(self, db: Session):
         self.db = db
         self.repo = RadiusSessionRepository(db)
-        self.online_repo = CustomerOnlineRepository(db)
+        self.live_sessions = live_sessions
+        self.live_sessions.load(db)
 
     def start_session(self, session_data: Dict[str, Any]) -> RadiusSession:
         """Start a new RADIUS session"""
@@ -55,7 +57,7 @@ class RadiusSessionService:
             raise DuplicateError("RADIUS session creation failed due to data conflict")
 
     def _add_to_online(self, session: RadiusSession):
-        """Add customer to online status"""
+        """Add customer to the live session table"""
         online_data = {
             "customer_id": session.customer_id,
             "service_id": session.service_id,
@@ -79,11 +81,8 @@ class RadiusSessionService:
             "session_id": session.session_id,
         }
 
-        # Remove existing online record for this customer
-        self.online_repo.remove_customer(session.customer_id)
-
-        # Add new online record
-        self.online_repo.create(online_data)
+        # Replaces any existing online record for this customer
+        self.live_sessions.start(online_data)
 
     def stop_session(
         self, session_id: str, end_time: Optional[datetime] = None
@@ -92,7 +91,7 @@ class RadiusSessionService:
         success = self.repo.stop_session(session_id, end_time)
         if success:
             # Remove from online customers
-            self.online_repo.remove_by_session_id(session_id)
+            self.live_sessions.stop(session_id)
             logger.info(f"Stopped RADIUS session: {session_id}")
         return success
 
@@ -100,15 +99,22 @@ class RadiusSessionService:
         self, session_id: str, in_bytes: int, out_bytes: int, time_on: int
     ) -> Optional[RadiusSession]:
         """Update session usage statistics"""
+        live = self.live_sessions.get(session_id)
+        previous = (live.in_bytes, live.out_bytes) if live is not None else None
+
         session = self.repo.update_session_usage(
             session_id, in_bytes, out_bytes, time_on
         )
 
         if session:
             # Update online customer data
-            self.online_repo.update_session_data(
-                session_id, in_bytes, out_bytes, time_on
-            )
+            self.live_sessions.update(session_id, in_bytes, out_bytes, time_on)
+            if previous is not None:
+                fup_meter.record(
+                    live.service_id,
+                    (in_bytes or 0) - previous[0],
+                    (out_bytes or 0) - previous[1],
+                )
             logger.debug(f"Updated session usage: {session_id}")
 
         return session
@@ -151,62 +157,51 @@ class RadiusSessionService:
 
 
 class CustomerOnlineService:
-    """Service for customer online status management"""
+    """Service for customer online status, served from the live session table"""
 
     def __init__(self, db: Session):
         self.db = db
-        self.repo = CustomerOnlineRepository(db)
+        self.live_sessions = live_sessions
+        self.live_sessions.load(db)
 
-    def get_online_customers(self) -> List[CustomerOnline]:
+    def get_online_customers(self) -> List[LiveSession]:
         """Get all currently online customers"""
-        return self.repo.get_all_online()
+        return self.live_sessions.all()
 
     def get_online_count(self) -> int:
         """Get count of online customers"""
-        return self.repo.get_online_count()
+        return self.live_sessions.count()
 
-    def get_customer_online_status(self, customer_id: int) -> Optional[CustomerOnline]:
+    def get_customer_online_status(self, customer_id: int) -> Optional[LiveSession]:
         """Get online status for a specific customer"""
-        return self.repo.get_by_customer(customer_id)
+        return self.live_sessions.get_by_customer(customer_id)
 
     def is_customer_online(self, customer_id: int) -> bool:
         """Check if customer is currently online"""
-        return self.repo.get_by_customer(customer_id) is not None
+        return self.live_sessions.get_by_customer(customer_id) is not None
 
-    def get_by_ip(self, ip_address: str) -> Optional[CustomerOnline]:
+    def get_by_ip(self, ip_address: str) -> Optional[LiveSession]:
         """Get online customer by IP address"""
-        return self.repo.get_by_ip(ip_address)
+        return self.live_sessions.get_by_ip(ip_address)
 
-    def get_by_login(self, login: str) -> Optional[CustomerOnline]:
+    def get_by_login(self, login: str) -> Optional[LiveSession]:
         """Get online customer by login"""
-        return self.repo.get_by_login(login)
+        return self.live_sessions.get_by_login(login)
+
+    def get_by_nas(self, nas_id: int) -> List[LiveSession]:
+        """Get customers online on a NAS"""
+        return self.live_sessions.get_by_nas(nas_id)
 
     def disconnect_customer(self, customer_id: int) -> bool:
         """Disconnect a customer (remove from online status)"""
-        success = self.repo.remove_customer(customer_id)
+        success = self.live_sessions.remove_customer(customer_id)
         if success:
             logger.info(f"Disconnected customer: {customer_id}")
         return success
 
     def get_online_summary(self) -> Dict[str, Any]:
         """Get online customers summary"""
-        online_customers = self.get_online_customers()
-
-        total_data = sum(c.total_bytes for c in online_customers)
-        total_time = sum(c.time_on for c in online_customers if c.time_on)
-
-        return {
-            "total_online": len(online_customers),
-            "total_data_gb": round(total_data / (1024**3), 2) if total_data else 0,
-            "total_session_time_hours": (
-                round(total_time / 3600, 2) if total_time else 0
-            ),
-            "average_session_duration_minutes": (
-                round(total_time / len(online_customers) / 60, 2)
-                if online_customers and total_time
-                else 0
-            ),
-        }
+        return self.live_sessions.summary()
 
 
 class CustomerStatisticsService:
@@ -13,18 +13,31 @@ from typing import Any, Dict, List, Optional
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
-from app.models.services import CustomerInternetService as InternetService
-from app.models.services import CustomerService
-from app.models.services import CustomerVoiceService as VoiceService
-from app.models.services import ServiceTemplate as ServicePlan
+from app.models.services import (
+    CustomerInternetService as InternetService,
+    CustomerService,
+    CustomerVoiceService as VoiceService,
+    ServiceTemplate as ServicePlan,
+)
 
 from ..models.customer import Customer
-from ..models.networking.ipam import IPAllocation
-from ..models.networking.radius import CustomerOnline, CustomerStatistics, RadiusSession
+from ..models.foundation.tariff import InternetTariffConfig
+from ..models.networking.ipam import AllocationStatus, IPAllocation
+from ..models.networking.nas_radius import NASDevice
+from ..models.networking.radius import (
+    CustomerOnline,
+    CustomerStatistics,
+    RadiusSession,
+    SessionStatus,
+)
 from ..models.networking.routers import Router
+from ..models.services.enums import ServiceStatus
 from ..repositories.base import BaseRepository
 from ..repositories.service_plan import ServicePlanRepository
 from ..services.customer import CustomerService as CustomerServiceClass
+from ..services.fup_engine import fup_meter
+from ..services.live_sessions import SESSION_FIELDS, live_sessions
+from ..services.presence import presence_tracker
 
 # Create aliases for backward compatibility
 IPv4IP = IPAllocation
@@ -58,6 +71,8 @@ class RadiusServiceIntegration:
         self.ipv4_repo = BaseRepository(IPv4IP, db)
         self.ipv6_repo = BaseRepository(IPv6IP, db)
         self.router_repo = BaseRepository(Router, db)
+        self.live_sessions = live_sessions
+        self.live_sessions.load(db)
 
     def authenticate_customer(
         self, portal_id: str, password: str, nas_ip: str = None
@@ -82,45 +97,39 @@ class RadiusServiceIntegration:
                     "reason": "Invalid portal ID or password",
                 }
 
-            # Check customer status (allow 'active' and 'new' for RADIUS)
-            if customer.status not in ["active", "new"]:
-                logger.warning(f"Customer account inactive for portal ID: {portal_id}")
-                return {
-                    "authenticated": False,
-                    "reason": f"Account status: {customer.status}",
-                }
+            result = self._authorize(customer, portal_id)
+            if result["authenticated"]:
+                logger.info(
+                    f"Authentication successful for portal ID: {portal_id}, "
+                    f"customer: {customer.id}"
+                )
+            return result
 
-            # Get active service plan for customer
-            service_plan = self._get_active_service_plan(customer.id)
-            if not service_plan:
-                logger.warning(f"No active service plan for customer: {customer.id}")
-                return {"authenticated": False, "reason": "No active service plan"}
+        except Exception as e:
+            logger.error(
+                f"Error during authentication for portal ID {portal_id}: {str(e)}"
+            )
+            return {"authenticated": False, "reason": "Authentication system error"}
 
-            # Get service plan attributes for RADIUS
-            radius_attributes = self._get_radius_attributes(service_plan, customer)
+    def resolve_customer(self, portal_id: str) -> Dict[str, Any]:
+        """
+        Resolve the customer and service plan of a portal ID without a password
 
-            # Log successful authentication
-            logger.info(
-                f"Authentication successful for portal ID: {portal_id}, customer: {customer.id}"
-            )
+        Accounting requests carry no password. The NAS only starts accounting
+        for a user it authenticated, so an Acct-Start whose Access-Accept is
+        not at hand is resolved from its User-Name with the same status and
+        service plan checks as authentication.
+        """
+        try:
+            customer = self.customer_service.get_customer_by_portal_id(portal_id)
+            if not customer:
+                logger.warning(f"Unknown portal ID in accounting: {portal_id}")
+                return {"authenticated": False, "reason": "Unknown portal ID"}
 
-            return {
-                "authenticated": True,
-                "customer_id": customer.id,
-                "portal_id": portal_id,
-                "service_plan_id": service_plan.id,
-                "radius_attributes": radius_attributes,
-                "customer_info": {
-                    "name": customer.name,
-                    "email": customer.email,
-                    "status": customer.status,
-                },
-            }
+            return self._authorize(customer, portal_id)
 
         except Exception as e:
-            logger.error(
-                f"Error during authentication for portal ID {portal_id}: {str(e)}"
-            )
+            logger.error(f"Error resolving portal ID {portal_id}: {str(e)}")
             return {"authenticated": False, "reason": "Authentication system error"}
 
     def start_session(
@@ -135,44 +144,83 @@ class RadiusServiceIntegration:
                 return None
 
             customer_id = auth_result["customer_id"]
-            service_plan_id = auth_result["service_plan_id"]
+            portal_id = auth_result.get("portal_id")
+            session_id = session_data.get("session_id")
+            nas_ip = session_data.get("nas_ip")
+
+            # A retransmitted start finds the session recorded the first time
+            existing = (
+                self.db.query(RadiusSession)
+                .filter(RadiusSession.session_id == session_id)
+                .first()
+            )
+            if existing:
+                return existing
+
+            nas_device_id = (
+                self.db.query(NASDevice.id).filter(NASDevice.nas_ip == nas_ip).scalar()
+            )
+            if nas_device_id is None:
+                logger.warning(
+                    f"Cannot start session {session_id}: unknown NAS {nas_ip}"
+                )
+                return None
 
-            # Assign IP address
-            assigned_ip = self._assign_ip_address(customer_id, service_plan_id)
+            service = self._get_active_service(customer_id)
+
+            # The NAS reports the address it assigned; otherwise take one from
+            # the pool
+            framed_ip = session_data.get("framed_ip") or self._assign_ip_address(
+                customer_id, auth_result.get("service_plan_id")
+            )
+            nas_port = session_data.get("nas_port")
+            nas_port_id = str(nas_port) if nas_port is not None else None
+            now = datetime.now(timezone.utc)
 
-            # Create RADIUS session
             session = RadiusSession(
+                session_id=session_id,
+                nas_device_id=nas_device_id,
                 customer_id=customer_id,
-                service_plan_id=service_plan_id,
-                portal_id=auth_result["portal_id"],
-                session_id=session_data.get("session_id"),
-                nas_ip_address=session_data.get("nas_ip"),
-                nas_port=session_data.get("nas_port"),
-                framed_ip_address=assigned_ip,
-                start_time=datetime.now(timezone.utc),
-                status="active",
+                service_id=service.id if service else None,
+                tariff_id=service.tariff_id if service else None,
+                username=portal_id,
+                login=portal_id,
+                nas_id=nas_device_id,
+                nas_ip_address=nas_ip,
+                nas_port_id=nas_port_id,
+                port=nas_port_id,
+                calling_station_id=session_data.get("calling_station_id"),
+                framed_ip_address=framed_ip,
+                ipv4=framed_ip,
+                start_time=now,
+                start_session=now,
+                status=SessionStatus.ACTIVE,
                 bytes_in=0,
                 bytes_out=0,
                 packets_in=0,
                 packets_out=0,
             )
-
-            session = self.radius_session_repo.create(session.__dict__)
-
-            # Update customer online status
-            self._update_customer_online_status(customer_id, session.id, "online")
-
-            # Log session start
-            logger.info(
-                f"RADIUS session started for customer {customer_id}, session ID: {session.id}"
-            )
-
-            return session
+            self.db.add(session)
+            self.db.commit()
 
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error starting RADIUS session: {str(e)}")
             return None
 
+        # Update customer online status
+        self.live_sessions.start(
+            {name: getattr(session, name) for name in SESSION_FIELDS}
+        )
+        self._update_customer_online_status(customer_id, session.id, "online")
+
+        logger.info(
+            f"RADIUS session started for customer {customer_id}, "
+            f"session ID: {session.id}"
+        )
+
+        return session
+
     def stop_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
         """
         Stop a RADIUS session and update usage statistics
@@ -180,7 +228,7 @@ class RadiusServiceIntegration:
         try:
             # Find active session
             session = self.radius_session_repo.get_all(
-                filters={"session_id": session_id, "status": "active"}
+                filters={"session_id": session_id, "status": SessionStatus.ACTIVE}
             )
 
             if not session:
@@ -190,26 +238,29 @@ class RadiusServiceIntegration:
             session = session[0]  # Get first result
 
             # Update session with final statistics
-            session.end_time = datetime.now(timezone.utc)
-            session.status = "stopped"
+            self._meter_usage(session, session_data)
+            session.stop_time = datetime.now(timezone.utc)
+            session.end_session = session.stop_time
+            session.status = SessionStatus.STOPPED
             session.bytes_in = session_data.get("bytes_in", session.bytes_in)
             session.bytes_out = session_data.get("bytes_out", session.bytes_out)
             session.packets_in = session_data.get("packets_in", session.packets_in)
             session.packets_out = session_data.get("packets_out", session.packets_out)
-            session.termination_cause = session_data.get(
+            session.disconnect_reason = session_data.get(
                 "termination_cause", "User-Request"
             )
 
             # Calculate session duration
-            if session.start_time and session.end_time:
-                duration = session.end_time - session.start_time
-                session.session_duration = int(duration.total_seconds())
+            if session.start_time and session.stop_time:
+                duration = session.stop_time - session.start_time
+                session.time_on = int(duration.total_seconds())
 
             # Update session in database
             self.db.merge(session)
             self.db.commit()
 
             # Update customer online status
+            self.live_sessions.stop(session_id)
             self._update_customer_online_status(
                 session.customer_id, session.id, "offline"
             )
@@ -222,12 +273,14 @@ class RadiusServiceIntegration:
                 self._release_ip_address(session.framed_ip_address)
 
             logger.info(
-                f"RADIUS session stopped for customer {session.customer_id}, session ID: {session.id}"
+                f"RADIUS session stopped for customer {session.customer_id}, "
+                f"session ID: {session.id}"
             )
 
             return True
 
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error stopping RADIUS session {session_id}: {str(e)}")
             return False
 
@@ -237,45 +290,73 @@ class RadiusServiceIntegration:
         """
         Update session accounting data (interim updates)
         """
-        try:
-            # Find active session
-            session = self.radius_session_repo.get_all(
-                filters={"session_id": session_id, "status": "active"}
-            )
-
-            if not session:
-                logger.warning(
-                    f"Active session not found for accounting update: {session_id}"
-                )
-                return False
+        return session_id in self.update_sessions_accounting(
+            {session_id: accounting_data}
+        )
 
-            session = session[0]  # Get first result
+    def update_sessions_accounting(
+        self, updates: Dict[str, Dict[str, Any]]
+    ) -> List[str]:
+        """
+        Apply interim updates for many sessions with one query and one commit
 
-            # Update accounting data
-            session.bytes_in = accounting_data.get("bytes_in", session.bytes_in)
-            session.bytes_out = accounting_data.get("bytes_out", session.bytes_out)
-            session.packets_in = accounting_data.get("packets_in", session.packets_in)
-            session.packets_out = accounting_data.get(
-                "packets_out", session.packets_out
+        ``updates`` maps session IDs to accounting data; returns the IDs of the
+        active sessions that were updated.
+        """
+        if not updates:
+            return []
+        try:
+            sessions = (
+                self.db.query(RadiusSession)
+                .filter(
+                    RadiusSession.session_id.in_(list(updates)),
+                    RadiusSession.status == SessionStatus.ACTIVE,
+                )
+                .all()
             )
-            session.last_update = datetime.now(timezone.utc)
-
-            # Update session in database
-            self.db.merge(session)
+            now = datetime.now(timezone.utc)
+            for session in sessions:
+                accounting_data = updates[session.session_id]
+                self._meter_usage(session, accounting_data)
+                session.bytes_in = accounting_data.get("bytes_in", session.bytes_in)
+                session.bytes_out = accounting_data.get("bytes_out", session.bytes_out)
+                session.packets_in = accounting_data.get(
+                    "packets_in", session.packets_in
+                )
+                session.packets_out = accounting_data.get(
+                    "packets_out", session.packets_out
+                )
+                session.last_update = now
             self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(
+                f"Error updating accounting for {len(updates)} session(s): {str(e)}"
+            )
+            return []
 
-            # Check for usage limits and enforcement
-            self._check_usage_limits(session)
+        updated = [session.session_id for session in sessions]
+        missing = len(updates) - len(updated)
+        if missing:
+            logger.warning(
+                f"Active session not found for {missing} accounting update(s)"
+            )
+        logger.debug(f"Accounting updated for {len(updated)} session(s)")
 
-            logger.debug(f"Accounting updated for session {session_id}")
+        for session in sessions:
+            time_on = (
+                int((now - session.start_time).total_seconds())
+                if session.start_time
+                else 0
+            )
+            self.live_sessions.update(
+                session.session_id, session.bytes_in, session.bytes_out, time_on
+            )
 
-            return True
+        # The updates are committed; a failed limit check does not undo them
+        self._check_usage_limits_many(sessions)
 
-        except Exception as e:
-            logger.error(
-                f"Error updating accounting for session {session_id}: {str(e)}"
-            )
-            return False
+        return updated
 
     def get_customer_sessions(
         self, customer_id: int, active_only: bool = False
@@ -319,6 +400,52 @@ class RadiusServiceIntegration:
 
     # Private helper methods
 
+    def _authorize(self, customer: Customer, portal_id: str) -> Dict[str, Any]:
+        """
+        Check an identified customer's status and service plan for RADIUS
+        """
+        # Check customer status (allow 'active' and 'new' for RADIUS)
+        if customer.status not in ["active", "new"]:
+            logger.warning(f"Customer account inactive for portal ID: {portal_id}")
+            return {
+                "authenticated": False,
+                "reason": f"Account status: {customer.status}",
+            }
+
+        # Get active service plan for customer
+        service_plan = self._get_active_service_plan(customer.id)
+        if not service_plan:
+            logger.warning(f"No active service plan for customer: {customer.id}")
+            return {"authenticated": False, "reason": "No active service plan"}
+
+        return {
+            "authenticated": True,
+            "customer_id": customer.id,
+            "portal_id": portal_id,
+            "service_plan_id": service_plan.id,
+            # Service plan attributes for RADIUS
+            "radius_attributes": self._get_radius_attributes(service_plan, customer),
+            "customer_info": {
+                "name": customer.name,
+                "email": customer.email,
+                "status": customer.status,
+            },
+        }
+
+    def _get_active_service(self, customer_id: int) -> Optional[CustomerService]:
+        """
+        Get the customer's active service, the one a session is metered on
+        """
+        return (
+            self.db.query(CustomerService)
+            .filter(
+                CustomerService.customer_id == customer_id,
+                CustomerService.status == ServiceStatus.ACTIVE,
+            )
+            .order_by(CustomerService.id)
+            .first()
+        )
+
     def _get_active_service_plan(self, customer_id: int) -> Optional[ServicePlan]:
         """
         Get the active service plan for a customer
@@ -426,37 +553,84 @@ class RadiusServiceIntegration:
         except Exception as e:
             logger.error(f"Error generating RADIUS attributes: {str(e)}")
 
+        if customer:
+            self._apply_speed_limit(attributes, customer.id)
+
         return attributes
 
-    def _assign_ip_address(
-        self, customer_id: int, service_plan_id: int
-    ) -> Optional[str]:
+    def _apply_speed_limit(self, attributes: Dict[str, Any], customer_id: int) -> None:
         """
-        Assign an IP address to a customer session
+        Replace the bandwidth attributes with the speed of a limited service
+
+        A service throttled by the FUP engine keeps its reduced speed when
+        the customer logs in again, not only in the session that received
+        the CoA.
         """
         try:
-            # Find available IPv4 address
-            available_ip = (
-                self.db.query(IPv4IP)
+            limited = (
+                self.db.query(
+                    InternetService.current_speed_down_kbps,
+                    InternetService.current_speed_up_kbps,
+                )
+                .join(
+                    CustomerService,
+                    CustomerService.id == InternetService.customer_service_id,
+                )
                 .filter(
-                    and_(IPv4IP.status == "available", IPv4IP.ip_address.isnot(None))
+                    CustomerService.customer_id == customer_id,
+                    CustomerService.status == ServiceStatus.ACTIVE,
+                    InternetService.speed_limited.is_(True),
                 )
                 .first()
             )
+        except Exception as e:
+            logger.error(f"Error reading speed limit for customer {customer_id}: {e}")
+            return
+
+        if limited is None:
+            return
+        speed_down, speed_up = limited
+        if speed_down:
+            attributes["WISPr-Bandwidth-Max-Down"] = speed_down * 1000
+        if speed_up:
+            attributes["WISPr-Bandwidth-Max-Up"] = speed_up * 1000
+        if speed_down and speed_up:
+            attributes["Mikrotik-Rate-Limit"] = f"{speed_up}k/{speed_down}k"
 
-            if available_ip:
-                # Assign IP to customer
-                available_ip.status = "assigned"
-                available_ip.customer_id = customer_id
-                available_ip.assigned_at = datetime.now(timezone.utc)
+    def _assign_ip_address(
+        self, customer_id: int, service_plan_id: int
+    ) -> Optional[str]:
+        """
+        Assign an IP address to a customer session
 
-                self.db.merge(available_ip)
-                self.db.commit()
+        The allocation is committed together with the session it is for.
+        """
+        try:
+            with self.db.begin_nested():
+                # Find available IPv4 address
+                available_ip = (
+                    self.db.query(IPv4IP)
+                    .filter(
+                        and_(
+                            IPv4IP.status == AllocationStatus.AVAILABLE,
+                            IPv4IP.ip_address.isnot(None),
+                        )
+                    )
+                    .with_for_update(skip_locked=True)
+                    .first()
+                )
 
+                if available_ip:
+                    # Assign IP to customer
+                    available_ip.status = AllocationStatus.ALLOCATED
+                    available_ip.customer_id = customer_id
+                    available_ip.lease_start = datetime.now(timezone.utc)
+
+            if available_ip:
                 logger.info(
                     f"Assigned IP {available_ip.ip_address} to customer {customer_id}"
                 )
-                return available_ip.ip_address
+                return str(available_ip.ip_address)
 
             logger.warning(f"No available IP addresses for customer {customer_id}")
             return None
@@ -477,9 +651,9 @@ class RadiusServiceIntegration:
             )
 
             if ip_record:
-                ip_record.status = "available"
+                ip_record.status = AllocationStatus.AVAILABLE
                 ip_record.customer_id = None
-                ip_record.assigned_at = None
+                ip_record.lease_end = datetime.now(timezone.utc)
 
                 self.db.merge(ip_record)
                 self.db.commit()
@@ -490,6 +664,7 @@ class RadiusServiceIntegration:
             return False
 
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error releasing IP address {ip_address}: {str(e)}")
             return False
 
@@ -497,41 +672,14 @@ class RadiusServiceIntegration:
         self, customer_id: int, session_id: int, status: str
     ) -> None:
         """
-        Update customer online status
-        """
-        try:
-            # Check if customer online record exists
-            online_record = (
-                self.db.query(CustomerOnline)
-                .filter(CustomerOnline.customer_id == customer_id)
-                .first()
-            )
-
-            if status == "online":
-                if online_record:
-                    # Update existing record
-                    online_record.session_id = session_id
-                    online_record.last_seen = datetime.now(timezone.utc)
-                    online_record.status = "online"
-                else:
-                    # Create new record
-                    online_record = CustomerOnline(
-                        customer_id=customer_id,
-                        session_id=session_id,
-                        last_seen=datetime.now(timezone.utc),
-                        status="online",
-                    )
-                    self.db.add(online_record)
-
-            elif status == "offline" and online_record:
-                # Update to offline
-                online_record.status = "offline"
-                online_record.last_seen = datetime.now(timezone.utc)
-
-            self.db.commit()
+        Record that a customer was seen online or went offline
 
-        except Exception as e:
-            logger.error(f"Error updating customer online status: {str(e)}")
+        Only the last-seen timestamps are written, in bulk by the presence
+        tracker, so session start and stop do not commit for them.
+        """
+        seen_at = datetime.now(timezone.utc)
+        presence_tracker.touch("customer", customer_id, at=seen_at)
+        presence_tracker.touch("customer_online", customer_id, at=seen_at)
 
     def _update_customer_statistics(self, session: RadiusSession) -> None:
         """
@@ -552,8 +700,6 @@ class RadiusServiceIntegration:
                     total_bytes_in=0,
                     total_bytes_out=0,
                     total_session_time=0,
-                    last_session_start=None,
-                    last_session_end=None,
                 )
                 self.db.add(stats)
 
@@ -561,37 +707,61 @@ class RadiusServiceIntegration:
             stats.total_sessions += 1
             stats.total_bytes_in += session.bytes_in or 0
             stats.total_bytes_out += session.bytes_out or 0
-            stats.total_session_time += session.session_duration or 0
-            stats.last_session_start = session.start_time
-            stats.last_session_end = session.end_time
+            stats.total_session_time += session.time_on or 0
+            stats.start_time = session.start_time
+            stats.end_time = session.stop_time
 
             self.db.commit()
 
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error updating customer statistics: {str(e)}")
 
+    def _meter_usage(
+        self, session: RadiusSession, accounting_data: Dict[str, Any]
+    ) -> None:
+        """Add the traffic since the last accounting update to the FUP meter"""
+        fup_meter.record(
+            session.service_id,
+            (accounting_data.get("bytes_in") or 0) - (session.bytes_in or 0),
+            (accounting_data.get("bytes_out") or 0) - (session.bytes_out or 0),
+        )
+
     def _check_usage_limits(self, session: RadiusSession) -> None:
         """
         Check usage limits and enforce restrictions if necessary
         """
+        self._check_usage_limits_many([session])
+
+    def _check_usage_limits_many(self, sessions: List[RadiusSession]) -> None:
+        """
+        Check usage limits for many sessions, loading the data limits of
+        their services' tariffs in one query
+        """
         try:
-            # Get service plan
-            service_plan = self.service_plan_repo.get(session.service_plan_id)
-            if not service_plan:
+            service_ids = {s.service_id for s in sessions if s.service_id}
+            if not service_ids:
                 return
 
-            # Get internet service details for data limits
-            internet_service = (
-                self.db.query(InternetService)
-                .filter(InternetService.service_plan_id == service_plan.id)
-                .first()
+            # Data limit of the tariff each service is on
+            limits = dict(
+                self.db.query(CustomerService.id, InternetTariffConfig.data_limit_bytes)
+                .join(
+                    InternetTariffConfig,
+                    InternetTariffConfig.tariff_id == CustomerService.tariff_id,
+                )
+                .filter(
+                    CustomerService.id.in_(service_ids),
+                    InternetTariffConfig.data_limit_bytes.isnot(None),
+                )
+                .all()
             )
 
-            if internet_service and internet_service.data_limit:
+            for session in sessions:
+                limit_bytes = limits.get(session.service_id)
+                if not limit_bytes:
+                    continue
                 total_usage = (session.bytes_in or 0) + (session.bytes_out or 0)
-                limit_bytes = (
-                    internet_service.data_limit * 1024 * 1024
-                )  # Convert MB to bytes
 
                 if total_usage >= limit_bytes:
                     logger.warning(
@@ -601,6 +771,7 @@ class RadiusServiceIntegration:
                     # For now, just log the event
 
         except Exception as e:
+            self.db.rollback()
             logger.error(
-                f"Error checking usage limits for session {session.id}: {str(e)}"
+                f"Error checking usage limits for {len(sessions)} session(s): {str(e)}"
             )
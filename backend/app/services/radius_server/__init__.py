@@ -0,0 +1,32 @@
+"""
+Built-in RADIUS Server
+
+Optional asyncio UDP front-end answering NAS devices directly; see
+:mod:`app.services.radius_server.server`. Run it with
+``python -m app.services.radius_server``.
+"""
+
+from .client import send_request
+from .dictionary import RadiusDictionary
+from .handler import RadiusRequestHandler
+from .packet import (
+    RadiusError,
+    RadiusPacket,
+    decode_packet,
+    encode_reply,
+    encode_request,
+)
+from .server import RadiusServer, load_nas_secrets
+
+__all__ = [
+    "RadiusDictionary",
+    "RadiusError",
+    "RadiusPacket",
+    "RadiusRequestHandler",
+    "RadiusServer",
+    "decode_packet",
+    "encode_reply",
+    "encode_request",
+    "load_nas_secrets",
+    "send_request",
+]
@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+import contextlib
+import logging
+
+from .server import RadiusServer
+
+parser = argparse.ArgumentParser(description="Run the built-in RADIUS server")
+parser.add_argument("--host", help="Address to bind (default RADIUS_SERVER_HOST)")
+parser.add_argument(
+    "--auth-port", type=int, help="Authentication port (default RADIUS_AUTH_PORT)"
+)
+parser.add_argument(
+    "--acct-port", type=int, help="Accounting port (default RADIUS_ACCT_PORT)"
+)
+args = parser.parse_args()
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+server = RadiusServer(
+    host=args.host, auth_port=args.auth_port, acct_port=args.acct_port
+)
+with contextlib.suppress(KeyboardInterrupt):
+    asyncio.run(server.serve_forever())
@@ -0,0 +1,76 @@
+"""
+RADIUS Client
+
+Sends a single request over UDP and waits for the matching reply, with
+retransmission. Used for CoA and Disconnect requests to NAS devices
+(RFC 5176, port 3799) and by the benchmark load generator.
+"""
+
+import asyncio
+import random
+from typing import Any, Dict, Mapping, Optional
+
+from .dictionary import RadiusDictionary
+from .packet import RadiusPacket, decode_packet, encode_request
+
+COA_PORT = 3799
+
+
+class _ReplyProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.transport = None
+        self.waiters: Dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        waiter = self.waiters.get(data[1]) if len(data) > 1 else None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(data)
+
+    def error_received(self, exc):
+        for waiter in self.waiters.values():
+            if not waiter.done():
+                waiter.set_exception(exc)
+
+
+async def send_request(
+    host: str,
+    code: int,
+    attributes: Mapping[str, Any],
+    secret: bytes,
+    dictionary: Optional[RadiusDictionary] = None,
+    port: int = COA_PORT,
+    timeout: float = 3.0,
+    retries: int = 2,
+) -> RadiusPacket:
+    """Send a request and return the verified reply.
+
+    Raises ``TimeoutError`` when no valid reply arrives after ``retries``
+    retransmissions.
+    """
+    dictionary = dictionary or RadiusDictionary.load()
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        _ReplyProtocol, remote_addr=(host, port)
+    )
+    try:
+        identifier = random.randrange(256)
+        data, authenticator = encode_request(
+            code, identifier, attributes, secret, dictionary
+        )
+        for _ in range(retries + 1):
+            waiter = loop.create_future()
+            protocol.waiters[identifier] = waiter
+            transport.sendto(data)
+            try:
+                raw = await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                continue
+            return decode_packet(
+                raw, secret, dictionary, request_authenticator=authenticator
+            )
+        raise TimeoutError(f"No RADIUS reply from {host}:{port}")
+    finally:
+        transport.close()
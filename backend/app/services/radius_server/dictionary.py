@@ -0,0 +1,173 @@
+"""
+RADIUS Dictionary
+
+Attribute definitions in FreeRADIUS dictionary format, parsed once into
+lookup tables by name and by (vendor, code).
+
+The built-in dictionary covers the RFC 2865/2866/5176 attributes the server
+reads and writes, plus the vendor attributes produced by
+``RadiusServiceIntegration._get_radius_attributes``. Sites can add their own
+definitions with ``RADIUS_DICTIONARY_PATH``; the supported directives are
+``ATTRIBUTE``, ``VALUE``, ``VENDOR`` and ``BEGIN-VENDOR`` / ``END-VENDOR``.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+DEFAULT_DICTIONARY = """
+ATTRIBUTE   User-Name               1   string
+ATTRIBUTE   User-Password           2   string  encrypt=1
+ATTRIBUTE   NAS-IP-Address          4   ipaddr
+ATTRIBUTE   NAS-Port                5   integer
+ATTRIBUTE   Service-Type            6   integer
+ATTRIBUTE   Framed-Protocol         7   integer
+ATTRIBUTE   Framed-IP-Address       8   ipaddr
+ATTRIBUTE   Reply-Message           18  string
+ATTRIBUTE   State                   24  octets
+ATTRIBUTE   Class                   25  octets
+ATTRIBUTE   Vendor-Specific         26  octets
+ATTRIBUTE   Session-Timeout         27  integer
+ATTRIBUTE   Idle-Timeout            28  integer
+ATTRIBUTE   Called-Station-Id       30  string
+ATTRIBUTE   Calling-Station-Id      31  string
+ATTRIBUTE   NAS-Identifier          32  string
+ATTRIBUTE   Acct-Status-Type        40  integer
+ATTRIBUTE   Acct-Delay-Time         41  integer
+ATTRIBUTE   Acct-Input-Octets       42  integer
+ATTRIBUTE   Acct-Output-Octets      43  integer
+ATTRIBUTE   Acct-Session-Id         44  string
+ATTRIBUTE   Acct-Session-Time       46  integer
+ATTRIBUTE   Acct-Input-Packets      47  integer
+ATTRIBUTE   Acct-Output-Packets     48  integer
+ATTRIBUTE   Acct-Terminate-Cause    49  integer
+ATTRIBUTE   Acct-Input-Gigawords    52  integer
+ATTRIBUTE   Acct-Output-Gigawords   53  integer
+ATTRIBUTE   Event-Timestamp         55  date
+ATTRIBUTE   NAS-Port-Type           61  integer
+ATTRIBUTE   NAS-Port-Id             87  string
+ATTRIBUTE   Message-Authenticator   80  octets
+ATTRIBUTE   Error-Cause             101 integer
+
+VALUE   Service-Type        Login-User          1
+VALUE   Service-Type        Framed-User         2
+VALUE   Framed-Protocol     PPP                 1
+VALUE   Acct-Status-Type    Start               1
+VALUE   Acct-Status-Type    Stop                2
+VALUE   Acct-Status-Type    Interim-Update      3
+VALUE   Acct-Status-Type    Accounting-On       7
+VALUE   Acct-Status-Type    Accounting-Off      8
+VALUE   Acct-Terminate-Cause    User-Request        1
+VALUE   Acct-Terminate-Cause    Lost-Carrier        2
+VALUE   Acct-Terminate-Cause    Lost-Service        3
+VALUE   Acct-Terminate-Cause    Idle-Timeout        4
+VALUE   Acct-Terminate-Cause    Session-Timeout     5
+VALUE   Acct-Terminate-Cause    Admin-Reset         6
+VALUE   Acct-Terminate-Cause    Admin-Reboot        7
+VALUE   Acct-Terminate-Cause    Port-Error          8
+VALUE   Acct-Terminate-Cause    NAS-Error           9
+VALUE   Acct-Terminate-Cause    NAS-Request         10
+VALUE   Acct-Terminate-Cause    NAS-Reboot          11
+VALUE   Acct-Terminate-Cause    Port-Unneeded       12
+VALUE   Acct-Terminate-Cause    Port-Preempted      13
+VALUE   Acct-Terminate-Cause    Port-Suspended      14
+VALUE   Acct-Terminate-Cause    Service-Unavailable 15
+VALUE   Acct-Terminate-Cause    Callback            16
+VALUE   Acct-Terminate-Cause    User-Error          17
+VALUE   Acct-Terminate-Cause    Host-Request        18
+
+VENDOR  WISPr       14122
+VENDOR  ChilliSpot  14559
+VENDOR  Mikrotik    14988
+
+BEGIN-VENDOR WISPr
+ATTRIBUTE   WISPr-Bandwidth-Max-Up      7   integer
+ATTRIBUTE   WISPr-Bandwidth-Max-Down    8   integer
+END-VENDOR WISPr
+
+BEGIN-VENDOR ChilliSpot
+ATTRIBUTE   ChilliSpot-Max-Total-Octets 3   integer
+END-VENDOR ChilliSpot
+
+BEGIN-VENDOR Mikrotik
+ATTRIBUTE   Mikrotik-Rate-Limit         8   string
+END-VENDOR Mikrotik
+"""
+
+ATTRIBUTE_TYPES = {"string", "octets", "integer", "ipaddr", "date"}
+
+
+@dataclass
+class AttributeDef:
+    """One attribute definition"""
+
+    name: str
+    code: int
+    type: str
+    vendor: int = 0
+    encrypt: int = 0
+    values: Dict[str, int] = field(default_factory=dict)
+    names: Dict[int, str] = field(default_factory=dict)
+
+
+class RadiusDictionary:
+    """Attribute definitions by name and by (vendor id, attribute code)"""
+
+    def __init__(self):
+        self.vendors: Dict[str, int] = {}
+        self.by_name: Dict[str, AttributeDef] = {}
+        self.by_key: Dict[Tuple[int, int], AttributeDef] = {}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "RadiusDictionary":
+        """Build the built-in dictionary, extended by the file at ``path``."""
+        dictionary = cls()
+        dictionary.parse(DEFAULT_DICTIONARY)
+        if path:
+            with open(path, encoding="utf-8") as f:
+                dictionary.parse(f.read())
+        return dictionary
+
+    def parse(self, text: str) -> None:
+        vendor = 0
+        for number, raw in enumerate(text.splitlines(), start=1):
+            line = raw.split("#", 1)[0].split()
+            if not line:
+                continue
+            keyword, args = line[0].upper(), line[1:]
+            try:
+                if keyword == "VENDOR":
+                    self.vendors[args[0]] = int(args[1], 0)
+                elif keyword == "BEGIN-VENDOR":
+                    vendor = self.vendors[args[0]]
+                elif keyword == "END-VENDOR":
+                    vendor = 0
+                elif keyword == "ATTRIBUTE":
+                    self._add_attribute(args, vendor)
+                elif keyword == "VALUE":
+                    attribute = self.by_name[args[0]]
+                    value = int(args[2], 0)
+                    attribute.values[args[1]] = value
+                    attribute.names[value] = args[1]
+            except (IndexError, KeyError, ValueError) as e:
+                raise ValueError(
+                    f"Invalid dictionary line {number}: {raw.strip()!r}"
+                ) from e
+
+    def _add_attribute(self, args, vendor: int) -> None:
+        name, code, type_ = args[0], int(args[1], 0), args[2].lower()
+        if type_ not in ATTRIBUTE_TYPES:
+            raise ValueError(f"Unsupported attribute type {type_}")
+        encrypt = 0
+        for option in args[3:]:
+            for flag in option.split(","):
+                if flag.startswith("encrypt="):
+                    encrypt = int(flag.split("=", 1)[1])
+        attribute = AttributeDef(name, code, type_, vendor, encrypt)
+        self.by_name[name] = attribute
+        self.by_key[(vendor, code)] = attribute
+
+    def get(self, name: str) -> Optional[AttributeDef]:
+        return self.by_name.get(name)
+
+    def lookup(self, vendor: int, code: int) -> Optional[AttributeDef]:
+        return self.by_key.get((vendor, code))
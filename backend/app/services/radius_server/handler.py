@@ -0,0 +1,203 @@
+"""
+RADIUS Request Handler
+
+Turns decoded Access-Request and Accounting-Request packets into calls on
+:class:`RadiusServiceIntegration`, one database session per batch.
+
+Interim-Updates in a batch are coalesced per session (counters only grow, so
+the last one wins) and applied with a single query and commit. Accounting
+packets carry no password, so Acct-Start reuses the result of the
+Access-Accept for the same User-Name, kept for ``auth_cache_seconds``; when
+that has expired, or another process answered the Access-Request, the
+customer is resolved from the User-Name instead. An Acct-Start that could
+not be recorded is not answered, so the NAS retransmits it.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..radius_integration import RadiusServiceIntegration
+from .packet import (
+    ACCESS_ACCEPT,
+    ACCESS_REJECT,
+    ACCESS_REQUEST,
+    ACCOUNTING_REQUEST,
+    ACCOUNTING_RESPONSE,
+    RadiusPacket,
+)
+
+logger = logging.getLogger(__name__)
+
+Reply = Tuple[int, Dict[str, Any]]
+
+
+def _octets(packet: RadiusPacket, direction: str) -> int:
+    return (packet.get(f"Acct-{direction}-Gigawords", 0) << 32) + packet.get(
+        f"Acct-{direction}-Octets", 0
+    )
+
+
+def accounting_data(packet: RadiusPacket) -> Dict[str, Any]:
+    """Accounting counters in the shape RadiusServiceIntegration expects."""
+    return {
+        "bytes_in": _octets(packet, "Input"),
+        "bytes_out": _octets(packet, "Output"),
+        "packets_in": packet.get("Acct-Input-Packets", 0),
+        "packets_out": packet.get("Acct-Output-Packets", 0),
+    }
+
+
+class RadiusRequestHandler:
+    """Processes batches of RADIUS requests against the service integration"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        auth_cache_seconds: float = 300.0,
+        auth_cache_size: int = 100_000,
+    ):
+        self.session_factory = session_factory
+        self.auth_cache_seconds = auth_cache_seconds
+        self.auth_cache_size = auth_cache_size
+        # User-Name -> (expires_at, auth_result), oldest first; shared by the
+        # auth and accounting workers
+        self._auth_lock = threading.Lock()
+        self._auth_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+
+    def handle_batch(
+        self, packets: List[Tuple[RadiusPacket, str]]
+    ) -> List[Optional[Reply]]:
+        """Process ``(packet, client_ip)`` pairs; return a reply per packet.
+
+        A ``None`` reply means the packet is dropped (unsupported code, or
+        an Acct-Start that was not recorded); if the batch fails as a whole
+        the exception propagates and nothing is answered, so the NAS
+        retransmits.
+        """
+        replies: List[Optional[Reply]] = [None] * len(packets)
+        interims: Dict[str, Dict[str, Any]] = {}
+        db = self._session()
+        try:
+            integration = RadiusServiceIntegration(db)
+            for index, (packet, client_ip) in enumerate(packets):
+                if packet.code == ACCESS_REQUEST:
+                    replies[index] = self._authenticate(integration, packet, client_ip)
+                elif packet.code == ACCOUNTING_REQUEST:
+                    status = packet.get("Acct-Status-Type")
+                    session_id = packet.get("Acct-Session-Id")
+                    if status == "Interim-Update" and session_id:
+                        interims[session_id] = accounting_data(packet)
+                    elif status == "Start" and session_id:
+                        if not self._start(integration, packet, client_ip):
+                            continue
+                    elif status == "Stop" and session_id:
+                        self._stop(integration, packet)
+                    replies[index] = (ACCOUNTING_RESPONSE, {})
+
+            # After starts and stops, so a session started in this batch is
+            # found and one stopped in it is left alone
+            if interims:
+                integration.update_sessions_accounting(interims)
+        finally:
+            db.close()
+        return replies
+
+    def _session(self) -> Session:
+        if self.session_factory is None:
+            from app.core.database import SessionLocal
+
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def _authenticate(
+        self,
+        integration: RadiusServiceIntegration,
+        packet: RadiusPacket,
+        client_ip: str,
+    ) -> Reply:
+        username = packet.get("User-Name")
+        password = packet.get("User-Password")
+        if not username or password is None:
+            return ACCESS_REJECT, {"Reply-Message": "Missing credentials"}
+
+        result = integration.authenticate_customer(
+            portal_id=username,
+            password=password,
+            nas_ip=packet.get("NAS-IP-Address", client_ip),
+        )
+        if not result.get("authenticated"):
+            return ACCESS_REJECT, {"Reply-Message": result.get("reason", "Rejected")}
+
+        self._remember(username, result)
+        # Attributes without a dictionary entry (ISP-*) are not sent
+        return ACCESS_ACCEPT, result.get("radius_attributes", {})
+
+    def _start(
+        self,
+        integration: RadiusServiceIntegration,
+        packet: RadiusPacket,
+        client_ip: str,
+    ) -> bool:
+        """Record an Acct-Start; return False if it was not recorded."""
+        username = packet.get("User-Name")
+        if not username:
+            return False
+        auth_result = self._recall(username)
+        if auth_result is None:
+            auth_result = integration.resolve_customer(username)
+            if not auth_result.get("authenticated"):
+                logger.warning(
+                    f"Acct-Start for {username} not recorded: "
+                    f"{auth_result.get('reason')}"
+                )
+                return False
+        session = integration.start_session(
+            auth_result,
+            {
+                "session_id": packet.get("Acct-Session-Id"),
+                "nas_ip": packet.get("NAS-IP-Address", client_ip),
+                "nas_port": packet.get("NAS-Port"),
+                "framed_ip": packet.get("Framed-IP-Address"),
+                "calling_station_id": packet.get("Calling-Station-Id"),
+            },
+        )
+        return session is not None
+
+    def _stop(
+        self, integration: RadiusServiceIntegration, packet: RadiusPacket
+    ) -> None:
+        data = accounting_data(packet)
+        data["termination_cause"] = str(
+            packet.get("Acct-Terminate-Cause", "User-Request")
+        )
+        integration.stop_session(packet.get("Acct-Session-Id"), data)
+
+    def _remember(self, username: str, auth_result: Dict[str, Any]) -> None:
+        with self._auth_lock:
+            self._auth_cache.pop(username, None)
+            self._auth_cache[username] = (
+                time.monotonic() + self.auth_cache_seconds,
+                auth_result,
+            )
+            while len(self._auth_cache) > self.auth_cache_size:
+                self._auth_cache.popitem(last=False)
+
+    def _recall(self, username: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not username:
+            return None
+        with self._auth_lock:
+            entry = self._auth_cache.get(username)
+            if entry is None:
+                return None
+            expires_at, auth_result = entry
+            if expires_at < time.monotonic():
+                del self._auth_cache[username]
+                return None
+            return auth_result
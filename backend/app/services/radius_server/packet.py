@@ -0,0 +1,329 @@
+"""
+RADIUS Packet Codec
+
+Encoding and decoding of RADIUS packets (RFC 2865, 2866 and 5176) against a
+:class:`RadiusDictionary`, including User-Password hiding, request and
+response authenticators and Message-Authenticator (RFC 3579).
+
+Decoded attributes are keyed by dictionary name with a list of values per
+attribute; integers with ``VALUE`` names decode to the name. Attributes
+missing from the dictionary are kept as raw bytes under ``Attr-<code>`` or
+``Vendor-<id>-Attr-<code>``.
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import os
+import struct
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .dictionary import AttributeDef, RadiusDictionary
+
+ACCESS_REQUEST = 1
+ACCESS_ACCEPT = 2
+ACCESS_REJECT = 3
+ACCOUNTING_REQUEST = 4
+ACCOUNTING_RESPONSE = 5
+DISCONNECT_REQUEST = 40
+DISCONNECT_ACK = 41
+DISCONNECT_NAK = 42
+COA_REQUEST = 43
+COA_ACK = 44
+COA_NAK = 45
+
+HEADER_LENGTH = 20
+MAX_PACKET_LENGTH = 4096
+VENDOR_SPECIFIC = 26
+MESSAGE_AUTHENTICATOR = 80
+
+# Requests whose authenticator is a digest of the packet rather than random
+_SIGNED_REQUESTS = {ACCOUNTING_REQUEST, DISCONNECT_REQUEST, COA_REQUEST}
+_ZERO_AUTHENTICATOR = bytes(16)
+
+
+class RadiusError(ValueError):
+    """Malformed packet, or one that fails authentication"""
+
+
+@dataclass
+class RadiusPacket:
+    """A decoded RADIUS packet"""
+
+    code: int
+    identifier: int
+    authenticator: bytes
+    attributes: Dict[str, List[Any]] = field(default_factory=dict)
+    has_message_authenticator: bool = False
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """First value of an attribute."""
+        values = self.attributes.get(name)
+        return values[0] if values else default
+
+
+def _md5(*parts: bytes) -> bytes:
+    return hashlib.md5(b"".join(parts)).digest()
+
+
+def _message_authenticator(secret: bytes, packet: bytes) -> bytes:
+    return hmac.new(secret, packet, hashlib.md5).digest()
+
+
+def hide_password(password: bytes, secret: bytes, authenticator: bytes) -> bytes:
+    """User-Password hiding from RFC 2865, section 5.2."""
+    padded = password + bytes(-len(password) % 16 or (0 if password else 16))
+    hidden, previous = b"", authenticator
+    for start in range(0, len(padded), 16):
+        key = _md5(secret, previous)
+        previous = bytes(
+            a ^ b for a, b in zip(padded[start : start + 16], key, strict=True)
+        )
+        hidden += previous
+    return hidden
+
+
+def reveal_password(hidden: bytes, secret: bytes, authenticator: bytes) -> bytes:
+    if not hidden or len(hidden) % 16:
+        raise RadiusError("Invalid User-Password length")
+    password, previous = b"", authenticator
+    for start in range(0, len(hidden), 16):
+        chunk = hidden[start : start + 16]
+        password += bytes(
+            a ^ b for a, b in zip(chunk, _md5(secret, previous), strict=True)
+        )
+        previous = chunk
+    return password.rstrip(b"\0")
+
+
+def _decode_value(
+    definition: AttributeDef, value: bytes, secret: bytes, authenticator: bytes
+) -> Any:
+    if definition.encrypt == 1:
+        value = reveal_password(value, secret, authenticator)
+    if definition.type == "string":
+        return value.decode("utf-8", errors="replace")
+    if definition.type in ("integer", "date"):
+        if len(value) != 4:
+            raise RadiusError(f"Invalid {definition.name} length")
+        number = int.from_bytes(value, "big")
+        return definition.names.get(number, number)
+    if definition.type == "ipaddr":
+        if len(value) != 4:
+            raise RadiusError(f"Invalid {definition.name} length")
+        return str(ipaddress.IPv4Address(value))
+    return value
+
+
+def _encode_value(
+    definition: AttributeDef, value: Any, secret: bytes, authenticator: bytes
+) -> bytes:
+    if definition.type in ("integer", "date"):
+        if isinstance(value, str) and value in definition.values:
+            value = definition.values[value]
+        payload = int(value).to_bytes(4, "big")
+    elif definition.type == "ipaddr":
+        payload = ipaddress.IPv4Address(value).packed
+    elif isinstance(value, bytes):
+        payload = value
+    else:
+        payload = str(value).encode("utf-8")
+    if definition.encrypt == 1:
+        payload = hide_password(payload, secret, authenticator)
+    return payload
+
+
+def encode_attributes(
+    attributes: Mapping[str, Any],
+    dictionary: RadiusDictionary,
+    secret: bytes = b"",
+    authenticator: bytes = _ZERO_AUTHENTICATOR,
+) -> Tuple[bytes, List[str]]:
+    """Encode attributes; return the bytes and names that could not be encoded.
+
+    Attributes missing from the dictionary, or whose value does not fit its
+    type (e.g. an integer over 32 bits), are skipped.
+    """
+    encoded, skipped = [], []
+    for name, value in attributes.items():
+        definition = dictionary.get(name)
+        if definition is None:
+            skipped.append(name)
+            continue
+        try:
+            payloads = [
+                _encode_value(definition, item, secret, authenticator)
+                for item in (value if isinstance(value, list | tuple) else [value])
+            ]
+        except (ValueError, OverflowError, TypeError):
+            skipped.append(name)
+            continue
+        for payload in payloads:
+            if definition.vendor:
+                if len(payload) > 247:
+                    skipped.append(name)
+                    continue
+                vsa = struct.pack(
+                    "!IBB", definition.vendor, definition.code, len(payload) + 2
+                )
+                encoded.append(
+                    bytes([VENDOR_SPECIFIC, len(vsa) + len(payload) + 2])
+                    + vsa
+                    + payload
+                )
+            else:
+                if len(payload) > 253:
+                    skipped.append(name)
+                    continue
+                encoded.append(bytes([definition.code, len(payload) + 2]) + payload)
+    return b"".join(encoded), skipped
+
+
+def decode_packet(
+    data: bytes,
+    secret: bytes,
+    dictionary: RadiusDictionary,
+    request_authenticator: Optional[bytes] = None,
+) -> RadiusPacket:
+    """Decode and authenticate a packet.
+
+    Requests are checked against their own authenticator; replies are
+    checked against ``request_authenticator`` of the request they answer.
+    Raises :class:`RadiusError` for malformed or forged packets.
+    """
+    if len(data) < HEADER_LENGTH:
+        raise RadiusError("Packet shorter than the RADIUS header")
+    code, identifier, length = struct.unpack("!BBH", data[:4])
+    if length < HEADER_LENGTH or length > len(data) or length > MAX_PACKET_LENGTH:
+        raise RadiusError(f"Invalid packet length {length}")
+    data = data[:length]
+    authenticator = data[4:HEADER_LENGTH]
+
+    if request_authenticator is not None:
+        expected = _md5(data[:4], request_authenticator, data[HEADER_LENGTH:], secret)
+        if not hmac.compare_digest(expected, authenticator):
+            raise RadiusError("Invalid response authenticator")
+    elif code in _SIGNED_REQUESTS:
+        expected = _md5(data[:4], _ZERO_AUTHENTICATOR, data[HEADER_LENGTH:], secret)
+        if not hmac.compare_digest(expected, authenticator):
+            raise RadiusError("Invalid request authenticator")
+
+    # Values hidden with the request authenticator (User-Password)
+    hiding_authenticator = request_authenticator or authenticator
+    attributes: Dict[str, List[Any]] = defaultdict(list)
+    message_authenticator = None
+    position = HEADER_LENGTH
+    while position < length:
+        if position + 2 > length:
+            raise RadiusError("Truncated attribute")
+        code_, size = data[position], data[position + 1]
+        if size < 2 or position + size > length:
+            raise RadiusError("Invalid attribute length")
+        value = data[position + 2 : position + size]
+        if code_ == MESSAGE_AUTHENTICATOR:
+            message_authenticator = (position + 2, value)
+        if code_ == VENDOR_SPECIFIC and len(value) > 6:
+            vendor = int.from_bytes(value[:4], "big")
+            offset = 4
+            while offset < len(value):
+                if offset + 2 > len(value) or value[offset + 1] < 2:
+                    raise RadiusError("Invalid vendor attribute")
+                sub_code, sub_size = value[offset], value[offset + 1]
+                _store(
+                    attributes,
+                    dictionary,
+                    vendor,
+                    sub_code,
+                    value[offset + 2 : offset + sub_size],
+                    secret,
+                    hiding_authenticator,
+                )
+                offset += sub_size
+        else:
+            _store(
+                attributes, dictionary, 0, code_, value, secret, hiding_authenticator
+            )
+        position += size
+
+    if message_authenticator is not None:
+        offset, value = message_authenticator
+        signed = (
+            data[:4]
+            + (request_authenticator or authenticator)
+            + data[HEADER_LENGTH:offset]
+            + bytes(16)
+            + data[offset + 16 :]
+        )
+        if code in _SIGNED_REQUESTS and request_authenticator is None:
+            signed = data[:4] + _ZERO_AUTHENTICATOR + signed[HEADER_LENGTH:]
+        if len(value) != 16 or not hmac.compare_digest(
+            _message_authenticator(secret, signed), value
+        ):
+            raise RadiusError("Invalid Message-Authenticator")
+
+    return RadiusPacket(
+        code,
+        identifier,
+        authenticator,
+        dict(attributes),
+        message_authenticator is not None,
+    )
+
+
+def _store(attributes, dictionary, vendor, code, value, secret, authenticator) -> None:
+    definition = dictionary.lookup(vendor, code)
+    if definition is None:
+        name = f"Vendor-{vendor}-Attr-{code}" if vendor else f"Attr-{code}"
+        attributes[name].append(value)
+    elif definition.code != MESSAGE_AUTHENTICATOR or vendor:
+        attributes[definition.name].append(
+            _decode_value(definition, value, secret, authenticator)
+        )
+
+
+def encode_reply(
+    request: RadiusPacket,
+    code: int,
+    attributes: Mapping[str, Any],
+    secret: bytes,
+    dictionary: RadiusDictionary,
+) -> bytes:
+    """Encode a reply to ``request``, signed with the response authenticator."""
+    body, _ = encode_attributes(attributes, dictionary, secret, request.authenticator)
+    if request.has_message_authenticator:
+        body += bytes([MESSAGE_AUTHENTICATOR, 18]) + bytes(16)
+    header = struct.pack("!BBH", code, request.identifier, HEADER_LENGTH + len(body))
+    if request.has_message_authenticator:
+        signature = _message_authenticator(
+            secret, header + request.authenticator + body
+        )
+        body = body[:-16] + signature
+    return header + _md5(header, request.authenticator, body, secret) + body
+
+
+def encode_request(
+    code: int,
+    identifier: int,
+    attributes: Mapping[str, Any],
+    secret: bytes,
+    dictionary: RadiusDictionary,
+) -> Tuple[bytes, bytes]:
+    """Encode a request; return the packet and its authenticator.
+
+    Access-Requests get a random authenticator and a Message-Authenticator;
+    accounting, CoA and Disconnect requests are signed per RFC 2866/5176.
+    """
+    if code in _SIGNED_REQUESTS:
+        body, _ = encode_attributes(attributes, dictionary, secret)
+        header = struct.pack("!BBH", code, identifier, HEADER_LENGTH + len(body))
+        authenticator = _md5(header, _ZERO_AUTHENTICATOR, body, secret)
+        return header + authenticator + body, authenticator
+
+    authenticator = os.urandom(16)
+    body, _ = encode_attributes(attributes, dictionary, secret, authenticator)
+    body += bytes([MESSAGE_AUTHENTICATOR, 18]) + bytes(16)
+    header = struct.pack("!BBH", code, identifier, HEADER_LENGTH + len(body))
+    signature = _message_authenticator(secret, header + authenticator + body)
+    return header + authenticator + body[:-16] + signature, authenticator
@@ -0,0 +1,291 @@
+"""
+RADIUS UDP Server
+
+An asyncio front-end that receives Access-Request and Accounting-Request
+packets from NAS devices directly and answers them in-process, without
+FreeRADIUS and the REST round trip in between.
+
+Each port has a queue and a worker. The worker waits ``batch_window_ms``
+after the first packet, takes up to ``batch_max`` queued packets and hands
+them to :class:`RadiusRequestHandler` on a worker thread, so packets arriving
+together share one database session and one commit for their interim
+updates. Retransmissions of a packet still being processed are dropped, and
+those of an answered one get the cached reply.
+
+Client secrets come from the active NAS devices and RADIUS clients in the
+database, with ``RADIUS_DEFAULT_SECRET`` as a fallback; packets from any
+other address are dropped.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ...core.config import settings
+from ...models.networking.nas_radius import NASDevice, RADIUSClient
+from .client import send_request
+from .dictionary import RadiusDictionary
+from .handler import RadiusRequestHandler
+from .packet import (
+    ACCESS_REQUEST,
+    ACCOUNTING_REQUEST,
+    COA_ACK,
+    COA_REQUEST,
+    DISCONNECT_ACK,
+    DISCONNECT_REQUEST,
+    RadiusError,
+    decode_packet,
+    encode_reply,
+)
+
+logger = logging.getLogger(__name__)
+
+# Replies are kept this long to answer NAS retransmissions
+DUPLICATE_WINDOW_SECONDS = 30.0
+# Packets queued per port beyond this are dropped; the NAS retransmits
+QUEUE_LIMIT = 20_000
+
+Address = Tuple[str, int]
+
+
+def load_nas_secrets(db: Session) -> Dict[str, bytes]:
+    """Shared secrets of the active NAS devices and RADIUS clients by IP."""
+    secrets = {}
+    for ip, secret in db.query(
+        RADIUSClient.client_ip, RADIUSClient.shared_secret
+    ).filter(RADIUSClient.is_active.is_(True)):
+        secrets[str(ip).split("/")[0]] = secret.encode()
+    for ip, secret in db.query(NASDevice.nas_ip, NASDevice.radius_secret).filter(
+        NASDevice.is_active.is_(True)
+    ):
+        secrets[str(ip).split("/")[0]] = secret.encode()
+    return secrets
+
+
+class _RadiusProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "RadiusServer", code: int, queue: asyncio.Queue):
+        self.server = server
+        self.code = code
+        self.queue = queue
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Address):
+        self.server.received(data, addr, self)
+
+
+class RadiusServer:
+    """Authentication and accounting listeners sharing one request handler"""
+
+    def __init__(
+        self,
+        handler: Optional[RadiusRequestHandler] = None,
+        dictionary: Optional[RadiusDictionary] = None,
+        host: Optional[str] = None,
+        auth_port: Optional[int] = None,
+        acct_port: Optional[int] = None,
+        secrets: Optional[Dict[str, bytes]] = None,
+        default_secret: Optional[str] = None,
+        batch_window_ms: Optional[float] = None,
+        batch_max: Optional[int] = None,
+    ):
+        self.handler = handler or RadiusRequestHandler()
+        self.dictionary = dictionary or RadiusDictionary.load(
+            settings.radius_dictionary_path
+        )
+        self.host = host or settings.radius_server_host
+        self.auth_port = settings.radius_auth_port if auth_port is None else auth_port
+        self.acct_port = settings.radius_acct_port if acct_port is None else acct_port
+        self.secrets = secrets
+        default_secret = default_secret or settings.radius_default_secret
+        self.default_secret = default_secret.encode() if default_secret else None
+        self.batch_window = (
+            settings.radius_batch_window_ms
+            if batch_window_ms is None
+            else batch_window_ms
+        ) / 1000
+        self.batch_max = batch_max or settings.radius_batch_max
+
+        # (client address, identifier, authenticator) -> (received_at, reply or None)
+        self._recent: "OrderedDict[tuple, Tuple[float, Optional[bytes]]]" = (
+            OrderedDict()
+        )
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="radius")
+        self._protocols: List[_RadiusProtocol] = []
+        self._workers: List[asyncio.Task] = []
+        self.stats = {"received": 0, "replied": 0, "duplicates": 0, "dropped": 0}
+
+    @property
+    def ports(self) -> Dict[str, int]:
+        """Bound ports, useful when started on port 0."""
+        return {
+            "auth": self._protocols[0].transport.get_extra_info("sockname")[1],
+            "acct": self._protocols[1].transport.get_extra_info("sockname")[1],
+        }
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.secrets is None:
+            self.secrets = await loop.run_in_executor(
+                self._executor, self._load_secrets
+            )
+        for code, port in (
+            (ACCESS_REQUEST, self.auth_port),
+            (ACCOUNTING_REQUEST, self.acct_port),
+        ):
+            queue: asyncio.Queue = asyncio.Queue(QUEUE_LIMIT)
+            protocol = _RadiusProtocol(self, code, queue)
+            await loop.create_datagram_endpoint(
+                lambda protocol=protocol: protocol, local_addr=(self.host, port)
+            )
+            self._protocols.append(protocol)
+            self._workers.append(asyncio.create_task(self._worker(protocol)))
+        logger.info(
+            f"RADIUS server listening on {self.host} "
+            f"ports {self.ports['auth']}/{self.ports['acct']} "
+            f"for {len(self.secrets)} clients"
+        )
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for protocol in self._protocols:
+            protocol.transport.close()
+        self._workers, self._protocols = [], []
+        self._executor.shutdown(wait=True)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    def reload_secrets(self) -> None:
+        """Pick up NAS devices added or changed since start."""
+        self.secrets = self._load_secrets()
+
+    def _load_secrets(self) -> Dict[str, bytes]:
+        db = self.handler._session()
+        try:
+            return load_nas_secrets(db)
+        finally:
+            db.close()
+
+    def _secret(self, ip: str) -> Optional[bytes]:
+        return self.secrets.get(ip, self.default_secret)
+
+    def received(self, data: bytes, addr: Address, protocol: _RadiusProtocol) -> None:
+        self.stats["received"] += 1
+        secret = self._secret(addr[0])
+        if secret is None or len(data) < 20:
+            self.stats["dropped"] += 1
+            logger.debug(f"Dropped RADIUS packet from unknown client {addr[0]}")
+            return
+
+        key = (addr, data[1], data[4:20])
+        now = time.monotonic()
+        self._expire(now)
+        if key in self._recent:
+            self.stats["duplicates"] += 1
+            reply = self._recent[key][1]
+            if reply is not None:
+                protocol.transport.sendto(reply, addr)
+            return
+
+        try:
+            packet = decode_packet(data, secret, self.dictionary)
+        except RadiusError as e:
+            self.stats["dropped"] += 1
+            logger.warning(f"Dropped RADIUS packet from {addr[0]}: {e}")
+            return
+        if packet.code != protocol.code:
+            self.stats["dropped"] += 1
+            return
+        try:
+            protocol.queue.put_nowait((packet, addr, secret, key))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return
+        self._recent[key] = (now, None)
+
+    def _expire(self, now: float) -> None:
+        while self._recent:
+            key, (received_at, _) = next(iter(self._recent.items()))
+            if now - received_at < DUPLICATE_WINDOW_SECONDS:
+                break
+            del self._recent[key]
+
+    async def _worker(self, protocol: _RadiusProtocol) -> None:
+        loop = asyncio.get_running_loop()
+        queue = protocol.queue
+        while True:
+            batch = [await queue.get()]
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.batch_max and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                replies = await loop.run_in_executor(
+                    self._executor,
+                    self.handler.handle_batch,
+                    [(packet, addr[0]) for packet, addr, _, _ in batch],
+                )
+            except Exception as e:
+                logger.error(f"RADIUS batch of {len(batch)} failed: {e}")
+                for _, _, _, key in batch:
+                    self._recent.pop(key, None)
+                continue
+
+            for (packet, addr, secret, key), reply in zip(batch, replies, strict=True):
+                if reply is None:
+                    self._recent.pop(key, None)
+                    continue
+                data = encode_reply(packet, reply[0], reply[1], secret, self.dictionary)
+                if key in self._recent:
+                    self._recent[key] = (self._recent[key][0], data)
+                protocol.transport.sendto(data, addr)
+                self.stats["replied"] += 1
+
+    async def disconnect(self, nas_ip: str, attributes: Dict[str, Any]) -> bool:
+        """Send a Disconnect-Request (RFC 5176) to a NAS; True on Disconnect-ACK.
+
+        ``attributes`` identify the session, e.g. ``Acct-Session-Id`` and
+        ``User-Name``.
+        """
+        reply = await send_request(
+            nas_ip,
+            DISCONNECT_REQUEST,
+            attributes,
+            self._client_secret(nas_ip),
+            self.dictionary,
+        )
+        return reply.code == DISCONNECT_ACK
+
+    async def change_of_authorization(
+        self, nas_ip: str, attributes: Dict[str, Any]
+    ) -> bool:
+        """Send a CoA-Request (RFC 5176) to a NAS; True on CoA-ACK."""
+        reply = await send_request(
+            nas_ip,
+            COA_REQUEST,
+            attributes,
+            self._client_secret(nas_ip),
+            self.dictionary,
+        )
+        return reply.code == COA_ACK
+
+    def _client_secret(self, nas_ip: str) -> bytes:
+        secret = self._secret(nas_ip)
+        if secret is None:
+            raise ValueError(f"No RADIUS secret for NAS {nas_ip}")
+        return secret
@@ -6,6 +6,7 @@ Business logic for reseller management in single-tenant ISP Framework.
 
 import logging
 from datetime import datetime, timezone
+from decimal import Decimal
 from typing import List
 
 from passlib.context import CryptContext
@@ -23,11 +24,7 @@ from app.schemas.reseller import (
     ResellerStats,
     ResellerUpdate,
 )
-from app.services.reseller_helpers import (
-    get_customer_last_payment_date,
-    get_customer_monthly_revenue,
-    get_customer_services_count,
-)
+from app.services.reseller_rollups import ResellerRollupService
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +38,7 @@ class ResellerService:
     def __init__(self, db: Session):
         self.db = db
         self.repository = ResellerRepository(db)
+        self.rollups = ResellerRollupService(db)
 
     def create_reseller(self, reseller_data: ResellerCreate) -> ResellerResponse:
         """Create a new reseller"""
@@ -176,15 +174,15 @@ class ResellerService:
         return results
 
     def get_reseller_stats(self, reseller_id: int) -> ResellerStats:
-        """Get comprehensive reseller statistics"""
+        """Get comprehensive reseller statistics from the lifetime rollup"""
         logger.info(f"Retrieving reseller stats: {reseller_id}")
 
         reseller = self.repository.get_by_id(reseller_id)
         if not reseller:
             raise NotFoundError(f"Reseller with ID {reseller_id} not found")
 
-        stats_data = self.repository.get_reseller_stats(reseller_id)
-        return ResellerStats.model_validate(stats_data)
+        lifetime, _ = self.rollups.get_rollups(reseller_id)
+        return self._stats_from_rollup(reseller, lifetime)
 
     def get_reseller_customers(
         self, reseller_id: int, limit: int = 50, offset: int = 0
@@ -196,25 +194,28 @@ class ResellerService:
         if not reseller:
             raise NotFoundError(f"Reseller with ID {reseller_id} not found")
 
-        customers = self.repository.get_reseller_customers(reseller_id, limit, offset)
-
-        results = []
-        for customer in customers:
-            # Get customer service count and revenue (simplified for now)
-            customer_data = {
-                "customer_id": customer.id,
-                "portal_id": customer.portal_id,
-                "name": customer.name,
-                "email": customer.email,
-                "status": customer.status,
-                "services_count": get_customer_services_count(self.db, customer.id),
-                "monthly_revenue": get_customer_monthly_revenue(self.db, customer.id),
-                "last_payment": get_customer_last_payment_date(self.db, customer.id),
-                "created_at": customer.created_at,
-            }
-            results.append(ResellerCustomerSummary.model_validate(customer_data))
+        return self._customer_summaries(reseller_id, limit, offset)
 
-        return results
+    def _customer_summaries(
+        self, reseller_id: int, limit: int, offset: int
+    ) -> List[ResellerCustomerSummary]:
+        rows = self.repository.get_reseller_customer_summaries(
+            reseller_id, limit, offset
+        )
+        return [
+            ResellerCustomerSummary(
+                customer_id=row.Customer.id,
+                portal_id=row.Customer.portal_id,
+                name=row.Customer.name,
+                email=row.Customer.email,
+                status=row.status or "unknown",
+                services_count=row.services_count,
+                monthly_revenue=row.monthly_revenue,
+                last_payment=row.last_payment,
+                created_at=row.Customer.created_at,
+            )
+            for row in rows
+        ]
 
     def get_reseller_commission_report(
         self, reseller_id: int, start_date: datetime, end_date: datetime
@@ -250,32 +251,58 @@ class ResellerService:
         return ResellerCommissionReport.model_validate(report_data)
 
     def get_reseller_dashboard(self, reseller_id: int) -> ResellerDashboard:
-        """Get comprehensive dashboard data for reseller"""
+        """Get dashboard data for reseller
+
+        Counts and commission come from the lifetime and current-month
+        rollups, so the cost does not grow with the reseller's portfolio.
+        """
         logger.info(f"Retrieving reseller dashboard: {reseller_id}")
 
-        # Get reseller info
-        reseller_info = self.get_reseller(reseller_id)
+        reseller = self.repository.get_by_id(reseller_id)
+        if not reseller:
+            raise NotFoundError(f"Reseller with ID {reseller_id} not found")
 
-        # Get stats
-        stats = self.get_reseller_stats(reseller_id)
+        lifetime, month = self.rollups.get_rollups(reseller_id)
 
-        # Get recent customers (last 10)
-        recent_customers = self.get_reseller_customers(reseller_id, limit=10, offset=0)
+        reseller_data = reseller.__dict__.copy()
+        reseller_data["customer_count"] = lifetime.customer_count
 
-        # Get commission summary for current month
+        # Commission summary for the current month
         now = datetime.now(timezone.utc)
         month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        commission_summary = self.get_reseller_commission_report(
-            reseller_id, month_start, now
+        month_revenue = month.total_revenue if month else Decimal("0")
+        commission_summary = ResellerCommissionReport(
+            reseller_id=reseller_id,
+            reseller_name=reseller.name,
+            period_start=month_start,
+            period_end=now,
+            total_customer_payments=month_revenue,
+            commission_rate=reseller.commission_percentage or Decimal("0"),
+            commission_amount=month.commission_amount if month else Decimal("0"),
+            payment_count=month.payment_count if month else 0,
+            customer_count=month.paying_customers if month else 0,
         )
 
         return ResellerDashboard(
-            reseller=reseller_info,
-            stats=stats,
-            recent_customers=recent_customers,
+            reseller=ResellerResponse.model_validate(reseller_data),
+            stats=self._stats_from_rollup(reseller, lifetime),
+            recent_customers=self._customer_summaries(reseller_id, limit=10, offset=0),
             commission_summary=commission_summary,
         )
 
+    @staticmethod
+    def _stats_from_rollup(reseller, lifetime) -> ResellerStats:
+        return ResellerStats(
+            reseller_id=reseller.id,
+            reseller_name=reseller.name,
+            customer_count=lifetime.customer_count,
+            active_customers=lifetime.active_customers,
+            total_revenue=lifetime.total_revenue,
+            commission_earned=lifetime.commission_amount,
+            commission_percentage=reseller.commission_percentage or Decimal("0"),
+            territory=reseller.territory,
+        )
+
     def assign_customer_to_reseller(self, customer_id: int, reseller_id: int) -> bool:
         """Assign a customer to a reseller"""
         logger.info(f"Assigning customer {customer_id} to reseller {reseller_id}")
@@ -0,0 +1,491 @@
+"""
+Reseller Rollup Service
+
+Maintains ``reseller_rollups``: per-reseller, per-month customer and revenue
+counters. Payment and customer-assignment changes are collected per session
+by a ``ChangeCollector`` and folded into the rollups with one upsert when the
+session commits, so the counters commit atomically with the data they count.
+A full ``rebuild`` backfills new resellers and corrects drift from bulk
+statements that bypass the ORM. The listeners are registered by
+``install_reseller_rollups`` at API and worker startup.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.exceptions import NotFoundError
+from app.core.session_changes import ChangeCollector, attribute_value
+from app.models.billing import CustomerBillingAccount, Payment, PaymentStatus
+from app.models.customer import Customer, CustomerStatus
+from app.models.foundation import Reseller, ResellerRollup
+
+logger = logging.getLogger(__name__)
+
+LIFETIME = ""
+ACTIVE_STATUS_CODE = "active"
+ROLLUP_PENDING_KEY = "reseller_rollup_pending"
+
+COUNTER_COLUMNS = (
+    "customers_added",
+    "customers_removed",
+    "active_customers",
+    "payment_count",
+    "paying_customers",
+    "total_revenue",
+    "commission_amount",
+)
+
+CENT = Decimal("0.01")
+
+
+def rollup_period(at: Optional[datetime] = None) -> str:
+    """Monthly rollup period (YYYYMM) for a timestamp"""
+    return (at or datetime.now(timezone.utc)).strftime("%Y%m")
+
+
+def _month_bounds(period: str) -> Tuple[datetime, datetime]:
+    start = datetime.strptime(period, "%Y%m").replace(tzinfo=timezone.utc)
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+class ResellerRollupService:
+    """Read, update and rebuild reseller rollups"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # Reads
+
+    def get_rollups(
+        self, reseller_id: int, period: Optional[str] = None
+    ) -> Tuple[ResellerRollup, Optional[ResellerRollup]]:
+        """Lifetime and monthly rollup for a reseller, backfilling on first use
+
+        The backfill commits, so it runs in a session of its own rather than
+        committing or rolling back the caller's transaction.
+        """
+        period = period or rollup_period()
+        rows = self._read_rollups(reseller_id, period)
+        if LIFETIME not in rows:
+            self._backfill(reseller_id)
+            rows = self._read_rollups(reseller_id, period)
+            if LIFETIME not in rows:
+                raise NotFoundError(f"Reseller with ID {reseller_id} not found")
+        return rows[LIFETIME], rows.get(period)
+
+    def _read_rollups(self, reseller_id: int, period: str) -> Dict[str, ResellerRollup]:
+        return {
+            row.period: row
+            for row in self.db.query(ResellerRollup).filter(
+                ResellerRollup.reseller_id == reseller_id,
+                ResellerRollup.period.in_([LIFETIME, period]),
+            )
+        }
+
+    def _backfill(self, reseller_id: int) -> None:
+        from app.core.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            ResellerRollupService(db).rebuild([reseller_id])
+        finally:
+            db.close()
+
+    # Incremental maintenance
+
+    def apply_changes(self, pending: Dict[str, List[tuple]]) -> int:
+        """Fold collected customer and payment changes into the rollups
+
+        Customer changes count in the month the customer was created (the
+        current month when that is unknown) and payments in the month they
+        were made, matching ``rebuild``.
+        """
+        deltas: Dict[Tuple[int, str], Dict[str, Any]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+
+        def add(
+            reseller_id: int, period: str, column: str, value, lifetime=True
+        ) -> None:
+            deltas[(reseller_id, period)][column] += value
+            if lifetime:
+                deltas[(reseller_id, LIFETIME)][column] += value
+
+        customers = pending.get("customers", [])
+        statuses = pending.get("statuses", [])
+        if customers or statuses:
+            active = self._active_status_ids(
+                {change[2] for change in customers}
+                | {status for change in statuses for status in change[1:]}
+            )
+            for reseller_id, sign, status_id, at in customers:
+                period = rollup_period(at)
+                add(
+                    reseller_id,
+                    period,
+                    "customers_added" if sign > 0 else "customers_removed",
+                    1,
+                )
+                if status_id in active:
+                    add(reseller_id, period, "active_customers", sign)
+            for reseller_id, old_status, new_status, at in statuses:
+                change = (new_status in active) - (old_status in active)
+                if change:
+                    add(reseller_id, rollup_period(at), "active_customers", change)
+
+        payments = pending.get("payments", [])
+        if payments:
+            self._add_payment_deltas(payments, add)
+
+        rows = [
+            {
+                "reseller_id": reseller_id,
+                "period": period,
+                **{column: values.get(column, 0) for column in COUNTER_COLUMNS},
+            }
+            for (reseller_id, period), values in deltas.items()
+            if any(values.values())
+        ]
+        if rows:
+            self.db.execute(self._upsert(), rows)
+        return len(rows)
+
+    def _add_payment_deltas(self, payments: List[tuple], add) -> None:
+        resolved = self._resolve_payment_customers(payments)
+        resellers, rates = self._reseller_rates({p[0] for p in resolved if p[0]})
+
+        net_payments: Dict[Tuple[int, str], int] = defaultdict(int)
+        for customer_id, amount, paid_at, sign in resolved:
+            reseller_id = resellers.get(customer_id)
+            if reseller_id is None:
+                continue
+            period = rollup_period(paid_at)
+            amount = Decimal(str(amount or 0)) * sign
+            rate = Decimal(str(rates.get(reseller_id) or 0))
+            add(reseller_id, period, "payment_count", sign)
+            add(reseller_id, period, "total_revenue", amount)
+            add(
+                reseller_id,
+                period,
+                "commission_amount",
+                (amount * rate / 100).quantize(CENT),
+            )
+            net_payments[(customer_id, period)] += sign
+
+        # A customer starts (or stops) paying in a month when their count of
+        # completed payments there moves away from (or back to) zero
+        counts = self._completed_payment_counts(net_payments)
+        for (customer_id, period), net in net_payments.items():
+            after = counts.get((customer_id, period), 0)
+            change = (after > 0) - (after - net > 0)
+            if change:
+                add(
+                    resellers[customer_id],
+                    period,
+                    "paying_customers",
+                    change,
+                    lifetime=False,
+                )
+
+    def _resolve_payment_customers(self, payments: List[tuple]) -> List[tuple]:
+        """(customer_id, amount, payment_date, sign) for captured payments"""
+        account_ids = {p[1] for p in payments if p[0] is None and p[1] is not None}
+        account_customers = {}
+        if account_ids:
+            account_customers = dict(
+                self.db.query(
+                    CustomerBillingAccount.id, CustomerBillingAccount.customer_id
+                ).filter(CustomerBillingAccount.id.in_(account_ids))
+            )
+        return [
+            (customer_id or account_customers.get(account_id), amount, paid_at, sign)
+            for customer_id, account_id, amount, paid_at, sign in payments
+        ]
+
+    def _reseller_rates(
+        self, customer_ids: Iterable[int]
+    ) -> Tuple[Dict[int, int], Dict[int, Any]]:
+        """Reseller of each customer and each reseller's commission rate"""
+        customer_ids = set(customer_ids)
+        if not customer_ids:
+            return {}, {}
+        resellers = dict(
+            self.db.query(Customer.id, Customer.reseller_id).filter(
+                Customer.id.in_(customer_ids), Customer.reseller_id.isnot(None)
+            )
+        )
+        if not resellers:
+            return {}, {}
+        rates = dict(
+            self.db.query(Reseller.id, Reseller.commission_percentage).filter(
+                Reseller.id.in_(set(resellers.values()))
+            )
+        )
+        return resellers, rates
+
+    def _completed_payment_counts(
+        self, keys: Iterable[Tuple[int, str]]
+    ) -> Dict[Tuple[int, str], int]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        bounds = [_month_bounds(period) for _, period in keys]
+        customer = func.coalesce(
+            Payment.customer_id, CustomerBillingAccount.customer_id
+        )
+        rows = (
+            self.db.query(customer.label("customer_id"), Payment.payment_date)
+            .outerjoin(
+                CustomerBillingAccount,
+                CustomerBillingAccount.id == Payment.billing_account_id,
+            )
+            .filter(
+                Payment.status == PaymentStatus.COMPLETED,
+                customer.in_({customer_id for customer_id, _ in keys}),
+                Payment.payment_date >= min(start for start, _ in bounds),
+                Payment.payment_date < max(end for _, end in bounds),
+            )
+        )
+        counts: Dict[Tuple[int, str], int] = defaultdict(int)
+        for row in rows:
+            counts[(row.customer_id, rollup_period(row.payment_date))] += 1
+        return counts
+
+    def _active_status_ids(self, status_ids: Iterable[Optional[int]]) -> set:
+        status_ids = {status_id for status_id in status_ids if status_id is not None}
+        if not status_ids:
+            return set()
+        return {
+            row[0]
+            for row in self.db.query(CustomerStatus.id).filter(
+                CustomerStatus.id.in_(status_ids),
+                CustomerStatus.code == ACTIVE_STATUS_CODE,
+            )
+        }
+
+    def _upsert(self):
+        dialect = (
+            postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        )
+        stmt = dialect.insert(ResellerRollup)
+        return stmt.on_conflict_do_update(
+            index_elements=["reseller_id", "period"],
+            set_={
+                **{
+                    column: getattr(ResellerRollup, column) + stmt.excluded[column]
+                    for column in COUNTER_COLUMNS
+                },
+                "updated_at": func.now(),
+            },
+        )
+
+    # Full rebuild
+
+    def rebuild(self, reseller_ids: Optional[Iterable[int]] = None) -> int:
+        """Recompute rollups from customers and payments
+
+        Historic commission uses the current commission rate, and removals
+        before the rebuild are not recorded. Every reseller gets a lifetime
+        row, even without customers, so reads never rebuild twice.
+        """
+        try:
+            reseller_query = self.db.query(Reseller.id, Reseller.commission_percentage)
+            if reseller_ids is not None:
+                reseller_query = reseller_query.filter(
+                    Reseller.id.in_(list(reseller_ids))
+                )
+            rates = {
+                row.id: Decimal(str(row.commission_percentage or 0))
+                for row in reseller_query
+            }
+            if not rates:
+                return 0
+
+            rows: Dict[Tuple[int, str], Dict[str, Any]] = defaultdict(
+                lambda: defaultdict(int)
+            )
+            for reseller_id in rates:
+                rows[(reseller_id, LIFETIME)]
+
+            created = self._month(Customer.created_at)
+            for row in (
+                self.db.query(
+                    Customer.reseller_id,
+                    created.label("period"),
+                    func.count(Customer.id).label("customers"),
+                    func.sum(
+                        case((CustomerStatus.code == ACTIVE_STATUS_CODE, 1), else_=0)
+                    ).label("active"),
+                )
+                .outerjoin(CustomerStatus, CustomerStatus.id == Customer.status_id)
+                .filter(Customer.reseller_id.in_(list(rates)))
+                .group_by(Customer.reseller_id, created)
+            ):
+                for period in (LIFETIME, row.period):
+                    rows[(row.reseller_id, period)]["customers_added"] += row.customers
+                    rows[(row.reseller_id, period)]["active_customers"] += (
+                        row.active or 0
+                    )
+
+            paid = self._month(Payment.payment_date)
+            customer = func.coalesce(
+                Payment.customer_id, CustomerBillingAccount.customer_id
+            )
+            for row in (
+                self.db.query(
+                    Customer.reseller_id,
+                    paid.label("period"),
+                    func.count(Payment.id).label("payments"),
+                    func.count(func.distinct(customer)).label("payers"),
+                    func.sum(Payment.amount).label("revenue"),
+                )
+                .select_from(Payment)
+                .outerjoin(
+                    CustomerBillingAccount,
+                    CustomerBillingAccount.id == Payment.billing_account_id,
+                )
+                .join(Customer, Customer.id == customer)
+                .filter(
+                    Payment.status == PaymentStatus.COMPLETED,
+                    Customer.reseller_id.in_(list(rates)),
+                )
+                .group_by(Customer.reseller_id, paid)
+            ):
+                revenue = Decimal(str(row.revenue or 0))
+                commission = (revenue * rates[row.reseller_id] / 100).quantize(CENT)
+                for period in (LIFETIME, row.period):
+                    values = rows[(row.reseller_id, period)]
+                    values["payment_count"] += row.payments
+                    values["total_revenue"] += revenue
+                    values["commission_amount"] += commission
+                rows[(row.reseller_id, row.period)]["paying_customers"] += row.payers
+
+            self.db.query(ResellerRollup).filter(
+                ResellerRollup.reseller_id.in_(list(rates))
+            ).delete(synchronize_session=False)
+            self.db.bulk_insert_mappings(
+                ResellerRollup,
+                [
+                    {
+                        "reseller_id": reseller_id,
+                        "period": period,
+                        **{column: values.get(column, 0) for column in COUNTER_COLUMNS},
+                    }
+                    for (reseller_id, period), values in rows.items()
+                ],
+            )
+            self.db.commit()
+
+            logger.info(f"Rebuilt {len(rows)} rollup rows for {len(rates)} resellers")
+            return len(rows)
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error rebuilding reseller rollups: {str(e)}")
+            raise
+
+    def _month(self, column):
+        if self.db.get_bind().dialect.name == "postgresql":
+            return func.to_char(func.timezone("UTC", column), "YYYYMM")
+        return func.strftime("%Y%m", column)
+
+
+# Session listeners
+
+
+def _capture_customer(session: Session, customer: Customer, operation: str) -> None:
+    """Queue assignment and status changes of a customer
+
+    Like ``rebuild``, monthly customer counters are bucketed by the month the
+    customer was created, so changes carry ``created_at`` as their date.
+    """
+    old_reseller = old_status = new_reseller = new_status = None
+    if operation != "INSERT":
+        old_reseller = attribute_value(customer, "reseller_id", previous=True)
+        old_status = attribute_value(customer, "status_id", previous=True)
+    if operation != "DELETE":
+        new_reseller = attribute_value(customer, "reseller_id", previous=False)
+        new_status = attribute_value(customer, "status_id", previous=False)
+
+    if old_reseller != new_reseller:
+        created_at = attribute_value(customer, "created_at", previous=False)
+        changes = rollup_changes.pending(session)["customers"]
+        if old_reseller is not None:
+            changes.append((old_reseller, -1, old_status, created_at))
+        if new_reseller is not None:
+            changes.append((new_reseller, 1, new_status, created_at))
+    elif new_reseller is not None and old_status != new_status:
+        created_at = attribute_value(customer, "created_at", previous=False)
+        rollup_changes.pending(session)["statuses"].append(
+            (new_reseller, old_status, new_status, created_at)
+        )
+
+
+PAYMENT_FIELDS = ("customer_id", "billing_account_id", "amount", "payment_date")
+
+
+def _capture_payment(session: Session, payment: Payment, operation: str) -> None:
+    before = after = None
+    if operation != "INSERT" and (
+        attribute_value(payment, "status", previous=True) == PaymentStatus.COMPLETED
+    ):
+        before = tuple(
+            attribute_value(payment, key, previous=True) for key in PAYMENT_FIELDS
+        )
+    if operation != "DELETE" and (
+        attribute_value(payment, "status", previous=False) == PaymentStatus.COMPLETED
+    ):
+        after = tuple(
+            attribute_value(payment, key, previous=False) for key in PAYMENT_FIELDS
+        )
+    if before == after:
+        return
+
+    changes = rollup_changes.pending(session)["payments"]
+    if before is not None:
+        changes.append(before + (-1,))
+    if after is not None:
+        changes.append(after + (1,))
+
+
+def _capture(session: Session, obj: Any, operation: str) -> None:
+    """Record assignment and payment changes of a flush"""
+    if isinstance(obj, Customer):
+        _capture_customer(session, obj, operation)
+    elif isinstance(obj, Payment):
+        _capture_payment(session, obj, operation)
+
+
+def _apply(session: Session, pending: Dict[str, List[tuple]]) -> None:
+    """Fold the transaction's changes into the rollups
+
+    Applying once at commit rather than per flush keeps the row lock on a
+    reseller's lifetime rollup as short as possible.
+    """
+    ResellerRollupService(session).apply_changes(pending)
+
+
+rollup_changes = ChangeCollector(
+    ROLLUP_PENDING_KEY,
+    _capture,
+    _apply,
+    empty=lambda: {"customers": [], "statuses": [], "payments": []},
+)
+
+
+def install_reseller_rollups() -> None:
+    """Register the rollup session listeners (idempotent)
+
+    Called at API and worker startup, so changes committed by any code path
+    are counted.
+    """
+    rollup_changes.install()
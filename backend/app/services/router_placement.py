@@ -0,0 +1,395 @@
+"""
+Router Placement Engine
+
+Chooses the router and sector a new customer service is provisioned on.
+Occupancy is kept as counters on ``routers`` and ``router_sectors``; a slot is
+claimed with a conditional UPDATE so concurrent provisioning workers can never
+push a router or sector past its capacity, and each process keeps a heap of
+candidates ordered by load so picking the least loaded one needs no queries.
+"""
+
+import heapq
+import logging
+import threading
+from time import monotonic
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..core.exceptions import ValidationError
+from ..models.networking.routers import Router, RouterSector
+from ..models.services.enums import ServiceStatus
+from ..models.services.instances import CustomerService
+
+logger = logging.getLogger(__name__)
+
+# Routers in these states never receive new services
+UNPLACEABLE_ROUTER_STATUSES = ("disabled", "error")
+
+# Services in these states hold their router/sector slot
+OCCUPYING_SERVICE_STATUSES = (
+    ServiceStatus.ACTIVE,
+    ServiceStatus.SUSPENDED,
+    ServiceStatus.PENDING_UPGRADE,
+    ServiceStatus.PENDING_DOWNGRADE,
+    ServiceStatus.PENDING_RELOCATION,
+)
+
+PLACEMENT_INDEX_TTL_SECONDS = 60
+PLACEMENT_MAX_ATTEMPTS = 5
+
+Candidate = Tuple[int, Optional[int]]
+
+
+def _utilisation(active: int, capacity: Optional[int]) -> Optional[float]:
+    """Fraction of capacity in use; None when full, 0.0 when uncapped"""
+    if capacity is None:
+        return 0.0
+    if active >= capacity:
+        return None
+    return active / capacity
+
+
+def _placeable_router():
+    return or_(
+        Router.status.is_(None), Router.status.notin_(UNPLACEABLE_ROUTER_STATUSES)
+    )
+
+
+def _has_capacity(model):
+    return or_(model.max_services.is_(None), model.active_services < model.max_services)
+
+
+class _PlacementIndex:
+    """Router/sector candidates in a lazily maintained min-heap
+
+    Candidates are ranked by router utilisation, then sector utilisation, then
+    raw counts, so services spread across routers first and across the sectors
+    of the chosen router second. Every counter change pushes fresh entries for
+    the affected candidates; entries whose key no longer matches the counters
+    are stale and are discarded when popped.
+    """
+
+    def __init__(self, rows: List[Tuple[Any, ...]]):
+        self.routers: Dict[int, List[Optional[int]]] = {}
+        self.sectors: Dict[int, List[Optional[int]]] = {}
+        self.sectors_by_router: Dict[int, List[int]] = {}
+        self.closed_sectors: Set[int] = set()
+        self.heap: List[Tuple[Tuple[Any, ...], int, Optional[int]]] = []
+
+        for (
+            router_id,
+            router_active,
+            router_max,
+            sector_id,
+            sector_active,
+            sector_max,
+        ) in rows:
+            self.routers[router_id] = [router_active or 0, router_max]
+            self.sectors_by_router.setdefault(router_id, [])
+            if sector_id is not None:
+                self.sectors[sector_id] = [router_id, sector_active or 0, sector_max]
+                self.sectors_by_router[router_id].append(sector_id)
+
+        for router_id in self.routers:
+            self._push_router(router_id)
+
+    def _key(
+        self, router_id: int, sector_id: Optional[int]
+    ) -> Optional[Tuple[Any, ...]]:
+        router_active, router_max = self.routers[router_id]
+        router_util = _utilisation(router_active, router_max)
+        if router_util is None:
+            return None
+
+        sector_active, sector_util = 0, 0.0
+        if sector_id is not None:
+            if sector_id in self.closed_sectors:
+                return None
+            _, sector_active, sector_max = self.sectors[sector_id]
+            sector_util = _utilisation(sector_active, sector_max)
+            if sector_util is None:
+                return None
+
+        return (
+            router_util,
+            sector_util,
+            router_active,
+            sector_active,
+            router_id,
+            sector_id or 0,
+        )
+
+    def _candidates(self, router_id: int) -> List[Candidate]:
+        sector_ids = self.sectors_by_router.get(router_id)
+        if not sector_ids:
+            return [(router_id, None)]
+        return [(router_id, sector_id) for sector_id in sector_ids]
+
+    def _push_router(self, router_id: int) -> None:
+        for candidate in self._candidates(router_id):
+            key = self._key(*candidate)
+            if key is not None:
+                heapq.heappush(self.heap, (key, *candidate))
+
+    def best(
+        self, router_id: Optional[int] = None, exclude: Set[Candidate] = frozenset()
+    ) -> Optional[Candidate]:
+        """Least loaded candidate with free capacity, optionally on one router"""
+        if router_id is not None:
+            if router_id not in self.routers:
+                return None
+            ranked = [
+                (key, candidate)
+                for candidate in self._candidates(router_id)
+                if candidate not in exclude
+                for key in [self._key(*candidate)]
+                if key is not None
+            ]
+            return min(ranked)[1] if ranked else None
+
+        skipped = []
+        chosen = None
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            key, candidate_router, candidate_sector = entry
+            if candidate_router not in self.routers or (
+                candidate_sector is not None and candidate_sector not in self.sectors
+            ):
+                continue
+            if self._key(candidate_router, candidate_sector) != key:
+                continue  # Stale: a fresher entry was pushed on update
+            skipped.append(entry)
+            if (candidate_router, candidate_sector) not in exclude:
+                chosen = (candidate_router, candidate_sector)
+                break
+
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return chosen
+
+    def update(
+        self,
+        router_id: int,
+        router_active: int,
+        sector_id: Optional[int] = None,
+        sector_active: Optional[int] = None,
+    ) -> None:
+        """Record counters returned by the database and re-rank the router"""
+        if router_id not in self.routers:
+            return
+        self.routers[router_id][0] = router_active
+        if sector_id is not None and sector_id in self.sectors:
+            self.sectors[sector_id][1] = sector_active
+        self._push_router(router_id)
+
+    def drop(self, router_id: int, sector_id: Optional[int] = None) -> None:
+        """Stop offering a router (or one of its sectors) until the next rebuild"""
+        if sector_id is None:
+            self.routers.pop(router_id, None)
+        else:
+            self.closed_sectors.add(sector_id)
+
+
+_placement_index_cache: Dict[str, Any] = {"index": None, "expires_at": 0.0}
+_placement_lock = threading.Lock()
+
+
+def invalidate_placement_cache() -> None:
+    """Drop the cached placement index (e.g. after adding routers or sectors)"""
+    with _placement_lock:
+        _placement_index_cache["index"] = None
+        _placement_index_cache["expires_at"] = 0.0
+
+
+class RouterPlacementEngine:
+    """Claims and releases router/sector slots for customer services
+
+    The in-process heap is only a ranking hint and is rebuilt from the
+    counters every ``PLACEMENT_INDEX_TTL_SECONDS``; capacity is enforced by
+    the database, so a worker with a stale view loses the claim instead of
+    overfilling a sector and simply moves on to the next candidate.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def place(
+        self, router_id: Optional[int] = None, sector_id: Optional[int] = None
+    ) -> Tuple[Router, Optional[RouterSector]]:
+        """Claim a slot on the least loaded (or the requested) router/sector"""
+        if router_id and sector_id:
+            claimed = self.claim(router_id, sector_id)
+            if not claimed:
+                raise ValidationError(
+                    f"Requested sector {sector_id} on router {router_id} "
+                    "is not available"
+                )
+            return claimed
+
+        tried: Set[Candidate] = set()
+        for _ in range(PLACEMENT_MAX_ATTEMPTS):
+            index = self._index()
+            with _placement_lock:
+                candidate = index.best(router_id, tried)
+            if candidate is None:
+                break
+            claimed = self.claim(*candidate)
+            if claimed:
+                return claimed
+            tried.add(candidate)
+
+        if router_id:
+            raise ValidationError(f"Requested router {router_id} is not available")
+        raise ValidationError("No router or sector with free capacity")
+
+    def claim(
+        self, router_id: int, sector_id: Optional[int] = None
+    ) -> Optional[Tuple[Router, Optional[RouterSector]]]:
+        """Atomically take one slot, or return None if either side is full
+
+        The router row is locked before the sector row on every path, so
+        concurrent claims cannot deadlock.
+        """
+        router = self.db.execute(
+            update(Router)
+            .where(Router.id == router_id, _placeable_router(), _has_capacity(Router))
+            .values(active_services=Router.active_services + 1)
+            .returning(Router)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        if router is None:
+            self._forget(router_id)
+            return None
+
+        sector = None
+        if sector_id is not None:
+            sector = self.db.execute(
+                update(RouterSector)
+                .where(
+                    RouterSector.id == sector_id,
+                    RouterSector.router_id == router_id,
+                    _has_capacity(RouterSector),
+                )
+                .values(active_services=RouterSector.active_services + 1)
+                .returning(RouterSector)
+                .execution_options(synchronize_session=False)
+            ).scalar_one_or_none()
+            if sector is None:
+                self._decrement(Router, router_id)
+                self._forget(router_id, sector_id)
+                return None
+
+        self._observe(
+            router.id,
+            router.active_services,
+            sector.id if sector else None,
+            sector.active_services if sector else None,
+        )
+        return router, sector
+
+    def release(
+        self, router_id: Optional[int], sector_id: Optional[int] = None
+    ) -> None:
+        """Give back the slot held by a service that left this router/sector"""
+        if not router_id:
+            return
+        router_active = self._decrement(Router, router_id)
+        sector_active = self._decrement(RouterSector, sector_id) if sector_id else None
+        if router_active is not None:
+            self._observe(router_id, router_active, sector_id, sector_active)
+
+    def recount(self) -> Dict[str, int]:
+        """Rebuild every counter from the customer services that hold a slot
+
+        Corrects drift from services whose status was changed outside the
+        provisioning flow. Returns how many routers and sectors were wrong.
+        """
+        occupying = CustomerService.status.in_(OCCUPYING_SERVICE_STATUSES)
+        router_count = (
+            select(func.count(CustomerService.id))
+            .where(CustomerService.primary_router_id == Router.id, occupying)
+            .scalar_subquery()
+        )
+        sector_count = (
+            select(func.count(CustomerService.id))
+            .where(CustomerService.sector_id == RouterSector.id, occupying)
+            .scalar_subquery()
+        )
+
+        routers_fixed = self.db.execute(
+            update(Router)
+            .where(Router.active_services != router_count)
+            .values(active_services=router_count)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        sectors_fixed = self.db.execute(
+            update(RouterSector)
+            .where(RouterSector.active_services != sector_count)
+            .values(active_services=sector_count)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+        invalidate_placement_cache()
+
+        if routers_fixed or sectors_fixed:
+            logger.warning(
+                f"Placement counters drifted: {routers_fixed} routers, "
+                f"{sectors_fixed} sectors corrected"
+            )
+        return {"routers_fixed": routers_fixed, "sectors_fixed": sectors_fixed}
+
+    def _decrement(self, model, row_id: int) -> Optional[int]:
+        return self.db.execute(
+            update(model)
+            .where(model.id == row_id)
+            .values(active_services=func.greatest(model.active_services - 1, 0))
+            .returning(model.active_services)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+
+    def _index(self) -> _PlacementIndex:
+        """Process-wide candidate heap, rebuilt with one query when expired"""
+        now = monotonic()
+        with _placement_lock:
+            if _placement_index_cache["expires_at"] > now:
+                return _placement_index_cache["index"]
+
+        rows = (
+            self.db.query(
+                Router.id,
+                Router.active_services,
+                Router.max_services,
+                RouterSector.id,
+                RouterSector.active_services,
+                RouterSector.max_services,
+            )
+            .outerjoin(RouterSector, RouterSector.router_id == Router.id)
+            .filter(_placeable_router())
+            .all()
+        )
+        index = _PlacementIndex(rows)
+
+        with _placement_lock:
+            _placement_index_cache["index"] = index
+            _placement_index_cache["expires_at"] = now + PLACEMENT_INDEX_TTL_SECONDS
+        return index
+
+    def _observe(
+        self,
+        router_id: int,
+        router_active: int,
+        sector_id: Optional[int],
+        sector_active: Optional[int],
+    ) -> None:
+        with _placement_lock:
+            index = _placement_index_cache["index"]
+            if index is not None:
+                index.update(router_id, router_active, sector_id, sector_active)
+
+    def _forget(self, router_id: int, sector_id: Optional[int] = None) -> None:
+        with _placement_lock:
+            index = _placement_index_cache["index"]
+            if index is not None:
+                index.drop(router_id, sector_id)
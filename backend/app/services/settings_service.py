@@ -4,16 +4,22 @@ Settings management service for ISP Framework.
 Provides centralized settings management with caching, validation, and secrets handling.
 """
 
+import hashlib
+import ipaddress
 import json
 import os
 import re
+import threading
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
+import redis
 import structlog
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
+from app.core.config import settings as app_settings
 from app.core.database import SessionLocal
 from app.core.observability import log_audit_event
 from app.models.settings import (
@@ -27,44 +33,209 @@ from app.models.settings import (
 
 logger = structlog.get_logger("isp.settings")
 
+# Redis counter bumped on every settings or flag change
+SETTINGS_VERSION_KEY = "isp:settings:version"
+SETTINGS_VERSION_CHECK_SECONDS = 1.0
+SETTINGS_LOCAL_RELOAD_SECONDS = 300  # Snapshot lifetime when Redis is down
+
+
+class CompiledFlag:
+    """A feature flag with its targeting rules parsed for fast evaluation."""
+
+    __slots__ = (
+        "name",
+        "start",
+        "end",
+        "for_all",
+        "user_ids",
+        "networks",
+        "environments",
+        "percentage",
+    )
+
+    def __init__(self, flag: FeatureFlag):
+        self.name = flag.name
+        self.start = flag.rollout_start_date
+        self.end = flag.rollout_end_date
+        self.for_all = bool(flag.enabled_for_all)
+        self.user_ids = frozenset(flag.enabled_user_ids or ())
+        self.environments = frozenset(flag.enabled_environments or ())
+        self.percentage = flag.enabled_percentage or 0
+        self.networks = []
+        for range_str in flag.enabled_ip_ranges or ():
+            try:
+                self.networks.append(ipaddress.ip_network(range_str))
+            except ValueError:
+                logger.warning(
+                    "Ignoring invalid flag IP range", flag=flag.name, ip_range=range_str
+                )
+
+    def evaluate(
+        self,
+        user_id: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        environment: Optional[str] = None,
+    ) -> bool:
+        """Same rules as ``FeatureFlag.is_enabled_for_user``, without parsing."""
+        if self.start or self.end:
+            now = datetime.now(timezone.utc)
+            if self.start and now < self.start:
+                return False
+            if self.end and now > self.end:
+                return False
+
+        if self.for_all:
+            return True
+        if user_id and user_id in self.user_ids:
+            return True
+        if ip_address and self.networks:
+            try:
+                ip = ipaddress.ip_address(ip_address)
+            except ValueError:
+                ip = None
+            if ip is not None and any(ip in network for network in self.networks):
+                return True
+        if environment and environment in self.environments:
+            return True
 
-class SettingsCache:
-    """In-memory cache for settings to avoid database hits."""
+        if self.percentage > 0:
+            # Same bucketing as the model, so rollouts keep their users
+            hash_input = f"{self.name}:{user_id or ip_address or 'anonymous'}"
+            hash_value = int(hashlib.sha256(hash_input.encode()).hexdigest()[:8], 16)
+            return (hash_value % 100) + 1 <= self.percentage
 
-    def __init__(self):
-        self._cache: Dict[str, Any] = {}
-        self._last_refresh = None
-        self._cache_ttl = 300  # 5 minutes
+        return False
 
-    def get(self, key: str) -> Optional[Any]:
-        """Get cached setting value."""
-        if self._is_cache_expired():
-            return None
-        return self._cache.get(key)
 
-    def set(self, key: str, value: Any):
-        """Set cached setting value."""
-        self._cache[key] = value
-        if self._last_refresh is None:
-            self._last_refresh = datetime.now()
+class SettingsStore:
+    """Process-wide snapshot of active settings and compiled feature flags.
 
-    def invalidate(self, key: Optional[str] = None):
-        """Invalidate cache for specific key or all keys."""
-        if key:
-            self._cache.pop(key, None)
-        else:
-            self._cache.clear()
-            self._last_refresh = None
+    Everything is loaded in one pass, so a key missing from the snapshot is
+    a cached miss rather than a query. Writers bump a version counter in
+    Redis; readers compare it at most every ``check_interval`` seconds and
+    reload when it moved, which keeps every worker coherent without a query
+    per lookup. Without Redis the snapshot reloads every ``reload_seconds``.
+    """
 
-    def _is_cache_expired(self) -> bool:
-        """Check if cache has expired."""
-        if self._last_refresh is None:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        check_interval: float = SETTINGS_VERSION_CHECK_SECONDS,
+        reload_seconds: float = SETTINGS_LOCAL_RELOAD_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.check_interval = check_interval
+        self.reload_seconds = reload_seconds
+        self._settings: Dict[str, Any] = {}
+        self._flags: Dict[str, CompiledFlag] = {}
+        self._loaded = False
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._redis = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a setting value from the snapshot."""
+        self.refresh()
+        return self._settings.get(key, default)
+
+    def all(self) -> Dict[str, Any]:
+        self.refresh()
+        return dict(self._settings)
+
+    def is_enabled(
+        self,
+        flag_name: str,
+        user_id: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        environment: Optional[str] = None,
+    ) -> bool:
+        """Evaluate a feature flag; unknown and disabled flags are off."""
+        self.refresh()
+        flag = self._flags.get(flag_name)
+        return flag is not None and flag.evaluate(user_id, ip_address, environment)
+
+    def refresh(self) -> bool:
+        """Reload if another process changed settings; return whether loaded."""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
             return True
-        return (datetime.now() - self._last_refresh).seconds > self._cache_ttl
+        self._checked_at = now
+
+        version = self._read_version()
+        if self._loaded:
+            if version is None and now - self._loaded_at < self.reload_seconds:
+                return True
+            if version is not None and version == self._version:
+                return True
+        try:
+            self.load(version)
+        except Exception as e:
+            logger.warning("Failed to load settings snapshot", error=str(e))
+        return self._loaded
+
+    def load(self, version: Optional[int] = None):
+        """Load every active setting and enabled flag in one pass."""
+        with self._lock:
+            db = self.session_factory()
+            try:
+                settings_rows, flag_rows = self._fetch(db)
+            finally:
+                db.close()
+            self._settings = {row.key: row.get_typed_value() for row in settings_rows}
+            self._flags = {row.name: CompiledFlag(row) for row in flag_rows}
+            self._version = version
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+        logger.debug(
+            "Settings snapshot loaded",
+            settings=len(self._settings),
+            flags=len(self._flags),
+            version=version,
+        )
 
+    @staticmethod
+    def _fetch(db: Session):
+        settings_rows = db.query(Setting).filter(Setting.is_active.is_(True)).all()
+        flag_rows = db.query(FeatureFlag).filter(FeatureFlag.is_enabled.is_(True)).all()
+        return settings_rows, flag_rows
 
-# Global settings cache
-settings_cache = SettingsCache()
+    def invalidate(self, key: Optional[str] = None):
+        """Mark the snapshot stale here and in every other process."""
+        self._loaded = False
+        client = self._client()
+        if client is None:
+            return
+        try:
+            client.incr(SETTINGS_VERSION_KEY)
+        except Exception as e:
+            logger.warning("Failed to publish settings version", key=key, error=str(e))
+
+    def _read_version(self) -> Optional[int]:
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            return int(client.get(SETTINGS_VERSION_KEY) or 0)
+        except Exception as e:
+            logger.debug("Settings version unavailable", error=str(e))
+            return None
+
+    def _client(self):
+        if self._redis is None:
+            try:
+                self._redis = redis.from_url(
+                    app_settings.redis_url, decode_responses=True, socket_timeout=0.5
+                )
+            except Exception as e:
+                logger.warning("Redis unavailable for settings coherence", error=str(e))
+                self._redis = False
+        return self._redis or None
+
+
+# Global settings and feature flag snapshot
+settings_store = SettingsStore()
 
 
 class SettingsService:
@@ -83,24 +254,18 @@ class SettingsService:
 
     def get_setting(self, key: str, default: Any = None, use_cache: bool = True) -> Any:
         """Get a setting value by key."""
-        # Check cache first
-        if use_cache:
-            cached_value = settings_cache.get(key)
-            if cached_value is not None:
-                return cached_value
+        if use_cache and settings_store.refresh():
+            return settings_store.get(key, default)
 
         # Query database
         setting = (
             self.db.query(Setting)
-            .filter(and_(Setting.key == key, Setting.is_active is True))
+            .filter(and_(Setting.key == key, Setting.is_active.is_(True)))
             .first()
         )
 
         if setting:
-            value = setting.get_typed_value()
-            if use_cache:
-                settings_cache.set(key, value)
-            return value
+            return setting.get_typed_value()
 
         return default
 
@@ -156,7 +321,7 @@ class SettingsService:
         self.db.commit()
 
         # Invalidate cache
-        settings_cache.invalidate(key)
+        settings_store.invalidate(key)
 
         # Log audit event
         log_audit_event(
@@ -246,14 +411,14 @@ class SettingsService:
         """Get all settings in a category."""
         return (
             self.db.query(Setting)
-            .filter(and_(Setting.category == category, Setting.is_active is True))
+            .filter(and_(Setting.category == category, Setting.is_active.is_(True)))
             .order_by(Setting.display_order, Setting.key)
             .all()
         )
 
     def get_all_settings(self) -> Dict[str, Any]:
         """Get all settings as a dictionary."""
-        settings = self.db.query(Setting).filter(Setting.is_active is True).all()
+        settings = self.db.query(Setting).filter(Setting.is_active.is_(True)).all()
         return {setting.key: setting.get_typed_value() for setting in settings}
 
     def create_setting(
@@ -291,6 +456,7 @@ class SettingsService:
 
         self.db.add(setting)
         self.db.commit()
+        settings_store.invalidate(key)
 
         log_audit_event(
             domain="settings",
@@ -318,7 +484,7 @@ class SettingsService:
         self.db.commit()
 
         # Invalidate cache
-        settings_cache.invalidate(key)
+        settings_store.invalidate(key)
 
         log_audit_event(
             domain="settings",
@@ -358,6 +524,7 @@ class SettingsService:
 
         if created_count > 0:
             self.db.commit()
+            settings_store.invalidate()
             logger.info("Default settings initialized", count=created_count)
 
         return created_count
@@ -385,16 +552,7 @@ class FeatureFlagService:
         environment: Optional[str] = None,
     ) -> bool:
         """Check if a feature flag is enabled for the given context."""
-        flag = (
-            self.db.query(FeatureFlag)
-            .filter(and_(FeatureFlag.name == flag_name, FeatureFlag.is_enabled is True))
-            .first()
-        )
-
-        if not flag:
-            return False
-
-        return flag.is_enabled_for_user(user_id, ip_address, environment)
+        return settings_store.is_enabled(flag_name, user_id, ip_address, environment)
 
     def create_flag(self, name: str, description: str = None, **kwargs) -> FeatureFlag:
         """Create a new feature flag."""
@@ -405,6 +563,7 @@ class FeatureFlagService:
         flag = FeatureFlag(name=name, description=description, **kwargs)
         self.db.add(flag)
         self.db.commit()
+        settings_store.invalidate(name)
 
         log_audit_event(domain="feature_flags", event="flag_created", flag_name=name)
 
@@ -422,6 +581,7 @@ class FeatureFlagService:
 
         flag.updated_at = datetime.now(timezone.utc)
         self.db.commit()
+        settings_store.invalidate(name)
 
         log_audit_event(
             domain="feature_flags", event="flag_updated", flag_name=name, changes=kwargs
@@ -448,8 +608,10 @@ def get_feature_flag_service() -> FeatureFlagService:
 # Convenience functions
 def get_setting(key: str, default: Any = None) -> Any:
     """Get a setting value (convenience function)."""
+    if settings_store.refresh():
+        return settings_store.get(key, default)
     with get_settings_service() as service:
-        return service.get_setting(key, default)
+        return service.get_setting(key, default, use_cache=False)
 
 
 def is_feature_enabled(
@@ -459,8 +621,7 @@ def is_feature_enabled(
     environment: Optional[str] = None,
 ) -> bool:
     """Check if a feature flag is enabled (convenience function)."""
-    with get_feature_flag_service() as service:
-        return service.is_enabled(flag_name, user_id, ip_address, environment)
+    return settings_store.is_enabled(flag_name, user_id, ip_address, environment)
 
 
 # Settings-based configuration override
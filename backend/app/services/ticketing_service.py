@@ -5,21 +5,30 @@ Business logic for ISP customer support ticket management
 
 import logging
 import secrets
-from datetime import datetime, timedelta
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from time import monotonic
 from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, asc, desc, func, or_
+from sqlalchemy import and_, asc, desc, func, insert, or_, select
 from sqlalchemy.orm import Session
 
 from app.core.database import SessionLocal
 from app.models.auth.base import Administrator
+from app.models.services import (
+    CustomerService as CustomerServiceInstance,
+    ServiceStatus,
+)
 from app.models.ticketing import (
     EscalationReason,
     FieldWorkOrder,
     FieldWorkStatus,
     KnowledgeBaseArticle,
+    NetworkIncident,
     SLAPolicy,
     Ticket,
+    TicketDailyStats,
     TicketEscalation,
     TicketMessage,
     TicketPriority,
@@ -28,10 +37,102 @@ from app.models.ticketing import (
     TicketStatusHistory,
     TicketType,
 )
+from app.repositories.pagination import (
+    KeysetPage,
+    apply_keyset,
+    build_page,
+    estimate_query_count,
+)
 from app.services.webhook_integration_service import WebhookTriggers
 
 logger = logging.getLogger(__name__)
 
+# Sort key encoded in ticket search cursors
+TICKET_CURSOR_KEYS = ("created_at", "id")
+
+OPEN_TICKET_STATUSES = [
+    TicketStatus.NEW,
+    TicketStatus.ASSIGNED,
+    TicketStatus.IN_PROGRESS,
+]
+
+CLOSED_TICKET_STATUSES = [
+    TicketStatus.RESOLVED,
+    TicketStatus.CLOSED,
+    TicketStatus.CANCELLED,
+]
+
+# Text search configuration used by Ticket.search_vector
+TICKET_SEARCH_CONFIG = "english"
+
+# Incident correlation
+CLOSED_INCIDENT_STATUSES = ("resolved", "closed")
+INCIDENT_INDEX_TTL_SECONDS = 30
+# Affected-customer counts at which an incident's aggregated webhook is sent;
+# beyond the last one it repeats every that many customers
+INCIDENT_NOTIFY_MILESTONES = (1, 10, 50, 100, 250, 500, 1000)
+INCIDENT_SEVERITY_PRIORITY = {
+    "critical": TicketPriority.CRITICAL,
+    "high": TicketPriority.URGENT,
+    "medium": TicketPriority.HIGH,
+    "low": TicketPriority.NORMAL,
+}
+
+
+def _like_pattern(text: str) -> str:
+    """Build an escaped ILIKE substring pattern"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _overdue_condition(now: datetime):
+    """Tickets past their first-response or resolution due time"""
+    return or_(
+        and_(Ticket.first_response_due < now, Ticket.first_response_at.is_(None)),
+        and_(Ticket.resolution_due < now, Ticket.resolved_at.is_(None)),
+    )
+
+
+def _ticket_stat_columns(now: datetime) -> List[Any]:
+    """Ticket aggregates computed in a single pass with FILTER clauses
+
+    Labels match the TicketDailyStats columns so the same expressions feed both
+    live statistics and the rollup.
+    """
+    tickets = func.count(Ticket.id)
+    response_seconds = func.extract(
+        "epoch", Ticket.first_response_at - Ticket.created_at
+    )
+    resolution_seconds = func.extract("epoch", Ticket.resolved_at - Ticket.created_at)
+
+    return [
+        tickets.label("tickets_created"),
+        tickets.filter(Ticket.status.in_(OPEN_TICKET_STATUSES)).label("tickets_open"),
+        tickets.filter(_overdue_condition(now)).label("tickets_overdue"),
+        tickets.filter(Ticket.status == TicketStatus.RESOLVED).label(
+            "tickets_resolved"
+        ),
+        tickets.filter(Ticket.sla_policy_id.isnot(None)).label("sla_tracked"),
+        tickets.filter(
+            Ticket.first_response_sla_met.is_(True),
+            Ticket.resolution_sla_met.is_(True),
+        ).label("sla_met"),
+        func.coalesce(func.sum(response_seconds), 0).label("response_seconds_total"),
+        func.count(Ticket.first_response_at).label("response_count"),
+        func.coalesce(func.sum(resolution_seconds), 0).label(
+            "resolution_seconds_total"
+        ),
+        func.count(Ticket.resolved_at).label("resolution_count"),
+        func.coalesce(func.sum(Ticket.customer_satisfaction), 0).label(
+            "satisfaction_total"
+        ),
+        func.count(Ticket.customer_satisfaction).label("satisfaction_count"),
+    ]
+
+
+def _average(total: Any, count: Any, scale: float = 1) -> float:
+    return float(total or 0) / scale / count if count else 0.0
+
 
 class TicketService:
     """Core ticket management service"""
@@ -41,47 +142,27 @@ class TicketService:
         self.webhook_triggers = WebhookTriggers()
 
     def create_ticket(
-        self, ticket_data: Dict[str, Any], created_by: int = None
+        self,
+        ticket_data: Dict[str, Any],
+        created_by: int = None,
+        correlate_incidents: bool = True,
     ) -> Ticket:
-        """Create new support ticket"""
-        try:
-            # Generate unique ticket number
-            ticket_number = self._generate_ticket_number()
-
-            # Create ticket
-            ticket = Ticket(
-                ticket_number=ticket_number,
-                ticket_type=TicketType(ticket_data["ticket_type"]),
-                category=ticket_data.get("category"),
-                subcategory=ticket_data.get("subcategory"),
-                title=ticket_data["title"],
-                description=ticket_data["description"],
-                customer_id=ticket_data.get("customer_id"),
-                service_id=ticket_data.get("service_id"),
-                contact_id=ticket_data.get("contact_id"),
-                priority=TicketPriority(ticket_data.get("priority", "normal")),
-                urgency=ticket_data.get("urgency", 3),
-                impact=ticket_data.get("impact", 3),
-                source=TicketSource(ticket_data.get("source", "customer_portal")),
-                source_reference=ticket_data.get("source_reference"),
-                work_location=ticket_data.get("work_location"),
-                gps_latitude=ticket_data.get("gps_latitude"),
-                gps_longitude=ticket_data.get("gps_longitude"),
-                tags=ticket_data.get("tags", []),
-                custom_fields=ticket_data.get("custom_fields", {}),
-                created_by=created_by,
+        """Create new support ticket
+
+        Customer tickets that match an active network incident are grouped
+        under it by IncidentTicketService instead of being created standalone.
+        """
+        if correlate_incidents and ticket_data.get("customer_id"):
+            result = IncidentTicketService(self.db).ingest_tickets(
+                [ticket_data], created_by
             )
+            return result["tickets"][0]
+
+        try:
+            ticket = self._build_ticket(ticket_data)
 
             # Apply SLA policy
-            sla_policy = self._get_applicable_sla_policy(ticket)
-            if sla_policy:
-                ticket.sla_policy_id = sla_policy.id
-                ticket.first_response_due = self._calculate_sla_due_date(
-                    sla_policy.first_response_time
-                )
-                ticket.resolution_due = self._calculate_resolution_due_date(
-                    ticket.priority, sla_policy
-                )
+            self._apply_sla_policy(ticket, self._get_applicable_sla_policy(ticket))
 
             self.db.add(ticket)
             self.db.commit()
@@ -241,74 +322,71 @@ class TicketService:
             logger.error(f"Error assigning ticket: {str(e)}")
             raise
 
-    def search_tickets(
-        self, filters: Dict[str, Any], page: int = 1, per_page: int = 20
-    ) -> Tuple[List[Ticket], int]:
-        """Search tickets with filters and pagination"""
-        try:
-            query = self.db.query(Ticket)
+    def _build_search_query(self, filters: Dict[str, Any]):
+        """Build the filtered ticket query shared by the search methods"""
+        query = self.db.query(Ticket)
 
-            # Apply filters
-            if filters.get("customer_id"):
-                query = query.filter(Ticket.customer_id == filters["customer_id"])
+        # Apply filters
+        if filters.get("customer_id"):
+            query = query.filter(Ticket.customer_id == filters["customer_id"])
 
-            if filters.get("assigned_to"):
-                query = query.filter(Ticket.assigned_to == filters["assigned_to"])
+        if filters.get("assigned_to"):
+            query = query.filter(Ticket.assigned_to == filters["assigned_to"])
 
-            if filters.get("status"):
-                query = query.filter(Ticket.status == TicketStatus(filters["status"]))
+        if filters.get("status"):
+            query = query.filter(Ticket.status == TicketStatus(filters["status"]))
 
-            if filters.get("priority"):
-                query = query.filter(
-                    Ticket.priority == TicketPriority(filters["priority"])
-                )
+        if filters.get("priority"):
+            query = query.filter(Ticket.priority == TicketPriority(filters["priority"]))
 
-            if filters.get("ticket_type"):
-                query = query.filter(
-                    Ticket.ticket_type == TicketType(filters["ticket_type"])
-                )
+        if filters.get("ticket_type"):
+            query = query.filter(
+                Ticket.ticket_type == TicketType(filters["ticket_type"])
+            )
 
-            if filters.get("category"):
-                query = query.filter(Ticket.category == filters["category"])
+        if filters.get("category"):
+            query = query.filter(Ticket.category == filters["category"])
 
-            if filters.get("overdue"):
-                now = datetime.utcnow()
-                if filters["overdue"]:
-                    query = query.filter(
-                        or_(
-                            and_(
-                                Ticket.first_response_due < now,
-                                Ticket.first_response_at.is_(None),
-                            ),
-                            and_(
-                                Ticket.resolution_due < now,
-                                Ticket.resolved_at.is_(None),
-                            ),
-                        )
-                    )
+        if filters.get("overdue"):
+            query = query.filter(_overdue_condition(datetime.utcnow()))
 
-            if filters.get("created_after"):
-                query = query.filter(Ticket.created_at >= filters["created_after"])
+        if filters.get("created_after"):
+            query = query.filter(Ticket.created_at >= filters["created_after"])
 
-            if filters.get("created_before"):
-                query = query.filter(Ticket.created_at <= filters["created_before"])
+        if filters.get("created_before"):
+            query = query.filter(Ticket.created_at <= filters["created_before"])
 
-            if filters.get("search_text"):
-                search_term = f"%{filters['search_text']}%"
-                query = query.filter(
-                    or_(
-                        Ticket.title.ilike(search_term),
-                        Ticket.description.ilike(search_term),
-                        Ticket.ticket_number.ilike(search_term),
-                    )
+        if filters.get("search_text"):
+            # Words match through the full-text index; substrings of the title
+            # and ticket number through the trigram indexes
+            search_text = filters["search_text"].strip()
+            pattern = _like_pattern(search_text)
+            query = query.filter(
+                or_(
+                    Ticket.search_vector.op("@@")(
+                        func.websearch_to_tsquery(TICKET_SEARCH_CONFIG, search_text)
+                    ),
+                    Ticket.title.ilike(pattern, escape="\\"),
+                    Ticket.ticket_number.ilike(pattern, escape="\\"),
                 )
+            )
+
+        return query
+
+    def search_tickets(
+        self, filters: Dict[str, Any], page: int = 1, per_page: int = 20
+    ) -> Tuple[List[Ticket], int]:
+        """Search tickets with filters and pagination"""
+        try:
+            query = self._build_search_query(filters)
 
             # Get total count
             total = query.count()
 
-            # Apply pagination and ordering
+            # Apply pagination and ordering (id breaks created_at ties so the
+            # order matches search_tickets_page)
             tickets = (
-                query.order_by(desc(Ticket.created_at))
+                query.order_by(desc(Ticket.created_at), desc(Ticket.id))
                 .offset((page - 1) * per_page)
                 .limit(per_page)
                 .all()
@@ -320,8 +398,48 @@ class TicketService:
             logger.error(f"Error searching tickets: {str(e)}")
             raise
 
+    def search_tickets_page(
+        self,
+        filters: Dict[str, Any],
+        cursor: Optional[str] = None,
+        per_page: int = 20,
+        estimate_total: bool = True,
+    ) -> KeysetPage[Ticket]:
+        """Search tickets newest-first using keyset pagination.
+
+        Seeks on (created_at, id) instead of using OFFSET, so deep pages cost
+        the same as the first one. The total is a planner estimate unless
+        ``estimate_total`` is False.
+        """
+        try:
+            query = self._build_search_query(filters)
+            paged = apply_keyset(
+                query,
+                [Ticket.created_at, Ticket.id],
+                cursor,
+                per_page,
+                descending=True,
+            )
+            result = build_page(paged.all(), per_page, TICKET_CURSOR_KEYS)
+
+            result.total_is_estimate = estimate_total
+            if estimate_total:
+                try:
+                    result.total = estimate_query_count(self.db, query)
+                except Exception as e:
+                    logger.warning(f"Falling back to exact ticket count: {e}")
+                    result.total_is_estimate = False
+            if result.total is None:
+                result.total = query.count()
+
+            return result
+
+        except Exception as e:
+            logger.error(f"Error searching tickets: {str(e)}")
+            raise
+
     def get_ticket_statistics(self, filters: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Get ticket statistics"""
+        """Get ticket statistics in a single pass over the filtered tickets"""
         try:
             base_query = self.db.query(Ticket)
 
@@ -336,95 +454,154 @@ class TicketService:
                         Ticket.created_at <= filters["created_before"]
                     )
 
-            total_tickets = base_query.count()
-            open_tickets = base_query.filter(
-                Ticket.status.in_(
-                    [TicketStatus.NEW, TicketStatus.ASSIGNED, TicketStatus.IN_PROGRESS]
-                )
-            ).count()
-
-            # Overdue tickets
-            now = datetime.utcnow()
-            overdue_tickets = base_query.filter(
-                or_(
-                    and_(
-                        Ticket.first_response_due < now,
-                        Ticket.first_response_at.is_(None),
-                    ),
-                    and_(Ticket.resolution_due < now, Ticket.resolved_at.is_(None)),
-                )
-            ).count()
+            stats = base_query.with_entities(
+                *_ticket_stat_columns(datetime.utcnow())
+            ).one()
+            total_tickets = stats.tickets_created
 
-            resolved_tickets = base_query.filter(
-                Ticket.status == TicketStatus.RESOLVED
-            ).count()
+            return {
+                "total_tickets": total_tickets,
+                "open_tickets": stats.tickets_open,
+                "overdue_tickets": stats.tickets_overdue,
+                "resolved_tickets": stats.tickets_resolved,
+                "sla_performance": {
+                    "total_with_sla": stats.sla_tracked,
+                    "sla_met": stats.sla_met,
+                    "sla_percentage": (stats.sla_met / max(total_tickets, 1)) * 100,
+                },
+                "average_response_time_hours": _average(
+                    stats.response_seconds_total, stats.response_count, 3600
+                ),
+                "average_resolution_time_hours": _average(
+                    stats.resolution_seconds_total, stats.resolution_count, 3600
+                ),
+                "customer_satisfaction": _average(
+                    stats.satisfaction_total, stats.satisfaction_count
+                ),
+            }
 
-            # SLA performance
-            sla_met_count = base_query.filter(
-                and_(
-                    Ticket.first_response_sla_met is True,
-                    Ticket.resolution_sla_met is True,
-                )
-            ).count()
+        except Exception as e:
+            logger.error(f"Error getting ticket statistics: {str(e)}")
+            raise
 
-            sla_performance = {
-                "total_with_sla": base_query.filter(
-                    Ticket.sla_policy_id.isnot(None)
-                ).count(),
-                "sla_met": sla_met_count,
-                "sla_percentage": (sla_met_count / max(total_tickets, 1)) * 100,
-            }
+    def refresh_daily_statistics(self, days: Optional[int] = 7) -> int:
+        """Rebuild the per-team, per-day statistics rollup
 
-            # Average response and resolution times
-            response_times = (
-                base_query.filter(Ticket.first_response_at.isnot(None))
-                .with_entities(
-                    func.avg(
-                        func.extract(
-                            "epoch", Ticket.first_response_at - Ticket.created_at
-                        )
-                        / 3600
-                    )
+        Only days in the last ``days`` days are recomputed (all days when
+        ``days`` is None). The window is replaced in one transaction, so
+        readers see either the old or the new rows.
+        """
+        try:
+            now = datetime.utcnow()
+            stat_date = func.date(func.timezone("UTC", Ticket.created_at))
+            team = func.coalesce(Ticket.assigned_team, "")
+            stat_columns = _ticket_stat_columns(now)
+
+            source = select(
+                stat_date.label("stat_date"), team.label("team"), *stat_columns
+            ).group_by(stat_date, team)
+            stale = TicketDailyStats.__table__.delete()
+
+            if days is not None:
+                since = now.date() - timedelta(days=days)
+                source = source.where(
+                    Ticket.created_at
+                    >= datetime.combine(since, time.min, tzinfo=timezone.utc)
                 )
-                .scalar()
-                or 0
-            )
+                stale = stale.where(TicketDailyStats.stat_date >= since)
 
-            resolution_times = (
-                base_query.filter(Ticket.resolved_at.isnot(None))
-                .with_entities(
-                    func.avg(
-                        func.extract("epoch", Ticket.resolved_at - Ticket.created_at)
-                        / 3600
-                    )
+            self.db.execute(stale)
+            result = self.db.execute(
+                insert(TicketDailyStats).from_select(
+                    ["stat_date", "team"] + [c.name for c in stat_columns], source
                 )
-                .scalar()
-                or 0
-            )
-
-            # Customer satisfaction
-            satisfaction = (
-                base_query.filter(Ticket.customer_satisfaction.isnot(None))
-                .with_entities(func.avg(Ticket.customer_satisfaction))
-                .scalar()
-                or 0
             )
+            self.db.commit()
 
-            return {
-                "total_tickets": total_tickets,
-                "open_tickets": open_tickets,
-                "overdue_tickets": overdue_tickets,
-                "resolved_tickets": resolved_tickets,
-                "sla_performance": sla_performance,
-                "average_response_time_hours": float(response_times),
-                "average_resolution_time_hours": float(resolution_times),
-                "customer_satisfaction": float(satisfaction),
-            }
+            logger.info(f"Refreshed {result.rowcount} ticket statistics rollup rows")
+            return result.rowcount
 
         except Exception as e:
-            logger.error(f"Error getting ticket statistics: {str(e)}")
+            self.db.rollback()
+            logger.error(f"Error refreshing ticket statistics rollup: {str(e)}")
             raise
 
+    def get_daily_statistics(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        team: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Read per-team, per-day statistics from the rollup"""
+        query = self.db.query(TicketDailyStats)
+        if date_from:
+            query = query.filter(TicketDailyStats.stat_date >= date_from)
+        if date_to:
+            query = query.filter(TicketDailyStats.stat_date <= date_to)
+        if team is not None:
+            query = query.filter(TicketDailyStats.team == team)
+
+        rows = query.order_by(TicketDailyStats.stat_date, TicketDailyStats.team).all()
+        return [
+            {
+                "stat_date": row.stat_date,
+                "team": row.team or None,
+                "total_tickets": row.tickets_created,
+                "open_tickets": row.tickets_open,
+                "overdue_tickets": row.tickets_overdue,
+                "resolved_tickets": row.tickets_resolved,
+                "sla_tracked": row.sla_tracked,
+                "sla_met": row.sla_met,
+                "average_response_time_hours": _average(
+                    row.response_seconds_total, row.response_count, 3600
+                ),
+                "average_resolution_time_hours": _average(
+                    row.resolution_seconds_total, row.resolution_count, 3600
+                ),
+                "customer_satisfaction": _average(
+                    row.satisfaction_total, row.satisfaction_count
+                ),
+                "refreshed_at": row.refreshed_at,
+            }
+            for row in rows
+        ]
+
+    def _build_ticket(self, ticket_data: Dict[str, Any]) -> Ticket:
+        """Build an unsaved ticket from request data"""
+        return Ticket(
+            ticket_number=self._generate_ticket_number(),
+            ticket_type=TicketType(ticket_data["ticket_type"]),
+            category=ticket_data.get("category"),
+            subcategory=ticket_data.get("subcategory"),
+            title=ticket_data["title"],
+            description=ticket_data["description"],
+            customer_id=ticket_data.get("customer_id"),
+            service_id=ticket_data.get("service_id"),
+            contact_id=ticket_data.get("contact_id"),
+            priority=TicketPriority(ticket_data.get("priority", "normal")),
+            urgency=ticket_data.get("urgency", 3),
+            impact=ticket_data.get("impact", 3),
+            source=TicketSource(ticket_data.get("source", "customer_portal")),
+            source_reference=ticket_data.get("source_reference"),
+            work_location=ticket_data.get("work_location"),
+            gps_latitude=ticket_data.get("gps_latitude"),
+            gps_longitude=ticket_data.get("gps_longitude"),
+            tags=ticket_data.get("tags", []),
+            custom_fields=ticket_data.get("custom_fields", {}),
+        )
+
+    def _apply_sla_policy(self, ticket: Ticket, sla_policy: Optional[SLAPolicy]):
+        """Set SLA policy and due dates on a ticket"""
+        if not sla_policy:
+            return
+        ticket.sla_policy_id = sla_policy.id
+        ticket.first_response_due = self._calculate_sla_due_date(
+            sla_policy.first_response_time
+        )
+        ticket.resolution_due = self._calculate_resolution_due_date(
+            ticket.priority, sla_policy
+        )
+
     def _generate_ticket_number(self) -> str:
         """Generate unique ticket number"""
         timestamp = datetime.utcnow().strftime("%Y%m%d")
@@ -489,6 +666,387 @@ class TicketService:
         pass
 
 
+class _IncidentIndex:
+    """Active incidents keyed by the router and sector ids they affect"""
+
+    def __init__(self, incidents: List[Tuple[int, Any, Any]]):
+        self.by_router: Dict[str, int] = {}
+        self.by_sector: Dict[str, int] = {}
+        # Oldest first, so the earliest incident wins when several overlap
+        for incident_id, devices, networks in incidents:
+            for device in devices or []:
+                self.by_router.setdefault(str(device), incident_id)
+            for network in networks or []:
+                self.by_sector.setdefault(str(network), incident_id)
+
+    def match(
+        self, router_id: Optional[int], sector_id: Optional[int]
+    ) -> Optional[int]:
+        """Return the incident affecting a sector (most specific) or router"""
+        if sector_id is not None and str(sector_id) in self.by_sector:
+            return self.by_sector[str(sector_id)]
+        if router_id is not None:
+            return self.by_router.get(str(router_id))
+        return None
+
+
+_incident_index_cache: Dict[str, Any] = {"index": None, "expires_at": 0.0}
+_incident_index_lock = threading.Lock()
+
+
+def invalidate_incident_cache() -> None:
+    """Drop the cached active-incident index (e.g. after declaring an incident)"""
+    with _incident_index_lock:
+        _incident_index_cache["index"] = None
+        _incident_index_cache["expires_at"] = 0.0
+
+
+class IncidentTicketService:
+    """Groups customer tickets under active network incidents
+
+    During an outage every affected customer opens a ticket. Tickets whose
+    service sits on a router or sector listed by an active incident become
+    children of one parent ticket per incident: they are inserted in bulk,
+    share the parent's SLA and assignment, re-reports from the same customer
+    are folded into their existing ticket, and a single aggregated webhook is
+    sent per incident at milestones instead of one per ticket.
+    """
+
+    def __init__(self, db: Session = None):
+        self.db = db or SessionLocal()
+        self.ticket_service = TicketService(self.db)
+
+    def ingest_tickets(
+        self, tickets_data: List[Dict[str, Any]], created_by: int = None
+    ) -> Dict[str, Any]:
+        """Create tickets, linking those affected by an active incident
+
+        Returns the tickets in input order (duplicates resolve to the
+        customer's existing ticket) with linked/duplicate/standalone counts.
+        """
+        results: List[Optional[Ticket]] = [None] * len(tickets_data)
+        groups: Dict[int, List[Tuple[int, Dict[str, Any]]]] = defaultdict(list)
+        standalone: List[int] = []
+
+        index = self._active_incident_index()
+        placements = self._service_placements(tickets_data) if index else {}
+
+        for position, data in enumerate(tickets_data):
+            incident_id = data.get("incident_id")
+            if not incident_id and index:
+                for router_id, sector_id in placements.get(position, []):
+                    incident_id = index.match(router_id, sector_id)
+                    if incident_id:
+                        break
+            if incident_id:
+                groups[incident_id].append((position, data))
+            else:
+                standalone.append(position)
+
+        linked = duplicates = 0
+        notifications = []
+        try:
+            for incident_id in sorted(groups):
+                outcome = self._link_to_incident(
+                    incident_id, groups[incident_id], created_by
+                )
+                if outcome is None:
+                    # Incident closed since the index was cached
+                    standalone.extend(position for position, _ in groups[incident_id])
+                    continue
+                for position, ticket in outcome["tickets"].items():
+                    results[position] = ticket
+                linked += len(outcome["created"])
+                duplicates += outcome["duplicates"]
+                if outcome["notify"]:
+                    notifications.append(outcome)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error linking tickets to incidents: {str(e)}")
+            raise
+
+        for outcome in notifications:
+            self._notify_incident(outcome, created_by)
+
+        for position in sorted(standalone):
+            results[position] = self.ticket_service.create_ticket(
+                tickets_data[position], created_by, correlate_incidents=False
+            )
+
+        if linked or duplicates:
+            logger.info(
+                f"Linked {linked} tickets to {len(groups)} incidents "
+                f"({duplicates} duplicate reports folded in)"
+            )
+        return {
+            "tickets": results,
+            "linked": linked,
+            "duplicates": duplicates,
+            "standalone": len(standalone),
+            "incident_ids": sorted(groups),
+        }
+
+    def _active_incident_index(self) -> Optional[_IncidentIndex]:
+        """Return the cached index of active incidents, rebuilding when stale"""
+        now = monotonic()
+        with _incident_index_lock:
+            if _incident_index_cache["expires_at"] > now:
+                return _incident_index_cache["index"]
+
+        rows = (
+            self.db.query(
+                NetworkIncident.id,
+                NetworkIncident.affected_devices,
+                NetworkIncident.affected_networks,
+            )
+            .filter(
+                NetworkIncident.resolved_at.is_(None),
+                NetworkIncident.status.notin_(CLOSED_INCIDENT_STATUSES),
+            )
+            .order_by(NetworkIncident.detected_at, NetworkIncident.id)
+            .all()
+        )
+        index = _IncidentIndex(rows) if rows else None
+
+        with _incident_index_lock:
+            _incident_index_cache["index"] = index
+            _incident_index_cache["expires_at"] = now + INCIDENT_INDEX_TTL_SECONDS
+        return index
+
+    def _service_placements(
+        self, tickets_data: List[Dict[str, Any]]
+    ) -> Dict[int, List[Tuple[Optional[int], Optional[int]]]]:
+        """Map each ticket position to the (router, sector) of its services"""
+        customer_ids = {d["customer_id"] for d in tickets_data if d.get("customer_id")}
+        if not customer_ids:
+            return {}
+
+        rows = (
+            self.db.query(
+                CustomerServiceInstance.id,
+                CustomerServiceInstance.customer_id,
+                CustomerServiceInstance.primary_router_id,
+                CustomerServiceInstance.sector_id,
+            )
+            .filter(
+                CustomerServiceInstance.customer_id.in_(customer_ids),
+                CustomerServiceInstance.status == ServiceStatus.ACTIVE,
+            )
+            .all()
+        )
+        by_customer: Dict[int, List[Any]] = defaultdict(list)
+        for row in rows:
+            by_customer[row.customer_id].append(row)
+
+        placements = {}
+        for position, data in enumerate(tickets_data):
+            services = by_customer.get(data.get("customer_id"), [])
+            # The service named on the ticket decides; otherwise any service
+            if data.get("service_id"):
+                services = [s for s in services if s.id == data["service_id"]]
+            placements[position] = [
+                (s.primary_router_id, s.sector_id) for s in services
+            ]
+        return placements
+
+    def _link_to_incident(
+        self,
+        incident_id: int,
+        items: List[Tuple[int, Dict[str, Any]]],
+        created_by: int = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Bulk-create child tickets for one incident in the current transaction"""
+        # Row lock serializes concurrent ingests of the same incident so the
+        # parent ticket and duplicate checks are race-free
+        incident = (
+            self.db.query(NetworkIncident)
+            .filter(NetworkIncident.id == incident_id)
+            .with_for_update()
+            .first()
+        )
+        if (
+            not incident
+            or incident.resolved_at
+            or incident.status in CLOSED_INCIDENT_STATUSES
+        ):
+            invalidate_incident_cache()
+            return None
+
+        parent = self._get_or_create_parent_ticket(incident, created_by)
+
+        customer_ids = {d["customer_id"] for _, d in items if d.get("customer_id")}
+        existing = {
+            ticket.customer_id: ticket
+            for ticket in self.db.query(Ticket).filter(
+                Ticket.parent_ticket_id == parent.id,
+                Ticket.customer_id.in_(customer_ids),
+                Ticket.status.notin_(CLOSED_TICKET_STATUSES),
+            )
+        }
+
+        now = datetime.utcnow()
+        tickets: Dict[int, Ticket] = {}
+        created: List[Ticket] = []
+        messages: List[TicketMessage] = []
+        for position, data in items:
+            customer_id = data.get("customer_id")
+            duplicate_of = existing.get(customer_id) if customer_id else None
+            if duplicate_of is not None:
+                # Keep the report, but on the customer's existing ticket
+                messages.append(
+                    TicketMessage(
+                        ticket=duplicate_of,
+                        content=data["description"],
+                        subject=data.get("title"),
+                        author_type="customer",
+                        author_id=customer_id,
+                    )
+                )
+                tickets[position] = duplicate_of
+                continue
+
+            ticket = self.ticket_service._build_ticket(data)
+            ticket.parent_ticket_id = parent.id
+            ticket.related_incident_id = incident.id
+            # Shared SLA and assignment from the parent
+            ticket.sla_policy_id = parent.sla_policy_id
+            ticket.first_response_due = parent.first_response_due
+            ticket.resolution_due = parent.resolution_due
+            ticket.assigned_to = parent.assigned_to
+            ticket.assigned_team = parent.assigned_team
+            if parent.assigned_to:
+                ticket.assigned_at = now
+                ticket.status = TicketStatus.ASSIGNED
+            else:
+                ticket.status = TicketStatus.NEW
+
+            tickets[position] = ticket
+            created.append(ticket)
+            if customer_id:
+                existing[customer_id] = ticket
+
+        self.db.add_all(created)
+        self.db.add_all(messages)
+        self.db.flush()
+
+        self.db.add_all(
+            [
+                TicketStatusHistory(
+                    ticket_id=ticket.id,
+                    new_status=ticket.status.value,
+                    new_assigned_to=ticket.assigned_to,
+                    change_reason=f"Linked to incident {incident.incident_number}",
+                    changed_by=created_by,
+                    change_method="automatic",
+                )
+                for ticket in created
+            ]
+        )
+
+        new_customers = len({t.customer_id for t in created if t.customer_id})
+        before = incident.confirmed_customers_affected or 0
+        incident.confirmed_customers_affected = before + new_customers
+
+        return {
+            "incident": incident,
+            "parent": parent,
+            "tickets": tickets,
+            "created": created,
+            "duplicates": len(messages),
+            "notify": _crossed_milestone(before, before + new_customers),
+        }
+
+    def _get_or_create_parent_ticket(
+        self, incident: NetworkIncident, created_by: int = None
+    ) -> Ticket:
+        """Return the incident's parent ticket, creating it on first use"""
+        parent = (
+            self.db.query(Ticket)
+            .filter(
+                Ticket.related_incident_id == incident.id,
+                Ticket.parent_ticket_id.is_(None),
+                Ticket.auto_created.is_(True),
+            )
+            .order_by(Ticket.id)
+            .first()
+        )
+        if parent:
+            return parent
+
+        parent = self.ticket_service._build_ticket(
+            {
+                "ticket_type": TicketType.INCIDENT.value,
+                "category": "Network",
+                "title": f"[{incident.incident_number}] {incident.title}"[:255],
+                "description": incident.description,
+                "priority": INCIDENT_SEVERITY_PRIORITY.get(
+                    (incident.severity or "").lower(), TicketPriority.HIGH
+                ).value,
+                "source": TicketSource.MONITORING.value,
+            }
+        )
+        parent.related_incident_id = incident.id
+        parent.auto_created = True
+        parent.assigned_to = incident.incident_commander
+        parent.assigned_team = "network"
+        if parent.assigned_to:
+            parent.assigned_at = datetime.utcnow()
+            parent.status = TicketStatus.ASSIGNED
+        self.ticket_service._apply_sla_policy(
+            parent, self.ticket_service._get_applicable_sla_policy(parent)
+        )
+
+        self.db.add(parent)
+        self.db.flush()
+        self.db.add(
+            TicketStatusHistory(
+                ticket_id=parent.id,
+                new_status=(parent.status or TicketStatus.NEW).value,
+                new_assigned_to=parent.assigned_to,
+                change_reason=f"Parent ticket for incident {incident.incident_number}",
+                changed_by=created_by,
+                change_method="automatic",
+            )
+        )
+        logger.info(
+            f"Created parent ticket {parent.ticket_number} "
+            f"for incident {incident.incident_number}"
+        )
+        return parent
+
+    def _notify_incident(self, outcome: Dict[str, Any], created_by: int = None):
+        """Send one aggregated webhook for the tickets linked to an incident"""
+        incident = outcome["incident"]
+        parent = outcome["parent"]
+        try:
+            self.ticket_service.webhook_triggers.incident_tickets_linked(
+                {
+                    "incident_id": incident.id,
+                    "incident_number": incident.incident_number,
+                    "parent_ticket_id": parent.id,
+                    "parent_ticket_number": parent.ticket_number,
+                    "customers_affected": incident.confirmed_customers_affected,
+                },
+                [ticket.id for ticket in outcome["created"]],
+                user_id=created_by,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to trigger incident.tickets_linked webhook: {e}")
+
+
+def _crossed_milestone(before: int, after: int) -> bool:
+    """Whether the affected-customer count passed a notification milestone"""
+    if after <= before:
+        return False
+    for milestone in INCIDENT_NOTIFY_MILESTONES:
+        if before < milestone <= after:
+            return True
+    # Past the last milestone, notify once per additional step
+    step = INCIDENT_NOTIFY_MILESTONES[-1]
+    return after >= step and before // step < after // step
+
+
 class TicketMessageService:
     """Ticket message and communication service"""
 
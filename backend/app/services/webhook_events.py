@@ -492,6 +492,37 @@ ISP_WEBHOOK_EVENTS = {
             "resolution_time_hours": 3.5,
         },
     },
+    "incident.tickets_linked": {
+        "category": EventCategory.TICKETING,
+        "description": (
+            "Triggered when customer tickets are grouped under a network incident "
+            "(aggregated, not per ticket)"
+        ),
+        "payload_schema": {
+            "type": "object",
+            "properties": {
+                "incident_id": {"type": "integer"},
+                "incident_number": {"type": "string"},
+                "parent_ticket_id": {"type": "integer"},
+                "parent_ticket_number": {"type": "string"},
+                "tickets_linked": {"type": "integer"},
+                "customers_affected": {"type": "integer"},
+                "ticket_ids": {"type": "array", "items": {"type": "integer"}},
+                "linked_at": {"type": "string", "format": "date-time"},
+            },
+            "required": ["incident_id", "parent_ticket_id", "customers_affected"],
+        },
+        "sample_payload": {
+            "incident_id": 12,
+            "incident_number": "INC-2024-012",
+            "parent_ticket_id": 300,
+            "parent_ticket_number": "TK-20240115-A1B2C3",
+            "tickets_linked": 48,
+            "customers_affected": 50,
+            "ticket_ids": [301, 302, 303],
+            "linked_at": "2024-01-15T11:05:00Z",
+        },
+    },
     # Authentication Events
     "user.login": {
         "category": EventCategory.AUTHENTICATION,
@@ -7,7 +7,7 @@ Provides easy-to-use methods for triggering events from any part of the system.
 
 import asyncio
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import BackgroundTasks
 from sqlalchemy.orm import Session
@@ -448,6 +448,23 @@ class WebhookTriggers:
             "ticket.assigned", ticket_data, triggered_by_user_id=user_id
         )
 
+    def incident_tickets_linked(
+        self,
+        incident_data: Dict[str, Any],
+        ticket_ids: List[int],
+        user_id: Optional[int] = None,
+    ):
+        """Trigger one aggregated event for tickets grouped under an incident"""
+        payload = {
+            **incident_data,
+            "tickets_linked": len(ticket_ids),
+            "ticket_ids": ticket_ids,
+            "linked_at": datetime.now(timezone.utc).isoformat(),
+        }
+        return self.integration_service.trigger_event(
+            "incident.tickets_linked", payload, triggered_by_user_id=user_id
+        )
+
 
 # Global instance for easy access
 webhook_triggers = WebhookTriggers()
@@ -12,7 +12,6 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
-import httpx
 from sqlalchemy import and_, desc, or_
 from sqlalchemy.orm import Session
 
@@ -670,6 +669,8 @@ class WebhookDeliveryEngine:
 
             # Make HTTP request
             start_time = datetime.now()
+            import httpx
+
             async with httpx.AsyncClient(
                 timeout=endpoint.timeout_seconds, verify=endpoint.verify_ssl
             ) as client:
@@ -821,6 +822,8 @@ class WebhookTestService:
 
             # Make request
             start_time = datetime.now()
+            import httpx
+
             async with httpx.AsyncClient(
                 timeout=endpoint.timeout_seconds, verify=endpoint.verify_ssl
             ) as client:
@@ -0,0 +1,114 @@
+"""
+Write-Behind Flushing
+
+Background flushing shared by the in-process stores that acknowledge a
+change in memory and write it to Postgres later (presence timestamps, the
+live session table, plugin hook statistics).
+
+A subclass implements :meth:`WriteBehind.flush`; a daemon thread, started on
+first use so forked workers each get their own, calls it every
+``flush_interval`` seconds or as soon as :meth:`WriteBehind.wake` is called.
+Module-level instances register :meth:`WriteBehind.close` with ``atexit`` so
+whatever is still buffered is written when the process exits.
+
+A flush that fails is retried with the next one, so rows the database will
+never accept must not stay in the buffer: :meth:`WriteBehind._execute_rows`
+drops them and keeps the rest of the batch.
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehind(ABC):
+    """Runs ``flush`` periodically on a background thread"""
+
+    thread_name = "write-behind"
+
+    def __init__(self, session_factory=None, flush_interval: float = 5.0):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @abstractmethod
+    def flush(self) -> int:
+        """Write buffered changes; return the number of rows written."""
+        pass
+
+    def wake(self) -> None:
+        """Flush now instead of at the end of the interval."""
+        self._wakeup.set()
+
+    def close(self) -> None:
+        """Stop the background flusher and write what is left."""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _execute_rows(self, db, statement, rows: List[Dict[str, Any]]) -> List[Any]:
+        """Execute ``statement`` for ``rows``, dropping rows the database rejects.
+
+        The batch runs in a savepoint. If it fails on a constraint or a bad
+        value, every row is retried in a savepoint of its own and the rows
+        that fail alone are logged and dropped. Other errors, such as a lost
+        connection, propagate so the caller keeps the batch for the next
+        flush. Returns the rows returned by the statement, if any.
+        """
+        try:
+            with db.begin_nested():
+                result = db.execute(statement, rows)
+                return result.all() if result.returns_rows else []
+        except (DataError, IntegrityError) as e:
+            logger.warning(
+                f"{self.thread_name}: batch of {len(rows)} rows rejected, "
+                f"retrying row by row: {e.orig}"
+            )
+
+        returned: List[Any] = []
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    result = db.execute(statement, row)
+                    if result.returns_rows:
+                        returned.extend(result.all())
+            except (DataError, IntegrityError) as e:
+                logger.error(f"{self.thread_name}: dropped row {row}: {e.orig}")
+        return returned
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.core.database import SessionLocal
+
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._closed or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=self.thread_name, daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"{self.thread_name} flusher error: {e}")
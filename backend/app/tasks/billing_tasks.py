@@ -3,17 +3,26 @@ Billing and Financial Task Processing
 Background tasks for billing operations, invoice generation, and payment processing
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List
 
 import structlog
 
 from app.core.celery import celery_app
-from app.core.database import get_db
+from app.services.balance_ledger import BalanceLedger
 from app.services.billing import BillingManagementService
+from app.services.billing_rollups import DRIFT_WINDOW_DAYS, BillingRollupService
+from app.services.dunning_engine import DunningEngine
+from app.services.reseller_rollups import ResellerRollupService
+from app.tasks.fanout import fan_out
 
 logger = structlog.get_logger("isp.tasks.billing")
 
+# Dunning actions per delivery batch, and service suspensions per chunk message
+DUNNING_DELIVERY_BATCH_SIZE = 500
+DUNNING_SUSPENSION_CHUNK_SIZE = 50
+DUNNING_SUSPENSION_REASON = "Suspended for non-payment (dunning)"
+
 
 @celery_app.task(bind=True, name="billing.generate_invoices")
 def generate_invoices_task(self, billing_cycle_id: int = None):
@@ -21,7 +30,7 @@ def generate_invoices_task(self, billing_cycle_id: int = None):
     try:
         logger.info("Starting invoice generation", billing_cycle_id=billing_cycle_id)
 
-        db = next(get_db())
+        db = self.session()
         billing_service = BillingManagementService(db)
 
         if billing_cycle_id:
@@ -55,7 +64,7 @@ def process_payments_task(self, payment_batch_id: str = None):
     try:
         logger.info("Starting payment processing", batch_id=payment_batch_id)
 
-        db = next(get_db())
+        db = self.session()
         billing_service = BillingManagementService(db)
 
         result = billing_service.process_pending_payments(payment_batch_id)
@@ -84,7 +93,7 @@ def send_overdue_notices_task(self, days_overdue: int = 30):
     try:
         logger.info("Starting overdue notice generation", days_overdue=days_overdue)
 
-        db = next(get_db())
+        db = self.session()
         billing_service = BillingManagementService(db)
 
         result = billing_service.send_overdue_notices(days_overdue)
@@ -102,11 +111,27 @@ def send_overdue_notices_task(self, days_overdue: int = 30):
         raise self.retry(exc=exc, countdown=600, max_retries=2)
 
 
+@celery_app.task(bind=True, name="billing.calculate_usage_charges_batch")
+def calculate_usage_charges_batch(self, ids: List[int], billing_period: str = None):
+    """Calculate usage charges for one batch of customers."""
+    db = self.session()
+    result = BillingManagementService(db).calculate_usage_charges(ids, billing_period)
+    return {
+        "customers": len(ids),
+        "charges_calculated": result["charges_calculated"],
+        "total_amount": float(result["total_amount"]),
+    }
+
+
 @celery_app.task(bind=True, name="billing.calculate_usage_charges")
 def calculate_usage_charges_task(
-    self, customer_id: int = None, billing_period: str = None
+    self, customer_id: int = None, billing_period: str = None, batch_size: int = 500
 ):
-    """Calculate usage-based charges for services."""
+    """Calculate usage-based charges for services.
+
+    Without ``customer_id`` the customers with usage in the period are fanned
+    out in batches of ``batch_size``; the totals arrive via ``result_id``.
+    """
     try:
         logger.info(
             "Starting usage charge calculation",
@@ -114,15 +139,29 @@ def calculate_usage_charges_task(
             billing_period=billing_period,
         )
 
-        db = next(get_db())
+        db = self.session()
         billing_service = BillingManagementService(db)
 
-        if customer_id:
-            result = billing_service.calculate_customer_usage_charges(
-                customer_id, billing_period
+        if not customer_id:
+            dispatch = fan_out(
+                calculate_usage_charges_batch,
+                billing_service.get_usage_customer_ids(billing_period),
+                chunk_size=batch_size,
+                label="billing.usage_charges",
+                billing_period=billing_period,
             )
-        else:
-            result = billing_service.calculate_all_usage_charges(billing_period)
+            logger.info("Usage charge calculation dispatched", **dispatch)
+            return {
+                "status": "dispatched",
+                "customers": dispatch["total_ids"],
+                "batches": dispatch["batches"],
+                "result_id": dispatch["result_id"],
+                "completed_at": datetime.utcnow().isoformat(),
+            }
+
+        result = billing_service.calculate_customer_usage_charges(
+            customer_id, billing_period
+        )
 
         logger.info(
             "Usage charge calculation completed",
@@ -142,30 +181,74 @@ def calculate_usage_charges_task(
         raise self.retry(exc=exc, countdown=300, max_retries=3)
 
 
+@celery_app.task(bind=True, name="billing.reconcile_accounts_batch")
+def reconcile_accounts_batch(self, ids: List[int], fix: bool = True):
+    """Reconcile one batch of billing accounts."""
+    db = self.session()
+    result = BalanceLedger(db).reconcile(ids, batch_size=len(ids) or 1, fix=fix)
+    return {
+        "accounts_reconciled": result["accounts_checked"],
+        "discrepancies_found": result["accounts_drifted"],
+        "total_drift": float(result["total_drift"]),
+        "drifted_accounts": sorted(result["drift"]),
+    }
+
+
 @celery_app.task(bind=True, name="billing.reconcile_accounts")
-def reconcile_accounts_task(self, account_ids: List[int] = None):
-    """Reconcile customer account balances and transactions."""
+def reconcile_accounts_task(
+    self,
+    account_ids: List[int] = None,
+    batch_size: int = 500,
+    fix: bool = True,
+    fan_out_batches: bool = False,
+):
+    """Reconcile stored account balances against the billing ledger.
+
+    With ``fan_out_batches`` the accounts are split into batches of
+    ``batch_size`` that run as parallel tasks, merged via ``result_id``.
+    """
     try:
         logger.info(
             "Starting account reconciliation",
             account_count=len(account_ids) if account_ids else "all",
         )
 
-        db = next(get_db())
-        billing_service = BillingManagementService(db)
+        db = self.session()
+        ledger = BalanceLedger(db)
+
+        if fan_out_batches:
+            if account_ids is None:
+                account_ids = ledger.account_ids()
+            dispatch = fan_out(
+                reconcile_accounts_batch,
+                account_ids,
+                chunk_size=batch_size,
+                label="billing.reconcile_accounts",
+                fix=fix,
+            )
+            logger.info("Account reconciliation dispatched", **dispatch)
+            return {
+                "status": "dispatched",
+                "accounts": dispatch["total_ids"],
+                "batches": dispatch["batches"],
+                "result_id": dispatch["result_id"],
+                "completed_at": datetime.utcnow().isoformat(),
+            }
 
-        result = billing_service.reconcile_accounts(account_ids)
+        result = ledger.reconcile(account_ids, batch_size=batch_size, fix=fix)
 
         logger.info(
             "Account reconciliation completed",
-            accounts_reconciled=result.get("accounts_reconciled", 0),
-            discrepancies_found=result.get("discrepancies_found", 0),
+            accounts_reconciled=result["accounts_checked"],
+            discrepancies_found=result["accounts_drifted"],
+            total_drift=str(result["total_drift"]),
         )
 
         return {
             "status": "success",
-            "accounts_reconciled": result.get("accounts_reconciled", 0),
-            "discrepancies_found": result.get("discrepancies_found", 0),
+            "accounts_reconciled": result["accounts_checked"],
+            "discrepancies_found": result["accounts_drifted"],
+            "total_drift": float(result["total_drift"]),
             "completed_at": datetime.utcnow().isoformat(),
         }
 
@@ -174,6 +257,117 @@ def reconcile_accounts_task(self, account_ids: List[int] = None):
         raise self.retry(exc=exc, countdown=600, max_retries=2)
 
 
+@celery_app.task(bind=True, name="billing.rebuild_reseller_rollups")
+def rebuild_reseller_rollups_task(self, reseller_ids: List[int] = None):
+    """Recompute reseller rollups from customers and payments."""
+    try:
+        logger.info(
+            "Starting reseller rollup rebuild",
+            reseller_count=len(reseller_ids) if reseller_ids else "all",
+        )
+
+        db = self.session()
+        rows = ResellerRollupService(db).rebuild(reseller_ids)
+
+        logger.info("Reseller rollup rebuild completed", rows_rebuilt=rows)
+
+        return {
+            "status": "success",
+            "rows_rebuilt": rows,
+            "completed_at": datetime.utcnow().isoformat(),
+        }
+
+    except Exception as exc:
+        logger.error("Reseller rollup rebuild failed", error=str(exc))
+        raise self.retry(exc=exc, countdown=600, max_retries=2) from exc
+
+
+@celery_app.task(bind=True, name="billing.rebuild_daily_rollups")
+def rebuild_daily_rollups_task(self, days: int = DRIFT_WINDOW_DAYS):
+    """Recompute the daily billing rollup for the last ``days`` days."""
+    try:
+        logger.info("Starting billing rollup rebuild", days=days)
+
+        db = self.session()
+        until = datetime.utcnow().date()
+        rows = BillingRollupService(db).rebuild(until - timedelta(days=days - 1), until)
+
+        logger.info("Billing rollup rebuild completed", rows_rebuilt=rows)
+
+        return {
+            "status": "success",
+            "rows_rebuilt": rows,
+            "completed_at": datetime.utcnow().isoformat(),
+        }
+
+    except Exception as exc:
+        logger.error("Billing rollup rebuild failed", error=str(exc))
+        raise self.retry(exc=exc, countdown=600, max_retries=2) from exc
+
+
+@celery_app.task(bind=True, name="billing.run_dunning")
+def run_dunning_task(self, account_ids: List[int] = None):
+    """Open, escalate and resolve dunning cases, then queue their follow-up.
+
+    Due email/SMS actions are fanned out in delivery batches and the services
+    of newly suspended accounts are suspended via chunked task messages.
+    """
+    from app.tasks.customer_notifications import send_dunning_actions_batch
+    from app.tasks.service_provisioning import suspend_service
+
+    try:
+        logger.info(
+            "Starting dunning run",
+            account_count=len(account_ids) if account_ids else "all",
+        )
+
+        db = self.session()
+        engine = DunningEngine(db)
+        result = engine.run(account_ids=account_ids)
+
+        delivery = fan_out(
+            send_dunning_actions_batch,
+            result.action_ids,
+            chunk_size=DUNNING_DELIVERY_BATCH_SIZE,
+            label="billing.dunning_delivery",
+        )
+
+        service_ids = engine.suspendable_service_ids(result.suspended_account_ids)
+        if service_ids:
+            suspend_service.chunks(
+                [(service_id, DUNNING_SUSPENSION_REASON) for service_id in service_ids],
+                DUNNING_SUSPENSION_CHUNK_SIZE,
+            ).apply_async()
+
+        logger.info(
+            "Dunning run completed",
+            cases_opened=result.cases_opened,
+            cases_escalated=result.cases_escalated,
+            cases_resolved=result.cases_resolved,
+            actions_queued=delivery["total_ids"],
+            services_suspended=len(service_ids),
+        )
+
+        return {
+            "status": "success",
+            "overdue_accounts": result.overdue_accounts,
+            "cases_opened": result.cases_opened,
+            "cases_escalated": result.cases_escalated,
+            "cases_updated": result.cases_updated,
+            "cases_resolved": result.cases_resolved,
+            "actions_created": result.actions_created,
+            "actions_queued": delivery["total_ids"],
+            "delivery_result_id": delivery["result_id"],
+            "accounts_suspended": len(result.suspended_account_ids),
+            "services_suspended": len(service_ids),
+            "completed_at": datetime.utcnow().isoformat(),
+        }
+
+    except Exception as exc:
+        logger.error("Dunning run failed", error=str(exc))
+        raise self.retry(exc=exc, countdown=900, max_retries=2) from exc
+
+
 # Scheduled tasks
 @celery_app.task(bind=True, name="billing.daily_billing_tasks")
 def daily_billing_tasks(self):
@@ -195,6 +389,10 @@ def daily_billing_tasks(self):
         usage_result = calculate_usage_charges_task.delay()
         results["usage_calculation"] = usage_result.id
 
+        # Catch balance drift from writes that bypassed the ORM
+        reconcile_result = reconcile_accounts_task.delay()
+        results["account_reconciliation"] = reconcile_result.id
+
         logger.info("Daily billing tasks scheduled", task_ids=results)
 
         return {
@@ -6,13 +6,12 @@ error handling and dead-letter queue integration.
 """
 
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import structlog
 from celery import current_task
 
 from app.core.celery import ISPFrameworkTask, celery_app
-from app.core.database import get_db
 from app.core.error_handling import (
     ErrorCategory,
     ErrorImpact,
@@ -21,9 +20,106 @@ from app.core.error_handling import (
 )
 from app.models.customer.base import Customer
 from app.models.services.instances import CustomerService
+from app.tasks.fanout import fan_out
 
 logger = structlog.get_logger("isp.tasks.customer_notifications")
 
+# Recipients per batch task in bulk sends
+NOTIFICATION_BATCH_SIZE = 500
+
+
+def _deliver_email(
+    customer: Customer,
+    template_name: str,
+    subject: Optional[str],
+    priority: str,
+    task_id: str,
+) -> Dict[str, Any]:
+    """Send one email to an already loaded customer."""
+    if not customer.email:
+        raise ISPException(
+            title="No Email Address",
+            detail=f"Customer {customer.id} has no email address",
+            severity=ErrorSeverity.MEDIUM,
+            category=ErrorCategory.BUSINESS_LOGIC,
+            impact=ErrorImpact.CUSTOMER_FACING,
+        )
+
+    logger.info(
+        "Sending email notification",
+        customer_id=customer.id,
+        email=customer.email,
+        template=template_name,
+        priority=priority,
+        task_id=task_id,
+    )
+
+    # Simulate email sending (in real implementation, would use SMTP)
+    if template_name == "test_failure":
+        # Simulate a failure for testing dead-letter queue
+        raise Exception("Simulated SMTP server connection timeout")
+
+    # Mock successful email sending
+    result = {
+        "success": True,
+        "customer_id": customer.id,
+        "email": customer.email,
+        "template": template_name,
+        "subject": subject or f"ISP Framework Notification - {template_name}",
+        "priority": priority,
+        "sent_at": datetime.now(timezone.utc).isoformat(),
+        "message_id": f"msg_{task_id}_{customer.id}",
+        "task_id": task_id,
+    }
+
+    logger.info("Email notification sent successfully", **result)
+
+    return result
+
+
+def _deliver_sms(
+    customer: Customer, message: str, priority: str, task_id: str
+) -> Dict[str, Any]:
+    """Send one SMS to an already loaded customer."""
+    if not customer.phone:
+        raise ISPException(
+            title="No Phone Number",
+            detail=f"Customer {customer.id} has no phone number",
+            severity=ErrorSeverity.MEDIUM,
+            category=ErrorCategory.BUSINESS_LOGIC,
+            impact=ErrorImpact.CUSTOMER_FACING,
+        )
+
+    logger.info(
+        "Sending SMS notification",
+        customer_id=customer.id,
+        phone=customer.phone,
+        message_length=len(message),
+        priority=priority,
+        task_id=task_id,
+    )
+
+    # Simulate SMS sending (in real implementation, would use SMS gateway)
+    if "test_failure" in message:
+        # Simulate a failure for testing dead-letter queue
+        raise Exception("SMS gateway rate limit exceeded")
+
+    # Mock successful SMS sending
+    result = {
+        "success": True,
+        "customer_id": customer.id,
+        "phone": customer.phone,
+        "message": message[:100] + "..." if len(message) > 100 else message,
+        "priority": priority,
+        "sent_at": datetime.now(timezone.utc).isoformat(),
+        "sms_id": f"sms_{task_id}_{customer.id}",
+        "task_id": task_id,
+    }
+
+    logger.info("SMS notification sent successfully", **result)
+
+    return result
+
 
 @celery_app.task(
     bind=True, base=ISPFrameworkTask, name="app.tasks.customer_notifications.send_email"
@@ -46,7 +142,7 @@ def send_email(
     - Network connectivity issues
     """
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Get customer
         customer = db.query(Customer).filter(Customer.id == customer_id).first()
@@ -59,46 +155,10 @@ def send_email(
                 impact=ErrorImpact.CUSTOMER_FACING,
             )
 
-        if not customer.email:
-            raise ISPException(
-                title="No Email Address",
-                detail=f"Customer {customer_id} has no email address",
-                severity=ErrorSeverity.MEDIUM,
-                category=ErrorCategory.BUSINESS_LOGIC,
-                impact=ErrorImpact.CUSTOMER_FACING,
-            )
-
-        logger.info(
-            "Sending email notification",
-            customer_id=customer_id,
-            email=customer.email,
-            template=template_name,
-            priority=priority,
-            task_id=current_task.request.id,
+        return _deliver_email(
+            customer, template_name, subject, priority, current_task.request.id
         )
 
-        # Simulate email sending (in real implementation, would use SMTP)
-        if template_name == "test_failure":
-            # Simulate a failure for testing dead-letter queue
-            raise Exception("Simulated SMTP server connection timeout")
-
-        # Mock successful email sending
-        result = {
-            "success": True,
-            "customer_id": customer_id,
-            "email": customer.email,
-            "template": template_name,
-            "subject": subject or f"ISP Framework Notification - {template_name}",
-            "priority": priority,
-            "sent_at": datetime.now(timezone.utc).isoformat(),
-            "message_id": f"msg_{current_task.request.id}_{customer_id}",
-            "task_id": current_task.request.id,
-        }
-
-        logger.info("Email notification sent successfully", **result)
-
-        return result
-
     except Exception as e:
         logger.error(
             "Email notification failed",
@@ -108,8 +168,6 @@ def send_email(
             task_id=current_task.request.id,
         )
         raise
-    finally:
-        db.close()
 
 
 @celery_app.task(
@@ -128,7 +186,7 @@ def send_sms(
     - Insufficient credits
     """
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Get customer
         customer = db.query(Customer).filter(Customer.id == customer_id).first()
@@ -141,44 +199,7 @@ def send_sms(
                 impact=ErrorImpact.CUSTOMER_FACING,
             )
 
-        if not customer.phone:
-            raise ISPException(
-                title="No Phone Number",
-                detail=f"Customer {customer_id} has no phone number",
-                severity=ErrorSeverity.MEDIUM,
-                category=ErrorCategory.BUSINESS_LOGIC,
-                impact=ErrorImpact.CUSTOMER_FACING,
-            )
-
-        logger.info(
-            "Sending SMS notification",
-            customer_id=customer_id,
-            phone=customer.phone,
-            message_length=len(message),
-            priority=priority,
-            task_id=current_task.request.id,
-        )
-
-        # Simulate SMS sending (in real implementation, would use SMS gateway)
-        if "test_failure" in message:
-            # Simulate a failure for testing dead-letter queue
-            raise Exception("SMS gateway rate limit exceeded")
-
-        # Mock successful SMS sending
-        result = {
-            "success": True,
-            "customer_id": customer_id,
-            "phone": customer.phone,
-            "message": message[:100] + "..." if len(message) > 100 else message,
-            "priority": priority,
-            "sent_at": datetime.now(timezone.utc).isoformat(),
-            "sms_id": f"sms_{current_task.request.id}_{customer_id}",
-            "task_id": current_task.request.id,
-        }
-
-        logger.info("SMS notification sent successfully", **result)
-
-        return result
+        return _deliver_sms(customer, message, priority, current_task.request.id)
 
     except Exception as e:
         logger.error(
@@ -188,8 +209,6 @@ def send_sms(
             task_id=current_task.request.id,
         )
         raise
-    finally:
-        db.close()
 
 
 @celery_app.task(
@@ -206,7 +225,7 @@ def send_service_suspension_notification(
 ) -> Dict[str, Any]:
     """Send notification about service suspension."""
     try:
-        db = next(get_db())
+        db = self.session()
 
         customer = db.query(Customer).filter(Customer.id == customer_id).first()
         customer_service = (
@@ -274,8 +293,6 @@ def send_service_suspension_notification(
             error=str(e),
         )
         raise
-    finally:
-        db.close()
 
 
 @celery_app.task(
@@ -288,7 +305,7 @@ def send_service_restoration_notification(
 ) -> Dict[str, Any]:
     """Send notification about service restoration."""
     try:
-        db = next(get_db())
+        db = self.session()
 
         customer = db.query(Customer).filter(Customer.id == customer_id).first()
         customer_service = (
@@ -354,8 +371,123 @@ def send_service_restoration_notification(
             error=str(e),
         )
         raise
-    finally:
-        db.close()
+
+
+@celery_app.task(
+    bind=True,
+    base=ISPFrameworkTask,
+    name="app.tasks.customer_notifications.send_notification_batch",
+)
+def send_notification_batch(
+    self,
+    ids: List[int],
+    template_name: str,
+    context: Dict[str, Any],
+    notification_type: str = "email",
+    priority: str = "bulk",
+) -> Dict[str, Any]:
+    """
+    Send one notification to each customer in a batch.
+
+    Recipients are loaded with a single query; a failed recipient is
+    recorded and does not fail the batch.
+    """
+    db = self.session()
+    task_id = current_task.request.id
+    message = context.get("message", "Bulk notification from ISP Framework")
+
+    customers = {
+        customer.id: customer
+        for customer in db.query(Customer).filter(Customer.id.in_(ids))
+    }
+
+    sent = 0
+    failed = []
+    for customer_id in ids:
+        customer = customers.get(customer_id)
+        try:
+            if customer is None:
+                raise ValueError(f"Customer {customer_id} not found")
+            if notification_type == "email":
+                _deliver_email(customer, template_name, None, priority, task_id)
+            else:
+                _deliver_sms(customer, message, priority, task_id)
+            sent += 1
+        except Exception as e:
+            failed.append({"customer_id": customer_id, "error": str(e)})
+
+    if failed:
+        logger.warning(
+            "Notification batch had failures",
+            batch_size=len(ids),
+            failed=len(failed),
+            task_id=task_id,
+        )
+
+    return {
+        "recipients": len(ids),
+        "sent": sent,
+        "failed": len(failed),
+        "failures": failed,
+    }
+
+
+@celery_app.task(
+    bind=True,
+    base=ISPFrameworkTask,
+    name="app.tasks.customer_notifications.send_dunning_actions_batch",
+)
+def send_dunning_actions_batch(self, ids: List[int]) -> Dict[str, Any]:
+    """
+    Deliver one batch of pending dunning email/SMS actions.
+
+    Actions and their customers come from one query; sent actions are
+    marked in a batched update and failures are recorded on the action.
+    """
+    from app.services.dunning_engine import DunningEngine
+
+    db = self.session()
+    task_id = current_task.request.id
+    engine = DunningEngine(db)
+
+    sent_ids = []
+    failed = []
+    for action, customer in engine.pending_deliveries(ids):
+        try:
+            if action.delivery_method == "email":
+                _deliver_email(
+                    customer,
+                    action.template_used or "dunning_notice",
+                    action.subject,
+                    "high",
+                    task_id,
+                )
+            else:
+                _deliver_sms(
+                    customer, action.message or action.subject, "high", task_id
+                )
+            sent_ids.append(action.id)
+        except Exception as e:
+            action.mark_as_failed(str(e))
+            failed.append(action.id)
+
+    engine.mark_sent(sent_ids)
+    db.commit()
+
+    if failed:
+        logger.warning(
+            "Dunning delivery batch had failures",
+            batch_size=len(ids),
+            failed=len(failed),
+            task_id=task_id,
+        )
+
+    return {
+        "actions": len(ids),
+        "sent": len(sent_ids),
+        "failed": len(failed),
+        "failures": failed,
+    }
 
 
 @celery_app.task(
@@ -369,13 +501,19 @@ def send_bulk_notifications(
     template_name: str,
     context: Dict[str, Any],
     notification_type: str = "email",
+    batch_size: int = NOTIFICATION_BATCH_SIZE,
 ) -> Dict[str, Any]:
     """
     Send bulk notifications to multiple customers.
 
-    This task demonstrates batch processing with individual task spawning.
+    Recipients are fanned out in batches of ``batch_size``: one broker
+    message and one customer query per batch, with the per-batch results
+    merged by a chord callback (poll ``result_id``).
     """
     try:
+        if notification_type not in ("email", "sms"):
+            raise ValueError(f"Unsupported notification type: {notification_type}")
+
         logger.info(
             "Starting bulk notification sending",
             customer_count=len(customer_ids),
@@ -384,51 +522,24 @@ def send_bulk_notifications(
             task_id=current_task.request.id,
         )
 
-        task_ids = []
-        failed_customers = []
-
-        for customer_id in customer_ids:
-            try:
-                if notification_type == "email":
-                    task = send_email.delay(
-                        customer_id=customer_id,
-                        template_name=template_name,
-                        context=context,
-                        priority="bulk",
-                    )
-                elif notification_type == "sms":
-                    # Extract message from context
-                    message = context.get(
-                        "message", "Bulk notification from ISP Framework"
-                    )
-                    task = send_sms.delay(
-                        customer_id=customer_id, message=message, priority="bulk"
-                    )
-                else:
-                    raise ValueError(
-                        f"Unsupported notification type: {notification_type}"
-                    )
-
-                task_ids.append({"customer_id": customer_id, "task_id": task.id})
-
-            except Exception as e:
-                logger.error(
-                    "Failed to queue notification for customer",
-                    customer_id=customer_id,
-                    error=str(e),
-                )
-                failed_customers.append({"customer_id": customer_id, "error": str(e)})
+        dispatch = fan_out(
+            send_notification_batch,
+            customer_ids,
+            chunk_size=batch_size,
+            label=f"notifications.{notification_type}.{template_name}",
+            template_name=template_name,
+            context=context,
+            notification_type=notification_type,
+        )
 
         result = {
             "success": True,
-            "total_customers": len(customer_ids),
-            "queued_tasks": len(task_ids),
-            "failed_customers_count": len(failed_customers),
-            "task_ids": task_ids,
-            "failed_customers": failed_customers,
+            "total_customers": dispatch["total_ids"],
+            "batches": dispatch["batches"],
+            "result_id": dispatch["result_id"],
             "template": template_name,
             "notification_type": notification_type,
-            "queued_at": datetime.now(timezone.utc).isoformat(),
+            "queued_at": dispatch["dispatched_at"],
         }
 
         logger.info("Bulk notification queuing completed", **result)
@@ -0,0 +1,109 @@
+"""
+Chunked fan-out primitives for bulk Celery tasks.
+
+Instead of one broker message per entity, a bulk task splits its id list into
+chunks and dispatches one batch task per chunk as a chord. Each batch loads
+its entities with a single ``IN`` query and returns a summary dict; the chord
+callback merges the summaries into one result.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import structlog
+from celery import chord, group
+from celery.result import AsyncResult
+
+from app.core.celery import celery_app
+
+logger = structlog.get_logger("isp.tasks.fanout")
+
+FANOUT_CHUNK_SIZE = 500
+
+# Lists in batch results (e.g. failed ids) are capped when merged
+FANOUT_MAX_LISTED = 1000
+
+
+def chunk_ids(
+    ids: Iterable[int], chunk_size: int = FANOUT_CHUNK_SIZE
+) -> List[List[int]]:
+    """Split ids into sorted, de-duplicated chunks."""
+    unique = sorted(set(ids))
+    return [unique[i : i + chunk_size] for i in range(0, len(unique), chunk_size)]
+
+
+def fan_out(
+    batch_task,
+    ids: Iterable[int],
+    chunk_size: int = FANOUT_CHUNK_SIZE,
+    label: Optional[str] = None,
+    aggregate: bool = True,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """Dispatch ``batch_task(ids=chunk, **kwargs)`` once per chunk.
+
+    With ``aggregate`` the batches run as a chord whose callback merges their
+    results (see ``merge_batch_results``); otherwise as a plain group.
+    Returns a dispatch summary with the id to poll for the merged result.
+    """
+    chunks = chunk_ids(ids, chunk_size)
+    label = label or batch_task.name
+    summary = {
+        "label": label,
+        "total_ids": sum(len(chunk) for chunk in chunks),
+        "batches": len(chunks),
+        "chunk_size": chunk_size,
+        "result_id": None,
+        "dispatched_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if not chunks:
+        return summary
+
+    batches = group(batch_task.s(ids=chunk, **kwargs) for chunk in chunks)
+    if aggregate:
+        result: AsyncResult = chord(batches)(aggregate_batch_results.s(label=label))
+    else:
+        result = batches.apply_async()
+    summary["result_id"] = result.id
+
+    logger.info("Fan-out dispatched", **summary)
+    return summary
+
+
+def merge_batch_results(results: Iterable[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Merge batch summaries: numbers are summed, lists concatenated (capped)."""
+    merged: Dict[str, Any] = {}
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        for key, value in result.items():
+            if isinstance(value, bool) or not isinstance(value, int | float | list):
+                continue
+            if isinstance(value, list):
+                listed = merged.setdefault(key, [])
+                listed.extend(value[: max(FANOUT_MAX_LISTED - len(listed), 0)])
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+@celery_app.task(bind=True, name="fanout.aggregate_results")
+def aggregate_batch_results(
+    self, results: List[Dict[str, Any]], label: str = ""
+) -> Dict[str, Any]:
+    """Chord callback combining the results of every batch."""
+    merged = merge_batch_results(results)
+    merged.update(
+        {
+            "status": "success",
+            "label": label,
+            "batches": len(results),
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+    logger.info(
+        "Fan-out completed",
+        label=label,
+        **{k: v for k, v in merged.items() if isinstance(v, int | float)},
+    )
+    return merged
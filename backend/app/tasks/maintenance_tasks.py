@@ -12,8 +12,10 @@ import structlog
 from celery import current_app
 
 from app.core.celery import ISPFrameworkTask, celery_app
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import SessionLocal
 from app.models.foundation import DeadLetterQueue, TaskExecutionLog
+from app.repositories.usage_tracking import UsageRepository
 
 logger = structlog.get_logger("isp.tasks.maintenance")
 
@@ -26,7 +28,7 @@ logger = structlog.get_logger("isp.tasks.maintenance")
 def add_to_dead_letter_queue(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
     """Add a failed task to the dead letter queue for manual processing."""
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Create dead letter queue entry
         dlq_entry = DeadLetterQueue(
@@ -67,8 +69,6 @@ def add_to_dead_letter_queue(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
             error=str(e),
         )
         raise
-    finally:
-        db.close()
 
 
 @celery_app.task(
@@ -79,7 +79,7 @@ def add_to_dead_letter_queue(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
 def process_dead_letter_queue(self) -> Dict[str, Any]:
     """Process pending items in the dead letter queue."""
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Get pending dead letter queue items
         pending_items = (
@@ -147,8 +147,6 @@ def process_dead_letter_queue(self) -> Dict[str, Any]:
     except Exception as e:
         logger.error("Dead letter queue processing failed", error=str(e))
         raise
-    finally:
-        db.close()
 
 
 @celery_app.task(
@@ -159,7 +157,7 @@ def process_dead_letter_queue(self) -> Dict[str, Any]:
 def cleanup_failed_tasks(self) -> Dict[str, Any]:
     """Clean up old failed tasks and logs."""
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Clean up old dead letter queue entries (older than 30 days)
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
@@ -206,8 +204,35 @@ def cleanup_failed_tasks(self) -> Dict[str, Any]:
     except Exception as e:
         logger.error("Task cleanup failed", error=str(e))
         raise
-    finally:
-        db.close()
+
+
+@celery_app.task(
+    bind=True,
+    base=ISPFrameworkTask,
+    name="app.tasks.maintenance_tasks.maintain_usage_partitions",
+)
+def maintain_usage_partitions(self) -> Dict[str, Any]:
+    """Create upcoming usage tracking partitions and drop expired ones."""
+    try:
+        db = self.session()
+        repo = UsageRepository(db)
+
+        months = repo.ensure_future_partitions(settings.usage_partition_months_ahead)
+        removed = repo.cleanup_old_usage_data(settings.usage_retention_days)
+
+        result = {
+            "partitions_through": months[-1].isoformat(),
+            "removed_rows": removed,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+        logger.info("Usage partition maintenance completed", **result)
+
+        return result
+
+    except Exception as e:
+        logger.error("Usage partition maintenance failed", error=str(e))
+        raise
 
 
 @celery_app.task(
@@ -218,7 +243,7 @@ def cleanup_failed_tasks(self) -> Dict[str, Any]:
 def retry_dead_letter_task(self, dlq_id: int) -> Dict[str, Any]:
     """Manually retry a specific dead letter queue task."""
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Get the dead letter queue item
         dlq_item = (
@@ -274,8 +299,6 @@ def retry_dead_letter_task(self, dlq_id: int) -> Dict[str, Any]:
             "Manual retry of dead letter task failed", dlq_id=dlq_id, error=str(e)
         )
         raise
-    finally:
-        db.close()
 
 
 @celery_app.task(
@@ -286,7 +309,7 @@ def retry_dead_letter_task(self, dlq_id: int) -> Dict[str, Any]:
 def get_dead_letter_stats(self) -> Dict[str, Any]:
     """Get statistics about the dead letter queue."""
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Get counts by status
         stats = {}
@@ -332,8 +355,6 @@ def get_dead_letter_stats(self) -> Dict[str, Any]:
     except Exception as e:
         logger.error("Failed to get dead letter stats", error=str(e))
         raise
-    finally:
-        db.close()
 
 
 def _get_retryable_tasks() -> List[str]:
@@ -451,9 +472,8 @@ def _log_task_execution(
     error: str = None,
 ):
     """Log task execution to database."""
+    db = SessionLocal()
     try:
-        db = next(get_db())
-
         execution_log = TaskExecutionLog(
             task_id=task_id,
             task_name=task_name,
@@ -8,8 +8,8 @@ from datetime import datetime
 import structlog
 
 from app.core.celery import celery_app
-from app.core.database import get_db
 from app.services.sla_monitoring import SLAMonitoringService
+from app.services.ticketing_service import TicketService
 
 logger = structlog.get_logger("isp.tasks.monitoring")
 
@@ -20,7 +20,7 @@ def system_health_check_task(self):
     try:
         logger.info("Starting system health check")
 
-        db = next(get_db())
+        db = self.session()
         monitoring_service = SLAMonitoringService(db)
 
         result = monitoring_service.perform_system_health_check()
@@ -51,7 +51,7 @@ def collect_performance_metrics_task(self):
     try:
         logger.info("Starting performance metrics collection")
 
-        db = next(get_db())
+        db = self.session()
         monitoring_service = SLAMonitoringService(db)
 
         result = monitoring_service.collect_performance_metrics()
@@ -78,7 +78,7 @@ def check_service_sla_task(self, service_id: int = None):
     try:
         logger.info("Starting SLA compliance check", service_id=service_id)
 
-        db = next(get_db())
+        db = self.session()
         monitoring_service = SLAMonitoringService(db)
 
         if service_id:
@@ -110,7 +110,7 @@ def generate_alerts_task(self, alert_type: str = None):
     try:
         logger.info("Starting alert generation", alert_type=alert_type)
 
-        db = next(get_db())
+        db = self.session()
         monitoring_service = SLAMonitoringService(db)
 
         result = monitoring_service.generate_alerts(alert_type)
@@ -139,7 +139,7 @@ def cleanup_old_metrics_task(self, retention_days: int = 90):
     try:
         logger.info("Starting metrics cleanup", retention_days=retention_days)
 
-        db = next(get_db())
+        db = self.session()
         monitoring_service = SLAMonitoringService(db)
 
         result = monitoring_service.cleanup_old_metrics(retention_days)
@@ -168,7 +168,7 @@ def bandwidth_usage_analysis_task(self, customer_id: int = None):
     try:
         logger.info("Starting bandwidth usage analysis", customer_id=customer_id)
 
-        db = next(get_db())
+        db = self.session()
         monitoring_service = SLAMonitoringService(db)
 
         if customer_id:
@@ -194,6 +194,28 @@ def bandwidth_usage_analysis_task(self, customer_id: int = None):
         raise self.retry(exc=exc, countdown=300, max_retries=3)
 
 
+@celery_app.task(bind=True, name="monitoring.refresh_ticket_statistics")
+def refresh_ticket_statistics_task(self, days: int = 7):
+    """Refresh the per-team, per-day ticket statistics rollup."""
+    try:
+        logger.info("Starting ticket statistics refresh", days=days or "all")
+
+        db = self.session()
+        rows = TicketService(db).refresh_daily_statistics(days)
+
+        logger.info("Ticket statistics refresh completed", rows_refreshed=rows)
+
+        return {
+            "status": "success",
+            "rows_refreshed": rows,
+            "completed_at": datetime.utcnow().isoformat(),
+        }
+
+    except Exception as exc:
+        logger.error("Ticket statistics refresh failed", error=str(exc))
+        raise self.retry(exc=exc, countdown=300, max_retries=3) from exc
+
+
 # Scheduled monitoring tasks
 @celery_app.task(bind=True, name="monitoring.every_5_minutes")
 def every_5_minutes_monitoring(self):
@@ -3,13 +3,16 @@ Network Operations and Monitoring Tasks
 Background tasks for network device management, monitoring, and automation
 """
 
+import asyncio
 from datetime import datetime
 
 import structlog
 
 from app.core.celery import celery_app
-from app.core.database import get_db
+from app.services.device_management_service import DeviceConfigService
+from app.services.fup_engine import RESET_PERIODS, FupEngine
 from app.services.network_service import NetworkService
+from app.services.router_placement import RouterPlacementEngine
 
 logger = structlog.get_logger("isp.tasks.network")
 
@@ -20,7 +23,7 @@ def device_health_check_task(self, device_id: int = None):
     try:
         logger.info("Starting device health check", device_id=device_id)
 
-        db = next(get_db())
+        db = self.session()
         network_service = NetworkService(db)
 
         if device_id:
@@ -54,7 +57,7 @@ def collect_device_metrics_task(self, device_id: int = None):
     try:
         logger.info("Starting device metrics collection", device_id=device_id)
 
-        db = next(get_db())
+        db = self.session()
         network_service = NetworkService(db)
 
         if device_id:
@@ -86,7 +89,7 @@ def backup_device_configs_task(self, device_id: int = None):
     try:
         logger.info("Starting device config backup", device_id=device_id)
 
-        db = next(get_db())
+        db = self.session()
         network_service = NetworkService(db)
 
         if device_id:
@@ -112,13 +115,36 @@ def backup_device_configs_task(self, device_id: int = None):
         raise self.retry(exc=exc, countdown=600, max_retries=2)
 
 
+@celery_app.task(bind=True, name="network.schedule_config_backups")
+def schedule_config_backups_task(self, max_concurrent: int = 50):
+    """Back up configurations of all managed devices whose schedule is due."""
+    try:
+        logger.info("Starting scheduled config backups", max_concurrent=max_concurrent)
+
+        db = self.session()
+        config_service = DeviceConfigService(db)
+        result = asyncio.run(config_service.schedule_config_backups(max_concurrent))
+
+        logger.info("Scheduled config backups completed", **result)
+
+        return {
+            "status": "success",
+            **result,
+            "completed_at": datetime.utcnow().isoformat(),
+        }
+
+    except Exception as exc:
+        logger.error("Scheduled config backups failed", error=str(exc))
+        raise self.retry(exc=exc, countdown=1800, max_retries=2) from exc
+
+
 @celery_app.task(bind=True, name="network.radius_session_cleanup")
 def radius_session_cleanup_task(self, max_age_hours: int = 24):
     """Clean up old RADIUS sessions and accounting records."""
     try:
         logger.info("Starting RADIUS session cleanup", max_age_hours=max_age_hours)
 
-        db = next(get_db())
+        db = self.session()
         network_service = NetworkService(db)
 
         result = network_service.cleanup_radius_sessions(max_age_hours)
@@ -151,7 +177,7 @@ def update_device_firmware_task(self, device_id: int, firmware_version: str):
             firmware_version=firmware_version,
         )
 
-        db = next(get_db())
+        db = self.session()
         network_service = NetworkService(db)
 
         result = network_service.update_device_firmware(device_id, firmware_version)
@@ -183,7 +209,7 @@ def network_discovery_task(self, subnet: str = None):
     try:
         logger.info("Starting network discovery", subnet=subnet)
 
-        db = next(get_db())
+        db = self.session()
         network_service = NetworkService(db)
 
         result = network_service.discover_network_devices(subnet)
@@ -206,6 +232,68 @@ def network_discovery_task(self, subnet: str = None):
         raise self.retry(exc=exc, countdown=600, max_retries=2)
 
 
+@celery_app.task(bind=True, name="network.recount_placement_counters")
+def recount_placement_counters_task(self):
+    """Rebuild router/sector occupancy counters from customer services."""
+    try:
+        logger.info("Starting placement counter recount")
+
+        db = self.session()
+        result = RouterPlacementEngine(db).recount()
+
+        logger.info(
+            "Placement counter recount completed",
+            routers_fixed=result["routers_fixed"],
+            sectors_fixed=result["sectors_fixed"],
+        )
+
+        return {
+            "status": "success",
+            "routers_fixed": result["routers_fixed"],
+            "sectors_fixed": result["sectors_fixed"],
+            "completed_at": datetime.utcnow().isoformat(),
+        }
+
+    except Exception as exc:
+        logger.error("Placement counter recount failed", error=str(exc))
+        raise self.retry(exc=exc, countdown=600, max_retries=2) from exc
+
+
+@celery_app.task(bind=True, name="network.evaluate_fup")
+def evaluate_fup_task(self):
+    """Reset finished FUP periods, throttle services over their threshold
+    and push every speed change online sessions have not acknowledged, new
+    or left over from an earlier run, to the NAS."""
+    try:
+        db = self.session()
+        engine = FupEngine(db)
+
+        restored = [
+            action for period in RESET_PERIODS for action in engine.reset(period)
+        ]
+        throttled = engine.evaluate()
+        dispatched = asyncio.run(engine.dispatch(engine.pending()))
+
+        logger.info(
+            "FUP evaluation completed",
+            throttled=len(throttled),
+            restored=len(restored),
+            **dispatched,
+        )
+
+        return {
+            "status": "success",
+            "throttled": len(throttled),
+            "restored": len(restored),
+            **dispatched,
+            "completed_at": datetime.utcnow().isoformat(),
+        }
+
+    except Exception as exc:
+        logger.error("FUP evaluation failed", error=str(exc))
+        raise self.retry(exc=exc, countdown=60, max_retries=2) from exc
+
+
 # Scheduled tasks
 @celery_app.task(bind=True, name="network.hourly_monitoring")
 def hourly_monitoring_task(self):
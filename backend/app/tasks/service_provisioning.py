@@ -12,7 +12,6 @@ import structlog
 from celery import current_task
 
 from app.core.celery import ISPFrameworkTask, celery_app
-from app.core.database import get_db
 from app.core.error_handling import (
     ErrorCategory,
     ErrorImpact,
@@ -43,7 +42,7 @@ def provision_internet_service(
     - Service activation
     """
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Get customer service
         customer_service = (
@@ -125,7 +124,8 @@ def provision_internet_service(
 
         # Update service status to failed
         try:
-            db = next(get_db())
+            db = self.session()
+            db.rollback()
             customer_service = (
                 db.query(CustomerService)
                 .filter(CustomerService.id == customer_service_id)
@@ -139,8 +139,6 @@ def provision_internet_service(
             pass
 
         raise
-    finally:
-        db.close()
 
 
 @celery_app.task(
@@ -161,7 +159,7 @@ def suspend_service(
     - Customer notification
     """
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Get customer service
         customer_service = (
@@ -241,8 +239,6 @@ def suspend_service(
             task_id=current_task.request.id,
         )
         raise
-    finally:
-        db.close()
 
 
 @celery_app.task(
@@ -263,7 +259,7 @@ def restore_service(
     - Customer notification
     """
     try:
-        db = next(get_db())
+        db = self.session()
 
         # Get customer service
         customer_service = (
@@ -344,8 +340,6 @@ def restore_service(
             task_id=current_task.request.id,
         )
         raise
-    finally:
-        db.close()
 
 
 # Helper functions for service provisioning
@@ -0,0 +1,111 @@
+"""Benchmark the per-flush cost of audit change data capture.
+
+Runs the same unit of work against an in-memory SQLite database with a
+customer-sized model, once unaudited and once with auditing enabled, and
+reports the median time per commit plus the overhead per audited row. Each
+unit inserts ``--rows`` rows, flushes, updates three columns on each of them
+and commits, so the audited run also bulk inserts ``2 * rows`` queue entries.
+
+    SECRET_KEY=bench python -m benchmarks.bench_audit_cdc --rows 200 --rounds 50
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import (
+    DECIMAL,
+    Boolean,
+    Column,
+    DateTime,
+    Integer,
+    String,
+    Text,
+    create_engine,
+)
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.core.audit_mixins import disable_audit_for_model, enable_audit_for_model
+from app.models.audit import AuditQueue
+
+BenchBase = declarative_base()
+
+
+class BenchCustomer(BenchBase):
+    __tablename__ = "bench_customers"
+
+    id = Column(Integer, primary_key=True)
+    login = Column(String(50))
+    name = Column(String(255))
+    email = Column(String(255))
+    phone = Column(String(50))
+    status = Column(String(20))
+    category = Column(String(20))
+    balance = Column(DECIMAL(12, 2))
+    is_active = Column(Boolean)
+    notes = Column(Text)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+
+
+def _unit_of_work(db, rows: int, offset: int) -> float:
+    now = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    customers = [
+        BenchCustomer(
+            login=f"user{offset + i}",
+            name=f"Customer {offset + i}",
+            email=f"user{offset + i}@example.com",
+            phone="+100000000",
+            status="new",
+            category="person",
+            balance=Decimal("0.00"),
+            is_active=True,
+            notes="benchmark",
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(rows)
+    ]
+    db.add_all(customers)
+    db.flush()
+    for customer in customers:
+        customer.status = "active"
+        customer.balance = Decimal("10.00")
+        customer.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(rows: int, rounds: int) -> None:
+    engine = create_engine("sqlite://")
+    BenchBase.metadata.create_all(engine)
+    AuditQueue.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+
+    results = []
+    for name, audited in (("unaudited", False), ("audited", True)):
+        if audited:
+            enable_audit_for_model(BenchCustomer)
+        else:
+            disable_audit_for_model(BenchCustomer)
+        _unit_of_work(db, rows, 0)  # warm up mapper and statement caches
+        samples = [_unit_of_work(db, rows, (i + 1) * rows) for i in range(rounds)]
+        results.append((name, statistics.median(samples)))
+        db.expunge_all()
+
+    baseline = results[0][1]
+    print(f"{'configuration':<12} {'median_ms':>10} {'overhead_us_per_row':>20}")
+    for name, median in results:
+        per_row = (median - baseline) * 1000 / (2 * rows)
+        print(f"{name:<12} {median:>10.2f} {per_row:>20.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    run(args.rows, args.rounds)
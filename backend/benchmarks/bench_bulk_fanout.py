@@ -0,0 +1,113 @@
+"""Benchmark per-recipient dispatch against chunked fan-out for bulk tasks.
+
+Sends a notification to ``--recipients`` customers stored in an in-memory
+SQLite table, once with the former pattern (one task, and one customer
+lookup, per recipient) and once through ``fan_out`` (one batch task and one
+``IN`` query per chunk, plus the aggregating chord callback). Tasks run
+eagerly, so every task execution stands for one broker message; the table
+reports messages, their JSON payload size, SQL statements and wall time.
+
+    SECRET_KEY=bench python -m benchmarks.bench_bulk_fanout --recipients 100000
+"""
+
+import argparse
+import json
+import time
+
+from celery.signals import task_prerun
+from sqlalchemy import Column, Integer, String, create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.core.celery import celery_app
+from app.tasks.fanout import fan_out
+
+BenchBase = declarative_base()
+
+
+class BenchRecipient(BenchBase):
+    __tablename__ = "bench_recipients"
+
+    id = Column(Integer, primary_key=True)
+    email = Column(String(255))
+
+
+engine = create_engine("sqlite://")
+Session = sessionmaker(bind=engine)
+messages = {"count": 0, "bytes": 0}
+queries = {"count": 0}
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _count_query(*_):
+    queries["count"] += 1
+
+
+def _count_message(sender=None, args=None, kwargs=None, **_):
+    messages["count"] += 1
+    messages["bytes"] += len(json.dumps([args, kwargs], default=str))
+
+
+@celery_app.task(name="bench.send_one")
+def send_one(customer_id: int) -> dict:
+    with Session() as db:
+        recipient = db.get(BenchRecipient, customer_id)
+        return {"sent": int(recipient is not None and bool(recipient.email))}
+
+
+@celery_app.task(name="bench.send_batch")
+def send_batch(ids: list) -> dict:
+    with Session() as db:
+        recipients = db.query(BenchRecipient).filter(BenchRecipient.id.in_(ids)).all()
+        return {"sent": sum(1 for recipient in recipients if recipient.email)}
+
+
+def _per_recipient(ids):
+    for customer_id in ids:
+        send_one.delay(customer_id)
+
+
+def _fanned_out(ids, chunk_size):
+    fan_out(send_batch, ids, chunk_size=chunk_size, label="bench")
+
+
+def run(recipients: int, chunk_size: int) -> None:
+    celery_app.conf.task_always_eager = True
+    celery_app.conf.task_store_eager_result = False
+    task_prerun.connect(_count_message, weak=False)
+
+    BenchBase.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            BenchRecipient.__table__.insert(),
+            [
+                {"id": i, "email": f"user{i}@example.com"}
+                for i in range(1, recipients + 1)
+            ],
+        )
+    ids = list(range(1, recipients + 1))
+
+    print(
+        f"{'dispatch':<16} {'messages':>9} {'payload_kb':>11} "
+        f"{'queries':>8} {'seconds':>8}"
+    )
+    for name, dispatch in (
+        ("per-recipient", lambda: _per_recipient(ids)),
+        (f"fan-out x{chunk_size}", lambda: _fanned_out(ids, chunk_size)),
+    ):
+        messages.update(count=0, bytes=0)
+        queries.update(count=0)
+        start = time.perf_counter()
+        dispatch()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<16} {messages['count']:>9} {messages['bytes'] / 1024:>11.1f}"
+            f" {queries['count']:>8} {elapsed:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+    run(args.recipients, args.chunk_size)
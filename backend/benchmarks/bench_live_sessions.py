@@ -0,0 +1,98 @@
+"""Benchmark the in-memory live session table at ISP scale.
+
+Fills a registry with concurrent sessions, then times the lookups the NOC
+dashboards and RADIUS endpoints poll (by IP, login and customer, per-NAS
+counts, the online summary) and the start / interim / stop events that feed
+it. Nothing is written to the database; the background flusher is left idle
+and the number of coalesced rows it would write is reported instead.
+
+    SECRET_KEY=bench python -m benchmarks.bench_live_sessions --sessions 500000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from app.services.live_sessions import LiveSessionRegistry
+
+
+def _time_calls(fn, args, iterations: int) -> float:
+    """Return the median call latency in microseconds."""
+    samples = []
+    for i in range(iterations):
+        arg = args[i % len(args)]
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(samples)
+
+
+def _session(n: int, started_at: datetime) -> dict:
+    mac = ":".join(f"{n >> shift & 255:02X}" for shift in (24, 16, 8, 0))
+    return {
+        "session_id": f"sess-{n}",
+        "customer_id": n,
+        "service_id": n,
+        "nas_id": n % 200,
+        "login": f"user{n}",
+        "ipv4": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}",
+        "mac": f"02:00:{mac}",
+        "type": "radius",
+        "start_session": started_at,
+    }
+
+
+def run(sessions: int, iterations: int) -> None:
+    registry = LiveSessionRegistry(flush_interval=3600)
+    started_at = datetime.now(timezone.utc)
+    events = [_session(n, started_at) for n in range(sessions)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for event in events:
+        registry.start(event)
+    load_seconds = time.perf_counter() - start
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1024**2
+    tracemalloc.stop()
+
+    sample = random.sample(events, min(iterations, sessions))
+    print(f"sessions: {registry.count():,}")
+    print(f"start events: {sessions / load_seconds:,.0f}/s, memory {memory_mb:,.0f} MB")
+    print(f"{'operation':<20} {'median_us':>10}")
+    for name, fn, args in (
+        ("get_by_ip", registry.get_by_ip, [e["ipv4"] for e in sample]),
+        ("get_by_login", registry.get_by_login, [e["login"] for e in sample]),
+        (
+            "get_by_customer",
+            registry.get_by_customer,
+            [e["customer_id"] for e in sample],
+        ),
+        ("count_by_nas", registry.count_by_nas, list(range(200))),
+        ("count", lambda _: registry.count(), [None]),
+        ("summary", lambda _: registry.summary(), [None]),
+        (
+            "interim update",
+            lambda e: registry.update(e["session_id"], 1024, 2048, 60),
+            sample,
+        ),
+    ):
+        print(f"{name:<20} {_time_calls(fn, args, iterations):>10.2f}")
+
+    stop_us = _time_calls(lambda e: registry.stop(e["session_id"]), sample, len(sample))
+    print(f"{'stop':<20} {stop_us:>10.2f}")
+    print(f"rows pending for the next flush: {registry.pending():,}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=500_000)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+    run(args.sessions, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
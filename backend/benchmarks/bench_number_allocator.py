@@ -0,0 +1,105 @@
+"""Benchmark document number allocation as the documents table grows.
+
+Compares the old "count this month's rows" approach with the counter-row
+allocator at increasing table sizes. The allocator's cost should stay flat
+while the COUNT-based cost grows with the table.
+
+    python -m benchmarks.bench_number_allocator --sizes 1000 10000 100000
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.services.number_allocator import (
+    NumberAllocator,
+    NumberFormat,
+    register_number_format,
+)
+
+
+def _time_calls(fn, iterations: int) -> float:
+    """Return the median call latency in microseconds."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(samples)
+
+
+def run(sizes, iterations: int) -> None:
+    register_number_format("bench_invoice", NumberFormat(prefix="BENCH"))
+    register_number_format(
+        "bench_invoice_block", NumberFormat(prefix="BENCHB", gap_free=False)
+    )
+
+    print(f"{'rows':>10} {'count_us':>12} {'gap_free_us':>12} {'block_us':>12}")
+    with Session(engine) as db:
+        db.execute(
+            text(
+                "CREATE TEMP TABLE bench_invoices "
+                "(id bigserial PRIMARY KEY, invoice_date timestamptz NOT NULL)"
+            )
+        )
+        allocator = NumberAllocator(db)
+        inserted = 0
+
+        for size in sizes:
+            db.execute(
+                text(
+                    "INSERT INTO bench_invoices (invoice_date) "
+                    "SELECT date_trunc('month', now()) + (g % 28) * interval '1 day' "
+                    "FROM generate_series(1, :n) g"
+                ),
+                {"n": size - inserted},
+            )
+            inserted = size
+            db.execute(text("ANALYZE bench_invoices"))
+
+            def legacy_count():
+                db.execute(
+                    text(
+                        "SELECT count(*) FROM bench_invoices "
+                        "WHERE invoice_date >= date_trunc('month', now()) "
+                        "AND invoice_date < date_trunc('month', now()) "
+                        "+ interval '1 month'"
+                    )
+                ).scalar()
+
+            count_us = _time_calls(legacy_count, iterations)
+            gap_free_us = _time_calls(
+                lambda: allocator.next_number("bench_invoice"), iterations
+            )
+            block_us = _time_calls(
+                lambda: allocator.next_number("bench_invoice_block"), iterations
+            )
+            print(
+                f"{size:>10} {count_us:>12.1f} {gap_free_us:>12.1f} {block_us:>12.1f}"
+            )
+
+        db.rollback()
+
+    # Block reservations commit in their own transaction; clean them up
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM number_sequences WHERE name LIKE 'bench_invoice%'")
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    run(sorted(args.sizes), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
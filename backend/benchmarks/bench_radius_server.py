@@ -0,0 +1,282 @@
+"""Benchmark the built-in RADIUS server against the REST path.
+
+Sends the same traffic two ways and reports throughput and p50/p99 latency:
+
+- ``udp``: RADIUS packets to the asyncio server in
+  ``app/services/radius_server``, from ``benchmarks.radius_loadgen``
+- ``rest``: JSON to the ``radius_integration`` endpoints that FreeRADIUS'
+  rlm_rest would call, served by uvicorn on localhost over keep-alive
+  HTTP/1.1 connections
+
+``auth`` traffic is Access-Request vs ``POST /authenticate``; ``interim`` is
+Interim-Update accounting vs ``POST /session/accounting``. Both servers run
+on their own thread and event loop; the clients share the main loop.
+
+By default ``RadiusServiceIntegration`` is replaced by a stub that sleeps
+``--db-latency-ms`` per call, standing in for one database round trip, so no
+database is needed and the comparison isolates transport and batching. With
+``--real-backend`` both paths use the database (``DATABASE_URL``), which must
+hold customers ``user0`` .. ``user<N>`` with the given password.
+
+    SECRET_KEY=bench python -m benchmarks.bench_radius_server --requests 20000
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import socket
+import threading
+import time
+from unittest.mock import patch
+
+import uvicorn
+from fastapi import FastAPI
+
+from app.api.v1.endpoints import radius_integration as endpoints
+from app.core.database import get_db
+from app.services.radius_server import (
+    RadiusRequestHandler,
+    RadiusServer,
+    handler as handler_module,
+)
+from benchmarks import radius_loadgen
+
+SECRET = b"bench-secret"
+PASSWORD = "password"
+
+
+class _StubIntegration:
+    """RadiusServiceIntegration with one simulated round trip per call."""
+
+    db_latency = 0.0
+
+    def __init__(self, db):
+        pass
+
+    def _round_trip(self):
+        if self.db_latency:
+            time.sleep(self.db_latency)
+
+    def authenticate_customer(self, portal_id, password, nas_ip=None):
+        self._round_trip()
+        return {
+            "authenticated": True,
+            "customer_id": 1,
+            "portal_id": portal_id,
+            "service_plan_id": 1,
+            "radius_attributes": {
+                "WISPr-Bandwidth-Max-Down": 50_000_000,
+                "WISPr-Bandwidth-Max-Up": 10_000_000,
+                "Service-Type": "Framed-User",
+                "Framed-Protocol": "PPP",
+            },
+            "customer_info": {"name": portal_id, "email": None, "status": "active"},
+        }
+
+    def update_session_accounting(self, session_id, accounting_data):
+        self._round_trip()
+        return True
+
+    def update_sessions_accounting(self, updates):
+        self._round_trip()
+        return list(updates)
+
+
+class _NullSession:
+    def close(self):
+        pass
+
+
+def _null_db():
+    yield None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _BackgroundLoop:
+    """An event loop on its own thread, standing in for a separate process."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def _start_rest(stub: bool):
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/radius")
+    if stub:
+        app.dependency_overrides[get_db] = _null_db
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app,
+            host="127.0.0.1",
+            port=_free_port(),
+            log_level="warning",
+            access_log=False,
+        )
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _post(reader, writer, path: str, body: bytes) -> int:
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _run_rest(port: int, mode: str, requests: int, concurrency: int, users: int):
+    """Keep-alive HTTP/1.1 clients on raw streams, as cheap as the UDP ones."""
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            for n in counter:
+                if mode == "auth":
+                    path = "/radius/authenticate"
+                    body = {
+                        "username": f"user{n % users}",
+                        "password": PASSWORD,
+                        "nas_ip": "127.0.0.1",
+                    }
+                else:
+                    path = "/radius/session/accounting"
+                    body = {
+                        "session_id": f"sess-{n % users}",
+                        "bytes_in": n * 1500,
+                        "bytes_out": n * 6000,
+                    }
+                start = time.perf_counter()
+                if await _post(reader, writer, path, json.dumps(body).encode()) != 200:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return radius_loadgen.summarize(latencies, errors, time.perf_counter() - start)
+
+
+def run(args) -> None:
+    logging.basicConfig(level=logging.WARNING)
+    stub = not args.real_backend
+    _StubIntegration.db_latency = args.db_latency_ms / 1000
+
+    patches = []
+    if stub:
+        patches = [
+            patch.object(handler_module, "RadiusServiceIntegration", _StubIntegration),
+            patch.object(endpoints, "RadiusServiceIntegration", _StubIntegration),
+        ]
+    for p in patches:
+        p.start()
+
+    background = _BackgroundLoop()
+    radius = RadiusServer(
+        handler=RadiusRequestHandler(_NullSession if stub else None),
+        host="127.0.0.1",
+        auth_port=0,
+        acct_port=0,
+        secrets={"127.0.0.1": SECRET},
+        batch_window_ms=args.batch_window_ms,
+    )
+    background.run(radius.start())
+    rest, rest_thread = _start_rest(stub)
+
+    try:
+        backend = (
+            "stub backend, %.2f ms per call" % args.db_latency_ms
+            if stub
+            else "database backend"
+        )
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {backend}")
+        print(
+            f"{'path':<6} {'mode':<8} {'req/s':>10} "
+            f"{'p50_ms':>8} {'p99_ms':>8} {'errors':>7}"
+        )
+        for mode in ("auth", "interim"):
+            if mode == "auth":
+                port = radius.ports["auth"]
+                make_request = functools.partial(
+                    radius_loadgen.auth_request, users=args.users, password=PASSWORD
+                )
+            else:
+                port = radius.ports["acct"]
+                make_request = functools.partial(
+                    radius_loadgen.interim_request, sessions=args.users
+                )
+            results = {
+                "udp": asyncio.run(
+                    radius_loadgen.run(
+                        "127.0.0.1",
+                        port,
+                        SECRET,
+                        make_request,
+                        args.requests,
+                        args.concurrency,
+                    )
+                ),
+                "rest": asyncio.run(
+                    _run_rest(
+                        rest.config.port,
+                        mode,
+                        args.requests,
+                        args.concurrency,
+                        args.users,
+                    )
+                ),
+            }
+            for path, r in results.items():
+                print(
+                    f"{path:<6} {mode:<8} {r['req_per_s']:>10,.0f} {r['p50_ms']:>8.2f} "
+                    f"{r['p99_ms']:>8.2f} {r['errors']:>7}"
+                )
+    finally:
+        rest.should_exit = True
+        rest_thread.join()
+        background.run(radius.stop())
+        background.close()
+        for p in patches:
+            p.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--db-latency-ms", type=float, default=0.5)
+    parser.add_argument("--batch-window-ms", type=float, default=5.0)
+    parser.add_argument("--real-backend", action="store_true")
+    run(parser.parse_args())
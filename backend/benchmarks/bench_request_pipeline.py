@@ -0,0 +1,128 @@
+"""Benchmark per-request middleware overhead on a no-op route.
+
+Drives ASGI apps directly (no server or sockets) and reports the median
+latency of a ``GET /noop`` per configuration, plus the overhead on top of
+the bare application:
+
+- ``bare``: FastAPI app without user middleware
+- ``3x BaseHTTPMiddleware``: three pass-through ``BaseHTTPMiddleware`` layers,
+  a lower bound for the former security/logging/exception chain
+- ``pipeline``: the fused ``RequestPipelineMiddleware`` with all features
+- ``pipeline fast path``: the same, with ``/noop`` listed as a fast path
+
+    SECRET_KEY=bench python -m benchmarks.bench_request_pipeline --iterations 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware.request_pipeline import RequestPipelineMiddleware
+
+
+class _PassThrough(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+class _UnlimitedPipeline(RequestPipelineMiddleware):
+    """Pipeline with rate limits lifted so every request is fully screened."""
+
+    def __init__(self, app, **options):
+        super().__init__(app, **options)
+        for limit in self.policy.rate_limits.values():
+            limit["requests"] = 10**9
+
+
+def _build(layers) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/noop")
+    async def noop():
+        return None
+
+    for middleware, options in layers:
+        app.add_middleware(middleware, **options)
+    return app
+
+
+def _scope() -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/noop",
+        "raw_path": b"/noop",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"bench"),
+            (b"user-agent", b"bench/1.0"),
+            (b"x-forwarded-for", b"203.0.113.7"),
+        ],
+        "client": ("203.0.113.7", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def _time_requests(app, iterations: int) -> float:
+    """Return the median request latency in microseconds."""
+
+    def make_receive():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # No disconnect arrives while the response is being sent
+            await asyncio.Event().wait()
+
+        return receive
+
+    async def send(message):
+        pass
+
+    # Warm up routing, dependency caches and metric label children
+    for _ in range(200):
+        await app(_scope(), make_receive(), send)
+
+    samples = []
+    for _ in range(iterations):
+        scope, receive = _scope(), make_receive()
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(samples)
+
+
+def run(iterations: int) -> None:
+    # Keep sampled access logs out of the measurement output
+    logging.basicConfig(level=logging.WARNING)
+
+    configs = [
+        ("bare", []),
+        ("3x BaseHTTPMiddleware", [(_PassThrough, {})] * 3),
+        ("pipeline", [(_UnlimitedPipeline, {"sample_rate": 0.1})]),
+        ("pipeline fast path", [(_UnlimitedPipeline, {"fast_paths": ["/noop"]})]),
+    ]
+
+    print(f"{'configuration':<24} {'median_us':>10} {'overhead_us':>12}")
+    baseline = None
+    for name, layers in configs:
+        median = asyncio.run(_time_requests(_build(layers), iterations))
+        baseline = median if baseline is None else baseline
+        print(f"{name:<24} {median:>10.1f} {median - baseline:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.iterations)
@@ -0,0 +1,171 @@
+"""Benchmark API startup: import profile and time to first successful response.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter and
+reports the total import time with the slowest modules by cumulative time.
+It then starts uvicorn once with every router mounted at import and once with
+``LAZY_ROUTERS=true``, and measures the time from process start to the first
+200 from ``/healthz`` and to the first response under the API prefix (which,
+in lazy mode, includes importing that router).
+
+    SECRET_KEY=bench python -m benchmarks.bench_startup --output startup.jsonl
+
+``--output`` appends one JSON line per run, tagged with the commit, so the
+numbers can be tracked over time.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+
+def import_profile(top: int) -> dict:
+    """Import app.main under ``-X importtime`` and summarise the profile."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "LAZY_ROUTERS": "false"},
+        check=True,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append((int(cumulative_us), int(self_us), name.rstrip()))
+    total = next(
+        cumulative for cumulative, _, name in modules if name.strip() == "app.main"
+    )
+    slowest = sorted(
+        (module for module in modules if module[2].strip() != "app.main"), reverse=True
+    )[:top]
+    return {
+        "import_seconds": total / 1e6,
+        "modules": len(modules),
+        "slowest": [
+            {
+                "module": name.strip(),
+                "cumulative_ms": cumulative / 1e3,
+                "self_ms": self_us / 1e3,
+            }
+            for cumulative, self_us, name in slowest
+        ],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, start: float, accept, timeout: float) -> float:
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                status = response.status
+        except urllib.error.HTTPError as exc:
+            status = exc.code
+        except OSError:
+            time.sleep(0.02)
+            continue
+        if accept(status):
+            return time.perf_counter() - start
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} did not respond within {timeout}s")
+
+
+def time_to_first_response(lazy: bool, api_path: str, timeout: float) -> dict:
+    """Start uvicorn and time the first /healthz 200 and first API response."""
+    port = _free_port()
+    env = {**os.environ, "LAZY_ROUTERS": str(lazy).lower()}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        healthz = _wait_for(
+            f"{base}/healthz", start, lambda status: status == 200, timeout
+        )
+        # Any status counts: the request has been routed past the router import
+        first_api = _wait_for(f"{base}{api_path}", start, lambda status: True, timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"healthz_seconds": healthz, "first_api_seconds": first_api}
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(top: int, api_path: str, timeout: float, output: str = None) -> None:
+    profile = import_profile(top)
+    print(
+        f"import app.main: {profile['import_seconds']:.2f} s "
+        f"across {profile['modules']} modules"
+    )
+    print(f"{'module':<56} {'cumulative_ms':>14} {'self_ms':>9}")
+    for module in profile["slowest"]:
+        print(
+            f"{module['module']:<56} {module['cumulative_ms']:>14.1f} "
+            f"{module['self_ms']:>9.1f}"
+        )
+
+    servers = {}
+    print(f"\n{'routers':<8} {'healthz_s':>10} {'first_api_s':>12}")
+    for name, lazy in (("eager", False), ("lazy", True)):
+        servers[name] = time_to_first_response(lazy, api_path, timeout)
+        print(
+            f"{name:<8} {servers[name]['healthz_seconds']:>10.2f}"
+            f" {servers[name]['first_api_seconds']:>12.2f}"
+        )
+
+    if output:
+        record = {
+            "commit": _commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "import_seconds": profile["import_seconds"],
+            "slowest": profile["slowest"],
+            "servers": servers,
+        }
+        with open(output, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--api-path", default="/api/v1/customers/")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Append results as a JSON line to this file")
+    args = parser.parse_args()
+    run(args.top, args.api_path, args.timeout, args.output)
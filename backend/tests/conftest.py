@@ -6,6 +6,7 @@ with proper database isolation, RBAC setup, and infrastructure mocking.
 import asyncio
 import os
 import uuid
+from contextlib import contextmanager
 from typing import AsyncGenerator, Generator
 from unittest.mock import MagicMock
 
@@ -13,7 +14,8 @@ import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -22,6 +24,9 @@ from app.core.config import settings
 from app.main import app
 from app.core.database import Base, get_db
 from app.models.auth.base import Administrator
+from app.models.customer.base import Customer
+from app.models.customer.status import CustomerStatus
+from app.models.foundation.base import Location
 from app.models.rbac import Role, Permission, UserRole
 from app.core.security import get_password_hash
 
@@ -225,6 +230,116 @@ def mock_minio():
     return MagicMock()
 
 
+class FakeResult:
+    """Result of a :class:`FakeSession` statement"""
+
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.returns_rows = rows is not None
+
+    def all(self):
+        return list(self.rows)
+
+    def scalars(self):
+        return iter([row[0] for row in self.rows])
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    """Session stand-in for unit tests of the write-behind stores.
+
+    Every execute is recorded as ``(statement, params)``. ``fail`` makes every
+    execute raise as if the database were down; a statement whose parameters
+    include a row matching ``reject`` raises ``IntegrityError``, as a foreign
+    key violation would. ``returning(statement, params)`` supplies the rows a
+    statement returns.
+    """
+
+    def __init__(self, fail=False, reject=None, returning=None):
+        self.fail = fail
+        self.reject = reject
+        self.returning = returning
+        self.executed = []
+        self.committed = self.rolled_back = self.closed = False
+
+    def execute(self, stmt, params=None):
+        if self.fail:
+            raise OperationalError(str(stmt), params, Exception("database unavailable"))
+        rows = params if isinstance(params, list) else [params] if params else []
+        if self.reject is not None and any(self.reject(row) for row in rows):
+            raise IntegrityError(str(stmt), params, Exception("row rejected"))
+        self.executed.append((stmt, params))
+        return FakeResult(self.returning(stmt, params) if self.returning else None)
+
+    @contextmanager
+    def begin_nested(self):
+        savepoint = len(self.executed)
+        try:
+            yield self
+        except Exception:
+            del self.executed[savepoint:]
+            raise
+
+    def params(self, table_name):
+        """Parameter rows executed against ``table_name``, in order"""
+        rows = []
+        for stmt, params in self.executed:
+            table = getattr(stmt, "table", None)
+            if params is not None and table is not None and table.name == table_name:
+                rows.extend(params if isinstance(params, list) else [params])
+        return rows
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(scope="function")
+def customer_factory(db_session):
+    """Insert customers, with the status and location they require.
+
+    Returns a function taking a customer name and returning the new id.
+    """
+    statuses, locations = CustomerStatus.__table__, Location.__table__
+    customers = Customer.__table__
+    status_id = db_session.execute(
+        insert(statuses).values(code="pytest", name="Pytest").returning(statuses.c.id)
+    ).scalar_one()
+    location_id = db_session.execute(
+        insert(locations).values(name="Pytest").returning(locations.c.id)
+    ).scalar_one()
+    created = []
+
+    def create(name: str) -> int:
+        customer_id = db_session.execute(
+            insert(customers)
+            .values(
+                name=name,
+                portal_id=f"PYTEST{len(created) + 1:04d}",
+                status_id=status_id,
+                location_id=location_id,
+            )
+            .returning(customers.c.id)
+        ).scalar_one()
+        created.append(customer_id)
+        return customer_id
+
+    return create
+
+
+@pytest.fixture(scope="function")
+def fake_session():
+    """Factory for :class:`FakeSession` instances."""
+    return FakeSession
+
+
 @pytest.fixture(scope="function")
 def mock_ansible_runner():
     """Mock Ansible runner for automation tests."""
@@ -0,0 +1,60 @@
+"""Unit tests for the incrementally maintained balance ledger."""
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.models.billing import (
+    Invoice,
+    InvoiceStatus,
+    Payment,
+    PaymentStatus,
+    TransactionType,
+)
+from app.services import balance_ledger
+from app.services.balance_ledger import (
+    collect_balance_deltas,
+    credit_note_contribution,
+    invoice_contribution,
+    payment_contribution,
+    signed_transaction_amount,
+)
+
+
+def test_document_contributions_follow_status():
+    """Only posted documents move the balance."""
+    assert invoice_contribution(InvoiceStatus.DRAFT, 100) == 0
+    assert invoice_contribution(InvoiceStatus.CANCELLED, 100) == 0
+    assert invoice_contribution(InvoiceStatus.PENDING, 100) == Decimal("-100")
+    assert payment_contribution(PaymentStatus.PENDING, 40) == 0
+    assert payment_contribution(PaymentStatus.COMPLETED, 40) == Decimal("40")
+    assert credit_note_contribution("applied", 15) == Decimal("15")
+    assert credit_note_contribution("void", 15) == 0
+
+
+def test_manual_transactions_are_signed_by_type():
+    """Credits raise the balance, charges lower it, others are audit only."""
+    assert signed_transaction_amount(TransactionType.CREDIT, 10) == Decimal("10")
+    assert signed_transaction_amount(TransactionType.CHARGE, 10) == Decimal("-10")
+    assert signed_transaction_amount(TransactionType.TRANSFER, 10) == 0
+
+
+def test_flush_deltas_net_out_per_account():
+    """A status change reverses the old contribution and applies the new one."""
+    invoice = Invoice.__new__(Invoice)
+    payment = Payment.__new__(Payment)
+    values = {
+        # (object, previous): (account, status, amount)
+        (id(invoice), False): (1, InvoiceStatus.PENDING, Decimal("50")),
+        (id(payment), True): (1, PaymentStatus.PENDING, Decimal("30")),
+        (id(payment), False): (1, PaymentStatus.COMPLETED, Decimal("30")),
+    }
+
+    def fake_value(obj, key, previous):
+        account, status, amount = values[(id(obj), previous)]
+        return {"billing_account_id": account, "status": status}.get(key, amount)
+
+    session = SimpleNamespace(new=[invoice], dirty=[payment], deleted=[])
+    with patch.object(balance_ledger, "_attribute_value", side_effect=fake_value):
+        deltas = collect_balance_deltas(session)
+
+    assert deltas == {1: Decimal("-20")}
@@ -0,0 +1,142 @@
+"""Unit tests for billing statistics and the daily billing rollup."""
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.models.billing import Invoice, InvoiceStatus, Payment, PaymentStatus
+from app.repositories.billing import summarize_invoice_statistics
+from app.services import billing_rollups
+from app.services.billing_rollups import (
+    INVOICE,
+    PAYMENT,
+    ROLLUP_PENDING_KEY,
+    BillingRollupService,
+)
+
+# Late evening in UTC-5 is the next day in UTC
+ISSUED_AT = datetime(2026, 9, 30, 21, 0, tzinfo=timezone(timedelta(hours=-5)))
+PAID_AT = datetime(2026, 10, 2, 9, 0, tzinfo=timezone.utc)
+
+
+def _row(status, count, total, paid, balance):
+    return SimpleNamespace(
+        status=status,
+        invoice_count=count,
+        total_amount=Decimal(total),
+        paid_amount=Decimal(paid),
+        balance_due=Decimal(balance),
+    )
+
+
+def test_statistics_fold_grouped_rows_and_default_missing_statuses():
+    """Per-status aggregates add up, and absent statuses report zero."""
+    stats = summarize_invoice_statistics(
+        [
+            _row(InvoiceStatus.PAID, 3, "300", "300", "0"),
+            _row("pending", 2, "150", "0", "150"),
+        ]
+    )
+
+    assert stats["total_invoices"] == 5
+    assert (stats["total_amount"], stats["paid_amount"]) == (
+        Decimal("450"),
+        Decimal("300"),
+    )
+    assert stats["outstanding_amount"] == Decimal("150")
+    assert (stats["paid_invoices"], stats["pending_invoices"]) == (3, 2)
+    assert stats["draft_invoices"] == stats["overdue_invoices"] == 0
+
+
+def test_flush_captures_status_changes_as_moves_between_rows():
+    """Paying an invoice moves it from the pending to the paid row."""
+    invoice = Invoice.__new__(Invoice)
+    payment = Payment.__new__(Payment)
+    values = {
+        (id(invoice), True): {
+            "invoice_date": ISSUED_AT,
+            "status": InvoiceStatus.PENDING,
+            "total_amount": Decimal("80"),
+            "paid_amount": Decimal("0"),
+            "balance_due": Decimal("80"),
+        },
+        (id(invoice), False): {
+            "invoice_date": ISSUED_AT,
+            "status": InvoiceStatus.PAID,
+            "total_amount": Decimal("80"),
+            "paid_amount": Decimal("80"),
+            "balance_due": Decimal("0"),
+        },
+        (id(payment), False): {
+            "payment_date": PAID_AT,
+            "status": PaymentStatus.COMPLETED,
+            "amount": Decimal("80"),
+        },
+    }
+
+    def fake_value(obj, key, previous):
+        return values[(id(obj), previous)].get(key)
+
+    session = SimpleNamespace(new=[payment], dirty=[invoice], deleted=[], info={})
+    with patch.object(billing_rollups, "attribute_value", side_effect=fake_value):
+        billing_rollups.rollup_changes.collect(session, None)
+
+    executed = []
+    service = BillingRollupService(
+        SimpleNamespace(execute=lambda stmt, rows: executed.extend(rows))
+    )
+    with patch.object(service, "_upsert", return_value=None):
+        service.apply_changes(session.info[ROLLUP_PENDING_KEY])
+
+    rows = {(row["day"], row["document"], row["status"]): row for row in executed}
+    pending = rows[(date(2026, 10, 1), INVOICE, "pending")]
+    paid = rows[(date(2026, 10, 1), INVOICE, "paid")]
+    assert (pending["document_count"], pending["balance_due"]) == (-1, Decimal("-80"))
+    assert (paid["document_count"], paid["paid_amount"]) == (1, Decimal("80"))
+    assert rows[(date(2026, 10, 2), PAYMENT, "completed")]["total_amount"] == Decimal(
+        "80"
+    )
+
+
+def test_statistics_read_rollup_and_fall_back_before_backfill():
+    """Rollup rows are summarized; an empty range scans the invoices once."""
+    service = BillingRollupService(db=None)
+    rollup_rows = [
+        _row("paid", 40, "4000", "4000", "0"),
+        _row("sent", 5, "500", "0", "500"),
+    ]
+    past_due = {"overdue_amount": Decimal("120"), "past_due_invoices": 2}
+
+    class FakeQuery:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def filter(self, *criteria):
+            return self
+
+        group_by = filter
+
+        def all(self):
+            return self.rows
+
+    with patch.object(
+        service, "_range", return_value=FakeQuery(rollup_rows)
+    ), patch.object(service, "db"), patch(
+        "app.services.billing_rollups.InvoiceRepository"
+    ) as repo:
+        repo.return_value.get_past_due_totals.return_value = past_due
+        stats = service.get_statistics(date(2026, 1, 1), date(2026, 12, 31))
+
+    assert stats["total_invoices"] == 45 and stats["sent_invoices"] == 5
+    assert stats["outstanding_amount"] == Decimal("500")
+    assert (stats["overdue_amount"], stats["past_due_invoices"]) == (Decimal("120"), 2)
+    repo.return_value.get_billing_statistics.assert_not_called()
+
+    with patch.object(service, "_range", return_value=FakeQuery([])), patch.object(
+        service, "db"
+    ), patch("app.services.billing_rollups.InvoiceRepository") as repo:
+        service.get_statistics(date(2020, 1, 1), date(2020, 12, 31))
+
+    repo.return_value.get_billing_statistics.assert_called_once_with(
+        date(2020, 1, 1), date(2020, 12, 31)
+    )
@@ -0,0 +1,57 @@
+"""Tests for deduplicated, delta-compressed device config backups."""
+import zlib
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.services.device_management_service import (
+    ConfigBlobStore,
+    DeviceConfigService,
+    apply_config_delta,
+    config_digest,
+    encode_config_delta,
+)
+
+BASE = "".join(f"interface ether{i}\n description port {i}\n!\n" for i in range(500))
+
+
+def test_delta_round_trips_and_is_small():
+    """A one-line change is stored as a tiny delta against the snapshot."""
+    changed = BASE.replace("port 42\n", "uplink 42\n") + "ip route 0.0.0.0/0 10.0.0.1\n"
+    delta = encode_config_delta(BASE, changed)
+
+    assert apply_config_delta(BASE, delta) == changed
+    assert len(delta) < len(zlib.compress(changed.encode())) / 10
+
+
+def test_encode_falls_back_to_snapshot_for_rewrites():
+    """A rewritten config is stored in full instead of as a large delta."""
+    row = ConfigBlobStore._encode(config_digest("x\n" * 50), "x\n" * 50, (7, BASE))
+    assert row["encoding"] == "full" and row["base_blob_id"] is None
+
+    row = ConfigBlobStore._encode(config_digest(BASE + "!\n"), BASE + "!\n", (7, BASE))
+    assert row["encoding"] == "delta" and row["base_blob_id"] == 7
+
+
+def test_store_many_without_changes_does_not_query():
+    """A run where every config is unchanged stores nothing."""
+    db = MagicMock()
+    assert ConfigBlobStore(db).store_many([]) == []
+    db.query.assert_not_called()
+    db.execute.assert_not_called()
+
+
+def test_backup_due_uses_last_completed_or_verified_run():
+    """A verified-unchanged run counts as a backup for scheduling."""
+    service = DeviceConfigService(db=None)
+    device = SimpleNamespace(config_backup_schedule="@daily")
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(days=3)
+
+    assert service._is_backup_due(device, None)
+    assert service._is_backup_due(
+        device, SimpleNamespace(completed_at=stale, verified_at=None)
+    )
+    assert not service._is_backup_due(
+        device, SimpleNamespace(completed_at=stale, verified_at=now)
+    )
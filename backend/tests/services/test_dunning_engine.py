@@ -0,0 +1,174 @@
+"""Unit tests for the set-based dunning engine."""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.models.billing import DunningRule, DunningStatus
+from app.models.billing.enums import DunningActionType, EscalationLevel
+from app.services.billing_automation import BillingAutomationService
+from app.services.dunning_engine import DunningEngine
+
+AS_OF = datetime(2026, 10, 18, 2, 30, tzinfo=timezone.utc)
+
+
+def _rule(rule_id, days, action_type, suspend=False, max_stage=5):
+    rule = SimpleNamespace(
+        id=rule_id,
+        rule_name=f"rule-{rule_id}",
+        is_active=True,
+        priority=100,
+        trigger_days_overdue=days,
+        trigger_amount_threshold=None,
+        trigger_escalation_level=None,
+        action_type=action_type,
+        template_id=None,
+        escalate_after_days=7,
+        max_escalation_stage=max_stage,
+        suspend_account=suspend,
+        execution_delay_hours=0,
+    )
+    rule.is_triggered = lambda *args: DunningRule.is_triggered(rule, *args)
+    return rule
+
+
+RULES = [
+    _rule(1, 7, DunningActionType.EMAIL_REMINDER),
+    _rule(2, 14, DunningActionType.SMS_REMINDER),
+    _rule(3, 30, DunningActionType.ACCOUNT_SUSPENSION, suspend=True),
+]
+
+
+def _case(
+    case_id, applied, stage, amount, next_action_in_days, status=DunningStatus.ACTIVE
+):
+    return SimpleNamespace(
+        id=case_id,
+        status=status,
+        current_stage=stage,
+        total_overdue_amount=Decimal(amount),
+        next_action_date=AS_OF + timedelta(days=next_action_in_days),
+        auto_escalate=True,
+        auto_suspend=True,
+        additional_data={"applied_rule_ids": applied},
+    )
+
+
+def _overdue(amount, days):
+    return (Decimal(amount), AS_OF - timedelta(days=days), days)
+
+
+def _run(overdue, cases):
+    writes = {"updates": []}
+    engine = DunningEngine(
+        SimpleNamespace(
+            execute=lambda stmt, rows=None: writes["updates"].extend(rows or []),
+            commit=lambda: None,
+        )
+    )
+
+    def load_rules():
+        engine._rules = RULES
+        engine._rule_days = [rule.trigger_days_overdue for rule in RULES]
+
+    def insert_cases(rows, as_of):
+        writes["new_cases"] = rows
+        return {row["billing_account_id"]: 1000 + i for i, row in enumerate(rows)}
+
+    def insert_actions(fired, case_ids, overdue, as_of):
+        writes["actions"] = [
+            (account_id, case_id or case_ids[account_id], stage, rule.id)
+            for account_id, case_id, stage, rule in fired
+        ]
+        return len(fired)
+
+    def resolve_cases(case_ids, as_of):
+        writes["resolved"] = case_ids
+        return len(case_ids)
+
+    with patch.object(engine, "_overdue_accounts", return_value=overdue), patch.object(
+        engine, "_open_cases", return_value=cases
+    ), patch.object(engine, "_load_rules", side_effect=load_rules), patch.object(
+        engine, "_insert_cases", side_effect=insert_cases
+    ), patch.object(
+        engine, "_insert_actions", side_effect=insert_actions
+    ), patch.object(
+        engine, "_resolve_cases", side_effect=resolve_cases
+    ), patch.object(
+        engine, "_suspend_accounts", side_effect=lambda ids, as_of: ids
+    ), patch.object(
+        engine, "due_action_ids", return_value=[]
+    ):
+        result = engine.run(as_of=AS_OF)
+    return result, writes
+
+
+def test_new_overdue_account_opens_case_at_lowest_tier():
+    """An account first seen 20 days late gets the 7-day reminder only."""
+    result, writes = _run({10: _overdue("80", 20), 11: _overdue("40", 3)}, {})
+
+    assert result.cases_opened == 1
+    [case] = writes["new_cases"]
+    assert case["billing_account_id"] == 10
+    assert case["current_stage"] == 1
+    assert case["additional_data"] == {"applied_rule_ids": [1]}
+    assert case["next_action_date"] == AS_OF + timedelta(days=7)
+    assert writes["actions"] == [(10, 1000, 1, 1)]
+    assert result.suspended_account_ids == []
+
+
+def test_due_cases_escalate_and_changed_amounts_update():
+    """Only due cases fire their next tier; others just track the amount."""
+    cases = {
+        20: _case(200, applied=[1, 2], stage=2, amount="300", next_action_in_days=-1),
+        21: _case(201, applied=[1], stage=1, amount="50", next_action_in_days=3),
+        22: _case(202, applied=[1], stage=1, amount="60", next_action_in_days=3),
+    }
+    overdue = {
+        20: _overdue("300", 35),
+        21: _overdue("75", 16),  # Paid partly before the next step is due
+        22: _overdue("60", 16),  # Nothing changed: no write at all
+    }
+    result, writes = _run(overdue, cases)
+
+    assert (result.cases_escalated, result.cases_updated) == (1, 1)
+    assert writes["actions"] == [(20, 200, 3, 3)]
+    assert result.suspended_account_ids == [20]
+    escalated, amount_only = writes["updates"]
+    assert escalated["id"] == 200 and escalated["current_stage"] == 3
+    assert escalated["additional_data"]["applied_rule_ids"] == [1, 2, 3]
+    assert amount_only == {
+        "id": 201,
+        "total_overdue_amount": Decimal("75"),
+        "days_overdue": 16,
+        "escalation_level": EscalationLevel.MEDIUM,
+    }
+
+
+def test_paid_up_and_capped_cases():
+    """Settled accounts resolve; rules past their max stage do not fire."""
+    RULES[1].max_escalation_stage = 1
+    try:
+        cases = {
+            30: _case(300, applied=[], stage=0, amount="20", next_action_in_days=-1),
+            31: _case(301, applied=[1], stage=1, amount="90", next_action_in_days=-1),
+        }
+        result, writes = _run({31: _overdue("90", 20)}, cases)
+    finally:
+        RULES[1].max_escalation_stage = 5
+
+    assert writes["resolved"] == [300]
+    assert result.cases_escalated == 0
+    assert writes["actions"] == []
+
+
+def test_failed_payment_queues_a_dunning_run_for_the_customer():
+    """Repeated payment failures go through the task that delivers the actions."""
+    db = MagicMock()
+    db.query.return_value.filter.return_value = [(40,), (41,)]
+    service = BillingAutomationService(db)
+
+    with patch("app.tasks.billing_tasks.run_dunning_task.delay") as delay:
+        service._initiate_dunning_process({"id": 1, "customer_id": 7})
+
+    delay.assert_called_once_with(account_ids=[40, 41])
@@ -0,0 +1,290 @@
+"""Unit tests for the set-based FUP engine and its usage meter."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql
+
+from app.models.foundation.tariff import FUPResetPeriod, Tariff
+from app.models.services.enums import ServiceStatus, ServiceType
+from app.models.services.templates import ServiceTemplate
+from app.services import fup_engine
+from app.services.fup_engine import FupAction, FupEngine, FupUsageMeter, period_start
+from app.services.radius_server import client as radius_client
+from app.services.radius_server.packet import COA_ACK, COA_NAK, COA_REQUEST, RadiusError
+
+
+def _known_services(*service_ids):
+    """RETURNING rows for a session where ``service_ids`` are internet services"""
+
+    def returning(stmt, params):
+        return [(service_id,) for service_id in service_ids] if stmt.is_select else None
+
+    return returning
+
+
+def _sql(db):
+    return str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+
+
+def test_meter_coalesces_deltas_and_keeps_them_when_a_flush_fails(fake_session):
+    """Deltas add up per service, counter resets count as zero, and a failed
+    flush leaves the totals queued for the next one."""
+    sessions = [fake_session(fail=True), fake_session(returning=_known_services(7))]
+    meter = FupUsageMeter(session_factory=lambda: sessions.pop(0))
+    meter._ensure_worker = lambda: None
+
+    meter.record(7, 100, 1000)
+    meter.record(7, 50, -400)
+    meter.record(8, 0, 0)
+    meter.record(None, 10, 10)
+    assert meter.flush() == 0
+    meter.record(7, 1, 1)
+
+    database = sessions[0]
+    assert meter.flush() == 1
+    (row,) = database.params("customer_traffic_counters")
+    assert (row["service_id"], row["day_up"], row["week_down"], row["month_up"]) == (
+        7,
+        151,
+        1001,
+        151,
+    )
+    assert row["week_reset"] == period_start(
+        FUPResetPeriod.WEEKLY, datetime.now(timezone.utc)
+    )
+    assert database.committed and meter.pending() == 0
+
+
+def test_meter_drops_services_it_cannot_count(fake_session):
+    """Usage of services without an internet service, and rows the database
+    rejects on their own, are dropped instead of blocking every flush."""
+    database = fake_session(
+        reject=lambda row: row["service_id"] == 9, returning=_known_services(7, 9)
+    )
+    meter = FupUsageMeter(session_factory=lambda: database)
+    meter._ensure_worker = lambda: None
+    for service_id in (7, 8, 9):
+        meter.record(service_id, 10, 10)
+
+    assert meter.flush() == 2
+    assert [
+        row["service_id"] for row in database.params("customer_traffic_counters")
+    ] == [7]
+    assert database.committed and meter.pending() == 0
+
+
+def test_evaluate_and_reset_are_single_statements():
+    """Throttling and period resets each touch every service in one UPDATE;
+    a reset only restores services whose tariff resets with that period."""
+    db = MagicMock()
+    engine = FupEngine(db)
+
+    db.execute.return_value.all.return_value = [(11, "PORTAL11", 512, 256)]
+    assert engine.evaluate() == [FupAction(11, "PORTAL11", True, 512, 256)]
+    sql = _sql(db)
+    assert sql.startswith("UPDATE customer_internet_service_instances SET")
+    assert "CASE WHEN" in sql and "data_limit_bytes" in sql
+    # Tariffs without FUP speeds throttle to the plan's speed, not to NULL
+    assert (
+        "current_speed_down_kbps=coalesce(internet_tariff_configs.fup_speed_download, "
+        "coalesce(" in sql
+    )
+
+    db.execute.return_value.all.return_value = [(11, "PORTAL11", 20000, 5000)]
+    now = datetime(2026, 10, 18, 0, 5, tzinfo=timezone.utc)  # a Sunday
+    assert engine.reset(FUPResetPeriod.WEEKLY, now) == [
+        FupAction(11, "PORTAL11", False, 20000, 5000)
+    ]
+    statement = db.execute.call_args.args[0]
+    sql = _sql(db)
+    assert sql.startswith("WITH reset_counters AS")
+    assert "week_reset <" in sql and "fup_reset_period =" in sql
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert params["week_reset_1"] == datetime(2026, 10, 12, tzinfo=timezone.utc)
+    assert params["fup_reset_period_1"] == FUPResetPeriod.WEEKLY
+    assert db.commit.call_count == 2
+
+
+def test_pending_selects_sessions_whose_applied_state_differs():
+    """Sessions not yet throttled or restored, in either direction, are
+    found with one query over the online sessions."""
+    db = MagicMock()
+    db.execute.return_value.all.return_value = [(11, "PORTAL11", True, 512, 256)]
+
+    assert FupEngine(db).pending() == [FupAction(11, "PORTAL11", True, 512, 256)]
+    sql = _sql(db)
+    assert "FROM customers_online JOIN customer_internet_service_instances" in sql
+    applied, wanted = sql.split("WHERE ")[1].split(" != ")
+    assert applied.startswith("coalesce(customers_online.fup_exceeded")
+    assert wanted.startswith(
+        "coalesce(customer_internet_service_instances.fup_exceeded"
+    )
+
+
+def test_dispatch_sends_coa_to_online_sessions():
+    """CoA goes to every online session of the actions; failures are
+    counted per session and only acknowledged changes are recorded."""
+    db = MagicMock()
+    db.execute.return_value.all.return_value = [
+        SimpleNamespace(
+            service_id=1,
+            session_id="s1",
+            login="PORTAL1",
+            nas_ip="10.0.0.1",
+            radius_secret="one",
+        ),
+        SimpleNamespace(
+            service_id=2,
+            session_id="s2",
+            login="PORTAL2",
+            nas_ip="10.0.0.2/32",
+            radius_secret="two",
+        ),
+        SimpleNamespace(
+            service_id=4,
+            session_id="s4",
+            login="PORTAL4",
+            nas_ip="10.0.0.4",
+            radius_secret="four",
+        ),
+    ]
+    actions = [
+        FupAction(1, "PORTAL1", True, 1024, 512),
+        FupAction(2, None, False, 20000, 5000),
+        FupAction(3, "PORTAL3", True, 1024, 512),
+        FupAction(4, "PORTAL4", True, 1024, 512),
+    ]
+    sent = []
+
+    async def fake_send(host, code, attributes, secret, dictionary):
+        sent.append((host, code, attributes, secret))
+        if host == "10.0.0.2":
+            raise TimeoutError("no reply")
+        if host == "10.0.0.4":
+            raise RadiusError("Response authenticator mismatch")
+        return SimpleNamespace(
+            code=COA_ACK if attributes["User-Name"] == "PORTAL1" else COA_NAK
+        )
+
+    with patch.object(radius_client, "send_request", fake_send):
+        result = asyncio.run(FupEngine(db).dispatch(actions))
+
+    assert result == {"sent": 3, "acknowledged": 1, "failed": 2, "offline": 1}
+    assert sent[0] == (
+        "10.0.0.1",
+        COA_REQUEST,
+        {
+            "User-Name": "PORTAL1",
+            "Acct-Session-Id": "s1",
+            "Mikrotik-Rate-Limit": "512k/1024k",
+            "WISPr-Bandwidth-Max-Down": 1024000,
+            "WISPr-Bandwidth-Max-Up": 512000,
+        },
+        b"one",
+    )
+    assert sent[1][0] == "10.0.0.2" and sent[1][2]["User-Name"] == "PORTAL2"
+
+    statement, applied = db.execute.call_args.args
+    assert statement.table.name == "customers_online"
+    assert applied == [
+        {
+            "p_session_id": "s1",
+            "p_throttled": True,
+            "p_speed_down": 1024,
+            "p_speed_up": 512,
+        }
+    ]
+    db.commit.assert_called_once()
+
+
+def _insert(db, table, **values):
+    return db.execute(insert(table).values(**values).returning(table.c.id)).scalar_one()
+
+
+def test_engine_statements_against_postgres(db_session, customer_factory):
+    """The meter upsert, the UPDATE ... FROM with RETURNING, the reset CTE
+    and the pending query run against the real schema."""
+    tariff_id = _insert(
+        db_session,
+        Tariff.__table__,
+        name="FUP 1 KB",
+        service_type=ServiceType.INTERNET,
+        base_price=10,
+    )
+    db_session.execute(
+        insert(fup_engine.tariff_configs).values(
+            tariff_id=tariff_id,
+            speed_download=20000,
+            speed_upload=5000,
+            fup_enabled=True,
+            data_limit_bytes=1000,
+            fup_speed_download=1024,
+            fup_speed_upload=512,
+            fup_reset_period=FUPResetPeriod.WEEKLY,
+        )
+    )
+    template_id = _insert(
+        db_session,
+        ServiceTemplate.__table__,
+        name="FUP 1 KB",
+        service_type=ServiceType.INTERNET,
+        tariff_id=tariff_id,
+    )
+    customer_id = customer_factory("FUP Customer")
+    service_id = _insert(
+        db_session,
+        fup_engine.services,
+        customer_id=customer_id,
+        service_template_id=template_id,
+        tariff_id=tariff_id,
+        service_number="FUP-0001",
+        status=ServiceStatus.ACTIVE,
+    )
+    db_session.execute(
+        insert(fup_engine.internet_services).values(
+            customer_service_id=service_id, pppoe_username="PORTAL-FUP"
+        )
+    )
+    db_session.execute(
+        insert(fup_engine.online_sessions).values(
+            customer_id=customer_id,
+            service_id=service_id,
+            login="PORTAL-FUP",
+            session_id="fup-s1",
+            start_session=datetime.now(timezone.utc),
+        )
+    )
+    db_session.commit()
+
+    meter = FupUsageMeter(session_factory=lambda: db_session)
+    meter._ensure_worker = lambda: None
+    meter.record(service_id, 300, 300)
+    meter.record(service_id + 1000, 300, 300)
+    assert meter.flush() == 1
+    meter.record(service_id, 200, 200)
+    assert meter.flush() == 1
+    counters = fup_engine.counters
+    assert db_session.execute(
+        select(counters.c.week_up, counters.c.week_down)
+    ).all() == [(500, 500)]
+
+    engine = FupEngine(db_session)
+    throttle = FupAction(service_id, "PORTAL-FUP", True, 1024, 512)
+    assert engine.evaluate() == [throttle]
+    assert engine.evaluate() == []
+    assert engine.pending() == [throttle]
+
+    # The NAS acknowledged the throttle
+    online = fup_engine.online_sessions
+    db_session.execute(update(online).values(fup_exceeded=True))
+    assert engine.pending() == []
+
+    next_week = datetime.now(timezone.utc) + timedelta(days=7)
+    restore = FupAction(service_id, "PORTAL-FUP", False, 20000, 5000)
+    assert engine.reset(FUPResetPeriod.WEEKLY, next_week) == [restore]
+    assert engine.reset(FUPResetPeriod.WEEKLY, next_week) == []
+    assert db_session.execute(select(counters.c.week_up)).scalar_one() == 0
+    assert engine.pending() == [restore]
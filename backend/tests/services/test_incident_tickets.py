@@ -0,0 +1,28 @@
+"""Tests for outage-aware ticket grouping."""
+from app.services.ticketing_service import _crossed_milestone, _IncidentIndex
+
+
+def test_incident_index_prefers_sector_over_router():
+    """A sector outage is more specific than its router's."""
+    index = _IncidentIndex([(1, [10], []), (2, [], ["7"])])
+
+    assert index.match(router_id=10, sector_id=7) == 2
+    assert index.match(router_id=10, sector_id=8) == 1
+    assert index.match(router_id=11, sector_id=None) is None
+
+
+def test_incident_index_keeps_oldest_incident_per_device():
+    """Overlapping incidents resolve to the one detected first."""
+    index = _IncidentIndex([(1, [10], []), (2, [10], [])])
+
+    assert index.match(router_id=10, sector_id=None) == 1
+
+
+def test_notifications_only_at_milestones():
+    """Aggregated webhooks fire at milestones, not per ticket."""
+    assert _crossed_milestone(0, 1)
+    assert not _crossed_milestone(1, 9)
+    assert _crossed_milestone(9, 12)
+    assert not _crossed_milestone(1001, 1999)
+    assert _crossed_milestone(1999, 2000)
+    assert not _crossed_milestone(5, 5)
@@ -0,0 +1,183 @@
+"""Unit tests for in-memory invoice composition and batched persistence."""
+from collections import namedtuple
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.models.billing import InvoiceStatus
+from app.services.billing_automation import BillingAutomationService
+from app.services.invoice_composer import InvoiceComposer
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+Header = namedtuple(
+    "Header",
+    "billing_account_id invoice_date status total_amount paid_amount balance_due",
+)
+
+
+def _header(account_id, status=InvoiceStatus.DRAFT):
+    return {
+        "billing_account_id": account_id,
+        "invoice_date": NOW,
+        "due_date": NOW,
+        "billing_period_start": NOW,
+        "billing_period_end": NOW,
+        "status": status,
+    }
+
+
+class FakeSession:
+    """Records bulk statements; inserted invoices get ids from 500."""
+
+    def __init__(self):
+        self.statements = []
+
+    def scalars(self, stmt, rows):
+        self.statements.append((stmt.table.name, rows))
+        return [500 + i for i in range(len(rows))]
+
+    def execute(self, stmt, rows=None):
+        self.statements.append((stmt.table.name, rows))
+        # Totals after the update in test_append_lines_adds_to_header_totals
+        header = Header(
+            9, NOW, InvoiceStatus.PENDING, Decimal("106"), 0, Decimal("106")
+        )
+        return SimpleNamespace(first=lambda: header)
+
+
+def test_compose_prices_lines_and_totals_exactly():
+    """Every amount is rounded once and the header equals the sum of lines."""
+    invoice = InvoiceComposer.compose(
+        _header(1),
+        [
+            {
+                "description": "Fibre",
+                "unit_price": Decimal("0.3333"),
+                "quantity": 3,
+                "tax_rate": 10,
+            },
+            {
+                "description": "Router",
+                "unit_price": "59.99",
+                "discount_percentage": 15,
+                "tax_rate": 7.5,
+            },
+            {
+                "description": "Install",
+                "unit_price": 25,
+                "discount_amount": 5,
+                "taxable": False,
+            },
+        ],
+    )
+
+    fibre, router, install = invoice.lines
+    assert (fibre["line_total"], fibre["tax_amount"]) == (
+        Decimal("1.10"),
+        Decimal("0.10"),
+    )
+    assert router["discount_amount"] == Decimal("9.00")
+    assert router["tax_amount"] == Decimal("3.82")
+    assert router["line_total"] == Decimal("54.81")
+    assert (install["tax_amount"], install["line_total"]) == (
+        Decimal("0.00"),
+        Decimal("20.00"),
+    )
+
+    values = invoice.values()
+    assert values["subtotal"] == Decimal("85.99")
+    assert values["discount_amount"] == Decimal("14.00")
+    assert values["tax_amount"] == Decimal("3.92")
+    assert values["total_amount"] == values["balance_due"] == Decimal("75.91")
+    assert values["total_amount"] == sum(line["line_total"] for line in invoice.lines)
+
+
+def test_persist_writes_batch_with_one_insert_per_table():
+    """A batch costs one number allocation and one insert per table."""
+    db = FakeSession()
+    composer = InvoiceComposer(db)
+    invoices = [
+        InvoiceComposer.compose(
+            _header(1), [{"description": "A", "unit_price": 10}] * 3
+        ),
+        InvoiceComposer.compose(
+            _header(2, InvoiceStatus.PENDING),
+            [{"description": "B", "unit_price": 4, "quantity": 2}],
+        ),
+    ]
+
+    with patch.object(
+        composer.number_allocator, "allocate_numbers", return_value=["INV-1", "INV-2"]
+    ) as allocate, patch(
+        "app.services.invoice_composer.BalanceLedger.apply_deltas"
+    ) as apply_deltas, patch.object(
+        composer.rollups, "apply_changes"
+    ) as rollup:
+        ids = composer.persist(invoices)
+
+    assert ids == [500, 501]
+    allocate.assert_called_once_with("invoice", 2, None)
+    (headers_table, headers), (lines_table, lines) = db.statements
+    assert (headers_table, lines_table) == ("invoices", "invoice_items")
+    assert [row["invoice_number"] for row in headers] == ["INV-1", "INV-2"]
+    assert [row["total_amount"] for row in headers] == [
+        Decimal("30.00"),
+        Decimal("8.00"),
+    ]
+    assert [line["invoice_id"] for line in lines] == [500, 500, 500, 501]
+    # Only the posted invoice moves its account balance
+    apply_deltas.assert_called_once_with({2: Decimal("-8.00")})
+    [entries] = rollup.call_args.args
+    assert [(entry[1], entry[2], entry[-1]) for entry in entries["invoices"]] == [
+        (InvoiceStatus.DRAFT, Decimal("30.00"), 1),
+        (InvoiceStatus.PENDING, Decimal("8.00"), 1),
+    ]
+
+
+def test_append_lines_adds_to_header_totals():
+    """New lines bump the stored totals instead of re-aggregating."""
+    db = FakeSession()
+    composer = InvoiceComposer(db)
+
+    with patch(
+        "app.services.invoice_composer.BalanceLedger.apply_deltas"
+    ) as apply_deltas, patch.object(composer.rollups, "apply_changes") as rollup:
+        composer.append_lines(
+            42, [{"description": "Static IP", "unit_price": "5", "tax_rate": 20}]
+        )
+
+    (header_table, _), (lines_table, [line]) = db.statements
+    assert (header_table, lines_table) == ("invoices", "invoice_items")
+    assert line["invoice_id"] == 42 and line["line_total"] == Decimal("6.00")
+    apply_deltas.assert_called_once_with({9: Decimal("-6.00")})
+    # The rollup moves the invoice from its old totals to the new ones
+    [entries] = rollup.call_args.args
+    assert entries["invoices"] == [
+        (NOW, InvoiceStatus.PENDING, Decimal("100.00"), 0, Decimal("100.00"), -1),
+        (NOW, InvoiceStatus.PENDING, Decimal("106"), 0, Decimal("106"), 1),
+    ]
+
+
+@pytest.mark.parametrize(
+    "billing_date, period_end",
+    [
+        (date(2026, 1, 31), datetime(2026, 2, 28, tzinfo=timezone.utc)),
+        (date(2028, 1, 30), datetime(2028, 2, 29, tzinfo=timezone.utc)),
+        (date(2026, 12, 15), datetime(2027, 1, 15, tzinfo=timezone.utc)),
+    ],
+)
+def test_service_invoice_period_ends_one_month_later(billing_date, period_end):
+    """Month-end billing dates clamp to the end of a shorter next month, and
+    December rolls over into the next year."""
+    automation = BillingAutomationService.__new__(BillingAutomationService)
+    automation.invoice_composer = InvoiceComposer(db=None)
+    service = {"id": 4, "customer_id": 2, "monthly_fee": Decimal("50")}
+
+    invoice = automation._compose_service_invoice(service, 9, billing_date)
+
+    assert invoice.header["billing_period_end"] == period_end
+    assert invoice.lines[0]["period_end"] == period_end
@@ -0,0 +1,166 @@
+"""Unit tests for the in-memory live session table."""
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.models.networking.radius import CustomerOnline
+from app.services.live_sessions import LiveSessionRegistry
+
+STARTED_AT = datetime(2026, 10, 18, 8, 0, tzinfo=timezone.utc)
+GB = 1024**3
+
+
+def _assigned_ids(stmt, params):
+    """Ids the upsert returns, numbered from 100"""
+    if not stmt.is_insert:
+        return None
+    rows = params if isinstance(params, list) else [params]
+    return [(row["session_id"], index + 100) for index, row in enumerate(rows)]
+
+
+def _written(db):
+    """Session ids deleted, customer replacements and rows upserted"""
+    deleted = [
+        value
+        for stmt, params in db.executed
+        if params is None
+        for value in stmt.whereclause.right.value
+    ]
+    rows = db.params("customers_online")
+    replaced = [
+        (row["p_customer_id"], row["p_session_id"])
+        for row in rows
+        if "p_customer_id" in row
+    ]
+    upserted = [row for row in rows if "session_id" in row]
+    return deleted, replaced, upserted
+
+
+def _registry(*sessions):
+    sessions = list(sessions)
+    registry = LiveSessionRegistry(session_factory=lambda: sessions.pop(0))
+    registry._ensure_worker = lambda: None
+    return registry
+
+
+def _start(registry, session_id, customer_id, ip, **values):
+    return registry.start(
+        {
+            "session_id": session_id,
+            "customer_id": customer_id,
+            "login": f"user{customer_id}",
+            "ipv4": ip,
+            "nas_id": 1,
+            "start_session": STARTED_AT,
+            **values,
+        }
+    )
+
+
+def test_sessions_are_indexed_and_replace_the_customers_previous_one():
+    """Lookups hit the indexes; a new start drops the customer's old session."""
+    registry = _registry()
+    _start(registry, "s1", 7, "10.0.0.7", in_bytes=GB)
+    _start(registry, "s2", 8, "10.0.0.8", nas_id=2)
+    current = _start(registry, "s3", 7, "10.0.0.70", time_on=600)
+
+    assert registry.count() == 2
+    assert registry.get("s1") is None and registry.get_by_ip("10.0.0.7") is None
+    assert registry.get_by_ip("10.0.0.70") is current
+    assert registry.get_by_login("user7") is registry.get_by_customer(7) is current
+    assert [s.session_id for s in registry.get_by_nas(2)] == ["s2"]
+    assert registry.count_by_nas(1) == 1
+    assert registry.summary() == {
+        "total_online": 2,
+        "total_data_gb": 0,
+        "total_session_time_hours": 0.17,
+        "average_session_duration_minutes": 5.0,
+    }
+
+
+def test_interim_updates_and_stops_adjust_totals_incrementally():
+    """Counters move by deltas; stopping keeps keys another session took over."""
+    registry = _registry()
+    _start(registry, "s1", 7, "10.0.0.7")
+    _start(registry, "s2", 8, "10.0.0.8")
+
+    registry.update("s1", GB, GB, 3600)
+    registry.update("s1", 2 * GB, GB, 7200)
+    assert registry.update("missing", 1, 1, 1) is None
+    assert registry.summary()["total_data_gb"] == 3.0
+    assert registry.summary()["total_session_time_hours"] == 2.0
+
+    # The address was handed to another session before s1 stopped
+    _start(registry, "s3", 9, "10.0.0.7")
+    assert registry.stop("s1") and not registry.stop("s1")
+    assert registry.get_by_ip("10.0.0.7").session_id == "s3"
+    assert registry.remove_customer(8) and registry.count() == 1
+    assert registry.summary()["total_data_gb"] == 0
+
+
+def test_flush_coalesces_changes_and_retries_failures(fake_session):
+    """One upsert per changed session, one delete per stop, ids filled in."""
+    failing, retry = fake_session(fail=True), fake_session(returning=_assigned_ids)
+    registry = _registry(failing, retry)
+    _start(registry, "s1", 7, "10.0.0.7")
+    _start(registry, "s2", 8, "10.0.0.8")
+    registry.update("s1", 10, 20, 30)
+
+    assert registry.flush() == 0
+    assert failing.rolled_back and registry.pending() == 4
+
+    registry.stop("s2")
+    assert registry.flush() == 4
+    assert retry.committed and registry.pending() == 0
+    deleted, replaced, upserted = _written(retry)
+    assert deleted == ["s2"]
+    assert replaced == [(7, "s1"), (8, "s2")]
+    assert [(row["session_id"], row["in_bytes"]) for row in upserted] == [("s1", 10)]
+    assert registry.get("s1").id == 100
+
+
+def test_rows_of_other_processes_are_deleted_and_rejected_rows_dropped(
+    fake_session,
+):
+    """Stops and removals this process cannot see still delete their rows;
+    a session row the database rejects is dropped without holding back the
+    rest."""
+    db = fake_session(
+        reject=lambda row: row.get("session_id") == "bad", returning=_assigned_ids
+    )
+    registry = _registry(db)
+    assert not registry.stop("elsewhere")
+    _start(registry, "s1", 7, "10.0.0.7")
+    _start(registry, "bad", 8, "10.0.0.8")
+    assert not registry.remove_customer(9)
+
+    assert registry.flush() == 6
+    assert db.committed and registry.pending() == 0
+    deleted, replaced, upserted = _written(db)
+    assert deleted == ["elsewhere"]
+    assert replaced == [(7, "s1"), (8, "bad"), (9, None)]
+    assert [row["session_id"] for row in upserted] == ["s1"]
+    assert registry.get("s1").id == 100
+
+
+def test_flush_against_postgres_keeps_one_row_per_customer(
+    db_session, customer_factory
+):
+    """Registries of two processes writing the same table: a start replaces
+    the customer's row written by the other, and a stop removes a row the
+    stopping process never held."""
+    first_id, second_id = customer_factory("Online 1"), customer_factory("Online 2")
+
+    other, mine = _registry(db_session, db_session), _registry(db_session, db_session)
+    _start(other, "old", first_id, "10.0.0.7")
+    _start(other, "s9", second_id, "10.0.0.9")
+    assert other.flush() == 4
+
+    _start(mine, "new", first_id, "10.0.0.70")
+    assert not mine.stop("s9")
+    assert mine.flush() == 3
+
+    table = CustomerOnline.__table__
+    rows = db_session.execute(select(table.c.customer_id, table.c.session_id)).all()
+    assert [tuple(row) for row in rows] == [(first_id, "new")]
+    assert mine.get("new").id is not None
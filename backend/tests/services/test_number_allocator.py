@@ -0,0 +1,60 @@
+"""Unit tests for the sequence-backed number allocator."""
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.exceptions import ValidationError
+from app.services import number_allocator
+from app.services.number_allocator import NumberAllocator, NumberFormat
+
+
+@pytest.fixture(autouse=True)
+def clear_blocks():
+    """Reserved blocks are process-wide; isolate each test."""
+    number_allocator._reserved_blocks.clear()
+    yield
+    number_allocator._reserved_blocks.clear()
+
+
+def test_render_matches_legacy_format():
+    """Numbers keep the PREFIX-YYYYMM-NNNN shape used before the allocator."""
+    assert NumberFormat(prefix="INV").render("202501", 7) == "INV-202501-0007"
+    assert NumberFormat(prefix="T", period_format="").render("", 12) == "T-0012"
+
+
+def test_gap_free_allocates_consecutive_range():
+    """A bulk request is served by one counter bump."""
+    allocator = NumberAllocator(MagicMock())
+    at = datetime(2025, 3, 5, tzinfo=timezone.utc)
+
+    with patch.object(NumberAllocator, "_bump_counter", return_value=12) as bump:
+        numbers = allocator.allocate_numbers("invoice", 3, at=at)
+
+    assert numbers == ["INV-202503-0010", "INV-202503-0011", "INV-202503-0012"]
+    bump.assert_called_once()
+
+
+def test_gap_tolerant_serves_from_reserved_block():
+    """Gap-tolerant kinds only hit the database when a block runs out."""
+    number_allocator.register_number_format(
+        "test_ref", NumberFormat(prefix="REF", gap_free=False, block_size=5)
+    )
+    allocator = NumberAllocator(MagicMock())
+    at = datetime(2025, 3, 5, tzinfo=timezone.utc)
+
+    with patch.object(
+        NumberAllocator, "_reserve_block", side_effect=[5, 10]
+    ) as reserve:
+        first = allocator.allocate_numbers("test_ref", 4, at=at)
+        second = allocator.allocate_numbers("test_ref", 3, at=at)
+
+    assert first[0] == "REF-202503-0001"
+    assert second == ["REF-202503-0005", "REF-202503-0006", "REF-202503-0007"]
+    assert reserve.call_count == 2
+
+
+def test_unknown_kind_is_rejected():
+    """Allocating an unregistered kind is a validation error."""
+    with pytest.raises(ValidationError):
+        NumberAllocator(MagicMock()).next_number("nope")
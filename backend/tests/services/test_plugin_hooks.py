@@ -0,0 +1,116 @@
+"""Tests for the plugin hook dispatch table and batched hook statistics."""
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.plugins import Plugin, PluginHook
+from app.services.plugin_service import HookBinding, HookStatsRecorder, PluginManager
+
+
+def _binding(hook_id, callback, priority=100, mode="inline", timeout=None):
+    return HookBinding(
+        hook_id=hook_id,
+        hook_name="customer.created",
+        plugin_id=hook_id,
+        method_name=callback.__name__,
+        priority=priority,
+        callback=callback,
+        mode=mode,
+        timeout=timeout,
+    )
+
+
+def test_dispatch_table_is_sorted_once_and_rebuilt_on_unregister():
+    """Hooks run by priority and disappear with their plugin."""
+    manager = PluginManager(db=None)
+    manager.bindings = {
+        1: [_binding(1, lambda: "late", priority=200)],
+        2: [_binding(2, lambda: "early", priority=10)],
+    }
+    manager._rebuild_dispatch()
+
+    assert manager.execute_hook("customer.created") == ["early", "late"]
+
+    manager._unregister_plugin_hooks(2)
+    assert manager.execute_hook("customer.created") == ["late"]
+    assert manager.execute_hook("unknown.hook") == []
+
+
+def test_thread_hook_timeout_does_not_stall_other_hooks(monkeypatch):
+    """A slow threaded hook is abandoned after its timeout and counted as failed."""
+    manager = PluginManager(db=None)
+    monkeypatch.setattr(manager, "_log_plugin_event", lambda *args, **kwargs: None)
+
+    def slow():
+        time.sleep(1)
+
+    manager.bindings = {
+        1: [_binding(1, slow, priority=1, mode="thread", timeout=0.05)],
+        2: [_binding(2, lambda: "ok", priority=2)],
+    }
+    manager._rebuild_dispatch()
+
+    started = time.perf_counter()
+    assert manager.execute_hook("customer.created") == ["ok"]
+    assert time.perf_counter() - started < 0.5
+    assert manager.get_hook_stats()[0]["error_count"] >= 1
+
+
+def test_stats_flush_merges_true_mean_in_one_batch():
+    """Pending executions are folded into the stored mean and count."""
+    engine = create_engine("sqlite://")
+    Plugin.__table__.create(engine)
+    PluginHook.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            Plugin.__table__.insert(),
+            {
+                "id": 1,
+                "name": "crm",
+                "display_name": "CRM",
+                "version": "1.0",
+                "plugin_type": "INTEGRATION",
+                "module_path": "crm",
+                "entry_point": "CRM",
+                "error_count": 0,
+            },
+        )
+        conn.execute(
+            PluginHook.__table__.insert(),
+            {
+                "id": 7,
+                "plugin_id": 1,
+                "hook_name": "customer.created",
+                "hook_type": "event",
+                "callback_method": "on_created",
+                "execution_count": 2,
+                "average_execution_time": 10,
+            },
+        )
+
+    recorder = HookStatsRecorder(session_factory=sessionmaker(bind=engine))
+    binding = _binding(7, lambda: None)._replace(plugin_id=1)
+    for elapsed in (40.0, 40.0):
+        recorder.record(binding, elapsed)
+    recorder.record(binding, 5.0, failed=True)
+
+    snapshot = recorder.snapshot(7)
+    assert snapshot["execution_count"] == 2
+    assert snapshot["mean_ms"] == 40.0
+    assert snapshot["p95_ms"] == 40.0
+
+    assert recorder.flush() == 1
+    with engine.connect() as conn:
+        hook = conn.execute(PluginHook.__table__.select()).one()
+        plugin = conn.execute(Plugin.__table__.select()).one()
+    assert hook.execution_count == 4
+    assert hook.average_execution_time == 25
+    assert plugin.error_count == 1
+    assert recorder.flush() == 0
+
+    # Whatever is still pending when the process exits is written on close
+    recorder.record(binding, 10.0)
+    recorder.close()
+    with engine.connect() as conn:
+        assert conn.execute(PluginHook.__table__.select()).one().execution_count == 5
@@ -0,0 +1,118 @@
+"""Unit tests for the write-coalescing presence tracker."""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.customer.base import Customer
+from app.models.networking.device import Device
+from app.services.presence import PRESENCE_TARGETS, PresenceTracker
+
+SEEN_AT = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+
+
+def _tracker(*sessions):
+    sessions = list(sessions)
+    tracker = PresenceTracker(session_factory=lambda: sessions.pop(0), max_pending=100)
+    tracker._ensure_worker = lambda: None
+    return tracker
+
+
+def test_touches_of_one_row_coalesce_to_the_latest(fake_session):
+    """Repeated touches keep one entry with the newest time and known fields."""
+    db = fake_session()
+    tracker = _tracker(db)
+    later = SEEN_AT + timedelta(seconds=30)
+
+    tracker.touch(
+        "device", 7, at=SEEN_AT, last_ip_address="10.0.0.5", last_nas_port="1"
+    )
+    tracker.touch("device", 7, at=later, last_nas_port="2", last_nas_identifier=None)
+    tracker.touch("device", 7, at=SEEN_AT - timedelta(minutes=1), last_nas_port="0")
+    tracker.touch("customer", 3, at=SEEN_AT)
+
+    assert tracker.pending() == 2
+    assert tracker.flush() == 2
+    assert db.committed and db.closed and tracker.pending() == 0
+
+    assert db.params("devices") == [
+        {
+            "p_key": 7,
+            "p_at": later,
+            "p_last_ip_address": "10.0.0.5",
+            "p_last_nas_identifier": None,
+            "p_last_nas_port": "2",
+        }
+    ]
+    assert db.params("customers") == [{"p_key": 3, "p_at": SEEN_AT}]
+
+
+def test_update_statement_never_moves_timestamps_backwards():
+    """The bulk update only advances the timestamp and keeps unknown fields."""
+    sql = str(
+        PRESENCE_TARGETS["device"].statement().compile(dialect=postgresql.dialect())
+    )
+
+    assert "last_seen IS NULL OR devices.last_seen < %(p_at)s" in sql
+    assert "last_nas_port=coalesce(%(p_last_nas_port)s, devices.last_nas_port)" in sql
+
+
+def test_failed_flush_requeues_rows_for_the_next_flush(fake_session):
+    """Rows from a failed flush are retried, merged with later touches."""
+    failing, retry = fake_session(fail=True), fake_session()
+    tracker = _tracker(failing, retry)
+    tracker.touch("customer_online", 3, at=SEEN_AT)
+    tracker.touch("customer", 3, at=SEEN_AT)
+
+    assert tracker.flush() == 0
+    assert failing.rolled_back and failing.closed
+    assert tracker.pending() == 2
+
+    later = SEEN_AT + timedelta(seconds=5)
+    tracker.touch("customer", 3, at=later)
+    assert tracker.flush() == 2
+    assert retry.params("customers") == [{"p_key": 3, "p_at": later}]
+    assert retry.params("customers_online") == [{"p_key": 3, "p_at": SEEN_AT}]
+
+
+def test_rows_the_database_rejects_are_dropped(fake_session):
+    """A row that fails on its own is dropped; the rest of its batch is kept."""
+    db = fake_session(reject=lambda row: row["p_key"] == 4)
+    tracker = _tracker(db)
+    for key in (3, 4, 5):
+        tracker.touch("customer", key, at=SEEN_AT)
+
+    assert tracker.flush() == 3
+    assert db.committed and tracker.pending() == 0
+    assert [row["p_key"] for row in db.params("customers")] == [3, 5]
+
+
+def test_flush_updates_postgres_and_drops_values_that_do_not_fit(
+    db_session, customer_factory
+):
+    """Bulk updates run against the real tables; a value too long for its
+    column loses that one row, not the flush."""
+    customer_id = customer_factory("Presence Customer")
+    devices = [
+        Device(customer_id=customer_id, mac_address=f"00:11:22:33:44:0{index}")
+        for index in (1, 2)
+    ]
+    db_session.add_all(devices)
+    db_session.commit()
+    kept_id, dropped_id = (device.id for device in devices)
+
+    tracker = PresenceTracker(session_factory=lambda: db_session, max_pending=100)
+    tracker._ensure_worker = lambda: None
+    tracker.touch("device", kept_id, at=SEEN_AT, last_nas_port="ether1")
+    tracker.touch("device", dropped_id, at=SEEN_AT, last_nas_port="x" * 60)
+    tracker.touch("customer", customer_id, at=SEEN_AT)
+    assert tracker.flush() == 3 and tracker.pending() == 0
+
+    kept, dropped = db_session.get(Device, kept_id), db_session.get(Device, dropped_id)
+    assert (kept.last_seen, kept.last_nas_port) == (SEEN_AT, "ether1")
+    assert dropped.last_seen is None
+    assert db_session.get(Customer, customer_id).last_online == SEEN_AT
+
+    # An older touch does not move the timestamp back
+    tracker.touch("device", kept_id, at=SEEN_AT - timedelta(hours=1))
+    tracker.flush()
+    assert db_session.get(Device, kept_id).last_seen == SEEN_AT
@@ -0,0 +1,411 @@
+"""Unit tests for the built-in RADIUS server's codec and batch handler."""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.models.networking.nas_radius import NASDevice
+from app.models.networking.radius import RadiusSession, SessionStatus
+from app.models.services.instances import CustomerService
+from app.services import radius_integration
+from app.services.radius_integration import RadiusServiceIntegration
+from app.services.radius_server import handler as handler_module
+from app.services.radius_server.dictionary import RadiusDictionary
+from app.services.radius_server.handler import RadiusRequestHandler
+from app.services.radius_server.packet import (
+    ACCESS_ACCEPT,
+    ACCESS_REQUEST,
+    ACCOUNTING_REQUEST,
+    ACCOUNTING_RESPONSE,
+    RadiusError,
+    decode_packet,
+    encode_reply,
+    encode_request,
+)
+
+SECRET = b"testing123"
+
+
+def _decode(data, secret=SECRET, dictionary=None):
+    return decode_packet(data, secret, dictionary or RadiusDictionary.load())
+
+
+def test_access_request_and_reply_round_trip(tmp_path):
+    """Passwords longer than one block, VSAs and site dictionary entries
+    survive encoding; replies verify against the request authenticator."""
+    extra = tmp_path / "dictionary.local"
+    extra.write_text(
+        "VENDOR Acme 9999\n"
+        "BEGIN-VENDOR Acme\n"
+        "ATTRIBUTE Acme-Tier 1 string\n"
+        "END-VENDOR Acme\n"
+    )
+    dictionary = RadiusDictionary.load(str(extra))
+    data, authenticator = encode_request(
+        ACCESS_REQUEST,
+        7,
+        {
+            "User-Name": "PORTAL1001",
+            "User-Password": "a-longer-password-123",
+            "NAS-IP-Address": "10.0.0.1",
+        },
+        SECRET,
+        dictionary,
+    )
+
+    request = _decode(data, dictionary=dictionary)
+    assert request.get("User-Password") == "a-longer-password-123"
+    assert request.get("NAS-IP-Address") == "10.0.0.1"
+    assert request.has_message_authenticator
+
+    reply = encode_reply(
+        request,
+        ACCESS_ACCEPT,
+        {
+            "WISPr-Bandwidth-Max-Down": 50_000_000,
+            "Service-Type": "Framed-User",
+            "Acme-Tier": "gold",
+            "ISP-Customer-ID": 1,
+        },
+        SECRET,
+        dictionary,
+    )
+    decoded = decode_packet(
+        reply, SECRET, dictionary, request_authenticator=authenticator
+    )
+    assert decoded.code == ACCESS_ACCEPT
+    assert decoded.attributes == {
+        "WISPr-Bandwidth-Max-Down": [50_000_000],
+        "Service-Type": ["Framed-User"],
+        "Acme-Tier": ["gold"],
+    }
+
+    with pytest.raises(RadiusError):
+        decode_packet(
+            reply, b"other-secret", dictionary, request_authenticator=authenticator
+        )
+
+
+def test_accounting_request_is_signed_and_tampering_is_rejected():
+    dictionary = RadiusDictionary.load()
+    data, _ = encode_request(
+        ACCOUNTING_REQUEST,
+        1,
+        {
+            "Acct-Status-Type": "Stop",
+            "Acct-Session-Id": "s1",
+            "Acct-Terminate-Cause": "Idle-Timeout",
+        },
+        SECRET,
+        dictionary,
+    )
+
+    packet = _decode(data)
+    assert packet.get("Acct-Status-Type") == "Stop"
+    assert packet.get("Acct-Terminate-Cause") == "Idle-Timeout"
+
+    with pytest.raises(RadiusError, match="request authenticator"):
+        _decode(data, secret=b"wrong")
+    with pytest.raises(RadiusError):
+        _decode(data[:-1] + bytes([data[-1] ^ 1]))
+    with pytest.raises(RadiusError):
+        _decode(data[:19])
+
+
+def _start_data(session_id, **values):
+    return {
+        "session_id": session_id,
+        "nas_ip": "10.0.0.1",
+        "nas_port": None,
+        "framed_ip": None,
+        "calling_station_id": None,
+        **values,
+    }
+
+
+class FakeIntegration:
+    calls = []
+
+    def __init__(self, db):
+        pass
+
+    def authenticate_customer(self, portal_id, password, nas_ip=None):
+        self.calls.append(("auth", portal_id, password, nas_ip))
+        return {
+            "authenticated": True,
+            "customer_id": 5,
+            "portal_id": portal_id,
+            "service_plan_id": 2,
+            "radius_attributes": {"Session-Timeout": 86400},
+        }
+
+    def resolve_customer(self, portal_id):
+        self.calls.append(("resolve", portal_id))
+        if portal_id != "PORTAL1002":
+            return {"authenticated": False, "reason": "Unknown portal ID"}
+        return {"authenticated": True, "customer_id": 6}
+
+    def start_session(self, auth_result, session_data):
+        self.calls.append(("start", auth_result["customer_id"], session_data))
+        return object()
+
+    def update_sessions_accounting(self, updates):
+        self.calls.append(("interims", updates))
+        return list(updates)
+
+
+class FakeSession:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_batch_reuses_accept_for_start_and_coalesces_interims():
+    """Acct-Start takes the cached Access-Accept or resolves the User-Name,
+    and is not answered if neither finds the customer; interims for one
+    session collapse to the latest counters, applied once per batch with
+    gigawords folded in."""
+    dictionary = RadiusDictionary.load()
+
+    def packet(code, attributes):
+        return (
+            _decode(encode_request(code, 1, attributes, SECRET, dictionary)[0]),
+            "10.0.0.1",
+        )
+
+    interim = {
+        "User-Name": "PORTAL1001",
+        "Acct-Status-Type": "Interim-Update",
+        "Acct-Session-Id": "s1",
+    }
+    batch = [
+        packet(ACCESS_REQUEST, {"User-Name": "PORTAL1001", "User-Password": "secret"}),
+        packet(ACCOUNTING_REQUEST, {**interim, "Acct-Status-Type": "Start"}),
+        packet(ACCOUNTING_REQUEST, {**interim, "Acct-Input-Octets": 100}),
+        packet(
+            ACCOUNTING_REQUEST,
+            {
+                **interim,
+                "Acct-Input-Octets": 5,
+                "Acct-Input-Gigawords": 1,
+                "Acct-Output-Octets": 9,
+            },
+        ),
+        packet(
+            ACCOUNTING_REQUEST,
+            {
+                "User-Name": "nobody",
+                "Acct-Status-Type": "Start",
+                "Acct-Session-Id": "s2",
+            },
+        ),
+        packet(
+            ACCOUNTING_REQUEST,
+            {
+                "User-Name": "PORTAL1002",
+                "Acct-Status-Type": "Start",
+                "Acct-Session-Id": "s3",
+            },
+        ),
+    ]
+    session = FakeSession()
+    FakeIntegration.calls = []
+
+    with patch.object(handler_module, "RadiusServiceIntegration", FakeIntegration):
+        replies = RadiusRequestHandler(lambda: session).handle_batch(batch)
+
+    assert replies[0] == (ACCESS_ACCEPT, {"Session-Timeout": 86400})
+    assert [reply and reply[0] for reply in replies[1:]] == [
+        ACCOUNTING_RESPONSE
+    ] * 3 + [
+        None,
+        ACCOUNTING_RESPONSE,
+    ]
+    assert FakeIntegration.calls == [
+        ("auth", "PORTAL1001", "secret", "10.0.0.1"),
+        ("start", 5, _start_data("s1")),
+        ("resolve", "nobody"),
+        ("resolve", "PORTAL1002"),
+        ("start", 6, _start_data("s3")),
+        (
+            "interims",
+            {
+                "s1": {
+                    "bytes_in": 2**32 + 5,
+                    "bytes_out": 9,
+                    "packets_in": 0,
+                    "packets_out": 0,
+                }
+            },
+        ),
+    ]
+    assert session.closed
+
+
+def test_interim_update_is_reported_when_the_limit_check_fails():
+    """Committed accounting stays a success even if the data limit lookup
+    fails afterwards."""
+    session = SimpleNamespace(
+        session_id="s1",
+        service_id=4,
+        bytes_in=0,
+        bytes_out=0,
+        packets_in=0,
+        packets_out=0,
+        start_time=datetime.now(timezone.utc) - timedelta(minutes=5),
+    )
+    db = MagicMock()
+    with patch.object(radius_integration, "live_sessions") as live:
+        integration = RadiusServiceIntegration(db)
+    sessions = MagicMock()
+    sessions.filter.return_value.all.return_value = [session]
+    db.query.side_effect = [
+        sessions,
+        OperationalError("SELECT", {}, Exception("connection lost")),
+    ]
+
+    with patch.object(radius_integration.fup_meter, "record"):
+        assert integration.update_session_accounting(
+            "s1", {"bytes_in": 10, "bytes_out": 20}
+        )
+
+    assert (session.bytes_in, session.bytes_out) == (10, 20)
+    db.commit.assert_called_once()
+    [(session_id, in_bytes, out_bytes, time_on)] = [
+        call.args for call in live.update.call_args_list
+    ]
+    assert (session_id, in_bytes, out_bytes) == ("s1", 10, 20)
+    assert 300 <= time_on < 360
+
+
+def test_stop_removes_the_session_from_the_live_table():
+    """Acct-Stop takes the session out of the live session table."""
+    session = SimpleNamespace(
+        id=1,
+        session_id="s1",
+        customer_id=5,
+        service_id=4,
+        bytes_in=0,
+        bytes_out=0,
+        packets_in=0,
+        packets_out=0,
+        start_time=datetime.now(timezone.utc) - timedelta(minutes=5),
+        framed_ip_address=None,
+    )
+    db = MagicMock()
+    with patch.object(radius_integration, "live_sessions") as live:
+        integration = RadiusServiceIntegration(db)
+    integration.radius_session_repo = MagicMock()
+    integration.radius_session_repo.get_all.return_value = [session]
+
+    with (
+        patch.object(radius_integration.fup_meter, "record"),
+        patch.object(radius_integration.presence_tracker, "touch"),
+        patch.object(integration, "_update_customer_statistics"),
+    ):
+        assert integration.stop_session("s1", {"bytes_in": 10, "bytes_out": 20})
+
+    live.stop.assert_called_once_with("s1")
+    assert session.time_on >= 300
+
+
+def test_start_is_recorded_and_answered_by_the_real_integration():
+    """Acct-Start builds a RadiusSession the model accepts, commits it and is
+    answered; a retransmission finds the recorded session and is answered
+    without a second insert."""
+    dictionary = RadiusDictionary.load()
+    start = decode_packet(
+        encode_request(
+            ACCOUNTING_REQUEST,
+            1,
+            {
+                "User-Name": "PORTAL1001",
+                "Acct-Status-Type": "Start",
+                "Acct-Session-Id": "s1",
+                "NAS-Port": 7,
+                "Framed-IP-Address": "100.64.0.9",
+                "Calling-Station-Id": "02:00:00:00:00:09",
+            },
+            SECRET,
+            dictionary,
+        )[0],
+        SECRET,
+        dictionary,
+    )
+    recorded = []
+    db = MagicMock()
+
+    def query(entity):
+        result = MagicMock()
+        if entity is RadiusSession:
+            result.filter.return_value.first.return_value = (
+                recorded[0] if recorded else None
+            )
+        elif entity is NASDevice.id:
+            result.filter.return_value.scalar.return_value = 3
+        elif entity is CustomerService:
+            result.filter.return_value.order_by.return_value.first.return_value = (
+                SimpleNamespace(id=4, tariff_id=2)
+            )
+        return result
+
+    db.query.side_effect = query
+    db.add.side_effect = recorded.append
+    handler = RadiusRequestHandler(lambda: db)
+    handler._remember(
+        "PORTAL1001",
+        {"authenticated": True, "customer_id": 5, "portal_id": "PORTAL1001"},
+    )
+
+    with (
+        patch.object(radius_integration.presence_tracker, "touch"),
+        patch.object(radius_integration, "live_sessions") as live,
+    ):
+        assert handler.handle_batch([(start, "10.0.0.1")]) == [
+            (ACCOUNTING_RESPONSE, {})
+        ]
+        assert handler.handle_batch([(start, "10.0.0.1")]) == [
+            (ACCOUNTING_RESPONSE, {})
+        ]
+
+    (session,) = recorded
+    assert isinstance(session, RadiusSession)
+    assert (
+        session.session_id,
+        session.nas_device_id,
+        session.customer_id,
+        session.service_id,
+        session.tariff_id,
+        session.username,
+        session.nas_port_id,
+        session.framed_ip_address,
+        session.calling_station_id,
+        session.status,
+    ) == (
+        "s1",
+        3,
+        5,
+        4,
+        2,
+        "PORTAL1001",
+        "7",
+        "100.64.0.9",
+        "02:00:00:00:00:09",
+        SessionStatus.ACTIVE,
+    )
+    db.commit.assert_called_once()
+    [(online,)] = [call.args for call in live.start.call_args_list]
+    assert {
+        name: online[name]
+        for name in ("session_id", "customer_id", "nas_id", "login", "ipv4", "port")
+    } == {
+        "session_id": "s1",
+        "customer_id": 5,
+        "nas_id": 3,
+        "login": "PORTAL1001",
+        "ipv4": "100.64.0.9",
+        "port": "7",
+    }
@@ -0,0 +1,125 @@
+"""Unit tests for the incrementally maintained reseller rollups."""
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.models.billing import Payment, PaymentStatus
+from app.models.customer import Customer
+from app.services import reseller_rollups
+from app.services.reseller_rollups import (
+    LIFETIME,
+    ROLLUP_PENDING_KEY,
+    ResellerRollupService,
+    rollup_period,
+)
+
+PAID_AT = datetime(2026, 9, 15, tzinfo=timezone.utc)
+CREATED_AT = datetime(2025, 3, 2, tzinfo=timezone.utc)
+
+
+def _applied_rows(service, pending):
+    executed = []
+    service.db = SimpleNamespace(execute=lambda stmt, rows: executed.extend(rows))
+    with patch.object(service, "_upsert", return_value=None):
+        service.apply_changes(pending)
+    return {(row["reseller_id"], row["period"]): row for row in executed}
+
+
+def test_flush_captures_reassignments_and_completed_payments():
+    """Moving a customer reverses the old reseller; completing a payment counts it."""
+    customer = Customer.__new__(Customer)
+    payment = Payment.__new__(Payment)
+    values = {
+        # (object, previous): attribute values
+        (id(customer), True): {"reseller_id": 1, "status_id": 5},
+        (id(customer), False): {
+            "reseller_id": 2,
+            "status_id": 5,
+            "created_at": CREATED_AT,
+        },
+        (id(payment), True): {"status": PaymentStatus.PENDING},
+        (id(payment), False): {
+            "status": PaymentStatus.COMPLETED,
+            "customer_id": 10,
+            "amount": Decimal("30"),
+            "payment_date": PAID_AT,
+        },
+    }
+
+    def fake_value(obj, key, previous):
+        return values[(id(obj), previous)].get(key)
+
+    session = SimpleNamespace(new=[], dirty=[customer, payment], deleted=[], info={})
+    with patch.object(reseller_rollups, "attribute_value", side_effect=fake_value):
+        reseller_rollups.rollup_changes.collect(session, None)
+
+    pending = session.info[ROLLUP_PENDING_KEY]
+    assert pending["customers"] == [(1, -1, 5, CREATED_AT), (2, 1, 5, CREATED_AT)]
+    assert pending["payments"] == [(10, None, Decimal("30"), PAID_AT, 1)]
+
+
+def test_assignment_changes_update_lifetime_and_creation_month():
+    """Each change lands in the lifetime row and, as in a rebuild, the row of
+    the month the customer was created."""
+    service = ResellerRollupService(db=None)
+    pending = {
+        "customers": [(1, -1, 5, CREATED_AT), (2, 1, 5, CREATED_AT)],
+        "statuses": [(2, 5, 6, CREATED_AT)],
+        "payments": [],
+    }
+    with patch.object(service, "_active_status_ids", return_value={5}):
+        rows = _applied_rows(service, pending)
+
+    assert (1, rollup_period()) not in rows
+    for period in (LIFETIME, "202503"):
+        assert rows[(1, period)]["customers_removed"] == 1
+        assert rows[(1, period)]["active_customers"] == -1
+        assert rows[(2, period)]["customers_added"] == 1
+        # Added as active, then suspended
+        assert rows[(2, period)]["active_customers"] == 0
+
+
+def test_payments_add_revenue_commission_and_first_payers():
+    """Commission uses the reseller's rate; paying customers count once a month."""
+    service = ResellerRollupService(db=None)
+    payments = [
+        (10, None, Decimal("100"), PAID_AT, 1),
+        (10, None, Decimal("50"), PAID_AT, 1),
+        (11, None, Decimal("20"), PAID_AT, -1),
+    ]
+    with patch.object(
+        service, "_reseller_rates", return_value=({10: 3, 11: 3}, {3: Decimal("10")})
+    ), patch.object(
+        service, "_completed_payment_counts", return_value={(10, "202609"): 2}
+    ):
+        rows = _applied_rows(service, {"payments": payments})
+
+    month, lifetime = rows[(3, "202609")], rows[(3, LIFETIME)]
+    assert month["payment_count"] == lifetime["payment_count"] == 1
+    assert month["total_revenue"] == lifetime["total_revenue"] == Decimal("130")
+    assert month["commission_amount"] == Decimal("13.00")
+    # Customer 10 started paying, customer 11's only payment was refunded
+    assert month["paying_customers"] == 0
+    assert lifetime["paying_customers"] == 0
+
+
+def test_first_read_backfills_without_touching_the_callers_transaction():
+    """The backfill commits in a session of its own; the caller's session is
+    only read from."""
+    lifetime = SimpleNamespace(period=LIFETIME)
+    caller = MagicMock()
+    backfill = MagicMock()
+    service = ResellerRollupService(caller)
+
+    with patch.object(
+        service, "_read_rollups", side_effect=[{}, {LIFETIME: lifetime}]
+    ), patch("app.core.database.SessionLocal", return_value=backfill), patch.object(
+        ResellerRollupService, "rebuild"
+    ) as rebuild:
+        assert service.get_rollups(3) == (lifetime, None)
+
+    assert rebuild.call_args.args == ([3],)
+    backfill.close.assert_called_once()
+    caller.commit.assert_not_called()
+    caller.rollback.assert_not_called()
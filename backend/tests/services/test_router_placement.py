@@ -0,0 +1,37 @@
+"""Tests for load-aware router/sector placement."""
+from app.services.router_placement import _PlacementIndex
+
+
+def _index():
+    # router_id, router_active, router_max, sector_id, sector_active, sector_max
+    return _PlacementIndex(
+        [
+            (1, 8, 10, 11, 5, None),
+            (1, 8, 10, 12, 3, None),
+            (2, 2, 10, 21, 1, 2),
+            (2, 2, 10, 22, 0, 2),
+            (3, 0, None, None, None, None),
+        ]
+    )
+
+
+def test_least_loaded_router_then_sector_wins():
+    """Uncapped routers rank as idle; within a router the emptier sector wins."""
+    index = _index()
+    assert index.best() == (3, None)
+    assert index.best(router_id=2) == (2, 22)
+    assert index.best(router_id=1) == (1, 12)
+
+
+def test_updates_rerank_and_full_candidates_are_skipped():
+    """Claimed counters re-rank the heap and full sectors are never offered."""
+    index = _index()
+    index.drop(3)
+    assert index.best() == (2, 22)
+
+    index.update(2, 3, 22, 2)  # sector 22 is now full
+    assert index.best() == (2, 21)
+
+    index.update(2, 4, 21, 2)  # router 2 has no sector left
+    assert index.best() == (1, 12)
+    assert index.best(exclude={(1, 12)}) == (1, 11)
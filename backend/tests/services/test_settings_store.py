@@ -0,0 +1,108 @@
+"""Unit tests for the settings and feature flag snapshot."""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.models.settings import FeatureFlag
+from app.services.settings_service import CompiledFlag, SettingsStore
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key) or 0) + 1
+        return self.values[key]
+
+
+def _flag(**overrides):
+    fields = {
+        "name": "new_billing",
+        "is_enabled": True,
+        "enabled_for_all": False,
+        "enabled_percentage": 0,
+        "enabled_user_ids": None,
+        "enabled_ip_ranges": None,
+        "enabled_environments": None,
+        "rollout_start_date": None,
+        "rollout_end_date": None,
+        "depends_on_flags": None,
+    }
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def _setting(key, value):
+    return SimpleNamespace(key=key, get_typed_value=lambda: value)
+
+
+def _store(redis_client, rows):
+    store = SettingsStore(
+        session_factory=lambda: SimpleNamespace(close=lambda: None), check_interval=0
+    )
+    store._redis = redis_client
+    store._fetch = lambda db: rows()
+    return store
+
+
+def test_compiled_flag_matches_model_rules():
+    """Precompiled targeting gives the same answers as the model method."""
+    flag = _flag(
+        enabled_percentage=30,
+        enabled_user_ids=[7],
+        enabled_ip_ranges=["10.0.0.0/8"],
+        enabled_environments=["staging"],
+    )
+    compiled = CompiledFlag(flag)
+    contexts = [(7, None, None), (None, "10.1.2.3", None), (None, "bad-ip", None)]
+    contexts += [(None, None, "staging"), (None, None, "production")]
+    contexts += [(user_id, None, None) for user_id in range(1, 200)]
+
+    for context in contexts:
+        expected = FeatureFlag.is_enabled_for_user(flag, *context)
+        assert compiled.evaluate(*context) == expected, context
+
+    closed = CompiledFlag(
+        _flag(
+            enabled_for_all=True,
+            rollout_end_date=datetime.now(timezone.utc) - timedelta(days=1),
+        )
+    )
+    assert closed.evaluate() is False
+
+
+def test_snapshot_caches_misses_and_loads_once():
+    """Missing keys and unknown flags are answered without reloading."""
+    loads = []
+
+    def rows():
+        loads.append(1)
+        return [_setting("billing.grace_days", 7)], [_flag(enabled_for_all=True)]
+
+    store = _store(FakeRedis(), rows)
+
+    assert store.get("billing.grace_days") == 7
+    assert store.get("missing.key", "fallback") == "fallback"
+    assert store.is_enabled("new_billing") is True
+    assert store.is_enabled("unknown_flag") is False
+    assert len(loads) == 1
+
+
+def test_version_bump_reloads_other_processes():
+    """A change in one process is picked up by another via the counter."""
+    shared = FakeRedis()
+    current = {"grace": 7}
+
+    def rows():
+        return [_setting("billing.grace_days", current["grace"])], []
+
+    writer, reader = _store(shared, rows), _store(shared, rows)
+    assert reader.get("billing.grace_days") == 7
+
+    current["grace"] = 14
+    writer.invalidate("billing.grace_days")
+
+    assert reader.get("billing.grace_days") == 14
@@ -0,0 +1,31 @@
+"""Tests for ticket search and single-pass statistics."""
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.services.ticketing_service import _average, _like_pattern, _ticket_stat_columns
+
+
+def test_like_pattern_escapes_wildcards():
+    """User input must not be able to inject ILIKE wildcards."""
+    assert _like_pattern("50%_off") == "%50\\%\\_off%"
+
+
+def test_statistics_are_one_statement_with_filter_aggregates():
+    """All counts come from one scan rather than a query per metric."""
+    sql = str(
+        select(*_ticket_stat_columns(datetime(2025, 1, 1))).compile(
+            dialect=postgresql.dialect()
+        )
+    )
+
+    # EXTRACT(epoch FROM tickets...) also reads "FROM tickets"; count clauses
+    assert sql.count("\nFROM tickets") == 1
+    assert "FILTER (WHERE" in sql
+
+
+def test_average_handles_empty_groups():
+    """Groups without samples average to zero instead of dividing by zero."""
+    assert _average(7200, 2, 3600) == 1.0
+    assert _average(None, 0) == 0.0
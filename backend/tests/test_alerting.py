@@ -0,0 +1,106 @@
+"""Tests for bounded error metric labels and aggregated alert windows."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+from app.core.alerting import OVERFLOW_LABEL, GrafanaAlertManager, LabelGuard
+from app.core.error_handling import (
+    ErrorCategory,
+    ErrorDetail,
+    ErrorImpact,
+    ErrorSeverity,
+)
+
+
+def _error(number: int, **overrides) -> ErrorDetail:
+    fields = {
+        "type": "about:blank",
+        "title": "Device unreachable",
+        "status": 503,
+        "detail": f"Ping to device failed ({number})",
+        "instance": "/network/devices/7",
+        "error_id": f"err-{number}",
+        "timestamp": datetime.now(timezone.utc),
+        "severity": ErrorSeverity.HIGH,
+        "category": ErrorCategory.NETWORK,
+        "impact": ErrorImpact.CUSTOMER_FACING,
+        "context": {"device_id": number},
+    }
+    fields.update(overrides)
+    return ErrorDetail(**fields)
+
+
+def test_label_guard_caps_distinct_values():
+    """Allow-listed and admitted values pass; the rest share one bucket."""
+    guard = LabelGuard("device_id", max_values=2, allowed=["core-1"])
+
+    assert [guard(v) for v in (1, 2, 3, "core-1", 1, None)] == [
+        "1",
+        "2",
+        OVERFLOW_LABEL,
+        "core-1",
+        "1",
+        OVERFLOW_LABEL,
+    ]
+
+
+def test_rule_index_matches_category_impact_and_severity():
+    """The precomputed index applies severity thresholds and filters."""
+    manager = GrafanaAlertManager()
+
+    network = manager._find_matching_rules(_error(1))
+    low = manager._find_matching_rules(_error(1, severity=ErrorSeverity.LOW))
+    internal = manager._find_matching_rules(_error(1, impact=ErrorImpact.OPERATIONAL))
+
+    assert [rule.name for rule in network] == ["network_infrastructure_alerts"]
+    assert low == internal == ()
+
+
+def test_burst_of_identical_errors_sends_one_summary():
+    """A burst sends the first alert, then one summary with the count."""
+    manager = GrafanaAlertManager()
+    manager._send_communication_alerts = AsyncMock()
+
+    async def burst():
+        for number in range(5000):
+            await manager.process_error(_error(number))
+        # Cooldown ends
+        for window in manager.alert_cache.values():
+            window["last_sent"] -= timedelta(minutes=window["rule"].cooldown_minutes)
+        await manager.flush_due_alerts()
+
+    asyncio.run(burst())
+
+    sent = [call.args[1] for call in manager._send_communication_alerts.await_args_list]
+    assert [detail.error_id for detail in sent] == ["err-0", "err-4999"]
+    summary = sent[1]
+    assert summary.title == "Device unreachable (x4999)"
+    assert summary.context["occurrences"] == 4999
+    assert summary.context["error_types"] == {"Device unreachable": 4999}
+    assert summary.context["sample_error_ids"].startswith("err-1, err-2")
+
+
+def test_concurrent_flushes_close_a_quiet_window_once():
+    """A flush that resumes after sending a summary skips windows closed meanwhile."""
+    manager = GrafanaAlertManager()
+    sent = []
+
+    async def send(rule, detail):
+        await asyncio.sleep(0)
+        sent.append(detail.error_id)
+
+    manager._send_communication_alerts = send
+
+    async def flush_twice():
+        await manager.process_error(_error(0))
+        await manager.process_error(_error(1))
+        [window] = manager.alert_cache.values()
+        manager.alert_cache["quiet"] = {**window, "count": 0}
+        for window in manager.alert_cache.values():
+            window["last_sent"] -= timedelta(minutes=window["rule"].cooldown_minutes)
+        await asyncio.gather(manager.flush_due_alerts(), manager.flush_due_alerts())
+
+    asyncio.run(flush_twice())
+
+    assert sent == ["err-0", "err-1"]
+    assert "quiet" not in manager.alert_cache
@@ -0,0 +1,90 @@
+"""Tests for batched change data capture into the audit queue."""
+import enum
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import Column, DateTime, Enum, Integer, String, create_engine, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.core.audit_mixins import AUDIT_CONTEXT_KEY, enable_audit_for_model
+from app.models.audit import AuditQueue
+
+WidgetBase = declarative_base()
+
+
+class WidgetState(enum.Enum):
+    NEW = "new"
+    LIVE = "live"
+
+
+class Widget(WidgetBase):
+    __tablename__ = "audited_widgets"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    state = Column(Enum(WidgetState), default=WidgetState.NEW)
+    password_hash = Column(String(255))
+    notes = Column(String(255))
+    updated_at = Column(DateTime(timezone=True))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    WidgetBase.metadata.create_all(engine)
+    AuditQueue.__table__.create(engine)
+    enable_audit_for_model(Widget, exclude=["notes"])
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+
+
+def _queued(db):
+    return db.execute(select(AuditQueue).order_by(AuditQueue.id)).scalars().all()
+
+
+def test_changes_are_queued_once_at_commit(session):
+    """Inserts, updates and deletes across flushes land in one bulk insert."""
+    session.info[AUDIT_CONTEXT_KEY] = {"user_id": 42}
+    widget = Widget(name="router", password_hash="secret", notes="ignored")
+    session.add(widget)
+    session.flush()
+    widget.state = WidgetState.LIVE
+    widget.updated_at = datetime.now(timezone.utc)
+    session.flush()
+    assert _queued(session) == []
+
+    session.commit()
+
+    insert, update = _queued(session)
+    assert (insert.operation, insert.record_id, insert.user_id) == (
+        "INSERT",
+        str(widget.id),
+        42,
+    )
+    assert insert.new_values == {"id": widget.id, "name": "router", "state": "new"}
+    assert update.old_values == {"state": "new"}
+    assert update.new_values == {"state": "live"}
+
+    session.delete(widget)
+    session.commit()
+    assert _queued(session)[-1].operation == "DELETE"
+
+
+def test_excluded_only_changes_and_rollbacks_queue_nothing(session):
+    """Updates touching only excluded columns, and rolled back work, are dropped."""
+    widget = Widget(name="switch")
+    session.add(widget)
+    session.commit()
+    count = len(_queued(session))
+
+    widget.notes = "maintenance"
+    widget.updated_at = datetime.now(timezone.utc)
+    session.commit()
+
+    widget.name = "renamed"
+    session.flush()
+    session.rollback()
+    session.commit()
+
+    assert len(_queued(session)) == count
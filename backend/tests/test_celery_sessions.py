@@ -0,0 +1,66 @@
+"""Tests for task-scoped database sessions and batched units of work."""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core import database
+from app.core.celery import celery_app
+
+
+@pytest.fixture
+def sqlite_sessions(monkeypatch):
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, value INTEGER)"))
+    factory = sessionmaker(bind=engine)
+    opened = []
+
+    def tracking_factory():
+        db = factory()
+        opened.append(db)
+        return db
+
+    monkeypatch.setattr(database, "SessionLocal", tracking_factory)
+    return engine, opened
+
+
+def test_task_session_is_shared_and_closed_on_failure(sqlite_sessions):
+    """One session per execution, released even when the task raises."""
+    engine, opened = sqlite_sessions
+
+    @celery_app.task(bind=True, name="tests.session_scope")
+    def failing(self):
+        assert self.session() is self.session()
+        self.session().execute(text("INSERT INTO items (value) VALUES (1)"))
+        raise RuntimeError("boom")
+
+    result = failing.apply()
+
+    assert result.failed()
+    assert len(opened) == 1
+    assert not opened[0].in_transaction()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM items")).scalar() == 0
+
+
+def test_process_in_batches_commits_per_batch_and_skips_failures(sqlite_sessions):
+    """A failing batch is rolled back without losing the batches around it."""
+    engine, opened = sqlite_sessions
+
+    def handler(db, batch):
+        if 5 in batch:
+            raise ValueError("bad row")
+        for value in batch:
+            db.execute(text("INSERT INTO items (value) VALUES (:v)"), {"v": value})
+
+    summary = database.process_in_batches(range(10), handler, batch_size=4)
+
+    assert summary["batches"] == 3
+    assert (summary["processed"], summary["failed"]) == (6, 4)
+    assert summary["errors"] == ["bad row"]
+    assert len(opened) == 1
+    with engine.connect() as conn:
+        values = (
+            conn.execute(text("SELECT value FROM items ORDER BY value")).scalars().all()
+        )
+    assert values == [0, 1, 2, 3, 8, 9]
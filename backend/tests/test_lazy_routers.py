@@ -0,0 +1,58 @@
+"""Tests for mounting the v1 endpoint routers on first request."""
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import api
+from app.api.v1.api import LazyRouterLoader, LazyRouterMiddleware, RouterSpec
+
+SPECS = (
+    RouterSpec("endpoints.services", "/services", ("services",)),
+    RouterSpec("endpoints.service_templates", "/services/templates", ("services",)),
+    RouterSpec("endpoints.billing", "/billing", ("billing",)),
+)
+
+
+def _lazy_app(monkeypatch):
+    imported = []
+
+    def fake_load_router(spec):
+        imported.append(spec.module)
+        router = APIRouter()
+
+        @router.get("/{item}")
+        def handler(item: str):
+            return {"module": spec.module, "item": item}
+
+        return router
+
+    monkeypatch.setattr(api, "load_router", fake_load_router)
+    app = FastAPI()
+    loader = LazyRouterLoader(app, "/api/v1", SPECS)
+    app.add_middleware(
+        LazyRouterMiddleware, loader=loader, schema_paths=[app.openapi_url]
+    )
+    return TestClient(app), loader, imported
+
+
+def test_routers_mount_on_first_matching_request(monkeypatch):
+    """Only routers under the requested prefix are imported, in table order."""
+    client, loader, imported = _lazy_app(monkeypatch)
+
+    response = client.get("/api/v1/services/templates/basic")
+
+    assert imported == ["endpoints.services", "endpoints.service_templates"]
+    assert response.json() == {"module": "endpoints.service_templates", "item": "basic"}
+    assert client.get("/api/v1/billingx/1").status_code == 404
+    assert not loader.complete
+
+
+def test_openapi_request_mounts_every_router(monkeypatch):
+    """The schema endpoint sees every route, regenerated after late mounts."""
+    client, loader, imported = _lazy_app(monkeypatch)
+    client.get("/api/v1/billing/1")
+
+    paths = client.get("/openapi.json").json()["paths"]
+
+    assert loader.complete
+    assert len(imported) == len(SPECS)
+    assert {"/api/v1/services/{item}", "/api/v1/billing/{item}"} <= set(paths)
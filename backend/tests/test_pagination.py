@@ -0,0 +1,65 @@
+"""Tests for keyset pagination helpers."""
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.exceptions import ValidationError
+from app.repositories.pagination import (
+    build_page,
+    decode_cursor,
+    encode_cursor,
+    estimate_query_count,
+)
+
+
+def test_cursor_round_trip_preserves_types():
+    """Datetimes and decimals should survive encoding unchanged."""
+    values = [datetime(2025, 1, 31, 12, 30, tzinfo=timezone.utc), Decimal("9.50"), 42]
+
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+def test_decode_cursor_rejects_garbage():
+    """Tampered cursors should raise a ValidationError, not a 500."""
+    with pytest.raises(ValidationError):
+        decode_cursor("not-a-cursor!!")
+
+
+def test_build_page_uses_look_ahead_row():
+    """The extra row signals another page and is not returned."""
+    rows = [SimpleNamespace(id=i) for i in range(1, 5)]
+
+    page = build_page(rows, 3, ["id"])
+
+    assert [r.id for r in page.items] == [1, 2, 3]
+    assert page.has_more is True
+    assert decode_cursor(page.next_cursor) == [3]
+
+
+def test_build_page_last_page_has_no_cursor():
+    """A short page is the last one."""
+    rows = [SimpleNamespace(id=i) for i in range(1, 3)]
+
+    page = build_page(rows, 3, ["id"])
+
+    assert page.has_more is False
+    assert page.next_cursor is None
+
+
+def test_failed_estimate_rolls_back_only_its_savepoint():
+    """An EXPLAIN error must not abort the caller's transaction, so the
+    exact-count fallback can still run."""
+    db = MagicMock()
+    db.connection.return_value.exec_driver_sql.side_effect = RuntimeError(
+        "EXPLAIN failed"
+    )
+    savepoint = db.begin_nested.return_value
+
+    with pytest.raises(RuntimeError):
+        estimate_query_count(db, MagicMock())
+
+    savepoint.__enter__.assert_called_once()
+    assert savepoint.__exit__.call_args.args[0] is RuntimeError
@@ -0,0 +1,73 @@
+"""Tests for the fused pure-ASGI request pipeline."""
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.security_middleware import rate_limit_store
+from app.middleware.request_pipeline import RequestPipelineMiddleware
+
+
+def _client(**options) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/healthz")
+    def healthz():
+        return {"status": "healthy"}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]))
+
+    @app.post("/echo")
+    async def echo(payload: dict):
+        return payload
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(RequestPipelineMiddleware, **options)
+    # Untrusted client address so the security screening applies
+    return TestClient(
+        app,
+        raise_server_exceptions=False,
+        headers={"X-Forwarded-For": "203.0.113.7", "User-Agent": "pytest"},
+    )
+
+
+def setup_function():
+    rate_limit_store.requests.clear()
+    rate_limit_store.blocked_ips.clear()
+
+
+def test_headers_request_id_and_streaming_pass_through():
+    """Security headers and request ids are added without buffering bodies."""
+    client = _client(sample_rate=0.0)
+
+    resp = client.get("/stream", headers={"X-Request-ID": "req-1"})
+    assert resp.content == b"abc"
+    assert resp.headers["X-Request-ID"] == "req-1"
+    assert resp.headers["X-Frame-Options"] == "DENY"
+    assert "Content-Security-Policy" in client.get("/healthz").headers
+
+
+def test_body_is_inspected_and_replayed_to_the_app():
+    """Clean bodies reach the endpoint intact; injections are rejected."""
+    client = _client(sample_rate=0.0)
+
+    assert client.post("/echo", json={"name": "ok"}).json() == {"name": "ok"}
+    resp = client.post("/echo", json={"q": "1 UNION SELECT password"})
+    assert resp.status_code == 400
+
+
+def test_fast_path_still_blocks_scanners_and_errors_are_converted():
+    """Probes skip rate limiting but not user-agent screening."""
+    client = _client(sample_rate=0.0, fast_paths=["/healthz"])
+
+    assert (
+        client.get("/healthz", headers={"User-Agent": "sqlmap/1.0"}).status_code == 403
+    )
+    setup_function()
+    resp = _client(sample_rate=0.0).get("/boom")
+    assert resp.status_code == 500
+    assert "X-Request-ID" in resp.headers
@@ -0,0 +1,63 @@
+"""Tests for the shared per-transaction change collector."""
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import column_property, declarative_base, sessionmaker
+
+from app.core.session_changes import ChangeCollector, attribute_value
+
+GadgetBase = declarative_base()
+
+
+class Gadget(GadgetBase):
+    __tablename__ = "collected_gadgets"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = column_property(Column(Integer), active_history=True)
+    name = Column(String(50))
+
+
+applied = []
+
+
+def _capture(session, obj, operation):
+    if not isinstance(obj, Gadget):
+        return
+    before = attribute_value(obj, "owner_id", previous=True)
+    after = attribute_value(obj, "owner_id", previous=False)
+    if operation == "INSERT" or before != after:
+        collector.pending(session).append((operation, before, after))
+
+
+collector = ChangeCollector(
+    "test_gadget_changes", _capture, lambda session, pending: applied.append(pending)
+)
+
+
+def test_changes_are_applied_once_per_commit_and_dropped_on_rollback():
+    """Changes from several flushes reach ``apply`` together at commit; the
+    previous value of an expired active_history column is still known."""
+    engine = create_engine("sqlite://")
+    GadgetBase.metadata.create_all(engine)
+    assert collector.install() is True
+    assert collector.install() is False
+    db = sessionmaker(bind=engine)()
+    applied.clear()
+
+    gadget = Gadget(owner_id=1, name="modem")
+    db.add(gadget)
+    db.flush()
+    gadget.name = "router"
+    db.commit()
+    assert applied == [[("INSERT", None, 1)]]
+
+    # Expired by the commit; the old owner is loaded when it is replaced
+    gadget.owner_id = 2
+    db.commit()
+    assert applied[-1] == [("UPDATE", 1, 2)]
+
+    gadget.owner_id = 3
+    db.flush()
+    db.rollback()
+    db.commit()
+    assert len(applied) == 2
+    assert "test_gadget_changes" not in db.info
+    db.close()
@@ -0,0 +1,66 @@
+"""Tests for per-request SQL profiling and N+1 detection."""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.sql_instrumentation import (
+    assert_max_queries,
+    fingerprint,
+    install_sql_instrumentation,
+    parameter_shape,
+    profile_queries,
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    install_sql_instrumentation(engine)
+    install_sql_instrumentation(engine)  # idempotent
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO items (name) VALUES ('a'), ('b'), ('c')"))
+    return engine
+
+
+def test_fingerprint_ignores_literal_values():
+    """Executions differing only in values share one fingerprint."""
+    assert fingerprint(
+        "SELECT * FROM items WHERE id = 1 AND name = 'x'"
+    ) == fingerprint("SELECT *  FROM items WHERE id = 42 AND name = 'it''s'")
+    assert fingerprint("SELECT * FROM items WHERE id IN (?, ?, ?)") == fingerprint(
+        "SELECT * FROM items WHERE id IN (?)"
+    )
+    assert parameter_shape({"ids": [1, 2, 3], "name": "x"}) == {
+        "ids": "list[int] x3",
+        "name": "str",
+    }
+
+
+def test_profile_flags_repeated_statement(engine):
+    """A statement run once per row is reported as an N+1 suspect."""
+    with (
+        profile_queries("test", "/items", export=False) as profile,
+        engine.connect() as conn,
+    ):
+        for item_id in range(1, 13):
+            conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": item_id})
+
+    assert profile.query_count == 12
+    assert profile.total_seconds > 0
+    [(statement, count)] = profile.repeated(threshold=10)
+    assert count == 12
+    assert "FROM items WHERE id = ?" in statement
+
+
+def test_assert_max_queries_reports_worst_statements(engine):
+    """The query cap fails with the most repeated statements listed."""
+    with assert_max_queries(1), engine.connect() as conn:
+        conn.execute(text("SELECT name FROM items"))
+
+    with (
+        pytest.raises(AssertionError, match=r"issued 3 queries \(limit 2\)"),
+        assert_max_queries(2),
+        engine.connect() as conn,
+    ):
+        for _ in range(3):
+            conn.execute(text("SELECT name FROM items"))
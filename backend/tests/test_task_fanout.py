@@ -0,0 +1,39 @@
+"""Tests for chunked Celery fan-out and result aggregation."""
+from app.core.celery import celery_app
+from app.tasks.fanout import chunk_ids, fan_out, merge_batch_results
+
+
+def test_chunk_ids_deduplicates_and_splits():
+    """Ids are sorted, de-duplicated and cut into fixed-size chunks."""
+    assert chunk_ids([5, 1, 3, 1, 4, 2], chunk_size=2) == [[1, 2], [3, 4], [5]]
+    assert chunk_ids([], chunk_size=10) == []
+
+
+def test_merge_sums_numbers_and_caps_lists(monkeypatch):
+    """Counters add up across batches; listed failures are bounded."""
+    monkeypatch.setattr("app.tasks.fanout.FANOUT_MAX_LISTED", 3)
+    merged = merge_batch_results(
+        [
+            {"sent": 2, "failed": 1, "failures": [1], "ok": True, "note": "x"},
+            None,
+            {"sent": 3, "failed": 2, "failures": [7, 8, 9]},
+        ]
+    )
+    assert merged == {"sent": 5, "failed": 3, "failures": [1, 7, 8]}
+
+
+def test_fan_out_sends_one_task_per_chunk(monkeypatch):
+    """Each chunk becomes one batch task and the chord merges their results."""
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    seen = []
+
+    @celery_app.task(name="tests.fanout_batch")
+    def batch(ids, multiplier=1):
+        seen.append(ids)
+        return {"processed": len(ids) * multiplier}
+
+    summary = fan_out(batch, range(1, 11), chunk_size=4, label="test", multiplier=2)
+
+    assert (summary["total_ids"], summary["batches"]) == (10, 3)
+    assert seen == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    assert summary["result_id"] is not None
@@ -0,0 +1,151 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import text
+
+from app.repositories import usage_tracking
+from app.repositories.usage_tracking import UsageRepository, month_start
+
+
+@pytest.fixture
+def mock_db():
+    """Return a mock SQLAlchemy session object."""
+    db = MagicMock()
+    db.commit.return_value = None
+    return db
+
+
+@pytest.fixture(autouse=True)
+def no_known_partitions():
+    with patch.object(usage_tracking, "_known_partitions", set()):
+        yield
+
+
+def _statements(db):
+    return [str(c.args[0]) for c in db.execute.call_args_list]
+
+
+def test_record_usage_many_inserts_in_chunks_and_creates_missing_partitions(mock_db):
+    """Rows get default counters and are inserted per chunk; a missing
+    partition is created in the same transaction, under a lock timeout, and
+    a committed one is remembered."""
+    repo = UsageRepository(mock_db)
+    # Late on Oct 31 in UTC-5 is already November in UTC
+    evening = datetime(2026, 10, 31, 21, 0, tzinfo=timezone(timedelta(hours=-5)))
+    records = [
+        {"customer_service_id": n, "tracking_date": evening, "period_type": "daily"}
+        for n in range(2500)
+    ]
+    november = {date(2026, 11, 1): "service_usage_tracking_p2026_11"}
+    mock_db.execute.return_value.scalar.return_value = "0"
+
+    with patch.object(repo, "list_partitions", side_effect=[{}, november]) as listed:
+        assert repo.record_usage_many(records) == 2500
+        assert repo.record_usage_many(records[:1]) == 1
+        assert repo.record_usage_many(records[:1]) == 1
+    assert listed.call_count == 2
+
+    statements = _statements(mock_db)
+    assert statements[:4] == [
+        "SELECT current_setting('lock_timeout')",
+        "SELECT set_config('lock_timeout', :value, true)",
+        'CREATE TABLE IF NOT EXISTS "service_usage_tracking_p2026_11" '
+        "PARTITION OF service_usage_tracking "
+        "FOR VALUES FROM ('2026-11-01 00:00+00') TO ('2026-12-01 00:00+00')",
+        "SELECT set_config('lock_timeout', :value, true)",
+    ]
+    assert [c.args[1] for c in mock_db.execute.call_args_list[1:4:2]] == [
+        {"value": "2000ms"},
+        {"value": "0"},
+    ]
+    mock_db.begin_nested.assert_called_once()
+
+    batches = [c.args[1] for c in mock_db.execute.call_args_list[4:]]
+    assert [len(batch) for batch in batches] == [1000, 1000, 500, 1, 1]
+    assert batches[0][0]["bytes_downloaded"] == 0
+    assert batches[0][0]["usage_charges"] == Decimal("0")
+    assert repo.record_usage_many([]) == 0
+
+
+def test_partition_ddl_runs_in_the_callers_postgres_transaction(db_session):
+    """The partition is created with the rows that need it, and disappears
+    with them on rollback; the session's lock timeout is left as it was."""
+    repo = UsageRepository(db_session)
+    month = date(1999, 1, 1)
+    name = "service_usage_tracking_p1999_01"
+    before = db_session.execute(text("SHOW lock_timeout")).scalar()
+
+    repo.ensure_partitions([month])
+    assert repo.list_partitions()[month] == name
+    assert db_session.execute(text("SHOW lock_timeout")).scalar() == before
+    assert month not in usage_tracking._known_partitions
+
+    db_session.rollback()
+    assert month not in repo.list_partitions()
+
+
+def test_usage_trends_are_aggregated_per_bucket_in_sql(mock_db):
+    """Trends come from one grouped query; buckets map to the trend rows."""
+    repo = UsageRepository(mock_db)
+    query = mock_db.query.return_value
+    query.filter.return_value = query
+    query.group_by.return_value = query
+    query.order_by.return_value = query
+    query.all.return_value = [
+        SimpleNamespace(
+            bucket=datetime(2026, 10, 17, tzinfo=timezone.utc),
+            total_bytes=Decimal(3 * 1024**3),
+            sessions=4,
+            session_minutes=90,
+            incoming_calls=2,
+            outgoing_calls=3,
+            call_minutes=12,
+            uptime_minutes=1440,
+            downtime_minutes=0,
+            charges=Decimal("7.50"),
+        )
+    ]
+
+    trends = repo.get_usage_trends(42, period_type="daily", days=7)
+
+    assert trends == [
+        {
+            "date": "2026-10-17",
+            "data_usage_gb": 3.0,
+            "sessions": 4,
+            "session_minutes": 90,
+            "calls": 5,
+            "call_minutes": 12,
+            "uptime_minutes": 1440,
+            "downtime_minutes": 0,
+            "charges": 7.5,
+        }
+    ]
+    (bucket,) = query.group_by.call_args.args
+    assert "date_trunc" in str(bucket) and "tracking_date" in str(bucket)
+
+
+def test_cleanup_drops_expired_partitions_and_deletes_only_the_boundary_month(mock_db):
+    """Whole months before the cutoff are dropped; the rest is a bounded DELETE."""
+    repo = UsageRepository(mock_db)
+    now = datetime.now(timezone.utc)
+    cutoff_month = month_start(now - timedelta(days=365))
+    old_month = date(cutoff_month.year - 1, cutoff_month.month, 1)
+    partitions = {
+        old_month: f"service_usage_tracking_p{old_month:%Y_%m}",
+        cutoff_month: f"service_usage_tracking_p{cutoff_month:%Y_%m}",
+    }
+    mock_db.execute.return_value.scalar.return_value = 1200.0
+    mock_db.query.return_value.filter.return_value.delete.return_value = 30
+
+    with patch.object(repo, "list_partitions", return_value=partitions):
+        removed = repo.cleanup_old_usage_data(days_to_keep=365)
+
+    assert removed == 1230
+    statements = [str(c.args[0]) for c in mock_db.execute.call_args_list]
+    assert f'DROP TABLE IF EXISTS "{partitions[old_month]}"' in statements
+    assert not any(partitions[cutoff_month] in s and "DROP" in s for s in statements)
+    mock_db.commit.assert_called_once()